@@ -1,13 +1,17 @@
 # app/__init__.py
-from app.chatbot.routes import chatbot_bp
+import os
 
-# app/__init__.py
 from flask import Flask
 from dotenv import load_dotenv
 
 load_dotenv()  # Carga variables del .env
 
+from app.extensions import init_db, init_jwt
+from app.chatbot.routes import chatbot_bp
+
 app = Flask(__name__)
 app.config["DEEPSEEK_API_KEY"] = os.getenv("DEEPSEEK_API_KEY")
+init_jwt(app)
+init_db(app)
 
 app.register_blueprint(chatbot_bp, url_prefix='/chatbot')
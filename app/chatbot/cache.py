@@ -0,0 +1,170 @@
+# app/chatbot/cache.py
+"""
+Caché de respuestas del chatbot.
+
+La clave es el mensaje normalizado (minúsculas, sin acentos, signos ni
+espacios de más), el plan del usuario y una huella del contexto que recibe
+el modelo (prompt del sistema, modelo, rol). "¿Cómo crear un flujo
+automático?" y "como crear un flujo automatico" comparten respuesta; un
+cambio en el prompt cambia la huella y deja de usar lo viejo.
+
+Los mensajes que hablan de los datos del propio usuario ("¿cuántos flujos
+tengo?", "mi suscripción") no se cachean: is_personal() los detecta y el
+bot va siempre al modelo.
+
+Primero se busca en memoria (LRU con TTL) y, si se configuró `path`, en una
+tabla SQLite que sobrevive a reinicios y se comparte entre procesos.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from database import get_pool
+
+DEFAULT_TTL = 24 * 3600
+# Cada cuántas escrituras se borran del disco las entradas vencidas
+PURGE_EVERY = 100
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+_PERSONAL = re.compile(
+    r"\b(mi|mis|mio|mia|mios|mias|yo|tengo|tenemos|nuestro|nuestra|nuestros|nuestras|conmigo"
+    r"|my|mine|our|i|ive|im)\b"
+)
+
+
+def normalize(message):
+    text = unicodedata.normalize("NFKD", message.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def is_personal(message):
+    """True si la respuesta depende de datos del usuario y no se puede compartir."""
+    return _PERSONAL.search(normalize(message)) is not None
+
+
+def fingerprint(*parts):
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1000, ttl=DEFAULT_TTL, path=None, max_disk_entries=50_000, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"aciertos": 0, "aciertos_disco": 0, "fallos": 0, "omitidos": 0}
+        self._writes = 0
+        self.pool = get_pool(path) if path else None
+        if self.pool is not None:
+            with self.pool.transaction() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chatbot_responses (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chatbot_responses_expires ON chatbot_responses(expires_at)")
+
+    @staticmethod
+    def key(message, plan, context_fingerprint):
+        return fingerprint(context_fingerprint, plan, normalize(message))
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, key, response, expires_at):
+        with self._lock:
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["aciertos"] += 1
+                    return entry[0]
+                del self._memory[key]
+        if self.pool is not None:
+            row = self.pool.connection().execute(
+                "SELECT response, expires_at FROM chatbot_responses WHERE key=? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self._count("aciertos_disco")
+                return row[0]
+        self._count("fallos")
+        return None
+
+    def put(self, key, response):
+        now = self.clock()
+        expires_at = now + self.ttl
+        self._remember(key, response, expires_at)
+        if self.pool is None:
+            return
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO chatbot_responses (key, response, expires_at) VALUES (?, ?, ?)",
+                         (key, response, expires_at))
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge()
+
+    def purge(self):
+        """Borra del disco lo vencido y, si sobran entradas, las que vencen antes."""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM chatbot_responses WHERE expires_at <= ?", (self.clock(),))
+            conn.execute("""
+                DELETE FROM chatbot_responses WHERE key IN (
+                    SELECT key FROM chatbot_responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_disk_entries,))
+
+    def skip(self):
+        """Registra un mensaje que no pasó por la caché (personal)."""
+        self._count("omitidos")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.pool is not None:
+            with self.pool.transaction() as conn:
+                conn.execute("DELETE FROM chatbot_responses")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, en_memoria=len(self._memory))
+        lookups = stats["aciertos"] + stats["aciertos_disco"] + stats["fallos"]
+        stats["tasa_aciertos"] = round((stats["aciertos"] + stats["aciertos_disco"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Caché del proceso; CHATBOT_CACHE_PATH activa la copia en SQLite."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    ttl=int(os.getenv("CHATBOT_CACHE_TTL", DEFAULT_TTL)),
+                    path=os.getenv("CHATBOT_CACHE_PATH") or None,
+                )
+    return _cache
@@ -0,0 +1,255 @@
+# app/chatbot/client.py
+"""
+Cliente HTTP de DeepSeek compartido por todo el proceso.
+
+Una sola requests.Session con pool de conexiones keep-alive: cada mensaje
+del chat reutiliza una conexión TLS ya abierta en vez de negociar una nueva.
+Todas las llamadas tienen timeout (conexión y lectura) y un máximo de
+llamadas simultáneas a la API. Las que no tienen lugar esperan en una cola
+de a lo sumo MAX_QUEUE; con la cola llena, o sin lugar en MAX_WAIT segundos,
+se lanza ChatbotBusy (429 en las rutas) en vez de encolar sin límite.
+
+Pedidos idénticos (mismo modelo, mensajes y opciones) que llegan mientras
+uno está en curso no hacen otra llamada: se suman a la que ya está en vuelo
+y reciben el mismo texto, incluso por fragmentos (ver _Flight). Es lo que
+pasa cuando un anuncio a todo el equipo dispara la misma pregunta a la vez.
+
+stream() devuelve el texto a medida que llega (SSE de la API, stream=True),
+para reenviarlo al navegador sin esperar la respuesta completa.
+"""
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEFAULT_MODEL = "deepseek-chat"
+# (conexión, lectura entre bytes); la lectura larga cubre respuestas lentas del modelo
+TIMEOUT = (3.05, 60)
+MAX_CONCURRENCY = 8
+MAX_QUEUE = 32
+MAX_WAIT = 10
+
+
+class ChatbotError(Exception):
+    """La API respondió con un error o con algo que no se puede interpretar."""
+
+
+class ChatbotBusy(ChatbotError):
+    """Ya hay MAX_CONCURRENCY llamadas en curso y la cola está llena o no se liberó ninguna a tiempo."""
+
+
+class _Flight:
+    """
+    Una llamada a la API compartida por todos los pedidos idénticos que llegan
+    mientras está en curso. No hay hilo propio: el suscriptor que necesita el
+    próximo fragmento lo lee de `source` (con el candado tomado, los demás
+    esperan ese mismo fragmento) y queda en `chunks` para el resto, incluidos
+    los que se suman tarde. Si se van todos, se cierra `source` y con eso la
+    conexión y el lugar en el límite de concurrencia.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.lock = threading.Lock()
+
+
+class DeepSeekClient:
+    def __init__(self, api_key=None, url=DEEPSEEK_API_URL, model=DEFAULT_MODEL, timeout=TIMEOUT,
+                 max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE, max_wait=MAX_WAIT, retries=2):
+        self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._flights = {}
+        self._counts = {"llamadas": 0, "compartidas": 0, "rechazadas": 0}
+        self.session = requests.Session()
+        # Reintentos solo para fallos de conexión y 502/503/504, que no llegaron a generar nada
+        retry = Retry(total=retries, connect=retries, read=0, backoff_factor=0.3, raise_on_status=False,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset({"POST"}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def _payload(self, messages, temperature, stream, **options):
+        return {"model": self.model, "messages": messages, "temperature": temperature, "stream": stream, **options}
+
+    def _busy(self):
+        with self._lock:
+            self._counts["rechazadas"] += 1
+        return ChatbotBusy("El asistente está atendiendo demasiadas consultas, intenta de nuevo en unos segundos")
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    full = True
+                else:
+                    full = False
+                    self._waiting += 1
+            if full:
+                raise self._busy()
+            try:
+                acquired = self._slots.acquire(timeout=self.max_wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise self._busy()
+        with self._lock:
+            self._in_flight += 1
+            self._counts["llamadas"] += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _shared(self, payload, source):
+        """Suscribe al pedido en curso con el mismo payload, o empieza uno nuevo con `source()`."""
+        key = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(source())
+            else:
+                self._counts["compartidas"] += 1
+            flight.subscribers += 1
+        return self._follow(key, flight)
+
+    def _follow(self, key, flight):
+        position = 0
+        try:
+            while True:
+                with flight.lock:
+                    if position == len(flight.chunks) and not flight.done:
+                        try:
+                            flight.chunks.append(next(flight.source))
+                        except StopIteration:
+                            flight.done = True
+                        except Exception as e:
+                            flight.done, flight.error = True, e
+                        if flight.done:
+                            # Terminada: quien llegue ahora hace su propia llamada
+                            with self._lock:
+                                if self._flights.get(key) is flight:
+                                    del self._flights[key]
+                    if position < len(flight.chunks):
+                        chunk = flight.chunks[position]
+                    elif flight.error is not None:
+                        raise flight.error
+                    else:
+                        return
+                position += 1
+                yield chunk
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                last = flight.subscribers == 0
+                if last and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if last:
+                flight.source.close()
+
+    def _post(self, payload, stream):
+        try:
+            response = self.session.post(self.url, json=payload, stream=stream, timeout=self.timeout,
+                                         headers={"Authorization": f"Bearer {self.api_key}"})
+        except requests.RequestException as e:
+            raise ChatbotError(f"No se pudo contactar a DeepSeek: {e}") from e
+        if response.status_code >= 400:
+            detail = response.text[:300]
+            response.close()
+            raise ChatbotError(f"DeepSeek respondió {response.status_code}: {detail}")
+        return response
+
+    def complete(self, messages, temperature=0.3, **options):
+        """Respuesta completa del modelo como texto."""
+        payload = self._payload(messages, temperature, False, **options)
+        replies = self._shared(payload, lambda: self._complete(payload))
+        try:
+            return next(replies)
+        finally:
+            replies.close()
+
+    def _complete(self, payload):
+        self._acquire()
+        try:
+            with self._post(payload, stream=False) as response:
+                data = response.json()
+        finally:
+            self._release()
+        try:
+            yield data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ChatbotError(f"Respuesta inesperada de DeepSeek: {str(data)[:300]}") from None
+
+    def stream(self, messages, temperature=0.3, **options):
+        """
+        Genera los fragmentos de texto a medida que llegan. El lugar en el límite
+        de concurrencia se ocupa hasta que el generador termina o se cierra
+        (por ejemplo, cuando el navegador corta la conexión); si hay otros
+        pedidos idénticos leyendo la misma respuesta, hasta que se cierran todos.
+        """
+        payload = self._payload(messages, temperature, True, **options)
+        return self._shared(payload, lambda: self._stream(payload))
+
+    def _stream(self, payload):
+        self._acquire()
+        try:
+            with self._post(payload, stream=True) as response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue  # líneas vacías, comentarios ": keep-alive"
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        continue  # se lee hasta el final para que la conexión vuelva al pool
+                    try:
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    except (ValueError, KeyError, IndexError):
+                        raise ChatbotError(f"Evento inesperado de DeepSeek: {data[:300]}") from None
+                    if delta:
+                        yield delta
+        finally:
+            self._release()
+
+    def stats(self):
+        """Llamadas en curso y en espera; pedidos que se sumaron a otra llamada y rechazados por carga."""
+        with self._lock:
+            return {"en_curso": self._in_flight, "en_espera": self._waiting, **self._counts}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Cliente del proceso, creado en la primera llamada con la configuración del entorno."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DeepSeekClient(
+                    url=os.getenv("DEEPSEEK_API_URL", DEEPSEEK_API_URL),
+                    max_concurrency=int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", MAX_CONCURRENCY)),
+                    max_queue=int(os.getenv("DEEPSEEK_MAX_QUEUE", MAX_QUEUE)),
+                )
+    return _client
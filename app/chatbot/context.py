@@ -0,0 +1,189 @@
+# app/chatbot/context.py
+"""
+Contexto de usuario de los prompts del chatbot, armado una vez por usuario.
+
+load_snapshot() hace las consultas (User, Subscription, Project) y deja los
+prompts del sistema ya renderizados: uno general (rol y plan, el que usan
+las preguntas cacheables) y uno personal (nombre, último login, estado de
+la suscripción y proyectos). UserContextCache los guarda en memoria, así un
+turno del chat no consulta la base mientras el usuario no cambie.
+
+watch_models() invalida el contexto de un usuario cuando se confirma
+(commit) un cambio en sus filas de User, Subscription o Project. Los
+UPDATE masivos (query.update()) no pasan por los eventos del ORM; para
+esos casos, y para cambios hechos desde otro proceso, el TTL pone un límite
+a cuánto puede durar un contexto viejo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from .cache import fingerprint
+
+DEFAULT_TTL = 300
+
+SYSTEM_PROMPT = """
+        Eres un asistente especializado en EnterpriseFlow con conocimiento en:
+        - 🏠 Inicio: Configuración inicial, dashboard
+        - 🤖 Automatización: Flujos de trabajo, triggers
+        - 😌 Bienestar: Monitoreo de carga laboral
+        - 🔒 Feedback Anónimo: Sistema de reportes
+        - ⚖️ Cumplimiento: Normativas legales
+        - 💳 Suscripción: Planes y facturación
+        """
+
+
+def render_snapshot(user, subscription, projects, now=None):
+    """
+    {'plan', 'general', 'personal', 'sistema_general', 'sistema', 'huella', 'cambia_en'}.
+    `cambia_en` es cuándo vence la suscripción activa: ahí el estado pasa a
+    'Inactivo' y el contexto tiene que volver a armarse.
+    """
+    now = now or datetime.now()
+    plan = subscription.plan if subscription else 'Free'
+    active = bool(subscription and subscription.expiry_date and subscription.expiry_date > now)
+    general = f"""
+        [Usuario]
+        - Rol: {user.role}
+        - Plan: {plan}
+        """
+    personal = f"""
+        [Usuario]
+        - Nombre: {user.name}
+        - Rol: {user.role}
+        - Último login: {user.last_login.strftime('%Y-%m-%d') if user.last_login else 'Nunca'}
+
+        [Suscripción]
+        - Plan: {plan}
+        - Estado: {'Activo' if active else 'Inactivo'}
+
+        [Proyectos Recientes]
+        {', '.join(p.name for p in projects) or 'Ninguno'}
+        """
+    return {
+        "plan": plan,
+        "general": general,
+        "personal": personal,
+        "sistema_general": SYSTEM_PROMPT + general,
+        "sistema": SYSTEM_PROMPT + personal,
+        "huella": fingerprint(SYSTEM_PROMPT, general),
+        "cambia_en": subscription.expiry_date.timestamp() if active else None,
+    }
+
+
+def load_snapshot(user_id):
+    from app.models import User, Subscription, Project
+    user = User.query.get(user_id)
+    sub = Subscription.query.filter_by(user_id=user_id).first()
+    projects = Project.query.filter_by(owner_id=user_id).limit(3).all()
+    return render_snapshot(user, sub, projects)
+
+
+class UserContextCache:
+    def __init__(self, loader=load_snapshot, ttl=DEFAULT_TTL, max_entries=10_000, clock=time.time):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        # Cuántas veces se invalidó cada usuario: un contexto que se estaba
+        # armando mientras llegaba una invalidación no se guarda
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {"aciertos": 0, "armados": 0, "invalidados": 0}
+
+    def get(self, user_id):
+        key = str(user_id)  # el JWT trae el id como texto, los modelos como entero
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._stats["aciertos"] += 1
+                return entry[0]
+            generation = self._generations.get(key, 0)
+        snapshot = self.loader(user_id)
+        expires_at = now + self.ttl
+        if snapshot.get("cambia_en"):
+            expires_at = min(expires_at, snapshot["cambia_en"])
+        with self._lock:
+            self._stats["armados"] += 1
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (snapshot, expires_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._stats["invalidados"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, en_memoria=len(self._entries))
+
+
+def watch_models(cache):
+    """
+    Registra los eventos del ORM que invalidan `cache`. Devuelve una función
+    que los quita (para tests y benchmarks).
+    """
+    from sqlalchemy import event, inspect
+    from sqlalchemy.orm import Session, object_session
+    from app.models import Project, Subscription, User
+
+    owner_columns = {User: "id", Subscription: "user_id", Project: "owner_id"}
+    # Clave propia por caché: cada una se entera de los mismos cambios
+    pending_key = ("chatbot_contexts", id(cache))
+
+    def changed(mapper, connection, target):
+        session = object_session(target)
+        if session is None:
+            return
+        column = owner_columns[mapper.class_]
+        # También el dueño anterior, si la fila cambió de usuario
+        owners = {getattr(target, column)} | set(inspect(target).attrs[column].history.deleted)
+        session.info.setdefault(pending_key, set()).update(o for o in owners if o is not None)
+
+    def after_commit(session):
+        for user_id in session.info.pop(pending_key, ()):
+            cache.invalidate(user_id)
+
+    def after_rollback(session):
+        session.info.pop(pending_key, None)
+
+    listeners = [(model, name, changed) for model in owner_columns
+                 for name in ("after_insert", "after_update", "after_delete")]
+    listeners += [(Session, "after_commit", after_commit), (Session, "after_rollback", after_rollback)]
+    for target, name, fn in listeners:
+        event.listen(target, name, fn)
+
+    def unwatch():
+        for target, name, fn in listeners:
+            event.remove(target, name, fn)
+    return unwatch
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_context_cache():
+    """Caché del proceso, ya conectada a los eventos de los modelos."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache = UserContextCache()
+                watch_models(cache)
+                _cache = cache
+    return _cache
@@ -1,111 +1,192 @@
 # app/chatbot/deepseek.py
-import os
-import requests
-from flask import current_app
+from .cache import ResponseCache, fingerprint, get_response_cache, is_personal
+from .client import get_client
+from .context import SYSTEM_PROMPT, get_context_cache
+from .history import get_history_store, llm_summarizer
+from .intents import FUNCIONALIDADES, IntentClassifier
+
+# El modelo marca así las respuestas que se completan con datos de la base
+ACTION_MARKER = "[ACCION]"
 
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 
-# app/chatbot/deepseek.py
-def _add_enterprise_context(self, user_id, message):
-    user = User.query.get(user_id)
-    sub = Subscription.query.filter_by(user_id=user_id).first()
-    projects = Project.query.filter_by(owner_id=user_id).limit(3).all()
-
-    context = f"""
-    [Usuario]
-    - Nombre: {user.name}
-    - Rol: {user.role}
-    - Último login: {user.last_login.strftime('%Y-%m-%d') if user.last_login else 'Nunca'}
-
-    [Suscripción]
-    - Plan: {sub.plan if sub else 'Free'}
-    - Estado: {'Activo' if sub and sub.expiry_date > datetime.now() else 'Inactivo'}
-
-    [Proyectos Recientes]
-    {', '.join(p.name for p in projects) or 'Ninguno'}
-    """
-    return f"{context}\n\n[Pregunta] {message}"
-    
 class EnterpriseFlowChatbot:
-    def __init__(self):
-        self.api_key = os.getenv("DEEPSEEK_API_KEY")
-        self.context = """
-        Eres un asistente especializado en EnterpriseFlow con conocimiento en:
-        - 🏠 Inicio: Configuración inicial, dashboard
-        - 🤖 Automatización: Flujos de trabajo, triggers
-        - 😌 Bienestar: Monitoreo de carga laboral
-        - 🔒 Feedback Anónimo: Sistema de reportes
-        - ⚖️ Cumplimiento: Normativas legales
-        - 💳 Suscripción: Planes y facturación
+    temperature = 0.3
+
+    def __init__(self, client=None, cache=None, contexts=None, history=None):
+        # Cliente compartido (client.py): conexiones keep-alive, timeouts y límite de llamadas simultáneas
+        self.client = client or get_client()
+        # Respuestas a preguntas generales, compartidas entre usuarios del mismo plan y rol (cache.py)
+        self.cache = cache if cache is not None else get_response_cache()
+        # Prompt del sistema ya armado por usuario; se invalida cuando cambian sus filas (context.py)
+        self.contexts = contexts if contexts is not None else get_context_cache()
+        self.context = SYSTEM_PROMPT
+        # Preguntas con respuesta directa desde la base, resueltas antes de ir al modelo (intents.py)
+        self.intents = IntentClassifier()
+        self.fingerprint = fingerprint(self.client.model, self.temperature)
+        # Turnos anteriores de cada usuario, con ventana acotada en tokens (history.py)
+        self._history = history
+        self.summarize = llm_summarizer(self.client)
+
+    @property
+    def history(self):
+        # El archivo del historial se abre con el primer mensaje, no al importar las rutas
+        if self._history is None:
+            self._history = get_history_store()
+        return self._history
+
+    def _prepare(self, user_message, user_id):
+        """
+        Mensajes para el modelo y clave de caché. Una pregunta general lleva
+        solo rol y plan, así la respuesta sirve a cualquiera con el mismo
+        contexto; una personal lleva el contexto completo y no se cachea.
+        Tampoco se cachea un mensaje que sigue una conversación: depende de
+        los turnos anteriores, que van entre el sistema y el mensaje nuevo.
         """
+        snapshot = self.contexts.get(user_id)
+        window = self.history.window(user_id, self.summarize)
+        if is_personal(user_message):
+            self.cache.skip()
+            system, key = snapshot["sistema"], None
+        elif window["mensajes"] or window["resumen"]:
+            self.cache.skip()
+            system, key = snapshot["sistema_general"], None
+        else:
+            system = snapshot["sistema_general"]
+            key = ResponseCache.key(user_message, snapshot["plan"], self.fingerprint + snapshot["huella"])
+        if window["resumen"]:
+            system = f"{system}\n\nResumen de la conversación hasta ahora:\n{window['resumen']}"
+        messages = [
+            {"role": "system", "content": system},
+            *window["mensajes"],
+            {"role": "user", "content": user_message}
+        ]
+        return messages, key
+
+    def _local_answer(self, user_message, user_id):
+        """Respuesta sin llamar al modelo, o None si el mensaje no es una intención conocida con confianza."""
+        intent, _ = self.intents.classify(user_message)
+        if intent is None:
+            return None
+        spec = self.intents.intents[intent]
+        answer = self._execute_feature_action(spec["funcionalidad"], user_id)
+        if spec.get("guia"):
+            return f"{spec['guia']}\n\n{answer}" if answer else spec["guia"]
+        return answer
 
     def generate_response(self, user_message, user_id):
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": self.context},
-                {"role": "user", "content": self._add_enterprise_context(user_id, user_message)}
-            ],
-            "temperature": 0.3
-        }
-
-        response = requests.post(DEEPSEEK_API_URL, json=payload, headers=headers)
-        return self._process_response(response.json(), user_id)
-
-    def _add_enterprise_context(self, user_id, message):
-        # Obtener datos específicos del usuario desde la base de datos
-        from app.models import User, Subscription
-        user = User.query.get(user_id)
-        sub = Subscription.query.filter_by(user_id=user_id).first()
-
-        return f"""
-        [Contexto EnterpriseFlow]
-        - Usuario: {user.name}
-        - Rol: {user.role}
-        - Suscripción: {sub.plan if sub else 'Free'}
-        - Último login: {user.last_login}
-        
-        [Pregunta]
-        {message}
+        reply = self._reply(user_message, user_id)
+        self.history.append(user_id, user_message, reply)
+        return reply
+
+    def _reply(self, user_message, user_id):
+        local = self._local_answer(user_message, user_id)
+        if local is not None:
+            return local
+        messages, key = self._prepare(user_message, user_id)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        text = self.client.complete(messages, temperature=self.temperature)
+        if key is not None and ACTION_MARKER not in text:
+            self.cache.put(key, text)
+        return self._process_response(text, user_id)
+
+    def stream_response(self, user_message, user_id):
         """
+        Igual que generate_response, pero devuelve el texto por fragmentos a
+        medida que llega. Si aparece [ACCION], el resto se consume entero y sale
+        en un solo fragmento procesado como en generate_response: la respuesta
+        de la acción o, si no hay acción, el texto sin el marcador.
+        Una respuesta local o cacheada sale en un solo fragmento; una nueva se
+        guarda (en la caché y en el historial) solo si llegó completa, y en la
+        caché solo si no tenía [ACCION].
+        """
+        local = self._local_answer(user_message, user_id)
+        if local is not None:
+            self.history.append(user_id, user_message, local)
+            yield local
+            return
+        messages, key = self._prepare(user_message, user_id)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.history.append(user_id, user_message, cached)
+                yield cached
+                return
+        chunks = self.client.stream(messages, temperature=self.temperature)
+        sent, pending = "", ""
+        for chunk in chunks:
+            pending += chunk
+            if ACTION_MARKER in pending:
+                break
+            # Lo que podría ser el comienzo del marcador espera al próximo fragmento
+            ready = pending[:len(pending) - _marker_prefix(pending)]
+            if ready and (sent or ready.strip()):
+                sent += ready
+                pending = pending[len(ready):]
+                yield ready
+        if ACTION_MARKER not in pending:
+            if pending:
+                yield pending
+            reply = sent + pending
+            self.history.append(user_id, user_message, reply)
+            if key is not None:
+                self.cache.put(key, reply)
+            return
+        text = sent + pending + "".join(chunks)
+        if not sent:
+            tail = self._process_response(text, user_id)
+        else:
+            # Lo ya enviado no se puede retirar: la acción se agrega a continuación
+            answer = self._action_answer(text, user_id)
+            tail = f"\n\n{answer}" if answer else text[len(sent):].replace(ACTION_MARKER, "").rstrip()
+        self.history.append(user_id, user_message, sent + tail)
+        yield tail
 
-    def _process_response(self, deepseek_response, user_id):
+    def _process_response(self, text, user_id):
         # Verificar si se necesita acción específica
-        if "[ACCION]" in deepseek_response.choices[0].message.content:
-            return self._handle_special_action(deepseek_response, user_id)
-        
-        return deepseek_response.choices[0].message.content
-
-    def _handle_special_action(self, response, user_id):
-        # Ejemplo: Manejar solicitudes de facturación
-        if "suscripción" in response.lower():
-            from app.models import Subscription
-            sub = Subscription.query.filter_by(user_id=user_id).first()
-            return f"Tu plan actual: {sub.plan}\nVencimiento: {sub.expiry_date}"
-            
-    # app/chatbot/deepseek.py
+        if ACTION_MARKER in text:
+            return self._handle_special_action(text, user_id)
+        return text
+
     def _handle_special_action(self, response_text, user_id):
-       # Detectar funcionalidad
-       for feature, keywords in FUNCIONALIDADES.items():
-           if any(kw in response_text.lower() for kw in keywords):
-               return self._execute_feature_action(feature, user_id)
-    
-       return response_text
-
-   def _execute_feature_action(self, feature, user_id):
-       from app.models import AutomationFlow, FeedbackReport  # Importa tus modelos
-    
-       if feature == "🤖 Automatización":
-           flows = AutomationFlow.query.filter_by(user_id=user_id).all()
-           return f"Tienes {len(flows)} flujos automatizados:\n- " + "\n- ".join(f.name for f in flows)
-    
-       elif feature == "🔒 Feedback":
-           last_report = FeedbackReport.query.filter_by(user_id=user_id).order_by(FeedbackReport.date.desc()).first()
-           return f"Último feedback enviado: {last_report.date if last_report else 'Nunca'}"
-    
-       # ... Añadir acciones para otras funcionalidades ...
+        return self._action_answer(response_text, user_id) or response_text.replace(ACTION_MARKER, "").strip()
+
+    def _action_answer(self, response_text, user_id):
+        # Detectar funcionalidad
+        for feature, keywords in FUNCIONALIDADES.items():
+            if any(kw in response_text.lower() for kw in keywords):
+                answer = self._execute_feature_action(feature, user_id)
+                if answer:
+                    return answer
+        return None
+
+    def _execute_feature_action(self, feature, user_id):
+        from app.models import AutomationFlow, FeedbackReport, Subscription
+
+        if feature == "🤖 Automatización":
+            flows = AutomationFlow.query.filter_by(user_id=user_id).all()
+            if not flows:
+                return "Todavía no tienes flujos automatizados."
+            return f"Tienes {len(flows)} flujos automatizados:\n- " + "\n- ".join(f.name for f in flows)
+
+        elif feature == "🔒 Feedback":
+            last_report = FeedbackReport.query.filter_by(user_id=user_id).order_by(FeedbackReport.date.desc()).first()
+            return f"Último feedback enviado: {last_report.date if last_report else 'Nunca'}"
+
+        elif feature == "💳 Suscripción":
+            sub = Subscription.query.filter_by(user_id=user_id).first()
+            if sub:
+                return f"Tu plan actual: {sub.plan}\nVencimiento: {sub.expiry_date}"
+
+        # ... Añadir acciones para otras funcionalidades ...
+        return None
+
+
+def _marker_prefix(text):
+    """Largo del final de `text` que coincide con el comienzo de ACTION_MARKER."""
+    for size in range(min(len(text), len(ACTION_MARKER) - 1), 0, -1):
+        if text.endswith(ACTION_MARKER[:size]):
+            return size
+    return 0
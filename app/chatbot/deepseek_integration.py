@@ -1,12 +1,11 @@
 # app/chatbot/deepseek_integration.py
-import os
-import requests
-from flask import current_app
-from app.models import User, Project, Subscription  # Asegúrate de que estos modelos existan
+from .client import get_client
+from .context import get_context_cache
 
 class EnterpriseFlowChatbot:
-    def __init__(self):
-        self.api_key = current_app.config['DEEPSEEK_API_KEY']
+    def __init__(self, client=None):
+        # Sesión HTTP compartida del proceso (client.py) en vez de un requests.post por mensaje
+        self.client = client or get_client()
         self.base_context = """
         Eres el asistente principal de EnterpriseFlow. Funcionalidades clave:
         1. 🏠 Inicio: Dashboard con resumen de proyectos
@@ -18,43 +17,23 @@ class EnterpriseFlowChatbot:
         """
 
     def get_user_context(self, user_id):
-        user = User.query.get(user_id)
-        subscription = Subscription.query.filter_by(user_id=user_id).first()
-        projects = Project.query.filter_by(owner_id=user_id).limit(3).all()
-        
-        return f"""
-        [Usuario]
-        - Nombre: {user.name}
-        - Rol: {user.role}
-        - Proyectos activos: {len(projects)}
-        - Plan: {subscription.plan if subscription else 'Free'}
-        """
-
-    def generate_response(self, user_input, user_id):
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # Mismo contexto por usuario que deepseek.py, sin consultar la base en cada mensaje (context.py)
+        return get_context_cache().get(user_id)["personal"]
 
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {
-                    "role": "system", 
-                    "content": f"{self.base_context}\n{self.get_user_context(user_id)}"
-                },
-                {
-                    "role": "user", 
-                    "content": user_input
-                }
-            ],
-            "temperature": 0.5
-        }
+    def _messages(self, user_input, user_id):
+        return [
+            {
+                "role": "system",
+                "content": f"{self.base_context}\n{self.get_user_context(user_id)}"
+            },
+            {
+                "role": "user",
+                "content": user_input
+            }
+        ]
 
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
+    def generate_response(self, user_input, user_id):
+        return self.client.complete(self._messages(user_input, user_id), temperature=0.5)
 
-        return response.json()['choices'][0]['message']['content']
+    def stream_response(self, user_input, user_id):
+        return self.client.stream(self._messages(user_input, user_id), temperature=0.5)
@@ -0,0 +1,211 @@
+# app/chatbot/history.py
+"""
+Historial de conversación del chatbot, por usuario.
+
+Los mensajes se agregan a una tabla SQLite (solo INSERT, índice por
+usuario e id) con sus tokens ya contados, así armar el contexto de un turno
+es leer las últimas filas de un índice y sumar enteros.
+
+Cada pedido lleva una ventana acotada:
+- los mensajes más recientes hasta `history_budget` tokens;
+- los más viejos se siguen mandando hasta juntar `summary_every` tokens;
+  ahí se resumen de una vez (una llamada al modelo cada tantos turnos, no
+  en cada uno) y el resumen, de a lo sumo `summary_budget` tokens, reemplaza
+  a esos mensajes;
+- lo que tiene más de `max_age` segundos ya no se manda: la conversación
+  de ayer no es contexto de la pregunta de hoy.
+
+Así el prompt queda por debajo de history_budget + summary_every +
+summary_budget, no importa cuánto dure la conversación.
+
+Los tokens se estiman (count_tokens): DeepSeek no publica su tokenizador y
+para presupuestar alcanza con un valor que tienda a pasarse, no a quedarse
+corto.
+"""
+import os
+import re
+import threading
+import time
+
+from database import get_pool
+
+# Lo que agrega el formato de chat a cada mensaje (rol, separadores)
+MESSAGE_OVERHEAD = 4
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """Estimación: una palabra cada ~4 caracteres, cada signo es un token."""
+    return sum((len(p) + 3) // 4 if p[0].isalnum() or p[0] == "_" else 1 for p in _PIECES.findall(text))
+
+
+def truncate_tokens(text, budget):
+    """Recorta el texto (por palabras) para que no pase de `budget` tokens."""
+    if count_tokens(text) <= budget:
+        return text
+    total, end = 0, 0
+    for match in _PIECES.finditer(text):
+        piece = match.group()
+        total += (len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == "_" else 1
+        if total > budget:
+            break
+        end = match.end()
+    return text[:end].rstrip() + "…"
+
+
+def extractive_summary(previous, messages, budget):
+    """Resumen sin modelo: lo anterior más el comienzo de cada mensaje, quedándose con lo último."""
+    lines = [previous] if previous else []
+    for m in messages:
+        who = "Usuario" if m["role"] == "user" else "Asistente"
+        lines.append(f"{who}: {truncate_tokens(m['content'], 30)}")
+    text = "\n".join(lines)
+    while count_tokens(text) > budget and len(lines) > 1:
+        lines.pop(0)
+        text = "\n".join(lines)
+    return truncate_tokens(text, budget)
+
+
+class ConversationStore:
+    def __init__(self, path, history_budget=1500, summary_every=600, summary_budget=300, max_age=3600,
+                 max_messages=100, clock=time.time):
+        self.path = path
+        self.history_budget = history_budget
+        self.summary_every = summary_every
+        self.summary_budget = summary_budget
+        self.max_age = max_age
+        self.max_messages = max_messages
+        self.clock = clock
+        self.pool = get_pool(path)
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chatbot_messages (
+                    id INTEGER PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chatbot_messages_user ON chatbot_messages(user_id, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chatbot_summaries (
+                    user_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    up_to_id INTEGER NOT NULL,
+                    last_at REAL NOT NULL
+                )
+            """)
+
+    def append(self, user_id, question, answer):
+        """Guarda un turno completo (pregunta y respuesta)."""
+        now = self.clock()
+        with self.pool.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO chatbot_messages (user_id, role, content, tokens, created_at) VALUES (?, ?, ?, ?, ?)
+            """, [(str(user_id), role, text, count_tokens(text) + MESSAGE_OVERHEAD, now)
+                  for role, text in (("user", question), ("assistant", answer))])
+
+    def _summary(self, conn, user_id, since):
+        row = conn.execute("SELECT summary, up_to_id, last_at FROM chatbot_summaries WHERE user_id=?",
+                           (user_id,)).fetchone()
+        if row is None or row[2] < since:
+            return None, 0
+        return row[0], row[1]
+
+    def window(self, user_id, summarize=None):
+        """
+        Contexto para el próximo pedido:
+        {'resumen': texto o None, 'mensajes': [{'role', 'content'}, ...], 'tokens': total}.
+        `summarize(resumen_anterior, mensajes, presupuesto)` se llama cuando
+        hay que plegar mensajes viejos; sin él se usa extractive_summary.
+        """
+        user_id = str(user_id)
+        since = self.clock() - self.max_age
+        conn = self.pool.connection()
+        summary, up_to_id = self._summary(conn, user_id, since)
+        rows = conn.execute("""
+            SELECT id, role, content, tokens, created_at FROM chatbot_messages
+            WHERE user_id = ? AND id > ? AND created_at >= ?
+            ORDER BY id DESC LIMIT ?
+        """, (user_id, up_to_id, since, self.max_messages)).fetchall()
+
+        recent, pending, used = [], [], 0
+        for row in rows:
+            if not pending and used + row[3] <= self.history_budget:
+                recent.append(row)
+                used += row[3]
+            else:
+                pending.append(row)
+        # La ventana empieza siempre con una pregunta: no se corta un turno por la mitad
+        while pending and recent and recent[-1][1] != "user":
+            pending.insert(0, recent.pop())
+        if sum(r[3] for r in pending) >= self.summary_every:
+            pending.reverse()
+            messages = [{"role": r[1], "content": r[2]} for r in pending]
+            summary = truncate_tokens((summarize or extractive_summary)(summary, messages, self.summary_budget),
+                                      self.summary_budget)
+            with self.pool.transaction() as write:
+                write.execute("""
+                    INSERT OR REPLACE INTO chatbot_summaries (user_id, summary, tokens, up_to_id, last_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (user_id, summary, count_tokens(summary), pending[-1][0], pending[-1][4]))
+        else:
+            recent.extend(pending)
+        recent.reverse()
+        return {
+            "resumen": summary,
+            "mensajes": [{"role": r[1], "content": r[2]} for r in recent],
+            "tokens": sum(r[3] for r in recent) + (count_tokens(summary) if summary else 0),
+        }
+
+    def clear(self, user_id):
+        """Empieza una conversación nueva: los mensajes quedan, pero ya no forman parte del contexto."""
+        user_id = str(user_id)
+        with self.pool.transaction() as conn:
+            last = conn.execute("SELECT MAX(id) FROM chatbot_messages WHERE user_id=?", (user_id,)).fetchone()[0]
+            conn.execute("""
+                INSERT OR REPLACE INTO chatbot_summaries (user_id, summary, tokens, up_to_id, last_at)
+                VALUES (?, '', 0, ?, ?)
+            """, (user_id, last or 0, self.clock()))
+
+    def prune(self, older_than):
+        """Borra los mensajes anteriores a `older_than` (mantenimiento; el contexto ya no los usa)."""
+        with self.pool.transaction() as conn:
+            return conn.execute("DELETE FROM chatbot_messages WHERE created_at < ?", (older_than,)).rowcount
+
+
+def llm_summarizer(client):
+    """Resume con el modelo; si la API falla, cae al resumen extractivo."""
+    from .client import ChatbotError
+
+    def summarize(previous, messages, budget):
+        transcript = "\n".join(f"{'Usuario' if m['role'] == 'user' else 'Asistente'}: {m['content']}"
+                               for m in messages)
+        prompt = [
+            {"role": "system", "content": "Resume la conversación en pocas frases, en español. Conserva datos, "
+                                          "nombres y decisiones; omite saludos."},
+            {"role": "user", "content": f"Resumen anterior:\n{previous or '(ninguno)'}\n\nMensajes:\n{transcript}"},
+        ]
+        try:
+            return client.complete(prompt, temperature=0, max_tokens=budget)
+        except ChatbotError:
+            return extractive_summary(previous, messages, budget)
+    return summarize
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Historial del proceso, en CHATBOT_HISTORY_PATH (por defecto chatbot_history.db)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore(os.getenv("CHATBOT_HISTORY_PATH", "chatbot_history.db"))
+    return _store
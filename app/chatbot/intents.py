@@ -1,4 +1,22 @@
 # app/chatbot/intents.py
+"""
+Intenciones que el chatbot resuelve sin llamar al modelo.
+
+FUNCIONALIDADES agrupa palabras clave por funcionalidad (la usa el manejo
+de [ACCION] en deepseek.py). INTENTS son preguntas concretas con respuesta
+determinista desde la base: cuántos flujos tengo, cuál es mi plan, cómo se
+crea un flujo...
+
+IntentClassifier compila los patrones una vez y los prueba sobre el mensaje
+normalizado (sin acentos ni signos, como la caché de respuestas). La
+confianza es la parte de las palabras del mensaje que cubre el patrón, sin
+contar saludos ni relleno: "¿cuántos flujos tengo?" es 1.0, "¿cuántos flujos
+tengo y cómo los optimizo?" queda por debajo del umbral y va al modelo.
+"""
+import re
+
+from .cache import normalize
+
 FUNCIONALIDADES = {
     "🏠 Inicio": ["dashboard", "inicio", "configuración"],
     "🤖 Automatización": ["automatizar", "flujo", "trigger"],
@@ -7,3 +25,94 @@ FUNCIONALIDADES = {
     "⚖️ Cumplimiento": ["legal", "normativa", "ley"],
     "💳 Suscripción": ["plan", "pago", "upgrade"]
 }
+
+_FLOWS = r"(?:flujos?|automatizacion(?:es)?)(?:\s+automatic[oa]s?|\s+automatizad[oa]s?)?"
+_CREATE = r"(?:crear?|creo|armar?|armo|configurar?|configuro|hacer|hago)"
+
+# nombre: funcionalidad que responde (deepseek.py) y patrones sobre texto normalizado
+INTENTS = {
+    "cantidad_flujos": {
+        "funcionalidad": "🤖 Automatización",
+        "patrones": [
+            rf"\b(?:cuantos|cuantas|cantidad\s+de|numero\s+de)\s+{_FLOWS}(?:\s+(?:tengo|hay|activos|creados))?",
+            rf"\b(?:ver|listar?|lista\s+de|muestrame|mostrar)?\s*mis\s+{_FLOWS}(?:\s+activos)?",
+            rf"\b{_FLOWS}\s+(?:tengo|tenemos|mios|activos)\b",
+        ],
+    },
+    "crear_flujo": {
+        "funcionalidad": "🤖 Automatización",
+        "patrones": [
+            rf"\b(?:como|donde)\s+(?:se\s+)?(?:puedo\s+)?{_CREATE}\s+(?:un|una|mi|el|la|nuevo|nueva|\s)*{_FLOWS}",
+            rf"\b{_CREATE}\s+(?:un|una)\s+(?:nuevo\s+|nueva\s+)?{_FLOWS}",
+            r"\bcomo\s+(?:se\s+)?(?:puedo\s+)?automatiz(?:ar|o)\s+(?:una\s+)?tareas?",
+        ],
+        "guia": (
+            "Para crear un flujo automático entra en 🤖 Automatización, elige el trigger "
+            "(horario, evento o formulario), agrega las acciones y el responsable, y guárdalo. "
+            "Desde ahí también puedes pausarlo o ver su historial."
+        ),
+    },
+    "plan_actual": {
+        "funcionalidad": "💳 Suscripción",
+        "patrones": [
+            r"\bmi\s+(?:plan|suscripcion)(?:\s+actual)?",
+            r"\b(?:plan|suscripcion)\s+(?:tengo|actual|contratad[oa])(?:\s+contratad[oa])?\b",
+            r"\bcuando\s+vence\s+(?:mi\s+)?(?:plan|suscripcion)?",
+        ],
+    },
+    "ultimo_feedback": {
+        "funcionalidad": "🔒 Feedback",
+        "patrones": [
+            r"\b(?:mi\s+)?(?:ultimo|ultima)\s+(?:feedback|reporte|sugerencia)(?:\s+(?:que\s+)?(?:envie|mande|hice))?",
+            r"\bcuando\s+(?:envie|mande)\s+(?:mi\s+)?(?:ultimo\s+)?(?:feedback|reporte)",
+        ],
+    },
+}
+
+# Palabras que no cambian qué se pregunta: no cuentan para la confianza
+FILLER = frozenset("""
+    hola buenas buenos dias tardes noches oye porfa por favor gracias me puedes podrias puedo
+    dime decir saber quiero quisiera necesito ayuda ayudame el la los las lo un una unos unas
+    de del a al en y que cual cuales es son fue esta estan hay ahora actualmente aqui todos todas
+""".split())
+
+_WORD = re.compile(r"\w+")
+
+THRESHOLD = 0.8
+
+
+class IntentClassifier:
+    def __init__(self, intents=INTENTS, threshold=THRESHOLD):
+        self.intents = intents
+        self.threshold = threshold
+        self.patterns = [(name, re.compile("|".join(f"(?:{p})" for p in spec["patrones"])))
+                         for name, spec in intents.items()]
+
+    def scores(self, message):
+        """Confianza de cada intención que aparece en el mensaje."""
+        text = normalize(message)
+        words = [m.span() for m in _WORD.finditer(text) if m.group() not in FILLER]
+        if not words:
+            return {}
+        found = {}
+        for name, pattern in self.patterns:
+            spans = [m.span() for m in pattern.finditer(text) if m.end() > m.start()]
+            if spans:
+                covered = sum(any(s <= ws and we <= e for s, e in spans) for ws, we in words)
+                found[name] = covered / len(words)
+        return found
+
+    def classify(self, message):
+        """(intención, confianza), o (None, confianza) si no alcanza el umbral o es ambigua."""
+        found = self.scores(message)
+        if not found:
+            return None, 0.0
+        ranked = sorted(found.items(), key=lambda item: -item[1])
+        name, confidence = ranked[0]
+        # Dos intenciones distintas que compiten: mejor que decida el modelo
+        if len(ranked) > 1 and ranked[1][1] >= self.threshold / 2 and \
+                self.intents[ranked[1][0]]["funcionalidad"] != self.intents[name]["funcionalidad"]:
+            return None, confidence
+        if confidence < self.threshold:
+            return None, confidence
+        return name, confidence
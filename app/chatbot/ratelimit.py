@@ -0,0 +1,81 @@
+# app/chatbot/ratelimit.py
+"""
+Límite de mensajes por usuario: un token bucket por usuario.
+
+Cada usuario tiene `burst` fichas y recupera `rate` por segundo; cada
+mensaje gasta una. Así se permite una ráfaga corta (varias preguntas
+seguidas) pero no sostener más de `rate` mensajes por segundo. Sin fichas,
+allow() devuelve cuántos segundos faltan para la próxima, que la ruta manda
+en Retry-After junto con el 429.
+
+Los baldes están ordenados por última actualización. Cuando hay más de
+`max_users` se descartan desde el más viejo: los que ya se llenaron (no
+guardan nada que no se pueda reconstruir) y, si hace falta, los demás hasta
+volver al tope, así la memoria no crece con cada usuario que alguna vez
+escribió y descartar cuesta lo mismo haya los baldes que haya.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 20 mensajes por minuto, hasta 10 seguidos
+RATE_PER_MINUTE = 20
+BURST = 10
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate=RATE_PER_MINUTE / 60, burst=BURST, max_users=10_000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self.clock = clock
+        self._buckets = OrderedDict()  # user_id -> (fichas, momento de la última actualización), el más viejo primero
+        self._lock = threading.Lock()
+        self._counts = {"permitidos": 0, "limitados": 0}
+
+    def allow(self, user_id):
+        """(True, 0) si el mensaje pasa; (False, segundos hasta la próxima ficha) si no."""
+        key = str(user_id)
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self._counts["limitados"] += 1
+                return False, math.ceil((1 - tokens) / self.rate)
+            self._buckets[key] = (tokens - 1, now)
+            self._counts["permitidos"] += 1
+            if len(self._buckets) > self.max_users:
+                self._evict(now)
+            return True, 0
+
+    def _evict(self, now):
+        while self._buckets:
+            tokens, updated = next(iter(self._buckets.values()))
+            if len(self._buckets) <= self.max_users and tokens + (now - updated) * self.rate < self.burst:
+                break
+            self._buckets.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counts, "usuarios": len(self._buckets)}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Límite del proceso: CHATBOT_RATE_PER_MINUTE y CHATBOT_BURST del entorno."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucketLimiter(
+                    rate=float(os.getenv("CHATBOT_RATE_PER_MINUTE", RATE_PER_MINUTE)) / 60,
+                    burst=int(os.getenv("CHATBOT_BURST", BURST)),
+                )
+    return _limiter
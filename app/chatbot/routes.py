@@ -1,32 +1,106 @@
 # app/chatbot/routes.py
-from flask import Blueprint, request, jsonify
+import itertools
+import json
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from .client import ChatbotBusy, ChatbotError
 from .deepseek import EnterpriseFlowChatbot
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from .history import count_tokens
+from .ratelimit import get_rate_limiter
 
-@chatbot_bp.post('/api/query')
-@jwt_required()
-def handle_query():
-    user_id = get_jwt_identity()
-    
 chatbot_bp = Blueprint('chatbot', __name__)
 bot = EnterpriseFlowChatbot()
+# Mensajes por usuario (ratelimit.py); el límite de llamadas simultáneas a la API está en client.py
+limiter = get_rate_limiter()
+
+# Tope de un mensaje; con la ventana del historial acota el tamaño de cada pedido al modelo
+MAX_MESSAGE_TOKENS = 1000
+
+
+def _sse(event):
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _stream_reply(message, user_id):
+    """
+    Respuesta como Server-Sent Events: un evento {"delta": ...} por fragmento
+    y `data: [DONE]` al final. El primer fragmento se pide antes de responder,
+    así un error de la API o el límite de concurrencia salen con su código HTTP.
+    """
+    chunks = bot.stream_response(message, user_id)
+    first = next(chunks, "")
+
+    def events():
+        try:
+            for chunk in itertools.chain([first], chunks):
+                if chunk:
+                    yield _sse({"delta": chunk})
+            yield "data: [DONE]\n\n"
+        except ChatbotError as e:
+            yield f"event: error\n{_sse({'error': str(e)})}"
+        finally:
+            chunks.close()
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 @chatbot_bp.post('/api/chat')
 @jwt_required()
 def handle_chat():
     user_id = get_jwt_identity()
-    data = request.get_json()
-    
-    if not data or 'message' not in data:
+    data = request.get_json(silent=True)
+
+    if not data or not isinstance(data.get('message'), str):
         return jsonify({"error": "Mensaje requerido"}), 400
+    if count_tokens(data['message']) > MAX_MESSAGE_TOKENS:
+        return jsonify({"error": "Mensaje demasiado largo"}), 400
+    allowed, retry_after = limiter.allow(user_id)
+    if not allowed:
+        return jsonify({"error": "Enviaste muchos mensajes seguidos, espera unos segundos"}), 429, \
+            {"Retry-After": str(retry_after)}
 
     try:
+        if data.get('stream'):
+            return _stream_reply(data['message'], user_id)
         response = bot.generate_response(data['message'], user_id)
         return jsonify({"reply": response})
+    except ChatbotBusy as e:
+        # La API está saturada (cola llena): el cliente reintenta después
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    except ChatbotError as e:
+        return jsonify({"error": str(e)}), 502
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+# Ruta que usa static/js/chatbot.js; mismo comportamiento que /api/chat
+chatbot_bp.add_url_rule('/api/query', 'handle_query', handle_chat, methods=['POST'])
+
+
+@chatbot_bp.delete('/api/history')
+@jwt_required()
+def reset_history():
+    # Nueva conversación: los turnos anteriores dejan de mandarse al modelo
+    bot.history.clear(get_jwt_identity())
+    return jsonify({"mensaje": "Conversación reiniciada"})
+
+
+@chatbot_bp.get('/api/cache')
+@jwt_required()
+def cache_stats():
+    # Aciertos en memoria y en disco, fallos y mensajes personales que no pasan por la caché
+    return jsonify(bot.cache.stats())
+
+
+@chatbot_bp.get('/api/load')
+@jwt_required()
+def load_stats():
+    # Llamadas a la API en curso, en cola, compartidas entre pedidos idénticos y rechazadas; mensajes limitados
+    return jsonify({"api": bot.client.stats(), "usuarios": limiter.stats()})
+
+
 @chatbot_bp.get('/api/features')
 def get_features():
     return jsonify({
@@ -0,0 +1,168 @@
+# app/chatbot/tests/conftest.py
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from app.chatbot.cache import ResponseCache
+from app.chatbot.client import DeepSeekClient
+from app.chatbot.context import UserContextCache, render_snapshot, watch_models
+from app.chatbot.deepseek import EnterpriseFlowChatbot
+from app.chatbot.history import ConversationStore
+from app.chatbot.ratelimit import TokenBucketLimiter
+
+REPLY = "Para crear un flujo abre Automatización y elige un trigger."
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    """Imita /v1/chat/completions de DeepSeek, con y sin stream."""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append({"payload": payload, "authorization": self.headers.get("Authorization")})
+        if server.statuses:
+            self._send(server.statuses.pop(0), json.dumps({"error": {"message": "fallo simulado"}}))
+            return
+        time.sleep(server.delay)
+        reply = server.reply(payload) if callable(server.reply) else server.reply
+        if not payload.get("stream"):
+            self._send(200, json.dumps({"choices": [{"message": {"role": "assistant", "content": reply}}]}))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk(": keep-alive\n\n")
+        for i, word in enumerate(reply.split(" ")):
+            if i == 1:
+                server.streaming.set()
+                server.release.wait(5)
+            delta = word if i == 0 else " " + word
+            self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def completion_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CompletionHandler)
+    server.daemon_threads = True
+    server.requests, server.statuses, server.connections = [], [], 0
+    server.reply, server.delay = REPLY, 0
+    # `release` deja pasar el resto del stream; los tests lo limpian para retenerlo a mitad de camino
+    server.streaming, server.release = threading.Event(), threading.Event()
+    server.release.set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def deepseek(completion_server):
+    client = DeepSeekClient(api_key="clave-de-prueba", url=completion_server.url, timeout=(1, 2), max_wait=0.2)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ConversationStore(str(tmp_path / "historial.db"))
+
+
+@pytest.fixture
+def bot(deepseek, history):
+    """El bot real, con el contexto de cada usuario armado en memoria en vez de leerlo de la base."""
+    plans = {}
+
+    def loader(user_id):
+        user = SimpleNamespace(name=f"Usuario {user_id}", role="Analista", last_login=None)
+        return render_snapshot(user, SimpleNamespace(plan=plans.get(user_id, "Pro"), expiry_date=None), [])
+
+    bot = EnterpriseFlowChatbot(deepseek, cache=ResponseCache(), contexts=UserContextCache(loader), history=history)
+    bot.plans = plans
+    return bot
+
+
+@pytest.fixture
+def sql_app():
+    """App Flask con los modelos en SQLite en memoria y una caché de contexto conectada a sus eventos."""
+    pytest.importorskip("flask_sqlalchemy")
+    from flask import Flask
+    from sqlalchemy import event
+    from app.extensions import db
+    from app.models import AutomationFlow, Project, Subscription, User
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(id=1, name="Ana", role="Analista"),
+            Subscription(user_id=1, plan="Pro", expiry_date=datetime.now() + timedelta(days=30)),
+            Project(owner_id=1, name="Onboarding"),
+            AutomationFlow(user_id=1, name="Recordatorio de facturas"),
+            AutomationFlow(user_id=1, name="Alta de empleados"),
+        ])
+        db.session.commit()
+        queries = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+        cache = UserContextCache()
+        unwatch = watch_models(cache)
+        yield SimpleNamespace(app=app, db=db, cache=cache, queries=queries, Project=Project,
+                              Subscription=Subscription)
+        unwatch()
+        db.session.remove()
+
+
+@pytest.fixture
+def client(sql_app, deepseek, history, monkeypatch):
+    from flask_jwt_extended import JWTManager
+    from app.chatbot import routes
+
+    sql_app.app.config["JWT_SECRET_KEY"] = "secreto-de-prueba-de-al-menos-32-bytes"
+    JWTManager(sql_app.app)
+    sql_app.app.register_blueprint(routes.chatbot_bp, url_prefix="/chatbot")
+    monkeypatch.setattr(routes, "bot", EnterpriseFlowChatbot(deepseek, cache=ResponseCache(), contexts=sql_app.cache,
+                                                             history=history))
+    monkeypatch.setattr(routes, "limiter", TokenBucketLimiter())
+    return sql_app.app.test_client()
+
+
+@pytest.fixture
+def auth_header(client):
+    from flask_jwt_extended import create_access_token
+    return {"Authorization": f"Bearer {create_access_token(identity='1')}"}
@@ -0,0 +1,95 @@
+# app/chatbot/tests/test_cache.py
+from app.chatbot.cache import ResponseCache, is_personal, normalize
+from app.chatbot.deepseek import _marker_prefix
+from conftest import REPLY
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_and_personal_messages():
+    assert normalize("¿Cómo   crear un FLUJO automático?") == normalize("como crear un flujo automatico")
+    assert not is_personal("¿Cómo crear un flujo automático?")
+    assert is_personal("¿Cuántos flujos tengo?") and is_personal("Estado de mi suscripción")
+    assert not is_personal("¿Qué incluye el plan Pro?")
+
+
+def test_ttl_and_lru_in_memory():
+    clock = Clock()
+    cache = ResponseCache(max_entries=2, ttl=60, clock=clock)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")  # "b" es la menos usada
+    assert cache.get("b") is None and cache.get("c") == "C"
+    clock.now += 61
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["aciertos"], stats["fallos"], stats["tasa_aciertos"]) == (2, 2, 0.5)
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "chatbot_cache.db")
+    clock = Clock()
+    ResponseCache(ttl=60, path=path, clock=clock).put("k", "respuesta")
+    fresh = ResponseCache(ttl=60, path=path, clock=clock)
+    assert fresh.get("k") == "respuesta" and fresh.stats()["aciertos_disco"] == 1
+    assert fresh.get("k") == "respuesta" and fresh.stats()["aciertos"] == 1
+    clock.now += 61
+    assert ResponseCache(ttl=60, path=path, clock=clock).get("k") is None
+
+
+def test_sqlite_tier_purges_expired_and_excess(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(ttl=60, path=str(tmp_path / "c.db"), max_disk_entries=3, clock=clock)
+    for i in range(5):
+        clock.now += 1
+        cache.put(f"k{i}", str(i))
+    cache.purge()
+    keys = {k for (k,) in cache.pool.connection().execute("SELECT key FROM chatbot_responses")}
+    assert keys == {"k2", "k3", "k4"}
+
+
+def test_bot_shares_general_answers_and_bypasses_personal_ones(bot, completion_server):
+    assert bot.generate_response("¿Qué diferencia hay entre un trigger y una acción?", 1) == REPLY
+    assert bot.generate_response("que diferencia hay entre un trigger y una accion", 2) == REPLY
+    assert "".join(bot.stream_response("Qué diferencia hay entre un trigger y una acción", 3)) == REPLY
+    assert len(completion_server.requests) == 1
+
+    bot.plans[4] = "Enterprise"  # otro plan, otra respuesta
+    bot.generate_response("¿Qué diferencia hay entre un trigger y una acción?", 4)
+    bot.generate_response("¿Cómo va mi equipo esta semana?", 1)
+    bot.generate_response("¿Cómo va mi equipo esta semana?", 1)
+    assert len(completion_server.requests) == 4
+    assert "Nombre: Usuario 1" in completion_server.requests[-1]["payload"]["messages"][0]["content"]
+
+    stats = bot.cache.stats()
+    assert (stats["aciertos"], stats["fallos"], stats["omitidos"]) == (2, 2, 2)
+
+
+def test_interrupted_stream_is_not_cached(bot, completion_server):
+    stream = bot.stream_response("¿Qué es un trigger?", 1)
+    next(stream)
+    stream.close()
+    assert list(bot.stream_response("¿Qué es un trigger?", 1)) != [REPLY]
+    assert len(completion_server.requests) == 2
+    bot.history.clear(1)  # con la conversación en curso sería un seguimiento, que no se cachea
+    assert list(bot.stream_response("¿Qué es un trigger?", 1)) == [REPLY]
+
+
+def test_action_marker_mid_stream_is_not_streamed_nor_cached(bot, completion_server):
+    completion_server.reply = "Te cuento cómo sigue. [ACCION] Mira la ayuda."
+    chunks = list(bot.stream_response("¿Qué es un trigger?", 1))
+    assert chunks[0] == "Te" and "[ACCION]" not in "".join(chunks)
+    assert "".join(chunks).endswith("Mira la ayuda.")
+    assert bot.cache.stats()["en_memoria"] == 0
+    bot.history.clear(1)
+    list(bot.stream_response("¿Qué es un trigger?", 1))
+    assert len(completion_server.requests) == 2  # no se guardó en la caché
+    # Un marcador partido entre fragmentos tampoco se manda a medias
+    assert _marker_prefix("Te cuento [ACC") == 4 and _marker_prefix("Te cuento") == 0
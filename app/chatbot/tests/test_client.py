@@ -0,0 +1,166 @@
+# app/chatbot/tests/test_client.py
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from app.chatbot import routes
+from app.chatbot.client import ChatbotBusy, ChatbotError, DeepSeekClient
+from app.chatbot.ratelimit import TokenBucketLimiter
+from conftest import REPLY
+
+MESSAGES = [{"role": "user", "content": "¿Cómo creo un flujo?"}]
+
+
+def test_complete_reuses_one_keep_alive_connection(deepseek, completion_server):
+    for _ in range(5):
+        assert deepseek.complete(MESSAGES) == REPLY
+    assert completion_server.connections == 1
+    request = completion_server.requests[0]
+    assert request["authorization"] == "Bearer clave-de-prueba"
+    assert request["payload"]["stream"] is False and request["payload"]["messages"] == MESSAGES
+
+
+def test_stream_yields_text_as_it_arrives(deepseek, completion_server):
+    chunks = list(deepseek.stream(MESSAGES))
+    assert len(chunks) == len(REPLY.split(" ")) and "".join(chunks) == REPLY
+    assert completion_server.requests[0]["payload"]["stream"] is True
+    assert deepseek.complete(MESSAGES) == REPLY
+    assert completion_server.connections == 1
+
+
+def test_retries_unavailable_and_reports_errors(deepseek, completion_server):
+    completion_server.statuses = [503]
+    assert deepseek.complete(MESSAGES) == REPLY
+    assert len(completion_server.requests) == 2
+
+    completion_server.statuses = [401]
+    with pytest.raises(ChatbotError, match="401"):
+        deepseek.complete(MESSAGES)
+
+    completion_server.delay = 0.5
+    slow = DeepSeekClient(api_key="x", url=completion_server.url, timeout=(1, 0.1), retries=0)
+    with pytest.raises(ChatbotError, match="No se pudo contactar"):
+        slow.complete(MESSAGES)
+
+
+def test_concurrency_limit_rejects_instead_of_queueing(completion_server):
+    client = DeepSeekClient(api_key="x", url=completion_server.url, max_concurrency=1, max_wait=0.05)
+    completion_server.release.clear()
+    stream = client.stream(MESSAGES)
+    assert next(stream) == REPLY.split(" ")[0]
+    with pytest.raises(ChatbotBusy):
+        client.complete(MESSAGES)
+    completion_server.release.set()
+    stream.close()  # el navegador cortó: se libera el lugar
+    assert client.complete(MESSAGES) == REPLY
+
+
+@pytest.fixture
+def chat_app(bot, monkeypatch):
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "secreto-de-prueba-de-al-menos-32-bytes"
+    JWTManager(app)
+    app.register_blueprint(routes.chatbot_bp, url_prefix="/chatbot")
+    monkeypatch.setattr(routes, "bot", bot)
+    monkeypatch.setattr(routes, "limiter", TokenBucketLimiter())
+    with app.app_context():
+        token = create_access_token(identity="7")
+    return app.test_client(), {"Authorization": f"Bearer {token}"}
+
+
+def test_chat_route_streams_server_sent_events(chat_app):
+    client, headers = chat_app
+    response = client.post("/chatbot/api/chat", json={"message": "¿Qué es un trigger?", "stream": True},
+                           headers=headers)
+    assert response.status_code == 200 and response.mimetype == "text/event-stream"
+    events = [e[len("data: "):] for e in response.get_data(as_text=True).split("\n\n") if e]
+    assert events[-1] == "[DONE]"
+    assert "".join(json.loads(e)["delta"] for e in events[:-1]) == REPLY
+
+
+def test_chat_route_without_stream_and_errors(chat_app, completion_server):
+    client, headers = chat_app
+    response = client.post("/chatbot/api/query", json={"message": "hola"}, headers=headers)
+    assert response.json == {"reply": REPLY}
+
+    completion_server.statuses = [500]
+    response = client.post("/chatbot/api/chat", json={"message": "adiós", "stream": True}, headers=headers)
+    assert response.status_code == 502 and "500" in response.json["error"]
+    assert client.delete("/chatbot/api/history", headers=headers).status_code == 200
+    assert client.post("/chatbot/api/query", json={"message": "Hola!"}, headers=headers).json == {"reply": REPLY}
+    assert client.get("/chatbot/api/cache", headers=headers).json["aciertos"] == 1
+    assert client.post("/chatbot/api/chat", json={}, headers=headers).status_code == 400
+
+
+def test_identical_streams_share_one_upstream_call(deepseek, completion_server):
+    completion_server.release.clear()
+    leader = deepseek.stream(MESSAGES)
+    assert next(leader) == REPLY.split(" ")[0]
+    results = []
+    followers = [threading.Thread(target=lambda: results.append("".join(deepseek.stream(MESSAGES))))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    leader.close()  # el primero se va: los demás siguen leyendo la misma respuesta
+    completion_server.release.set()
+    for thread in followers:
+        thread.join(5)
+    assert results == [REPLY] * 3
+    assert len(completion_server.requests) == 1
+    assert deepseek.stats() == {"en_curso": 0, "en_espera": 0, "llamadas": 1, "compartidas": 3, "rechazadas": 0}
+    # Terminada la llamada, un pedido igual va de nuevo a la API
+    assert "".join(deepseek.stream(MESSAGES)) == REPLY
+    assert len(completion_server.requests) == 2
+
+
+def test_identical_completions_share_one_call(deepseek, completion_server):
+    completion_server.delay = 0.3
+    with ThreadPoolExecutor(8) as pool:
+        replies = list(pool.map(lambda _: deepseek.complete(MESSAGES), range(8)))
+        other = pool.submit(deepseek.complete, MESSAGES, temperature=0)
+        assert other.result() == REPLY
+    assert replies == [REPLY] * 8
+    assert len(completion_server.requests) == 2  # otra temperatura es otro pedido
+
+
+def test_queue_is_bounded(completion_server):
+    client = DeepSeekClient(api_key="x", url=completion_server.url, max_concurrency=1, max_queue=1, max_wait=5)
+    completion_server.release.clear()
+    stream = client.stream(MESSAGES)
+    next(stream)
+    with ThreadPoolExecutor(1) as pool:
+        queued = pool.submit(client.complete, [{"role": "user", "content": "¿Qué es un trigger?"}])
+        while client.stats()["en_espera"] == 0:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        with pytest.raises(ChatbotBusy):
+            client.complete([{"role": "user", "content": "¿Qué es una acción?"}])
+        assert time.perf_counter() - start < 0.5  # con la cola llena no se espera max_wait
+        completion_server.release.set()
+        stream.close()
+        assert queued.result() == REPLY
+    assert client.stats()["rechazadas"] == 1
+
+
+def test_overload_and_rate_limit_answer_429(chat_app, completion_server, monkeypatch):
+    client, headers = chat_app
+    busy = DeepSeekClient(api_key="x", url=completion_server.url, max_concurrency=1, max_queue=0)
+    monkeypatch.setattr(routes.bot, "client", busy)
+    completion_server.release.clear()
+    held = busy.stream(MESSAGES)
+    next(held)
+    response = client.post("/chatbot/api/chat", json={"message": "¿Qué es un trigger?"}, headers=headers)
+    assert response.status_code == 429 and response.headers["Retry-After"] == "5"
+    completion_server.release.set()
+    held.close()
+
+    monkeypatch.setattr(routes, "limiter", TokenBucketLimiter(rate=1 / 60, burst=1))
+    assert client.post("/chatbot/api/chat", json={"message": "¿Qué es un trigger?"}, headers=headers).status_code == 200
+    response = client.post("/chatbot/api/chat", json={"message": "¿Y una acción?"}, headers=headers)
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) > 50
+    assert client.get("/chatbot/api/load", headers=headers).json["usuarios"]["limitados"] == 1
@@ -0,0 +1,73 @@
+# app/chatbot/tests/test_context.py
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.chatbot.context import UserContextCache, render_snapshot
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2030, 1, 1).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+def _snapshot(user_id, expiry=None):
+    user = SimpleNamespace(name=f"Usuario {user_id}", role="Analista", last_login=None)
+    return render_snapshot(user, SimpleNamespace(plan="Pro", expiry_date=expiry), [], now=datetime(2030, 1, 1))
+
+
+def test_snapshot_is_built_once_until_ttl_or_invalidation():
+    clock, loads = Clock(), []
+    cache = UserContextCache(lambda user_id: loads.append(user_id) or _snapshot(user_id), ttl=60, clock=clock)
+    first = cache.get("7")
+    assert cache.get(7) is first and loads == ["7"]  # id del JWT (texto) y del modelo (entero)
+    cache.invalidate(7)
+    cache.get("7")
+    clock.now += 61
+    cache.get("7")
+    assert len(loads) == 3
+    assert cache.stats() == {"aciertos": 1, "armados": 3, "invalidados": 1, "en_memoria": 1}
+
+
+def test_snapshot_expires_with_the_subscription():
+    clock = Clock()
+    expiry = datetime(2030, 1, 1, 0, 0, 30)
+    cache = UserContextCache(lambda user_id: _snapshot(user_id, expiry), ttl=300, clock=clock)
+    assert "Estado: Activo" in cache.get(1)["sistema"]
+    clock.now += 29
+    cache.get(1)
+    clock.now += 2  # venció antes que el TTL
+    cache.get(1)
+    assert cache.stats()["armados"] == 2
+
+
+def test_invalidation_during_build_is_not_lost():
+    cache = UserContextCache(lambda user_id: (cache.invalidate(user_id), _snapshot(user_id))[1])
+    cache.get(1)
+    assert cache.stats()["en_memoria"] == 0
+
+
+def test_chat_turns_do_not_query_until_rows_change(sql_app):
+    cache, queries, db = sql_app.cache, sql_app.queries, sql_app.db
+    snapshot = cache.get("1")
+    assert "Nombre: Ana" in snapshot["sistema"] and "Onboarding" in snapshot["sistema"]
+    built_with = len(queries)
+    for _ in range(10):
+        cache.get("1")
+    assert len(queries) == built_with == 3
+
+    sql_app.Subscription.query.filter_by(user_id=1).first().plan = "Enterprise"
+    db.session.rollback()  # sin commit no se invalida
+    cache.get("1")
+    assert cache.stats()["invalidados"] == 0
+
+    sql_app.Subscription.query.filter_by(user_id=1).first().plan = "Enterprise"
+    db.session.commit()
+    assert cache.get("1")["plan"] == "Enterprise"
+
+    db.session.add(sql_app.Project(owner_id=1, name="Auditoría"))
+    db.session.commit()
+    assert "Auditoría" in cache.get("1")["sistema"]
+    assert cache.stats()["invalidados"] == 2
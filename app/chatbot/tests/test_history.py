@@ -0,0 +1,92 @@
+# app/chatbot/tests/test_history.py
+from app.chatbot.history import ConversationStore, count_tokens, truncate_tokens
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_900_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_estimate_and_truncation():
+    assert count_tokens("") == 0
+    assert count_tokens("¿Cuántos flujos tengo?") == 8  # ¿ Cuán·tos flu·jos ten·go ?
+    text = "palabra " * 100
+    short = truncate_tokens(text, 20)
+    assert count_tokens(short) <= 21 and short.endswith("…")
+    assert truncate_tokens("hola", 20) == "hola"
+
+
+def test_window_stays_bounded_however_long_the_conversation(tmp_path):
+    calls = []
+
+    def summarize(previous, messages, budget):
+        assert previous == (f"resumen {len(calls)}" if calls else None)
+        calls.append(len(messages))
+        return f"resumen {len(calls)}"
+
+    store = ConversationStore(str(tmp_path / "h.db"), history_budget=200, summary_every=100, summary_budget=50,
+                              clock=Clock())
+    bound = store.history_budget + store.summary_every + store.summary_budget
+    for turn in range(300):
+        window = store.window(7, summarize)
+        assert window["tokens"] <= bound
+        store.append(7, f"Pregunta número {turn} sobre flujos", f"Respuesta número {turn}, con algo de detalle.")
+    window = store.window(7, summarize)
+    assert window["mensajes"][-1]["content"] == "Respuesta número 299, con algo de detalle."
+    assert [m["role"] for m in window["mensajes"][:2]] == ["user", "assistant"]
+    assert window["resumen"] == f"resumen {len(calls)}"
+    # Se resume por tandas, no en cada turno
+    assert 10 < len(calls) < 300 / 4
+
+
+def test_old_and_cleared_conversations_are_not_context(tmp_path):
+    clock = Clock()
+    store = ConversationStore(str(tmp_path / "h.db"), max_age=3600, clock=clock)
+    store.append(1, "¿Qué es un trigger?", "Lo que inicia un flujo.")
+    store.append(2, "Hola", "¡Hola!")
+    assert len(store.window(1)["mensajes"]) == 2
+    clock.now += 3601
+    assert store.window(1) == {"resumen": None, "mensajes": [], "tokens": 0}
+
+    store.append(2, "¿Y una acción?", "Lo que hace el flujo.")
+    store.clear(2)
+    assert store.window(2)["mensajes"] == []
+    store.append(2, "Otra pregunta", "Otra respuesta")
+    assert [m["content"] for m in store.window(2)["mensajes"]] == ["Otra pregunta", "Otra respuesta"]
+    assert store.prune(clock.now - 60) == 4
+
+
+def test_follow_ups_carry_the_previous_turns(bot, completion_server):
+    bot.generate_response("¿Qué es un trigger?", 1)
+    bot.generate_response("¿Y cómo lo pruebo?", 1)
+    messages = completion_server.requests[-1]["payload"]["messages"]
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[1]["content"] == "¿Qué es un trigger?" and messages[-1]["content"] == "¿Y cómo lo pruebo?"
+    assert bot.history.window(2)["mensajes"] == []
+
+
+def test_long_conversations_are_summarized_by_the_model(bot, completion_server, tmp_path):
+    bot._history = ConversationStore(str(tmp_path / "corto.db"), history_budget=60, summary_every=40,
+                                     summary_budget=30)
+    sizes = []
+    for turn in range(12):
+        bot.generate_response(f"Pregunta {turn}: ¿qué diferencia hay entre un trigger y una acción?", 1)
+        sizes.append(sum(count_tokens(m["content"]) for m in completion_server.requests[-1]["payload"]["messages"]))
+    summaries = [r for r in completion_server.requests if "Resume la conversación" in
+                 r["payload"]["messages"][0]["content"]]
+    assert summaries
+    assert "Resumen de la conversación hasta ahora" in completion_server.requests[-1]["payload"]["messages"][0]["content"]
+    assert max(sizes[4:]) <= max(sizes[:4]) * 2  # ya no crece con cada turno
+
+
+def test_route_keeps_local_answers_and_rejects_oversized_messages(client, auth_header, completion_server):
+    client.post("/chatbot/api/chat", json={"message": "¿Cuál es mi plan?"}, headers=auth_header)
+    client.post("/chatbot/api/chat", json={"message": "¿Y eso qué incluye?"}, headers=auth_header)
+    messages = completion_server.requests[-1]["payload"]["messages"]
+    assert messages[1]["content"] == "¿Cuál es mi plan?" and "Tu plan actual: Pro" in messages[2]["content"]
+
+    response = client.post("/chatbot/api/chat", json={"message": "palabra " * 2000}, headers=auth_header)
+    assert response.status_code == 400 and len(completion_server.requests) == 1
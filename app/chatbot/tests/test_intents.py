@@ -0,0 +1,74 @@
+# app/chatbot/tests/test_intents.py
+import time
+
+from app.chatbot.intents import IntentClassifier
+
+# Mensajes reales de soporte; None = lo tiene que contestar el modelo
+LABELED = [
+    ("¿Cuántos flujos tengo?", "cantidad_flujos"),
+    ("cuantos flujos automatizados tengo", "cantidad_flujos"),
+    ("Hola! ¿cuántas automatizaciones tengo?", "cantidad_flujos"),
+    ("muéstrame mis flujos", "cantidad_flujos"),
+    ("mis flujos activos", "cantidad_flujos"),
+    ("¿Qué flujos tengo?", "cantidad_flujos"),
+    ("número de flujos", "cantidad_flujos"),
+    ("Cómo crear un flujo automático?", "crear_flujo"),
+    ("¿Cómo creo un flujo?", "crear_flujo"),
+    ("¿Dónde se configura un trigger nuevo?", None),
+    ("quiero crear una automatización", "crear_flujo"),
+    ("¿Cómo puedo armar un flujo?", "crear_flujo"),
+    ("¿Cómo automatizo una tarea?", "crear_flujo"),
+    ("¿Cuál es mi plan?", "plan_actual"),
+    ("Hola, ¿qué plan tengo?", "plan_actual"),
+    ("mi suscripción actual", "plan_actual"),
+    ("¿Cuándo vence mi suscripción?", "plan_actual"),
+    ("¿Qué plan tengo contratado?", "plan_actual"),
+    ("¿Cuál fue mi último feedback?", "ultimo_feedback"),
+    ("último reporte que envié", "ultimo_feedback"),
+    ("¿Cuándo envié mi último feedback?", "ultimo_feedback"),
+    ("¿Qué incluye mi plan?", None),
+    ("¿Qué incluye el plan Pro?", None),
+    ("¿Cuántos flujos tengo y cómo los optimizo?", None),
+    ("mi plan y mis flujos", None),
+    ("¿Qué es un trigger?", None),
+    ("Explícame la normativa GDPR", None),
+    ("¿Cómo reduzco el estrés del equipo?", None),
+    ("¿Puedo pagar con transferencia?", None),
+    ("Quiero cambiar mi plan a Enterprise", None),
+    ("¿Por qué falló mi flujo de facturas anoche?", None),
+    ("Dame ideas de automatizaciones para RRHH", None),
+    ("", None),
+]
+
+
+def test_hit_rate_without_false_positives():
+    classifier = IntentClassifier()
+    predicted = [(expected, classifier.classify(message)[0]) for message, expected in LABELED]
+    known = [(e, p) for e, p in predicted if e is not None]
+    hit_rate = sum(e == p for e, p in known) / len(known)
+    false_positives = [(m, p) for (m, e), (_, p) in zip(LABELED, predicted) if e is None and p is not None]
+    wrong_intent = [(e, p) for e, p in known if p is not None and p != e]
+    assert hit_rate >= 0.9, predicted
+    assert false_positives == [] and wrong_intent == []
+
+
+def test_classification_takes_microseconds():
+    classifier = IntentClassifier()
+    messages = [m for m, _ in LABELED] * 100
+    start = time.perf_counter()
+    for message in messages:
+        classifier.classify(message)
+    per_message = (time.perf_counter() - start) / len(messages)
+    assert per_message < 200e-6  # ~20 µs en una laptop; el margen es para CI
+
+
+def test_known_intents_are_answered_from_the_database(client, auth_header, completion_server):
+    reply = client.post("/chatbot/api/query", json={"message": "¿Cuántos flujos tengo?"}, headers=auth_header).json
+    assert reply["reply"].startswith("Tienes 2 flujos automatizados") and "Alta de empleados" in reply["reply"]
+    reply = client.post("/chatbot/api/chat", json={"message": "¿Cuál es mi plan?", "stream": True},
+                        headers=auth_header).get_data(as_text=True)
+    assert "Tu plan actual: Pro" in reply
+    assert completion_server.requests == []
+
+    client.post("/chatbot/api/chat", json={"message": "¿Qué incluye mi plan?"}, headers=auth_header)
+    assert len(completion_server.requests) == 1
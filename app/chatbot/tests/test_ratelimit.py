@@ -0,0 +1,44 @@
+# app/chatbot/tests/test_ratelimit.py
+from app.chatbot.ratelimit import TokenBucketLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_steady_rate():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate=1, burst=3, clock=clock)
+    assert [limiter.allow("7")[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("7") == (False, 1)
+    assert limiter.allow(8) == (True, 0)  # cada usuario tiene su balde
+    clock.now += 1
+    assert limiter.allow(7) == (True, 0)
+    assert limiter.allow(7)[0] is False
+    clock.now += 60
+    assert [limiter.allow(7)[0] for _ in range(4)] == [True, True, True, False]  # no acumula más que la ráfaga
+
+
+def test_idle_buckets_are_dropped():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_users=10, clock=clock)
+    for user_id in range(10):
+        limiter.allow(user_id)
+    clock.now += 5
+    limiter.allow("nuevo")
+    assert limiter.stats() == {"permitidos": 11, "limitados": 0, "usuarios": 1}
+
+
+def test_user_count_is_capped_by_least_recent_update():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_users=10, clock=clock)
+    for user_id in range(15):
+        limiter.allow(user_id)
+        limiter.allow(0)  # el 0 sigue activo y no se descarta
+        clock.now += 0.1
+    assert limiter.stats()["usuarios"] == 10
+    assert list(limiter._buckets) == [*map(str, range(6, 15)), "0"]
@@ -1,9 +1,18 @@
 # app/extensions.py
+import os
+from datetime import timedelta
+
 from flask_jwt_extended import JWTManager
+from flask_sqlalchemy import SQLAlchemy
 
 jwt = JWTManager()
+db = SQLAlchemy()
 
 def init_jwt(app):
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
     jwt.init_app(app)
+
+def init_db(app):
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", os.getenv("DATABASE_URL", "sqlite:///chatbot.db"))
+    db.init_app(app)
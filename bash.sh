@@ -10,8 +10,7 @@ git push -u origin main
 
 # 2. Instalación de dependencias y validación
 pip install -r requirements.txt
-pip install fpdf2 spacy pandas streamlit
-python -m spacy download es_core_news_sm
+pip install fpdf2 pandas streamlit
 pip install flake8  # Instalar linter
 
 # 3. Verificación de código
@@ -0,0 +1,191 @@
+# batch_invoices.py
+"""
+Facturación masiva (cierre de mes) desde un CSV o un DataFrame de clientes.
+
+Columnas: client_name, client_email, client_address, subtotal y,
+opcionalmente, external_ref (referencia del cliente/pedido). Las filas se
+procesan por bloques:
+
+1. se descartan las que ya tienen factura (misma external_ref para el
+   usuario; sin external_ref se usa un hash de la fila y el período),
+2. los PDFs se generan en un pool de procesos,
+3. facturas, invoice_logs y correos (email_outbox) se insertan con
+   executemany en una sola transacción por bloque.
+
+Volver a correr el mismo archivo no duplica facturas.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from helpers import generate_invoice_pdf, iva_rate_for
+from mailer import OUTBOX_INSERT, default_sender, outbox_row
+
+REQUIRED_COLUMNS = ("client_name", "client_email", "client_address", "subtotal")
+
+
+def _render(job):
+    render, args = job
+    return render(*args)
+
+
+def read_clients(source):
+    """Filas como dicts desde una ruta CSV, un archivo abierto o un DataFrame, sin cargarlas todas."""
+    if hasattr(source, "to_dict"):  # pandas.DataFrame
+        for row in source.itertuples(index=False):
+            yield {str(k).strip().lower(): v for k, v in row._asdict().items()}
+        return
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            yield from read_clients(f)
+        return
+    if isinstance(source, (io.BufferedIOBase, io.RawIOBase)):  # p. ej. el archivo subido en Streamlit
+        source = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(source)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    yield from reader
+
+
+def _reference(user_email, row, period):
+    ref = str(row.get("external_ref") or "").strip()
+    if ref:
+        return ref
+    key = "|".join([user_email, period] + [str(row.get(c, "")).strip() for c in REQUIRED_COLUMNS])
+    return "auto-" + hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class BatchInvoicer:
+    def __init__(self, db, user_email, render=generate_invoice_pdf, workers=None, chunk_size=200,
+                 template="Estándar", message="Gracias por su compra.", send_email=True, period=None):
+        """`workers=0` genera los PDFs en el mismo proceso."""
+        self.db = db
+        self.user_email = user_email
+        self.render = render
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.template = template
+        self.message = message
+        self.send_email = send_email
+        self.period = period or datetime.date.today().strftime("%Y-%m")
+
+    def _executor(self):
+        if not self.workers:
+            return None
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+
+    def _prepare(self, chunk, start, errors):
+        """Valida el bloque y devuelve las filas que todavía no tienen factura."""
+        pending = []
+        for offset, row in enumerate(chunk):
+            line = start + offset
+            try:
+                subtotal = float(row["subtotal"])
+                if not str(row["client_name"] or "").strip():
+                    raise ValueError("client_name vacío")
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append({"fila": line, "error": f"{type(e).__name__}: {e}"})
+                continue
+            pending.append({
+                "fila": line,
+                "client_name": str(row["client_name"]).strip(),
+                "client_email": str(row.get("client_email") or "").strip(),
+                "client_address": str(row.get("client_address") or "").strip(),
+                "subtotal": subtotal,
+                "external_ref": _reference(self.user_email, row, self.period),
+            })
+        if not pending:
+            return []
+        refs = [p["external_ref"] for p in pending]
+        existing = {r[0] for r in self.db.conn.execute(
+            f"SELECT external_ref FROM invoices WHERE user_email=? AND external_ref IN ({','.join('?' * len(refs))})",
+            [self.user_email, *refs]
+        )}
+        fresh, seen = [], set()
+        for p in pending:
+            if p["external_ref"] not in existing and p["external_ref"] not in seen:
+                seen.add(p["external_ref"])
+                fresh.append(p)
+        return fresh
+
+    def _store(self, invoices, sender):
+        now = time.time()
+        rows, logs, emails = [], [], []
+        for inv in invoices:
+            pdf_hash, pdf_size = self.db.blobs.put(inv["pdf"])
+            rows.append((self.user_email, inv["client_name"], inv["client_email"], inv["client_address"],
+                         inv["subtotal"], inv["iva"], inv["total"], inv["invoice_number"], pdf_hash, pdf_size,
+                         inv["external_ref"]))
+            logs.append((self.user_email, "generada (lote)", inv["invoice_number"]))
+            if self.send_email and inv["client_email"]:
+                emails.append(outbox_row(
+                    inv["client_email"], f"Factura {inv['invoice_number']}", f"{self.message}\nTotal: ${inv['total']:.2f}",
+                    [(f"Factura_{inv['invoice_number']}.pdf", inv["pdf"])], sender=sender,
+                    user_email=self.user_email, kind="factura", reference=inv["invoice_number"], now=now,
+                ))
+        with self.db.pool.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO invoices (user_email, client_name, client_email, client_address, subtotal, iva, total,
+                                      invoice_number, pdf_hash, pdf_size, external_ref)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.executemany("""
+                INSERT INTO invoice_logs (invoice_id, user_email, action)
+                SELECT id, ?, ? FROM invoices WHERE invoice_number=?
+            """, logs)
+            conn.executemany(OUTBOX_INSERT, emails)
+        return len(emails)
+
+    def run(self, source, progress=None):
+        """
+        Factura todas las filas y devuelve un resumen con el rendimiento.
+        `progress(procesadas)` se llama después de cada bloque.
+        """
+        started = time.perf_counter()
+        # Prefijo propio del lote para que dos lotes en el mismo segundo no repitan números
+        stamp = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:4].upper()}"
+        report = {"procesadas": 0, "creadas": 0, "omitidas": 0, "correos": 0, "errores": []}
+        rows = read_clients(source)
+        # El remitente sale de secrets.toml: se lee una vez por lote, no por factura
+        sender = default_sender() if self.send_email else None
+        executor = self._executor()
+        try:
+            while True:
+                chunk = list(itertools.islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                first_line = report["procesadas"] + 2  # la fila 1 es la cabecera
+                errors_before = len(report["errores"])
+                fresh = self._prepare(chunk, first_line, report["errores"])
+                report["omitidas"] += len(chunk) - len(fresh) - (len(report["errores"]) - errors_before)
+                report["procesadas"] += len(chunk)
+                for inv in fresh:
+                    inv["iva"] = iva_rate_for(inv["client_address"])
+                    inv["total"] = round(inv["subtotal"] * (1 + inv["iva"]), 2)
+                    inv["invoice_number"] = f"INV-{stamp}-{inv['fila']:06d}"
+                jobs = [(self.render, (inv["client_name"], inv["subtotal"], inv["iva"], inv["total"],
+                                       inv["invoice_number"], self.template)) for inv in fresh]
+                if executor is None:
+                    pdfs = map(_render, jobs)
+                else:
+                    pdfs = executor.map(_render, jobs, chunksize=max(1, len(jobs) // (self.workers * 4)))
+                for inv, pdf in zip(fresh, pdfs):
+                    inv["pdf"] = pdf
+                if fresh:
+                    report["correos"] += self._store(fresh, sender)
+                    report["creadas"] += len(fresh)
+                if progress:
+                    progress(report["procesadas"])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        report["segundos"] = round(time.perf_counter() - started, 3)
+        report["facturas_por_segundo"] = round(report["creadas"] / report["segundos"], 1) if report["segundos"] else 0.0
+        return report
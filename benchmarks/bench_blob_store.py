@@ -0,0 +1,110 @@
+# benchmarks/bench_blob_store.py
+"""
+Tamaño de la base y latencia de get_invoices_by_user con los PDFs dentro de
+invoices.pdf_file (como antes) contra el almacén de blobs (blob_store.py).
+
+Uso: python benchmarks/bench_blob_store.py [--invoices 100000] [--users 1000] [--pdf-kb 3]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SQL_INVOICES_BY_USER, DatabaseManager
+from migrations import MIGRATIONS, apply_migrations
+
+
+def fake_pdf(i, size):
+    # Cabecera y contenido propio de cada factura, como los PDFs de fpdf (poco comprimibles)
+    body = random.Random(i).randbytes(size // 2)
+    return b"%PDF-1.4\n" + f"Factura INV-{i}\n".encode() + body + b"0" * (size // 2)
+
+
+def rows(args):
+    for i in range(args.invoices):
+        yield (f"user{i % args.users}@empresa.com", f"Cliente {i}", "MEX", 100.0, 0.16, 116.0, f"INV-{i}",
+               fake_pdf(i, args.pdf_kb * 1024))
+
+
+def seed_inline(path, args):
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, [m for m in MIGRATIONS if m[0] < 8])
+    conn.executemany("""
+        INSERT INTO invoices (user_email, client_name, client_address, subtotal, iva, total, invoice_number, pdf_file)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows(args))
+    conn.commit()
+    conn.close()
+
+
+def seed_blobs(path, args):
+    db = DatabaseManager(path)
+    db.migrate()
+    batch = []
+    for user, client, address, subtotal, iva, total, number, pdf in rows(args):
+        batch.append((user, client, address, subtotal, iva, total, number, *db.blobs.put(pdf)))
+        if len(batch) == 5000:
+            with db.pool.transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO invoices (user_email, client_name, client_address, subtotal, iva, total, invoice_number, pdf_hash, pdf_size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+            batch = []
+    if batch:
+        with db.pool.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO invoices (user_email, client_name, client_address, subtotal, iva, total, invoice_number, pdf_hash, pdf_size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+    db.pool.close_all()
+    return db.blobs
+
+
+def latency(path, args, samples=500):
+    """ms por consulta con una conexión nueva (caché de páginas fría, como un proceso recién iniciado)."""
+    conn = sqlite3.connect(path)
+    times = []
+    for i in range(samples):
+        user = f"user{(i * 7919) % args.users}@empresa.com"
+        start = time.perf_counter()
+        conn.execute(SQL_INVOICES_BY_USER, (user,)).fetchall()
+        times.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return statistics.median(times), sorted(times)[int(len(times) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pdf-kb", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inline, blobs = os.path.join(tmp, "inline", "app.db"), os.path.join(tmp, "blobs", "app.db")
+        os.makedirs(os.path.dirname(inline))
+        os.makedirs(os.path.dirname(blobs))
+        seed_inline(inline, args)
+        store = seed_blobs(blobs, args)
+
+        inline_size = os.path.getsize(inline)
+        blobs_size = os.path.getsize(blobs)
+        inline_p50, inline_p95 = latency(inline, args)
+        blobs_p50, blobs_p95 = latency(blobs, args)
+        stored = store.stored_size()
+
+    mb = 1024 * 1024
+    print(f"{args.invoices} facturas, {args.users} usuarios, PDFs de {args.pdf_kb} KB")
+    print(f"PDF en SQLite  : base {inline_size / mb:8.1f} MB | get_invoices_by_user p50 {inline_p50:6.2f} ms  p95 {inline_p95:6.2f} ms")
+    print(f"blob store     : base {blobs_size / mb:8.1f} MB | get_invoices_by_user p50 {blobs_p50:6.2f} ms  p95 {blobs_p95:6.2f} ms")
+    print(f"                 blobs en disco {stored / mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_chatbot.py
+"""
+Latencia de un turno de /chatbot/api/chat con el modelo simulado (responde
+al instante, o tras --llm-ms), para medir solo lo que agrega la app: JWT,
+armado del contexto del usuario y del prompt.
+
+Compara el contexto armado en cada mensaje (TTL 0: tres consultas por
+turno, como antes) contra la caché por usuario de app/chatbot/context.py.
+Los mensajes son personales, así no los resuelve la caché de respuestas.
+
+Uso: python benchmarks/bench_chatbot.py [--users 1000] [--turns 3000] [--llm-ms 0]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import event
+
+from app.chatbot import routes
+from app.chatbot.cache import ResponseCache
+from app.chatbot.context import UserContextCache, watch_models
+from app.chatbot.deepseek import EnterpriseFlowChatbot
+from app.chatbot.history import ConversationStore
+from app.chatbot.ratelimit import TokenBucketLimiter
+from app.extensions import db
+from app.models import Project, Subscription, User
+
+
+class SimulatedLLM:
+    """Mismo contrato que DeepSeekClient.complete, sin red."""
+    model = "deepseek-chat"
+
+    def __init__(self, delay_ms):
+        self.delay = delay_ms / 1000
+
+    def complete(self, messages, temperature=0.3, **options):
+        if self.delay:
+            time.sleep(self.delay)
+        return "Tu plan actual incluye automatizaciones ilimitadas."
+
+
+def populate(users):
+    expiry = datetime.now() + timedelta(days=365)
+    for user_id in range(1, users + 1):
+        db.session.add(User(id=user_id, name=f"Usuario {user_id}", role="Analista", last_login=datetime.now()))
+        db.session.add(Subscription(user_id=user_id, plan=random.choice(["Básico", "Pro", "Enterprise"]),
+                                    expiry_date=expiry))
+        db.session.add_all(Project(owner_id=user_id, name=f"Proyecto {user_id}-{n}") for n in range(5))
+    db.session.commit()
+
+
+def run(client, tokens, user_ids, queries):
+    timings, before = [], len(queries)
+    for turn, user_id in enumerate(user_ids):
+        start = time.perf_counter()
+        response = client.post("/chatbot/api/chat", json={"message": f"¿Qué incluye mi plan? ({turn})"},
+                               headers={"Authorization": f"Bearer {tokens[user_id]}"})
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    q = statistics.quantiles(timings, n=100)
+    return q[49], q[98], (len(queries) - before) / len(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=3000)
+    parser.add_argument("--llm-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp.name, 'chatbot.db')}"
+    app.config["JWT_SECRET_KEY"] = "benchmark-secret-de-al-menos-32-bytes"
+    JWTManager(app)
+    db.init_app(app)
+    app.register_blueprint(routes.chatbot_bp, url_prefix="/chatbot")
+
+    with app.app_context():
+        db.create_all()
+        populate(args.users)
+        tokens = {u: create_access_token(identity=str(u)) for u in range(1, args.users + 1)}
+        queries = []
+        event.listen(db.engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+        client = app.test_client()
+        routes.limiter = TokenBucketLimiter(burst=args.users + args.turns)  # se mide su costo, sin que limite
+        llm = SimulatedLLM(args.llm_ms)
+        rnd = random.Random(1)
+        turns = [rnd.randrange(1, args.users + 1) for _ in range(args.turns)]
+
+        print(f"{args.users:,} usuarios, {args.turns:,} turnos, modelo simulado de {args.llm_ms:g} ms\n")
+        print(f"{'contexto':<22} {'p50 ms':>8} {'p99 ms':>8} {'consultas/turno':>16}")
+        for name, ttl in (("armado en cada turno", 0), ("caché por usuario", 300)):
+            contexts = UserContextCache(ttl=ttl)
+            unwatch = watch_models(contexts)
+            history = ConversationStore(os.path.join(tmp.name, f"historial-{ttl}.db"))
+            routes.bot = EnterpriseFlowChatbot(llm, cache=ResponseCache(), contexts=contexts, history=history)
+            run(client, tokens, list(tokens), queries)  # calentamiento: un turno por usuario
+            p50, p99, per_turn = run(client, tokens, turns, queries)
+            print(f"{name:<22} {p50:>8.3f} {p99:>8.3f} {per_turn:>16.2f}")
+            unwatch()
+
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
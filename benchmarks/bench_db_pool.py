@@ -0,0 +1,101 @@
+# benchmarks/bench_db_pool.py
+"""
+Compara ops/seg de DatabaseManager abriendo una conexión por llamada (como
+antes) contra el pool de conexiones persistentes.
+
+Uso: python benchmarks/bench_db_pool.py [--ops 5000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, hash_password
+
+SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE, password TEXT,
+                    nombre TEXT, apellido TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE automation_tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT, type TEXT,
+                               schedule TEXT, responsible TEXT, notification_method TEXT,
+                               status TEXT DEFAULT 'pendiente', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE leave_requests (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT, tipo_permiso TEXT,
+                             fecha_inicio DATE, fecha_fin DATE, estado TEXT DEFAULT 'pendiente',
+                             motivo TEXT, observaciones TEXT);
+"""
+
+QUERIES = [
+    ("SELECT 1 FROM users WHERE email=? AND password=?", lambda u: (u, hash_password("clave"))),
+    ("SELECT type, schedule, responsible, notification_method, status, created_at FROM automation_tasks "
+     "WHERE user_email=? ORDER BY created_at DESC", lambda u: (u,)),
+    ("SELECT tipo_permiso, fecha_inicio, fecha_fin, estado, motivo, observaciones FROM leave_requests "
+     "WHERE user_email=? ORDER BY fecha_inicio DESC", lambda u: (u,)),
+]
+
+
+def seed(path, users=200):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    for i in range(users):
+        email = f"user{i}@empresa.com"
+        conn.execute("INSERT INTO users (email, password) VALUES (?, ?)", (email, hash_password("clave")))
+        conn.executemany(
+            "INSERT INTO automation_tasks (user_email, type, schedule) VALUES (?, 'Reporte', '08:00')",
+            [(email,)] * 5,
+        )
+        conn.executemany(
+            "INSERT INTO leave_requests (user_email, tipo_permiso, fecha_inicio) VALUES (?, 'Vacaciones', '2026-01-01')",
+            [(email,)] * 3,
+        )
+    conn.commit()
+    conn.close()
+
+
+def run_legacy(path, ops):
+    for i in range(ops):
+        sql, params = QUERIES[i % len(QUERIES)]
+        conn = sqlite3.connect(path)
+        conn.execute(sql, params(f"user{i % 200}@empresa.com")).fetchall()
+        conn.close()
+
+
+def run_pooled(path, ops):
+    db = DatabaseManager(path)
+    for i in range(ops):
+        user = f"user{i % 200}@empresa.com"
+        step = i % 3
+        if step == 0:
+            db.verify_user(user, "clave")
+        elif step == 1:
+            db.get_automation_tasks(user)
+        else:
+            db.get_leave_requests(user)
+
+
+def measure(fn, path, ops):
+    start = time.perf_counter()
+    fn(path, ops)
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path)
+        before = measure(run_legacy, path, args.ops)
+        after = measure(run_pooled, path, args.ops)
+
+    print(f"conexión por llamada : {before:10.0f} ops/seg")
+    print(f"pool persistente     : {after:10.0f} ops/seg")
+    print(f"mejora               : {after / before:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_pdf_engine.py
+"""
+PDFs por segundo de cada tipo de documento: armando el FPDF a mano como antes
+(con la firma leída y decodificada en cada certificado) contra pdf_engine.py.
+
+Necesita fpdf2 y Pillow. Uso: python benchmarks/bench_pdf_engine.py [--docs 300] [--signature ruta.png]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+except ImportError:
+    sys.exit("fpdf2 no está instalado: pip install fpdf2")
+
+import pdf_engine
+
+NEXT = {"new_x": XPos.LMARGIN, "new_y": YPos.NEXT}
+
+
+def legacy_invoice(i):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=14)
+    pdf.cell(0, 10, f"Factura INV-{i}", align="C", **NEXT)
+    pdf.set_font("Helvetica", size=12)
+    for line in ("Cliente: ACME", "Subtotal: $100.00", "IVA: 16%", "Total: $116.00", "Fecha: 17/10/2026 10:00"):
+        pdf.cell(0, 10, line, **NEXT)
+    return bytes(pdf.output())
+
+
+def legacy_receipt(i):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=14)
+    pdf.cell(0, 10, "Recibo Digital", align="C", **NEXT)
+    pdf.set_font("Helvetica", size=12)
+    pdf.ln(8)
+    for line in (f"Recibí de: Cliente {i}", "Monto: $50.00", "Concepto: Consultoría", "Emitido por: ana@empresa.com",
+                 "Fecha: 17/10/2026 10:00"):
+        pdf.cell(0, 10, line, **NEXT)
+    return bytes(pdf.output())
+
+
+def legacy_certificate(i, signature):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, "Certificado de Reconocimiento", align="C", **NEXT)
+    pdf.ln(15)
+    pdf.set_font("Helvetica", "", 12)
+    pdf.multi_cell(0, 10, f"Se reconoce oficialmente a Colega {i} por:", align="C", **NEXT)
+    pdf.ln(10)
+    pdf.set_font("Helvetica", "I", 12)
+    pdf.multi_cell(0, 8, '"Excelente trabajo en el cierre de mes"', **NEXT)
+    pdf.ln(20)
+    pdf.image(signature, x=50, w=30, h=15)
+    pdf.set_font("Helvetica", "I", 10)
+    pdf.cell(0, 10, "Firmado por: CEO", align="R", **NEXT)
+    return bytes(pdf.output())
+
+
+def rate(fn, docs):
+    start = time.perf_counter()
+    for i in range(docs):
+        fn(i)
+    return docs / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--signature", help="PNG de firma (por defecto uno generado de 600x300)")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        signature = args.signature
+        if signature is None:
+            from PIL import Image, ImageDraw
+            signature = os.path.join(tmp, "firma.png")
+            image = Image.new("RGBA", (600, 300), (255, 255, 255, 0))
+            ImageDraw.Draw(image).line([(20, 250), (200, 40), (380, 260), (580, 60)], fill=(0, 0, 90, 255), width=8)
+            image.save(signature)
+
+        cases = [
+            ("factura", legacy_invoice,
+             lambda i: pdf_engine.render_invoice("ACME", 100.0, 0.16, 116.0, f"INV-{i}")),
+            ("recibo", legacy_receipt,
+             lambda i: pdf_engine.render_receipt(f"Cliente {i}", 50.0, "Consultoría", "ana@empresa.com")),
+            ("certificado", lambda i: legacy_certificate(i, signature),
+             lambda i: pdf_engine.render_certificate(f"Colega {i}", "Excelente trabajo en el cierre de mes", "CEO",
+                                                     signature)),
+        ]
+        print(f"{'documento':<12} {'antes (PDF/s)':>14} {'pdf_engine (PDF/s)':>19} {'mejora':>8}")
+        for name, legacy, engine in cases:
+            legacy(0), engine(0)  # calentamiento: imports y caché de la firma
+            before = rate(legacy, args.docs)
+            after = rate(engine, args.docs)
+            print(f"{name:<12} {before:>14.0f} {after:>19.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_rerun.py
+"""
+Latencia de la parte fija de cada rerun de Streamlit: lo que hacía
+EnterpriseFlowApp.__init__ más el bloque de CREATE TABLE al final de main.py,
+contra obtener los mismos servicios del contenedor del proceso.
+
+Stripe se mide solo si está instalado.
+
+Uso: python benchmarks/bench_rerun.py [--reruns 50]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from services import ServiceContainer
+
+
+def optional(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        print(f"  {module} no está instalado: se omite del benchmark")
+        return False
+
+
+def legacy_rerun(db_path, with_payment):
+    DatabaseManager(db_path)
+    if with_payment:
+        from payment_handler import PaymentHandler
+        PaymentHandler()
+    # Bloque que estaba al final de main.py (dos conexiones, cuatro DDL)
+    for ddl in (
+        ("CREATE TABLE IF NOT EXISTS user_rewards (id INTEGER PRIMARY KEY, user_email TEXT UNIQUE)",
+         "CREATE TABLE IF NOT EXISTS personal_goals (id INTEGER PRIMARY KEY, user_email TEXT, goal_text TEXT)"),
+        ("CREATE TABLE IF NOT EXISTS medical_records (id INTEGER PRIMARY KEY, user_email TEXT)",
+         "CREATE TABLE IF NOT EXISTS leave_requests (id INTEGER PRIMARY KEY, user_email TEXT)"),
+    ):
+        conn = sqlite3.connect(db_path)
+        for statement in ddl:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+
+def container_rerun(container, with_payment):
+    container.db
+    if with_payment:
+        container.payment
+
+
+def timed(fn, reruns):
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    with_payment = optional("stripe") and optional("pydantic")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        container = ServiceContainer(db_path)
+        before = timed(lambda: legacy_rerun(db_path, with_payment), args.reruns)
+        after = timed(lambda: container_rerun(container, with_payment), args.reruns)
+
+    print(f"antes (construir todo en cada rerun): mediana {before[0]:8.3f} ms, máx {before[1]:8.3f} ms")
+    print(f"después (contenedor del proceso)   : mediana {after[0]:8.3f} ms, máx {after[1]:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_search_index.py
+"""
+Latencia de búsqueda de search_index.py con muchas páginas indexadas
+(por defecto 1.000.000 repartidas entre 2.000 usuarios).
+
+El texto es sintético: un vocabulario con distribución tipo Zipf, más algunos
+términos del dominio (contrato, consentimiento, ...) con frecuencias
+conocidas. Mide p50/p95/p99 por tipo de consulta, siempre con el filtro por
+usuario que usa la app.
+
+Uso: python benchmarks/bench_search_index.py [--pages 1000000] [--users 2000] [--queries 300] [--db ruta.db]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from search_index import PAGE_SLOTS, SHARDS, SearchIndex, owner_key, shard_table
+
+WORDS_PER_PAGE = 120
+PAGES_PER_DOCUMENT = 20
+# término: probabilidad de aparecer en una página
+DOMAIN_TERMS = {"contrato": 0.05, "consentimiento": 0.01, "auditoría": 0.005, "indemnización": 0.0005}
+
+QUERIES = [
+    ("término común", lambda rnd, vocab: vocab[rnd.randrange(20)]),
+    ("término raro", lambda rnd, vocab: "indemnización"),
+    ("dos términos", lambda rnd, vocab: f"contrato {vocab[rnd.randrange(200)]}"),
+    ("prefijo", lambda rnd, vocab: "consent"),
+    ("frase", lambda rnd, vocab: f'"{vocab[0]} {vocab[1]}"'),
+]
+
+
+def vocabulary(size=20000):
+    rnd = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyzáéíóñ"
+    return ["".join(rnd.choice(letters) for _ in range(rnd.randint(3, 10))) for _ in range(size)]
+
+
+def populate(db, pages, users, vocab):
+    rnd = random.Random(2)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))  # Zipf
+    documents = pages // PAGES_PER_DOCUMENT
+    started = time.perf_counter()
+    for first in range(0, documents, 500):
+        docs, rows = [], {}
+        for doc_id in range(first + 1, min(first + 500, documents) + 1):
+            owner = f"user{doc_id % users}@empresa.com"
+            docs.append((doc_id, owner, f"doc{doc_id}.pdf", 0, f"{doc_id:064x}", "", PAGES_PER_DOCUMENT))
+            key, table = owner_key(owner), shard_table(owner)
+            for page in range(1, PAGES_PER_DOCUMENT + 1):
+                words = rnd.choices(vocab, cum_weights=cum_weights, k=WORDS_PER_PAGE)
+                for term, p in DOMAIN_TERMS.items():
+                    if rnd.random() < p:
+                        words[rnd.randrange(WORDS_PER_PAGE)] = term
+                rows.setdefault(table, []).append((doc_id * PAGE_SLOTS + page, key, " ".join(words)))
+        with db.pool.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO documents (id, owner, original_name, size, sha256, storage_path, indexed_pages)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, docs)
+            for table, table_rows in rows.items():
+                conn.executemany(f"INSERT INTO {table} (rowid, owner_key, body) VALUES (?, ?, ?)", table_rows)
+        done = min(first + 500, documents) * PAGES_PER_DOCUMENT
+        print(f"\r  indexadas {done:,} páginas ({done / (time.perf_counter() - started):,.0f}/s)", end="", flush=True)
+    with db.pool.transaction() as conn:
+        for shard in range(SHARDS):
+            conn.execute(f"INSERT INTO document_text_{shard:02d} (document_text_{shard:02d}) VALUES ('optimize')")
+    print()
+
+
+def indexed_pages(db):
+    return sum(db.conn.execute(f"SELECT COUNT(*) FROM document_text_{shard:02d}").fetchone()[0]
+               for shard in range(SHARDS))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--db", help="reutiliza una base ya poblada por una corrida anterior")
+    args = parser.parse_args()
+
+    tmp = None
+    path = args.db
+    if path is None:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, "bench.db")
+    db = DatabaseManager(path)
+    db.migrate()
+    vocab = vocabulary()
+    indexed = indexed_pages(db)
+    if indexed == 0:
+        print(f"Indexando {args.pages:,} páginas de {WORDS_PER_PAGE} palabras para {args.users:,} usuarios...")
+        populate(db, args.pages, args.users, vocab)
+        indexed = indexed_pages(db)
+    print(f"{indexed:,} páginas, base de {os.path.getsize(path) / 2**20:,.0f} MB\n")
+
+    search = SearchIndex(db)
+    rnd = random.Random(3)
+    print(f"{'consulta':<15} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'resultados':>11}")
+    for name, make in QUERIES:
+        timings, hits = [], []
+        for _ in range(args.queries):
+            owner = f"user{rnd.randrange(args.users)}@empresa.com"
+            text = make(rnd, vocab)
+            start = time.perf_counter()
+            hits.append(len(search.search(owner, text)))
+            timings.append((time.perf_counter() - start) * 1000)
+        q = statistics.quantiles(timings, n=100)
+        print(f"{name:<15} {q[49]:>8.2f} {q[94]:>8.2f} {q[98]:>8.2f} {statistics.mean(hits):>11.1f}")
+
+    db.pool.close_all()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_startup.py
+"""
+Informe de tiempo de arranque estilo `python -X importtime`.
+
+Compara las importaciones que main.py hacía al inicio (TensorFlow, spaCy,
+FPDF, NumPy, pandas, Stripe, requests) con las que hace ahora, y guarda el
+informe en benchmarks/results/startup_importtime.txt.
+
+Uso: python benchmarks/bench_startup.py
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT = os.path.join(ROOT, "benchmarks", "results", "startup_importtime.txt")
+
+BEFORE = [
+    "streamlit", "pandas", "numpy", "stripe", "fpdf", "database", "payment_handler",
+    "tensorflow.keras.models", "spacy", "smtplib", "email.mime.multipart", "requests",
+]
+AFTER = [
+    "streamlit", "database", "services", "lazy_imports", "smtplib", "email.mime.multipart",
+]
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def importtime(code):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    entries = [
+        (int(m.group(2)), len(m.group(3)), m.group(4))
+        for m in LINE.finditer(proc.stderr)
+    ]
+    return entries, proc.stdout.split()
+
+
+def section(title, modules):
+    """Importa la lista en un solo proceso, como lo haría main.py."""
+    interpreter = {name for _, _, name in importtime("pass")[0]}
+    code = "\n".join(
+        f"try:\n    import {m}\nexcept ImportError:\n    print({m!r})" for m in modules
+    )
+    entries, missing = importtime(code)
+    top_level = [(cum, name) for cum, depth, name in entries
+                 if depth == 1 and name not in interpreter]
+    total = sum(cum for cum, _ in top_level)
+
+    lines = [title, "-" * len(title)]
+    for cum, name in sorted(top_level, reverse=True)[:12]:
+        lines.append(f"{cum / 1000:10.1f} ms  {name}")
+    lines.append(f"{total / 1000:10.1f} ms  TOTAL")
+    if missing:
+        lines.append(f"no instalados en este entorno: {', '.join(missing)}")
+    return lines, total
+
+
+def main():
+    before_lines, before = section("Antes: importaciones al inicio de main.py", BEFORE)
+    after_lines, after = section("Después: importaciones al inicio de main.py", AFTER)
+    lines = before_lines + [""] + after_lines + [""]
+    lines.append(f"Ahorro en arranque: {(before - after) / 1000:.1f} ms"
+                 " (sin contar los módulos no instalados)")
+    report = "\n".join(lines) + "\n"
+
+    os.makedirs(os.path.dirname(REPORT), exist_ok=True)
+    with open(REPORT, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    print(f"Informe guardado en {os.path.relpath(REPORT, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
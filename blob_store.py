@@ -0,0 +1,137 @@
+# blob_store.py
+"""
+Almacén de archivos direccionado por contenido (PDFs de facturas, recibos y
+certificados).
+
+Cada archivo se guarda una sola vez bajo el sha256 de su contenido, en
+<raíz>/ab/cd/<sha256>, comprimido con gzip cuando eso ahorra espacio. En
+SQLite solo quedan el hash y el tamaño, así las tablas siguen siendo
+chicas y las consultas no arrastran los PDFs por la caché de páginas.
+
+La raíz por defecto es la carpeta `blobs` junto a la base de datos.
+"""
+import gzip
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+
+# Solo se guarda comprimido si ahorra al menos este porcentaje
+MIN_SAVING = 0.1
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+
+    @classmethod
+    def for_database(cls, db_path):
+        return cls(os.path.join(os.path.dirname(os.path.abspath(db_path)), "blobs"))
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def _existing(self, digest):
+        """Ruta del blob y si está comprimido, o (None, None) si no existe."""
+        path = self._path(digest)
+        if os.path.exists(path + ".gz"):
+            return path + ".gz", True
+        if os.path.exists(path):
+            return path, False
+        return None, None
+
+    def put(self, data):
+        """Guarda los bytes (si no estaban ya) y devuelve (sha256, tamaño)."""
+        digest = hashlib.sha256(data).hexdigest()
+        if self._existing(digest)[0] is None:
+            compressed = gzip.compress(data, compresslevel=6, mtime=0)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                payload, path = compressed, self._path(digest) + ".gz"
+            else:
+                payload, path = data, self._path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escritura atómica: otro proceso nunca ve un archivo a medias
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        return digest, len(data)
+
+    def exists(self, digest):
+        return self._existing(digest)[0] is not None
+
+    def open(self, digest):
+        """
+        Archivo de solo lectura con el contenido original, para leerlo por partes.
+        Los blobs sin comprimir se devuelven mapeados en memoria.
+        """
+        path, compressed = self._existing(digest)
+        if path is None:
+            raise FileNotFoundError(f"Blob no encontrado: {digest}")
+        if compressed:
+            return gzip.open(path, "rb")
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return open(path, "rb")
+            return _MappedFile(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def read(self, digest):
+        with self.open(digest) as f:
+            return f.read()
+
+    def iter_chunks(self, digest, chunk_size=CHUNK_SIZE):
+        with self.open(digest) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def copy_to(self, digest, target):
+        """Copia el contenido original a un archivo abierto, sin cargarlo entero."""
+        with self.open(digest) as f:
+            shutil.copyfileobj(f, target, CHUNK_SIZE)
+
+    def delete(self, digest):
+        path, _ = self._existing(digest)
+        if path is not None:
+            os.remove(path)
+
+    def stored_size(self):
+        """Bytes que ocupan los blobs en disco."""
+        total = 0
+        for folder, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+        return total
+
+
+class _MappedFile:
+    """mmap con la interfaz de archivo que espera quien lee (read, seek, with)."""
+
+    def __init__(self, mapped):
+        self._mmap = mapped
+
+    def read(self, size=-1):
+        return self._mmap.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._mmap.seek(offset, whence)
+
+    def tell(self):
+        return self._mmap.tell()
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
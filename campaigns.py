@@ -0,0 +1,299 @@
+# campaigns.py
+"""
+Campañas de email masivo (automatización 'email_masivo').
+
+Una campaña tiene una plantilla HTML con marcadores {{ campo }} que se
+compila una sola vez, y una fuente de destinatarios: un CSV o una lista de
+la tabla campaign_contacts. Los destinatarios se leen por bloques
+(`chunk_size`), nunca todos en memoria. Cada bloque se envía con
+concurrencia acotada y un límite de envíos por segundo por dominio; al
+terminar el bloque se guardan sus entregas y el cursor en la misma
+transacción. Por eso una campaña pausada (o cuyo proceso murió) sigue
+desde el último bloque guardado: como mucho se repite el bloque en curso.
+
+El scheduler ejecuta la campaña cuando vence su tarea (ver scheduler.py).
+"""
+import csv
+import html
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mailer import build_message
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class CompiledTemplate:
+    """Plantilla partida en texto fijo y campos; render() solo concatena."""
+
+    def __init__(self, source):
+        self.source = source
+        self._parts = _PLACEHOLDER.split(source)  # [texto, campo, texto, campo, ..., texto]
+        self.fields = set(self._parts[1::2])
+
+    def render(self, values):
+        parts = self._parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = html.escape(str(values.get(parts[i], "")))
+        return "".join(parts)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que hay un token disponible."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class DomainRateLimiter:
+    """Un TokenBucket por dominio del destinatario (los proveedores limitan por separado)."""
+
+    def __init__(self, default_rate=10, rates=None):
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, address):
+        domain = address.rsplit("@", 1)[-1].lower()
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(domain, TokenBucket(self.rates.get(domain, self.default_rate)))
+        bucket.acquire()
+
+
+# --- Destinatarios ----------------------------------------------------------
+
+def _csv_rows(path):
+    """(posición, fila) del CSV con las columnas en minúsculas; la posición empieza en 1."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        for position, row in enumerate(reader, start=1):
+            yield position, row
+
+
+def _count_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def import_contacts(db, user_email, list_name, rows, chunk_size=1000):
+    """Carga contactos ({'email', 'nombre', ...}) en campaign_contacts por bloques."""
+    rows = iter(rows)
+    imported = 0
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return imported
+        with db.pool.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO campaign_contacts (user_email, list_name, email, nombre) VALUES (?, ?, ?, ?)",
+                [(user_email, list_name, r["email"].strip(), r.get("nombre")) for r in chunk],
+            )
+        imported += len(chunk)
+
+
+def _recipients(db, campaign, after, chunk_size):
+    """Bloques de (posición, destinatario) a partir de la posición `after`."""
+    if campaign["csv_path"]:
+        rows = _csv_rows(campaign["csv_path"])
+        rows = itertools.dropwhile(lambda item: item[0] <= after, rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+    else:
+        while True:
+            found = db.conn.execute("""
+                SELECT id, email, nombre FROM campaign_contacts
+                WHERE user_email=? AND list_name=? AND id>? ORDER BY id LIMIT ?
+            """, (campaign["user_email"], campaign["contact_list"], after, chunk_size)).fetchall()
+            if not found:
+                return
+            yield [(r[0], {"email": r[1], "nombre": r[2] or ""}) for r in found]
+            after = found[-1][0]
+
+
+# --- Campañas ---------------------------------------------------------------
+
+CAMPAIGN_FIELDS = ("id", "user_email", "task_id", "subject", "template", "csv_path", "contact_list",
+                   "status", "total", "sent", "failed", "cursor")
+
+
+def create_campaign(db, user_email, subject, template, csv_path=None, contact_list=None, task_id=None, schedule=None):
+    """
+    Registra la campaña. Con `schedule` crea también su tarea email_masivo en
+    la misma transacción: el scheduler nunca ve la tarea vencida sin su
+    campaña, y si algo falla no queda ninguna de las dos.
+    """
+    if bool(csv_path) == bool(contact_list):
+        raise ValueError("La campaña necesita un CSV o una lista de contactos (solo uno)")
+    CompiledTemplate(template)  # falla aquí si la plantilla no se puede usar
+    if csv_path:
+        total = _count_csv(csv_path)
+    else:
+        total = db.conn.execute(
+            "SELECT COUNT(*) FROM campaign_contacts WHERE user_email=? AND list_name=?", (user_email, contact_list)
+        ).fetchone()[0]
+    with db.pool.transaction() as conn:
+        if schedule is not None:
+            task_id = db.insert_automation_task(conn, user_email, {
+                'type': 'email_masivo', 'schedule': schedule, 'responsible': user_email,
+            })
+        cursor = conn.execute("""
+            INSERT INTO campaigns (user_email, task_id, subject, template, csv_path, contact_list, total)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_email, task_id, subject, template, csv_path, contact_list, total))
+    return cursor.lastrowid
+
+
+def get_campaign(db, campaign_id):
+    row = db.conn.execute(f"SELECT {', '.join(CAMPAIGN_FIELDS)} FROM campaigns WHERE id=?", (campaign_id,)).fetchone()
+    return dict(zip(CAMPAIGN_FIELDS, row)) if row else None
+
+
+def get_campaigns(db, user_email):
+    rows = db.conn.execute("""
+        SELECT id, subject, status, total, sent, failed, created_at FROM campaigns
+        WHERE user_email=? ORDER BY created_at DESC, id DESC
+    """, (user_email,)).fetchall()
+    return [
+        {"id": r[0], "Asunto": r[1], "Estado": r[2], "Total": r[3], "Enviados": r[4], "Fallidos": r[5],
+         "Progreso": f"{(r[4] + r[5]) * 100 // r[3]}%" if r[3] else "-", "Creada": r[6]}
+        for r in rows
+    ]
+
+
+def pause_campaign(db, campaign_id):
+    """El runner se detiene al terminar el bloque en curso."""
+    with db.pool.transaction() as conn:
+        return conn.execute(
+            "UPDATE campaigns SET status='pausada' WHERE id=? AND status IN ('pendiente', 'en_curso')", (campaign_id,)
+        ).rowcount == 1
+
+
+def resume_campaign(db, campaign_id, now=None):
+    """Vuelve a dejar la campaña pendiente y adelanta su tarea para que el scheduler la retome."""
+    with db.pool.transaction() as conn:
+        resumed = conn.execute(
+            "UPDATE campaigns SET status='pendiente' WHERE id=? AND status='pausada'", (campaign_id,)
+        ).rowcount == 1
+        if resumed:
+            conn.execute("""
+                UPDATE automation_tasks SET next_run_at=?
+                WHERE id=(SELECT task_id FROM campaigns WHERE id=?)
+            """, (int(time.time() if now is None else now), campaign_id))
+    return resumed
+
+
+class CampaignRunner:
+    def __init__(self, db, send, sender, max_workers=8, chunk_size=200, rate_limiter=None, lease=600,
+                 clock=time.time):
+        """`send(sender, [destinatario], bytes)`, p. ej. SMTPConnectionPool.send."""
+        self.db = db
+        self.send = send
+        self.sender = sender
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        self.lease = lease
+        self.clock = clock
+
+    def _claim(self, campaign_id):
+        """Solo un runner por campaña; una 'en_curso' sin latido por `lease` segundos se puede retomar."""
+        now = self.clock()
+        with self.db.pool.transaction() as conn:
+            return conn.execute("""
+                UPDATE campaigns SET status='en_curso', heartbeat_at=?, started_at=COALESCE(started_at, ?)
+                WHERE id=? AND (status='pendiente' OR (status='en_curso' AND heartbeat_at < ?))
+            """, (now, now, campaign_id, now - self.lease)).rowcount == 1
+
+    def _deliver(self, campaign, template, position, recipient):
+        address = (recipient.get("email") or "").strip()
+        if "@" not in address:
+            return position, address, "fallido", "dirección inválida"
+        try:
+            self.rate_limiter.acquire(address)
+            body = template.render(recipient)
+            message = build_message(self.sender, address, campaign["subject"], body, subtype="html")
+            self.send(self.sender, [address], message.as_bytes())
+        except Exception as e:
+            return position, address, "fallido", str(e)
+        return position, address, "enviado", None
+
+    def run(self, campaign_id, max_chunks=None):
+        """Envía la campaña (o `max_chunks` bloques) y devuelve su estado final."""
+        if not self._claim(campaign_id):
+            return get_campaign(self.db, campaign_id)["status"]
+        campaign = get_campaign(self.db, campaign_id)
+        template = CompiledTemplate(campaign["template"])
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="campana") as executor:
+            chunks = _recipients(self.db, campaign, campaign["cursor"], self.chunk_size)
+            for done, chunk in enumerate(chunks):
+                if max_chunks is not None and done >= max_chunks:
+                    with self.db.pool.transaction() as conn:
+                        conn.execute("UPDATE campaigns SET status='pendiente' WHERE id=? AND status='en_curso'", (campaign_id,))
+                    return get_campaign(self.db, campaign_id)["status"]
+                results = list(executor.map(lambda item: self._deliver(campaign, template, *item), chunk))
+                sent = sum(1 for r in results if r[2] == "enviado")
+                with self.db.pool.transaction() as conn:
+                    conn.executemany("""
+                        INSERT OR IGNORE INTO campaign_deliveries (campaign_id, position, recipient, status, error, sent_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, [(campaign_id, p, a, s, e, self.clock()) for p, a, s, e in results])
+                    status = conn.execute("""
+                        UPDATE campaigns SET cursor=?, sent=sent+?, failed=failed+?, heartbeat_at=?
+                        WHERE id=? RETURNING status
+                    """, (results[-1][0], sent, len(results) - sent, self.clock(), campaign_id)).fetchone()[0]
+                if status != "en_curso":
+                    return status  # pausada o cancelada desde la app
+        with self.db.pool.transaction() as conn:
+            conn.execute(
+                "UPDATE campaigns SET status='completada', finished_at=? WHERE id=? AND status='en_curso'",
+                (self.clock(), campaign_id)
+            )
+        return get_campaign(self.db, campaign_id)["status"]
+
+
+def run_campaign_task(task, db):
+    """Handler del scheduler para 'email_masivo': corre la campaña asociada a la tarea."""
+    from config import load_secrets
+    from mailer import SMTPConnectionPool
+
+    row = db.conn.execute(
+        "SELECT id FROM campaigns WHERE task_id=? AND status IN ('pendiente', 'en_curso') ORDER BY id LIMIT 1",
+        (task["id"],)
+    ).fetchone()
+    if row is None:
+        return "Sin campañas pendientes"
+    settings = load_secrets("smtp")
+    pool = SMTPConnectionPool.from_secrets(settings, size=4)
+    try:
+        status = CampaignRunner(db, pool.send, settings.get("user", ""), max_workers=pool.size).run(row[0])
+    finally:
+        pool.close_all()
+    progress = get_campaign(db, row[0])
+    return f"Campaña {row[0]}: {status} ({progress['sent']} enviados, {progress['failed']} fallidos de {progress['total']})"
@@ -0,0 +1,181 @@
+# compliance.py
+"""
+Motor de reglas de la Auditoría Normativa.
+
+Cada marco (GDPR, SOX, ISO27001) es una lista de términos y frases; un
+documento cumple el marco si aparecen al menos `minimo` términos distintos.
+Los términos de todos los marcos se compilan en una sola expresión regular
+(un trie de prefijos comunes) que no distingue acentos y acepta cualquier espacio o salto de línea entre
+palabras, y el documento se recorre una sola vez en minúsculas. Pasar a
+minúsculas conserva la longitud, así las posiciones de cada coincidencia
+son las del texto original.
+
+Las reglas por defecto están en DEFAULT_RULESETS; se pueden reemplazar con un
+JSON del mismo formato (compliance_rules.json junto a la app, o la ruta en
+COMPLIANCE_RULES). `version` cambia cuando cambian las reglas y sirve para
+saber si una auditoría guardada sigue vigente.
+"""
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.environ.get("COMPLIANCE_RULES", os.path.join(BASE_DIR, "compliance_rules.json"))
+# Posiciones que se devuelven por término; el conteo siempre es completo
+MAX_LOCATIONS = 20
+CONTEXT_CHARS = 60
+
+DEFAULT_RULESETS = {
+    "GDPR": {
+        "minimo": 1,
+        "terminos": ["datos personales", "consentimiento", "protección de datos", "derecho de acceso",
+                     "derecho al olvido", "portabilidad de los datos", "encargado del tratamiento",
+                     "responsable del tratamiento", "delegado de protección de datos"],
+    },
+    "SOX": {
+        "minimo": 1,
+        "terminos": ["control interno", "auditoría financiera", "estados financieros", "auditor externo",
+                     "comité de auditoría", "segregación de funciones", "certificación financiera"],
+    },
+    "ISO27001": {
+        "minimo": 1,
+        "terminos": ["seguridad de la información", "riesgos", "gestión de riesgos", "control de acceso",
+                     "continuidad del negocio", "gestión de incidentes", "declaración de aplicabilidad"],
+    },
+}
+
+
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+
+
+def _variants():
+    """Letra base -> todas las variantes con acento (en minúsculas) de Latin-1 y Latin Extendido A."""
+    variants = {}
+    for code in range(0x00C0, 0x0180):
+        char = chr(code).lower()
+        if len(char) != 1:
+            continue
+        base = _strip_accents(char)
+        if len(base) == 1 and base != char and base.isalpha():
+            variants.setdefault(base, {base}).add(char)
+    return {base: "[" + "".join(sorted(chars)) + "]" for base, chars in variants.items()}
+
+
+_VARIANTS = _variants()
+
+
+def normalize(text):
+    """
+    Minúsculas con el mismo largo que `text`, así las posiciones coinciden.
+    str.lower() solo cambia el largo de "İ"; los acentos los resuelve el patrón.
+    """
+    return text.replace("\u0130", "i").lower()
+
+
+def load_rulesets(path=RULES_PATH):
+    """Reglas del JSON si existe; si no, las de DEFAULT_RULESETS."""
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return DEFAULT_RULESETS
+
+
+def _term_key(term):
+    return " ".join(_strip_accents(term.lower()).split())
+
+
+def _term_tokens(term):
+    """Piezas del patrón del término: cualquier acentuación de cada letra y cualquier espacio entre palabras."""
+    tokens = []
+    for i, word in enumerate(_term_key(term).split()):
+        if i:
+            tokens.append(r"\s+")
+        tokens.extend(_VARIANTS.get(c, re.escape(c)) for c in word)
+    return tokens
+
+
+def _trie_pattern(node):
+    """
+    Alternativa anidada por prefijos comunes ("control interno|control de acceso"
+    comparten "control "): en cada posición del texto se prueba una rama por
+    letra inicial en vez de cada término. Con prefijo y continuación, la
+    continuación es opcional y codiciosa, así gana el término más largo.
+    """
+    branches = [token + _trie_pattern(child) for token, child in node.items() if token]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        pattern = "(?:" + pattern + ")?"
+    return pattern
+
+
+class RuleEngine:
+    def __init__(self, rulesets=None):
+        self.rulesets = rulesets if rulesets is not None else load_rulesets()
+        self.version = hashlib.sha1(json.dumps(self.rulesets, sort_keys=True).encode()).hexdigest()[:12]
+        # término normalizado -> (término como está en las reglas, marcos que lo usan)
+        self._terms = {}
+        for framework, rules in self.rulesets.items():
+            for term in rules["terminos"]:
+                key = _term_key(term)
+                self._terms.setdefault(key, (term, []))[1].append(framework)
+        trie = {}
+        for key in self._terms:
+            node = trie
+            for token in _term_tokens(key):
+                node = node.setdefault(token, {})
+            node[""] = {}
+        self._regex = re.compile(r"(?<!\w)" + _trie_pattern(trie) + r"(?!\w)")
+
+    def audit(self, text):
+        """
+        {marco: {'cumple', 'coincidencias', 'terminos': {término: veces},
+                 'ubicaciones': [{'termino', 'inicio', 'fin', 'pagina', 'contexto'}]}}
+        Las páginas se cuentan por los saltos de página (\\f) que deja la extracción de PDFs.
+        """
+        result = {
+            framework: {"cumple": False, "coincidencias": 0, "terminos": {}, "ubicaciones": []}
+            for framework in self.rulesets
+        }
+        page_breaks = [m.start() for m in re.finditer("\f", text)]
+        for match in self._regex.finditer(normalize(text)):
+            term, frameworks = self._terms[_term_key(match.group())]
+            for framework in frameworks:
+                entry = result[framework]
+                entry["coincidencias"] += 1
+                count = entry["terminos"][term] = entry["terminos"].get(term, 0) + 1
+                if count <= MAX_LOCATIONS:
+                    start, end = match.span()
+                    entry["ubicaciones"].append({
+                        "termino": term, "inicio": start, "fin": end,
+                        "pagina": bisect.bisect_right(page_breaks, start) + 1,
+                        "contexto": " ".join(text[max(0, start - CONTEXT_CHARS):end + CONTEXT_CHARS].split()),
+                    })
+        for framework, rules in self.rulesets.items():
+            entry = result[framework]
+            entry["cumple"] = len(entry["terminos"]) >= rules.get("minimo", 1)
+        return result
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Motor con las reglas configuradas, compilado una vez por proceso."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RuleEngine()
+    return _engine
+
+
+def audit_text(text):
+    return get_engine().audit(text)
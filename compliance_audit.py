@@ -0,0 +1,195 @@
+# compliance_audit.py
+"""
+Auditoría normativa de todos los documentos de un usuario.
+
+Recorre el catálogo (document_catalog.py) y audita con el motor de reglas
+(compliance.py) los documentos que todavía no tienen resultado para su
+contenido (sha256) y la versión actual de las reglas. Lo ya auditado sale de
+`compliance_results`; volver a correr la auditoría solo procesa lo nuevo o
+lo que cambió, y un cambio en las reglas invalida todo de una vez.
+
+La extracción de texto y el análisis se hacen en un pool de procesos, por
+bloques; cada worker usa la caché de extracción compartida. El informe
+agregado por marco se exporta como CSV o JSON.
+"""
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compliance import RuleEngine, load_rulesets
+from extraction_cache import ExtractionCache
+from text_extraction import detect_kind, extract_text
+
+# Los tipos que se auditan; las imágenes quedan fuera salvo que se pida OCR
+AUDITABLE_KINDS = ("pdf", "docx", "txt")
+
+# --- Workers -------------------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker(rulesets, cache_path):
+    _worker["engine"] = RuleEngine(rulesets)
+    _worker["cache"] = ExtractionCache(cache_path) if cache_path else None
+
+
+def _summary(result):
+    """Lo que se guarda por documento: sin las posiciones, que solo interesan al ver un documento."""
+    return {
+        framework: {"cumple": r["cumple"], "coincidencias": r["coincidencias"], "terminos": r["terminos"]}
+        for framework, r in result.items()
+    }
+
+
+def _audit_file(job):
+    document_id, path, kind = job
+    try:
+        with open(path, "rb") as f:
+            text = extract_text(f.read(), kind, _worker["cache"])
+        return document_id, _summary(_worker["engine"].audit(text)), None
+    except Exception as e:
+        return document_id, None, f"{type(e).__name__}: {e}"
+
+
+class CorpusAudit:
+    def __init__(self, db, catalog, rulesets=None, workers=None, batch_size=32, kinds=AUDITABLE_KINDS,
+                 cache_path=None):
+        """`workers=0` audita en el mismo proceso. `cache_path` es la caché de extracción a compartir."""
+        self.db = db
+        self.catalog = catalog
+        self.rulesets = rulesets if rulesets is not None else load_rulesets()
+        self.engine = RuleEngine(self.rulesets)
+        self.workers = min(os.cpu_count() or 1, 4) if workers is None else workers
+        self.batch_size = batch_size
+        self.kinds = kinds
+        self.cache_path = cache_path
+
+    @property
+    def version(self):
+        return self.engine.version
+
+    def _documents(self, owner):
+        last_id = 0
+        while True:
+            rows = self.db.conn.execute("""
+                SELECT d.id, d.original_name, d.sha256, d.storage_path, d.mime_type, r.result
+                FROM documents d
+                LEFT JOIN compliance_results r ON r.sha256 = d.sha256 AND r.ruleset_version = ?
+                WHERE d.owner = ? AND d.id > ? ORDER BY d.id LIMIT 500
+            """, (self.version, owner, last_id)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def _executor(self):
+        if not self.workers:
+            _init_worker(self.rulesets, self.cache_path)
+            return None
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method),
+                                   initializer=_init_worker, initargs=(self.rulesets, self.cache_path))
+
+    def _store(self, results):
+        now = time.time()
+        with self.db.pool.transaction() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO compliance_results (sha256, ruleset_version, result, audited_at)
+                VALUES (?, ?, ?, ?)
+            """, [(sha256, self.version, json.dumps(result, ensure_ascii=False), now) for sha256, result in results])
+
+    def run(self, owner, progress=None):
+        """
+        Audita los documentos del usuario y devuelve el informe:
+        {'documentos': [...], 'marcos': {...}, 'auditados', 'reutilizados', 'omitidos', 'errores', 'segundos'}.
+        `progress(revisados)` se llama después de cada bloque.
+        """
+        started = time.perf_counter()
+        report = {"version_reglas": self.version, "documentos": [], "auditados": 0, "reutilizados": 0,
+                  "omitidos": 0, "errores": []}
+        executor = self._executor()
+        rows = self._documents(owner)
+        seen = 0
+        try:
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+                jobs, names = [], {}
+                for doc_id, name, sha256, storage_path, mime_type, cached in batch:
+                    names[doc_id] = (name, sha256)
+                    if cached is not None:
+                        report["reutilizados"] += 1
+                        report["documentos"].append({"id": doc_id, "nombre": name, "resultado": json.loads(cached)})
+                        continue
+                    kind = detect_kind(mime_type, name)
+                    if kind not in self.kinds:
+                        report["omitidos"] += 1
+                        continue
+                    jobs.append((doc_id, os.path.join(self.catalog.root, storage_path), kind))
+                results = map(_audit_file, jobs) if executor is None else executor.map(_audit_file, jobs)
+                fresh = []
+                for doc_id, result, error in results:
+                    name, sha256 = names[doc_id]
+                    if error:
+                        report["errores"].append({"id": doc_id, "nombre": name, "error": error})
+                        continue
+                    fresh.append((sha256, result))
+                    report["auditados"] += 1
+                    report["documentos"].append({"id": doc_id, "nombre": name, "resultado": result})
+                if fresh:
+                    self._store(fresh)
+                seen += len(batch)
+                if progress:
+                    progress(seen)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        report["marcos"] = aggregate(report["documentos"], self.rulesets)
+        report["segundos"] = round(time.perf_counter() - started, 3)
+        return report
+
+
+def aggregate(documents, rulesets):
+    """Por marco: documentos auditados, cuántos cumplen, coincidencias y los términos más frecuentes."""
+    frameworks = {}
+    for framework in rulesets:
+        terms, total, passed = {}, 0, 0
+        for doc in documents:
+            r = doc["resultado"].get(framework)
+            if r is None:
+                continue
+            total += 1
+            passed += r["cumple"]
+            for term, count in r["terminos"].items():
+                terms[term] = terms.get(term, 0) + count
+        frameworks[framework] = {
+            "documentos": total,
+            "cumplen": passed,
+            "no_cumplen": total - passed,
+            "porcentaje": round(100 * passed / total, 1) if total else 0.0,
+            "coincidencias": sum(terms.values()),
+            "terminos_frecuentes": dict(sorted(terms.items(), key=lambda t: -t[1])[:10]),
+        }
+    return frameworks
+
+
+def report_to_csv(report):
+    """Una fila por documento y marco."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["documento_id", "documento", "marco", "cumple", "coincidencias", "terminos"])
+    for doc in report["documentos"]:
+        for framework, r in doc["resultado"].items():
+            writer.writerow([doc["id"], doc["nombre"], framework, "sí" if r["cumple"] else "no", r["coincidencias"],
+                             "; ".join(f"{t} ({n})" for t, n in r["terminos"].items())])
+    return out.getvalue()
+
+
+def report_to_json(report):
+    return json.dumps(report, ensure_ascii=False, indent=2)
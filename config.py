@@ -1 +1,17 @@
+import os
 
+# Zona horaria en la que se interpretan los horarios de las automatizaciones
+TIMEZONE = os.getenv("ENTERPRISEFLOW_TZ") or os.getenv("TZ") or "UTC"
+
+# Los procesos fuera de Streamlit (scheduler.py, mailer.py) leen los mismos secretos
+SECRETS_PATH = os.getenv("ENTERPRISEFLOW_SECRETS") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+
+
+def load_secrets(section, path=None):
+    """Devuelve una sección de secrets.toml ({} si no existe) sin depender de streamlit."""
+    import tomllib
+    try:
+        with open(path or SECRETS_PATH, "rb") as f:
+            return tomllib.load(f).get(section, {})
+    except FileNotFoundError:
+        return {}
@@ -0,0 +1,196 @@
+# document_catalog.py
+"""
+Catálogo de los documentos subidos en el Gestor de Documentos.
+
+Cada archivo tiene una fila en `documents` (dueño, nombre original, tamaño,
+sha256 y ruta) y se guarda en una carpeta propia del usuario repartida en
+subcarpetas: uploaded_docs/<ab>/<hash del usuario>/<sha256>_<nombre>. Listar
+los documentos de un usuario es una consulta paginada por índice; ya no se
+recorre la carpeta de todos ni se leen los archivos para pintar la lista.
+
+Subir el mismo contenido dos veces (por ejemplo, en cada rerun de Streamlit
+con el archivo todavía en el uploader) devuelve el documento existente. Las
+copias repetidas que dejó la versión anterior quedan en `document_copies`
+(migración 10) hasta que se corre remove_duplicate_copies().
+"""
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+
+from search_index import delete_pages
+
+CHUNK_SIZE = 64 * 1024
+_UNSAFE = re.compile(r"[^\w.\- ]+")
+
+
+def safe_name(name):
+    """Nombre de archivo sin rutas ni caracteres raros, para guardarlo en disco."""
+    name = _UNSAFE.sub("_", os.path.basename(str(name or "")).strip()).strip(". ")
+    return name[:120] or "documento"
+
+
+class DocumentCatalog:
+    def __init__(self, db, root):
+        self.db = db
+        self.root = root
+
+    @classmethod
+    def for_database(cls, db):
+        return cls(db, os.path.join(os.path.dirname(os.path.abspath(db.db_path)), "uploaded_docs"))
+
+    def user_dir(self, owner):
+        digest = hashlib.sha1(owner.strip().lower().encode()).hexdigest()[:16]
+        return os.path.join(digest[:2], digest)
+
+    def path(self, document):
+        return os.path.join(self.root, document["ruta"])
+
+    def _row(self, row):
+        if row is None:
+            return None
+        return {"id": row[0], "dueño": row[1], "nombre": row[2], "tamaño": row[3], "sha256": row[4],
+                "ruta": row[5], "tipo": row[6], "subido": row[7]}
+
+    _COLUMNS = "id, owner, original_name, size, sha256, storage_path, mime_type, uploaded_at"
+
+    def add(self, owner, name, source, mime_type=None):
+        """
+        Guarda el archivo (bytes o un archivo abierto, p. ej. el de st.file_uploader)
+        y devuelve (documento, nuevo). Si el usuario ya tenía ese contenido no se escribe nada.
+        """
+        directory = os.path.join(self.root, self.user_dir(owner))
+        os.makedirs(directory, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(source, (bytes, bytearray, memoryview)):
+                    chunks = [bytes(source)]
+                else:
+                    if hasattr(source, "seek"):
+                        source.seek(0)
+                    chunks = iter(lambda: source.read(CHUNK_SIZE), b"")
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            existing = self.find(owner, sha256)
+            if existing is not None:
+                return existing, False
+            relative = os.path.join(self.user_dir(owner), f"{sha256[:16]}_{safe_name(name)}")
+            # Escritura atómica: la fila nunca apunta a un archivo a medias
+            os.replace(tmp, os.path.join(self.root, relative))
+            try:
+                with self.db.pool.transaction() as conn:
+                    conn.execute("""
+                        INSERT INTO documents (owner, original_name, size, sha256, storage_path, mime_type)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (owner, os.path.basename(str(name)), size, sha256, relative, mime_type))
+            except sqlite3.IntegrityError:
+                # Otra sesión lo subió a la vez: vale su fila, y si la guardó con otro nombre
+                # el archivo que acabamos de mover no lo referencia nadie
+                existing = self.find(owner, sha256)
+                if existing["ruta"] != relative:
+                    os.remove(os.path.join(self.root, relative))
+                return existing, False
+            return self.find(owner, sha256), True
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def find(self, owner, sha256):
+        return self._row(self.db.conn.execute(
+            f"SELECT {self._COLUMNS} FROM documents WHERE owner=? AND sha256=?", (owner, sha256)
+        ).fetchone())
+
+    def get(self, owner, document_id):
+        """El documento si existe y es del usuario; None en otro caso."""
+        return self._row(self.db.conn.execute(
+            f"SELECT {self._COLUMNS} FROM documents WHERE owner=? AND id=?", (owner, document_id)
+        ).fetchone())
+
+    def count(self, owner):
+        return self.db.conn.execute("SELECT COUNT(*) FROM documents WHERE owner=?", (owner,)).fetchone()[0]
+
+    def list(self, owner, page=1, per_page=20):
+        """Página `page` (desde 1) de los documentos del usuario, los más recientes primero."""
+        rows = self.db.conn.execute(f"""
+            SELECT {self._COLUMNS} FROM documents WHERE owner=?
+            ORDER BY uploaded_at DESC, id DESC LIMIT ? OFFSET ?
+        """, (owner, per_page, (max(page, 1) - 1) * per_page)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def open(self, owner, document_id):
+        """Archivo abierto para leer por partes, o None si no es del usuario o ya no está en disco."""
+        document = self.get(owner, document_id)
+        if document is None or not os.path.exists(self.path(document)):
+            return None
+        return open(self.path(document), "rb")
+
+    def read(self, owner, document_id):
+        f = self.open(owner, document_id)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def copy_to(self, owner, document_id, target):
+        f = self.open(owner, document_id)
+        if f is None:
+            return False
+        with f:
+            shutil.copyfileobj(f, target, CHUNK_SIZE)
+        return True
+
+    def delete(self, owner, document_id):
+        document = self.get(owner, document_id)
+        if document is None:
+            return False
+        with self.db.pool.transaction() as conn:
+            copies = [r[0] for r in conn.execute(
+                "SELECT storage_path FROM document_copies WHERE document_id=? AND storage_path IS NOT NULL",
+                (document_id,))]
+            delete_pages(conn, document_id, owner)
+            conn.execute("DELETE FROM document_copies WHERE document_id=?", (document_id,))
+            conn.execute("DELETE FROM documents WHERE id=?", (document_id,))
+        for relative in [document["ruta"], *copies]:
+            path = os.path.join(self.root, relative)
+            if os.path.exists(path):
+                os.remove(path)
+        return True
+
+    def remove_duplicate_copies(self):
+        """
+        Mantenimiento: borra los archivos repetidos que registró la migración 10.
+        Solo se borra una copia si todavía tiene el mismo contenido que el
+        documento y el archivo del documento sigue en disco; el nombre original
+        de la copia queda en `document_copies`. Devuelve cuántos archivos borró.
+        """
+        rows = self.db.conn.execute("""
+            SELECT c.id, c.storage_path, d.sha256, d.storage_path FROM document_copies c
+            JOIN documents d ON d.id = c.document_id
+            WHERE c.storage_path IS NOT NULL
+        """).fetchall()
+        removed = 0
+        for copy_id, relative, sha256, original in rows:
+            path = os.path.join(self.root, relative)
+            if os.path.exists(path):
+                if not os.path.exists(os.path.join(self.root, original)) or _sha256(path) != sha256:
+                    continue
+                os.remove(path)
+                removed += 1
+            with self.db.pool.transaction() as conn:
+                conn.execute("UPDATE document_copies SET storage_path = NULL WHERE id=?", (copy_id,))
+        return removed
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
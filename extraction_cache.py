@@ -0,0 +1,133 @@
+# extraction_cache.py
+"""
+Caché persistente del texto extraído de documentos (PDF, Word, OCR).
+
+La clave es el sha256 del archivo más el tipo y la versión del extractor
+(ver text_extraction.py): el mismo archivo subido por otro usuario, o en
+otra sección, reutiliza el texto; si cambia el extractor la entrada vieja
+simplemente deja de usarse y la expulsa el LRU.
+
+Vive en su propio archivo SQLite (extraction_cache.db junto a la base) con
+el texto comprimido. Cuando el total supera `max_bytes` se borran las
+entradas usadas hace más tiempo. Delante hay una copia en memoria, también
+acotada por tamaño, para los documentos que se releen en cada rerun.
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from database import get_pool
+
+# No se reescribe last_access en cada lectura: basta con saber cuáles se usan
+TOUCH_INTERVAL = 60
+
+
+class ExtractionCache:
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, memory_bytes=32 * 1024 * 1024, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.clock = clock
+        self.pool = get_pool(path)
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY,
+                    text BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_access ON extractions(last_access)")
+
+    @classmethod
+    def for_database(cls, db_path, **kwargs):
+        return cls(os.path.join(os.path.dirname(os.path.abspath(db_path)), "extraction_cache.db"), **kwargs)
+
+    @staticmethod
+    def key(digest, kind, version):
+        return f"{digest}:{kind}:{version}"
+
+    def _remember(self, key, text):
+        size = len(text)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = text
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                self._memory_size -= len(old)
+
+    def get(self, key):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                return text
+        row = self.pool.connection().execute(
+            "SELECT text, last_access FROM extractions WHERE key=?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        text = zlib.decompress(row[0]).decode("utf-8")
+        now = self.clock()
+        if now - row[1] > TOUCH_INTERVAL:
+            with self.pool.transaction() as conn:
+                conn.execute("UPDATE extractions SET last_access=?, hits=hits+1 WHERE key=?", (now, key))
+        self._remember(key, text)
+        return text
+
+    def put(self, key, text):
+        data = zlib.compress(text.encode("utf-8"), 6)
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), self.clock())
+            )
+        self._remember(key, text)
+        self.evict()
+
+    def evict(self):
+        """Borra las entradas menos usadas hasta quedar en el 90 % de max_bytes."""
+        conn = self.pool.connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        target = total - int(self.max_bytes * 0.9)
+        victims, freed = [], 0
+        for key, size in conn.execute("SELECT key, size FROM extractions ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        with self.pool.transaction() as conn:
+            conn.executemany("DELETE FROM extractions WHERE key=?", victims)
+        with self._lock:
+            for (key,) in victims:
+                text = self._memory.pop(key, None)
+                if text is not None:
+                    self._memory_size -= len(text)
+        return len(victims)
+
+    def get_or_extract(self, key, extract):
+        text = self.get(key)
+        if text is None:
+            text = extract()
+            self.put(key, text)
+        return text
+
+    def stats(self):
+        entries, size = self.pool.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()
+        return {"entradas": entries, "bytes": size, "en_memoria": len(self._memory)}
@@ -0,0 +1,67 @@
+# lazy_imports.py
+"""
+Dependencias pesadas que se importan recién cuando se usan.
+
+`from lazy_imports import np` no carga numpy: la importación real ocurre en el
+primer acceso a un atributo (np.array, ...). Así un worker de Streamlit arranca
+sin pagar NumPy, pandas, PDF u OCR hasta que el usuario abre la sección
+que los necesita.
+"""
+import importlib
+import threading
+import types
+
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name, install_hint=None):
+        super().__init__(name)
+        self.__dict__["_lazy_hint"] = install_hint or f"pip install {name.split('.')[0]}"
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    try:
+                        module = importlib.import_module(self.__name__)
+                    except ImportError as e:
+                        raise ImportError(f"{e}. Instálalo con: {self._lazy_hint}") from e
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # Los accesos siguientes ya no pasan por __getattr__
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self):
+        return self.__dict__["_lazy_module"] is not None
+
+
+# Datos
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# PDF y documentos
+fpdf = LazyModule("fpdf", "pip install fpdf2")
+PyPDF2 = LazyModule("PyPDF2")
+docx = LazyModule("docx", "pip install python-docx")
+
+# OCR
+pytesseract = LazyModule("pytesseract", "pip install pytesseract pillow")
+PIL_Image = LazyModule("PIL.Image", "pip install pillow")
+
+LAZY_MODULES = (np, pd, fpdf, PyPDF2, docx, pytesseract, PIL_Image)
+
+def loaded_modules():
+    """Nombres de las dependencias pesadas que ya se importaron en este proceso."""
+    return [m.__name__ for m in LAZY_MODULES if m.is_loaded]
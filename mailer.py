@@ -0,0 +1,311 @@
+# mailer.py
+"""
+Envío de correos a través de una bandeja de salida (email_outbox).
+
+La app solo encola: enqueue_email() serializa el mensaje y hace un INSERT,
+sin tocar la red. El proceso `python mailer.py` (OutboxWorker) reclama lotes
+de la tabla, los envía por conexiones SMTP ya autenticadas que se reutilizan
+(SMTPConnectionPool) y guarda el resultado de cada correo. Los fallos
+temporales se reintentan con espera exponencial; los permanentes (5xx,
+destinatario rechazado) quedan como 'fallido' sin reintentar.
+
+Uso: python mailer.py [ruta.db]
+"""
+import queue
+import signal
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from config import load_secrets
+
+
+def build_message(sender, recipient, subject, body, attachments=(), subtype="plain"):
+    """Mensaje MIME con adjuntos [(nombre, bytes)], como lo armaba cada pantalla."""
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, subtype))
+    for filename, data in attachments:
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(data)
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition", f'attachment; filename="{filename}"')
+        msg.attach(part)
+    return msg
+
+
+OUTBOX_INSERT = """
+    INSERT INTO email_outbox (user_email, sender, recipient, subject, message, kind, reference, next_attempt_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def default_sender():
+    """Remitente configurado en secrets.toml ([smtp] user); lee el archivo en cada llamada."""
+    return load_secrets("smtp").get("user", "")
+
+
+def outbox_row(recipient, subject, body, attachments=(), sender=None, user_email=None,
+               kind=None, reference=None, now=None):
+    """
+    Parámetros de OUTBOX_INSERT, para encolar dentro de una transacción propia (executemany).
+    Quien arma muchas filas resuelve default_sender() una vez y lo pasa en `sender`.
+    """
+    sender = default_sender() if sender is None else sender
+    msg = build_message(sender, recipient, subject, body, attachments)
+    return (user_email, sender, recipient, subject, msg.as_bytes(), kind, reference, time.time() if now is None else now)
+
+
+def enqueue_email(db, recipient, subject, body, attachments=(), sender=None, user_email=None,
+                  kind=None, reference=None, now=None):
+    """
+    Encola un correo y devuelve su id. No abre conexiones: el envío lo hace el worker.
+    `kind` y `reference` (p. ej. 'factura', número de factura) permiten actualizar
+    el registro de origen cuando se entrega (ver DELIVERY_HOOKS).
+    """
+    row = outbox_row(recipient, subject, body, attachments, sender, user_email, kind, reference, now)
+    with db.pool.transaction() as conn:
+        cursor = conn.execute(OUTBOX_INSERT, row)
+    return cursor.lastrowid
+
+
+def get_outbox_status(db, email_id):
+    row = db.conn.execute(
+        "SELECT status, attempts, last_error, sent_at FROM email_outbox WHERE id=?", (email_id,)
+    ).fetchone()
+    return dict(zip(("status", "attempts", "last_error", "sent_at"), row)) if row else None
+
+
+class SMTPConnectionPool:
+    """
+    Conexiones SMTP autenticadas que se reutilizan entre envíos. Antes de
+    reutilizar una conexión que estuvo ociosa se comprueba con NOOP; las que
+    fallan se descartan y se abre otra.
+    """
+
+    def __init__(self, server, port, user=None, password=None, starttls=True, size=2,
+                 max_idle=60, max_messages=100, timeout=30):
+        self.server = server
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_secrets(cls, settings=None, **kwargs):
+        settings = settings if settings is not None else load_secrets("smtp")
+        return cls(settings["server"], settings.get("port", 587), settings.get("user"), settings.get("password"),
+                   starttls=settings.get("starttls", True), **kwargs)
+
+    def _open(self):
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return smtp
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _checkout(self):
+        while True:
+            try:
+                smtp, last_used, sent = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open(), 0
+            if time.monotonic() - last_used < self.max_idle:
+                try:
+                    if smtp.noop()[0] == 250:
+                        return smtp, sent
+                except smtplib.SMTPException:
+                    pass
+            self._close(smtp)
+
+    @contextmanager
+    def connection(self):
+        """Presta una conexión; si el envío lanza un error de conexión, no vuelve al pool."""
+        self._slots.acquire()
+        try:
+            smtp, sent = self._checkout()
+            healthy = False
+            try:
+                yield smtp
+                healthy = True
+            except (smtplib.SMTPServerDisconnected, OSError):
+                raise
+            except smtplib.SMTPException:
+                healthy = True  # error del mensaje, la sesión sigue sirviendo
+                raise
+            finally:
+                sent += 1
+                if healthy and sent < self.max_messages:
+                    try:
+                        smtp.rset()
+                        self._idle.put((smtp, time.monotonic(), sent))
+                    except (smtplib.SMTPException, OSError):
+                        self._close(smtp)
+                else:
+                    self._close(smtp)
+        finally:
+            self._slots.release()
+
+    def send(self, sender, recipients, message_bytes):
+        with self.connection() as smtp:
+            return smtp.sendmail(sender, recipients, message_bytes)
+
+    def close_all(self):
+        while True:
+            try:
+                smtp, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(smtp)
+
+
+def _invoice_sent(db, email):
+    with db.pool.transaction() as conn:
+        conn.execute(
+            "UPDATE invoices SET status='enviada', sent_at=CURRENT_TIMESTAMP WHERE invoice_number=?", (email["reference"],)
+        )
+        conn.execute("""
+            INSERT INTO invoice_logs (invoice_id, user_email, action)
+            SELECT id, ?, 'enviada por email' FROM invoices WHERE invoice_number=?
+        """, (email["user_email"], email["reference"]))
+
+
+# Qué hacer con el registro de origen cuando un correo se entrega
+DELIVERY_HOOKS = {
+    "factura": _invoice_sent,
+}
+
+
+def _is_permanent(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and 500 <= code < 600
+
+
+class OutboxWorker:
+    def __init__(self, db, smtp_pool, batch_size=50, poll_interval=2, max_attempts=6, backoff=30,
+                 max_backoff=3600, lease=300, clock=time.time):
+        self.db = db
+        self.smtp = smtp_pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.clock = clock
+        self.hooks = dict(DELIVERY_HOOKS)
+        self._executor = ThreadPoolExecutor(max_workers=smtp_pool.size, thread_name_prefix="correo")
+        self._stop = threading.Event()
+
+    def claim(self, now):
+        """
+        Reclama un lote de correos vencidos en una sola sentencia. Los que quedaron
+        'enviando' más de `lease` segundos (worker caído) vuelven a estar disponibles.
+        """
+        with self.db.pool.transaction() as conn:
+            rows = conn.execute("""
+                UPDATE email_outbox SET status='enviando', claimed_at=?, attempts=attempts+1
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE (status='pendiente' AND next_attempt_at <= ?) OR (status='enviando' AND claimed_at < ?)
+                    ORDER BY next_attempt_at LIMIT ?
+                )
+                RETURNING id, user_email, sender, recipient, message, kind, reference, attempts
+            """, (now, now, now - self.lease, self.batch_size)).fetchall()
+        return [dict(zip(("id", "user_email", "sender", "recipient", "message", "kind", "reference", "attempts"), r))
+                for r in rows]
+
+    def _deliver(self, email):
+        try:
+            self.smtp.send(email["sender"], [email["recipient"]], email["message"])
+        except (smtplib.SMTPException, OSError) as e:
+            return email, e
+        return email, None
+
+    def _record(self, email, error, now):
+        if error is None:
+            with self.db.pool.transaction() as conn:
+                conn.execute(
+                    "UPDATE email_outbox SET status='enviado', sent_at=?, last_error=NULL WHERE id=?", (now, email["id"])
+                )
+            hook = self.hooks.get(email["kind"])
+            if hook:
+                hook(self.db, email)
+            return "enviado"
+        if _is_permanent(error) or email["attempts"] >= self.max_attempts:
+            status, next_attempt = "fallido", None
+        else:
+            status = "pendiente"
+            next_attempt = now + min(self.max_backoff, self.backoff * 2 ** (email["attempts"] - 1))
+        with self.db.pool.transaction() as conn:
+            conn.execute(
+                "UPDATE email_outbox SET status=?, next_attempt_at=?, last_error=? WHERE id=?",
+                (status, next_attempt, str(error), email["id"])
+            )
+        return status
+
+    def deliver_once(self, now=None):
+        """Reclama un lote y lo envía por las conexiones del pool. Devuelve {estado: cantidad}."""
+        now = self.clock() if now is None else now
+        batch = self.claim(now)
+        summary = {}
+        for email, error in self._executor.map(self._deliver, batch):
+            status = self._record(email, error, now)
+            summary[status] = summary.get(status, 0) + 1
+        return summary
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            summary = self.deliver_once()
+            if sum(summary.values()) < self.batch_size:
+                self._stop.wait(self.poll_interval)
+        self._executor.shutdown(wait=True)
+        self.smtp.close_all()
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    from database import DatabaseManager
+
+    db = DatabaseManager(sys.argv[1] if len(sys.argv) > 1 else "enterprise_flow.db")
+    db.migrate()
+    worker = OutboxWorker(db, SMTPConnectionPool.from_secrets())
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    print("Worker de correo de EnterpriseFlow en ejecución")
+    worker.run_forever()
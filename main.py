@@ -1,1391 +1,1370 @@
-import streamlit as st
-import pandas as pd
-import sqlite3
-import hashlib
-import uuid
-import numpy as np
-import datetime
-import os
-import stripe
-from fpdf import FPDF  # Importación corregida aquí
-from database import DatabaseManager
-from pathlib import Path
-from payment_handler import PaymentHandler
-from tensorflow.keras.models import load_model
-import spacy
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-import time
-import requests
-
-# Manejo de dependencias opcionales
-try:
-    import spacy
-    from database import DatabaseManager
-    from payment_handler import PaymentHandler
-    from tensorflow.keras.models import load_model
-except ImportError as e:
-    st.error(f"Error de dependencias: {str(e)}")
-    st.stop()
-
-# Configuración inicial
-st.set_page_config(
-    page_title="EnterpriseFlow",
-    page_icon="🏢",
-    layout="wide"
-)
-
-class EnterpriseFlowApp:
-    def __init__(self):
-        try:
-            self.nlp = spacy.load("es_core_news_sm")
-        except Exception as e:
-            st.error(f"Error cargando modelos de NLP: {str(e)}")
-            st.info("Ejecuta: python -m spacy download es_core_news_sm")
-            st.stop()
-        
-        self.db = DatabaseManager()
-        self.payment = PaymentHandler()
-        
-        if 'logged_in' not in st.session_state:
-            st.session_state.logged_in = False
-        if 'current_user' not in st.session_state:
-            st.session_state.current_user = None
-            
-        self._setup_ui()
-
-    def _setup_ui(self):
-        st.sidebar.image("https://via.placeholder.com/200x50.png?text=EnterpriseFlow", width=200)
-        if not st.session_state.logged_in:
-            self._show_login()
-        else:
-            self._rewards_header()
-            self._show_main_interface()
-
-    def _rewards_header(self):
-        user = st.session_state.current_user
-
-        # Ejemplo: estos datos deberían venir de tu base de datos o tu lógica real de avance
-        # Simulación para el ejemplo (reemplaza los valores aquí por tus consultas reales):
-        tareas_completadas = self.db.get_completed_tasks_count(user) if hasattr(self.db, "get_completed_tasks_count") else 12
-        logros = self.db.get_user_achievements(user) if hasattr(self.db, "get_user_achievements") else ["Inicio de sesión diario", "Primer tarea completada"]
-        dias_constancia = self.db.get_user_streak_days(user) if hasattr(self.db, "get_user_streak_days") else 7
-
-        # Lógica de puntos y recompensas automática:
-        puntos = tareas_completadas * 100 + len(logros) * 250 + dias_constancia * 10
-        nivel = max(1, puntos // 500 + 1)
-        # Insignias: 1 por cada 5 tareas completadas + 1 por cada 1000 puntos + 1 por cada 7 días de constancia
-        insignias = (tareas_completadas // 5) + (puntos // 1000) + (dias_constancia // 7)
-
-        st.markdown(
-            f"""
-            <div style="
-                background-color:#f7f7fa;
-                border-radius:8px;
-                padding:0.2rem 1rem 0.1rem 1rem;
-                margin-bottom:10px;
-                margin-top:0px;
-                box-shadow:0 1px 2px rgba(0,0,0,0.04);
-                border:1px solid #ededed;
-                ">
-                <div style="display:flex;align-items:center;gap:10px;">
-                    <span style="font-size:1.35rem;margin-right:6px;">🎮</span>
-                    <b style="font-size:1.04rem;">Sistema de Recompensas</b>
-                    <span style="flex:1;"></span>
-                    <span style="font-size:0.97rem;display:flex;align-items:center;gap:2px;">
-                        🥇
-                        <span style="margin-left:2px;margin-right:10px;"><b>{puntos:,}</b></span>
-                        🌟
-                        <span style="margin-left:2px;margin-right:10px;"><b>{nivel}</b></span>
-                        🏆
-                        <span style="margin-left:2px;"><b>{insignias}</b></span>
-                    </span>
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-
-    def update_user_rewards(user_email, puntos_delta=0, tareas_completadas=0, dias_constancia=0, insignias_delta=0):
-        conn = sqlite3.connect("enterprise_flow.db")
-        c = conn.cursor()
-        c.execute("SELECT puntos, nivel, insignias, tareas_completadas, dias_constancia FROM user_rewards WHERE user_email=?", (user_email,))
-        row = c.fetchone()
-        if row:
-            puntos, nivel, insignias, tareas, dias = row
-            puntos += puntos_delta
-            tareas += tareas_completadas
-            dias += dias_constancia
-            nivel = max(1, puntos // 500 + 1)
-            insignias += insignias_delta
-            c.execute("""
-                UPDATE user_rewards
-                SET puntos=?, nivel=?, insignias=?, tareas_completadas=?, dias_constancia=?, updated_at=CURRENT_TIMESTAMP
-                WHERE user_email=?
-            """, (puntos, nivel, insignias, tareas, dias, user_email))
-        else:
-            c.execute("""
-                INSERT INTO user_rewards (user_email, puntos, nivel, insignias, tareas_completadas, dias_constancia)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (user_email, puntos_delta, 1, insignias_delta, tareas_completadas, dias_constancia))
-        conn.commit()
-        conn.close()
-    
-    def _show_login(self):
-        with st.sidebar:
-            st.header("Bienvenido a EnterpriseFlow")
-            tab1, tab2 = st.tabs(["Iniciar Sesión", "Registrarse"])
-
-            with tab1:
-                email_login = st.text_input("Correo electrónico").strip().lower()
-                password_login = st.text_input("Contraseña", type="password")
-                if st.button("Ingresar"):
-                    if self.db.verify_user(email_login, password_login):
-                        st.session_state.logged_in = True
-                        st.session_state.current_user = email_login
-                        st.rerun()
-                    else:
-                        st.error("Credenciales incorrectas")
-
-            with tab2:
-                email_register = st.text_input("Correo para registro").strip().lower()  # Corrected line
-                password_register = st.text_input("Contraseña nueva", type="password")
-                if st.button("Crear Cuenta"):
-                    try:
-                        self.db.create_user(email_register, password_register)
-                        st.success("¡Cuenta creada exitosamente!")
-                    except sqlite3.IntegrityError:
-                        st.error("Este correo ya está registrado")
-                    
-    def _show_main_interface(self):
-        menu = st.sidebar.radio(
-            "Menú Principal",
-            ["🏠 Inicio", "📁 Documentos", "🤖 Automatización", "😌 Bienestar", "🎓 Aprendizaje", "🔒 Feedback Anónimo", "⚖️ Cumplimiento", "💳 Suscripción"]
-        )
-        
-        if menu == "🏠 Inicio":
-            self._show_dashboard()
-        elif menu == "📁 Documentos":
-            self._show_documents()
-        elif menu == "🤖 Automatización":
-            self._show_automation()
-        elif menu == "😌 Bienestar":
-            self._show_wellness()
-        elif menu == "🎓 Aprendizaje":
-            self._learning_portal()
-        elif menu == "🔒 Feedback Anónimo":
-            self._show_feedback_system()
-        elif menu == "⚖️ Cumplimiento":
-            self._show_compliance()
-        elif menu == "💳 Suscripción":
-            self._show_payment()
-
-    # app/sections/automation.py
-    def show_automation_preview(config):
-        with st.expander("Vista Previa del Flujo"):
-            st.graphviz_chart(f"""
-            digraph {{
-               {config['trigger']} -> {config['action']}
-               {config['action']} -> {config['notification']}
-            }}
-            """)
-            
-    def _show_dashboard(self):
-        st.title("Panel de Control")
-        st.write(f"Bienvenido: [{st.session_state.current_user}](mailto:{st.session_state.current_user})")
-
-        # --- SECCIÓN TUTORIALES ---
-        st.markdown("---")
-        st.header("📖 Tutoriales: Introducción a como usar EnterpriseFlow")
-         
-        with st.expander("🤖 Automatización de Tareas"):
-            st.markdown("""
-            1. Ve al menú lateral y selecciona **Automatización**.
-            2. Completa los campos para crear una factura, programar tareas o configurar envíos de emails masivos.
-            3. Haz clic en los botones correspondientes para guardar o ejecutar cada acción.
-            4. Observa la vista previa de tus automatizaciones y revisa los resultados en tiempo real.
-            """)
-
-        with st.expander("😌 Bienestar del Equipo"):
-            st.markdown("""
-            1. Accede a la sección **Bienestar** en el menú.
-            2. Usa el panel para calcular el riesgo de burnout y registra reconocimientos a tus colegas.
-            3. Explora los módulos de salud, descansos programados, aprendizaje y metas personales.
-            4. Personaliza y guarda tus propios datos de salud para llevar tu propio registro.
-            """)
-
-        with st.expander("🔒 Feedback Anónimo"):
-            st.markdown("""
-            1. Selecciona **Feedback Anónimo** en el menú lateral.
-            2. Elige el tipo de feedback y escribe tu mensaje de forma confidencial.
-            3. Haz clic en **Enviar Feedback** para que la administración lo reciba sin conocer tu identidad.
-            """)
-
-        with st.expander("⚖️ Cumplimiento y Auditoría"):
-            st.markdown("""
-            1. En el menú, haz clic en **Cumplimiento**.
-            2. Sube documentos para auditoría normativa (GDPR, SOX, ISO27001, etc.).
-            3. Revisa los resultados automáticos y asegúrate de que tus archivos cumplen con los estándares requeridos.
-            """)
-
-        st.info("¿Necesitas más ayuda? Contacta a soporte o revisa la documentación oficial para ver videos y guías paso a paso.")
-
-    def _show_documents(self):
-        st.header("📁 Gestor de Documentos")
-        st.markdown("Sube, escanea, entrega y gestiona tus documentos digitales.")
-
-        # Subida de documentos
-        uploaded_file = st.file_uploader("Sube un documento (PDF, imagen, Word)", type=["pdf", "png", "jpg", "jpeg", "docx"])
-        user = st.session_state.current_user
-
-        if uploaded_file:
-            # Guardar el archivo temporalmente o en base de datos
-            save_path = f"uploaded_docs/{user}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uploaded_file.name}"
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            with open(save_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.success(f"Documento '{uploaded_file.name}' guardado correctamente.")
-
-            if uploaded_file.type == "application/pdf":
-                with st.expander("📄 Escanear PDF (extraer texto)"):
-                    import PyPDF2
-                    reader = PyPDF2.PdfReader(save_path)
-                    text = "\n".join([page.extract_text() or "" for page in reader.pages])
-                    st.text_area("Texto extraído", value=text, height=200)
-            elif "image" in uploaded_file.type:
-                with st.expander("🔎 Escanear Imagen (OCR)"):
-                    try:
-                        import pytesseract
-                        from PIL import Image
-                        img = Image.open(save_path)
-                        st.image(img, caption="Imagen subida", use_column_width=True)
-                        text = pytesseract.image_to_string(img, lang="spa")
-                        st.text_area("Texto extraído (OCR)", value=text, height=200)
-                    except ImportError:
-                        st.warning("pytesseract y pillow necesarios para OCR de imagen. Instálalos con pip si quieres esta función.")
-            elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                with st.expander("📄 Leer Word"):
-                    try:
-                        from docx import Document
-                        doc = Document(save_path)
-                        text = "\n".join([para.text for para in doc.paragraphs])
-                        st.text_area("Texto extraído", value=text, height=200)
-                    except ImportError:
-                        st.warning("python-docx necesario para abrir archivos Word.")
-
-        # Listar documentos subidos por el usuario
-        st.markdown("### Tus documentos subidos")
-        doc_folder = "uploaded_docs"
-        docs = []
-        if os.path.exists(doc_folder):
-            docs = [f for f in os.listdir(doc_folder) if f.startswith(user+"_")]
-        if docs:
-            for docfile in docs:
-                st.write(f"📄 {docfile}")
-                with open(f"{doc_folder}/{docfile}", "rb") as f:
-                    st.download_button(
-                        label="Descargar",
-                        data=f.read(),
-                        file_name=docfile.split("_",2)[-1],
-                        mime="application/octet-stream"
-                    )
-        else:
-            st.info("Aún no has subido documentos.")
-
-        st.markdown("---")
-        st.header("🧾 Generar y Enviar Recibo Digital")
-
-        with st.form("generate_receipt"):
-            nombre = st.text_input("Nombre del receptor")
-            monto = st.number_input("Monto", min_value=0.0)
-            concepto = st.text_input("Concepto del recibo")
-            email_receptor = st.text_input("Email para enviar recibo")
-            submit = st.form_submit_button("Generar Recibo PDF y Enviar por Email")
-
-            if submit and nombre and monto and concepto and email_receptor:
-                # Crear PDF de recibo en memoria (¡NO en disco!)
-                from fpdf import FPDF
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=14)
-                pdf.cell(0, 10, "Recibo Digital", ln=1, align="C")
-                pdf.set_font("Arial", size=12)
-                pdf.ln(8)
-                pdf.cell(0, 10, f"Recibí de: {nombre}", ln=1)
-                pdf.cell(0, 10, f"Monto: ${monto:.2f}", ln=1)
-                pdf.cell(0, 10, f"Concepto: {concepto}", ln=1)
-                pdf.cell(0, 10, f"Emitido por: {user}", ln=1)
-                pdf.cell(0, 10, f"Fecha: {datetime.datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=1)
-                # Guardar como bytes en memoria — robusto para cualquier versión de FPDF
-                pdf_output = pdf.output(dest='S')
-                if isinstance(pdf_output, str):
-                    pdf_bytes = pdf_output.encode('latin1')
-                else:
-                    pdf_bytes = pdf_output
-                st.success("Recibo PDF generado correctamente.")
-                st.download_button("Descargar recibo PDF", data=pdf_bytes, file_name="recibo.pdf", mime="application/pdf")
-
-                # Enviar por email
-                try:
-                    import smtplib
-                    from email.mime.multipart import MIMEMultipart
-                    from email.mime.base import MIMEBase
-                    from email.mime.text import MIMEText
-                    from email import encoders
-
-                    msg = MIMEMultipart()
-                    msg["From"] = st.secrets["smtp"]["user"]
-                    msg["To"] = email_receptor
-                    msg["Subject"] = "Recibo Digital"
-
-                    body = f"Estimado/a {nombre},\nAdjunto encontrará su recibo digital por el concepto: {concepto}."
-                    msg.attach(MIMEText(body, "plain"))
-
-                    part = MIMEBase("application", "octet-stream")
-                    part.set_payload(pdf_bytes)
-                    encoders.encode_base64(part)
-                    part.add_header("Content-Disposition", f"attachment; filename=recibo.pdf")
-                    msg.attach(part)
-
-                    smtp_server = st.secrets["smtp"]["server"]
-                    smtp_port = st.secrets["smtp"]["port"]
-                    sender_email = st.secrets["smtp"]["user"]
-                    sender_password = st.secrets["smtp"]["password"]
-
-                    with smtplib.SMTP(smtp_server, smtp_port) as server:
-                        server.starttls()
-                        server.login(sender_email, sender_password)
-                        server.sendmail(sender_email, email_receptor, msg.as_string())
-                    st.success(f"Recibo enviado a {email_receptor} correctamente.")
-                except Exception as e:
-                    st.error(f"Error enviando email: {str(e)}")
-    
-    def _show_automation(self):
-        with st.expander("🤖 Automatización de Tareas", expanded=True):
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.subheader("Generador de Facturas Mejorado")
-                client_name = st.text_input("Nombre del Cliente")
-                subtotal = st.number_input("Subtotal", min_value=0.0)
-                client_address = st.text_input("Dirección del Cliente")
-                client_email = st.text_input("Correo Electrónico del Cliente")
-                send_whatsapp = st.checkbox("Enviar por WhatsApp (simulado)")
-                custom_message = st.text_area("Mensaje personalizado para el cliente", value="Gracias por su compra.")
-                template = st.selectbox("Plantilla de Factura", ["Estándar", "Moderna"])  # Puedes expandir esto
-
-                if st.button("Generar y Enviar Factura"):
-                    iva_rate = 0.16 if 'MEX' in client_address else 0.21
-                    total = round(subtotal * (1 + iva_rate), 2)
-                    invoice_number = f"INV-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-                    pdf_bytes = generate_invoice_pdf(client_name, subtotal, iva_rate, total, invoice_number, template)
-
-                    # Guardar en la base de datos
-                    self.db.save_invoice(
-                        st.session_state.current_user,
-                        client_name, client_email, client_address,
-                        subtotal, iva_rate, total, invoice_number, pdf_bytes
-                    )
-
-                    # Log de acción
-                    self.db.log_invoice_action(invoice_number, st.session_state.current_user, "generada")
-
-                    # Envío por email
-                    try:
-                        send_invoice_email(client_email, invoice_number, total, pdf_bytes, custom_message)
-                        st.success(f"Factura enviada a {client_email} correctamente.")
-                        self.db.update_invoice_status(invoice_number, "enviada")
-                        self.db.log_invoice_action(invoice_number, st.session_state.current_user, "enviada por email")
-                    except Exception as e:
-                        st.error(f"Error enviando email: {str(e)}")
-
-                    # WhatsApp (simulado)
-                    if send_whatsapp:
-                        # Aquí iría la lógica real de WhatsApp API.
-                        st.info(f"Factura simulada enviada a WhatsApp de {client_name}")
-                        self.db.log_invoice_action(invoice_number, st.session_state.current_user, "enviada por whatsapp")
-    
-            st.markdown("### Facturas Generadas")
-            facturas = self.db.get_invoices_by_user(st.session_state.current_user)
-            st.dataframe(pd.DataFrame(facturas))
-
-            with col2:
-                st.subheader("Programación de Tareas Mejorada")
-                task_type = st.selectbox("Tipo de Tarea", ["Reporte", "Recordatorio", "Backup"])
-                schedule_time = st.time_input("Hora de Ejecución")
-                responsible = st.text_input("Responsable (email)")
-                notification_method = st.selectbox("Notificación", ["Email", "Slack", "WhatsApp"])
-                if st.button("Programar Tarea Mejorada"):
-                   self.db.save_automation_task(
-                       st.session_state.current_user, {
-                           'type': task_type,
-                           'schedule': schedule_time.strftime("%H:%M"),
-                           'responsible': responsible,
-                           'notification_method': notification_method
-                        }
-                   )
-                st.success("Tarea programada exitosamente")
-            st.markdown("### Historial de Tareas")
-            tasks = self.db.get_automation_tasks(st.session_state.current_user)
-            st.dataframe(pd.DataFrame(tasks))
-        
-            with col3:
-                st.subheader("Nuevas Automatizaciones Mejoradas")
-                st.markdown("**Selecciona una plantilla o crea tu automatización personalizada:**")
-                plantilla = st.selectbox("Plantillas", ["Enviar reporte diario", "Backup semanal", "Notificar stock bajo", "Personalizada"])
-                if plantilla != "Personalizada":
-                    task_type, schedule, notification = {
-                        "Enviar reporte diario": ("Reporte", "08:00", "Email"),
-                        "Backup semanal": ("Backup", "Domingo 03:00", "Email"),
-                        "Notificar stock bajo": ("Alerta", "Inmediato", "Email"),
-                    }[plantilla]
-                    st.info(f"Plantilla seleccionada: {plantilla}")
-                else:
-                    task_type = st.text_input("Tipo de tarea (custom)")
-                    schedule = st.text_input("Horario o trigger")
-                    notification = st.text_input("Método de notificación")
-
-                if st.button("Guardar Automatización"):
-                    self.db.save_automation_task(
-                        st.session_state.current_user, {
-                            'type': task_type,
-                            'schedule': schedule,
-                            'responsible': st.session_state.current_user,
-                            'notification_method': notification
-                        }
-                    )
-                    self.db.log_automation_task_creation(st.session_state.current_user, task_type)
-                    st.success("Automatización guardada")
-
-                st.markdown("### Vista previa del flujo")
-                show_automation_preview({
-                    "trigger": schedule,
-                    "action": task_type,
-                    "notification": notification
-                })
-                
-                with st.container(border=True):
-                    st.markdown("**📧 Email Masivo**")
-                    email_subject = st.text_input("Asunto del Email")
-                    email_template = st.text_area("Plantilla HTML")
-                    if st.button("Programar Envío"):
-                        self.db.save_automation_task(st.session_state.current_user, {
-                            'type': 'email_masivo',
-                            'subject': email_subject,
-                            'template': email_template
-                        })
-                        st.success("Envío programado!")
-                
-                with st.container(border=True):
-                    st.markdown("**🔄 Sync CRM**")
-                    crm_action = st.selectbox("Acción", ["Actualizar clientes", "Importar leads"])
-                    sync_frequency = st.selectbox("Frecuencia", ["Diario", "Semanal", "Mensual"])
-                    if st.button("Configurar Sync"):
-                        self.db.save_automation_task(st.session_state.current_user, {
-                            'type': 'crm_sync',
-                            'action': crm_action,
-                            'frequency': sync_frequency
-                        })
-                        st.success("Sincronización configurada")
-
-            with st.container():
-                st.subheader("Automatizaciones Avanzadas Mejoradas")
-                st.markdown("**Carga tu propio script Python para automatización avanzada:**")
-                name = st.text_input("Nombre de la automatización")
-                script = st.text_area("Script Python (función run())")
-                if st.button("Guardar Script"):
-                    self.db.save_advanced_automation(st.session_state.current_user, name, script)
-                    st.success("Script guardado.")
-
-                    st.markdown("### Tus Automatizaciones Avanzadas")
-                    advs = self.db.get_advanced_automations(st.session_state.current_user)
-                    for adv in advs:
-                        st.markdown(f"**{adv['name']}** (v{adv['version']})")
-                        if st.button(f"Ejecutar {adv['name']}"):
-                            try:
-                                # Seguridad: nunca uses eval en producción real sin sandboxing
-                                local_env = {}
-                                exec(adv['script'], {}, local_env)
-                                output = local_env['run']()
-                                self.db.log_advanced_automation_run(adv['id'], "exitoso", str(output), "")
-                                st.success(f"Resultado: {output}")
-                            except Exception as e:
-                                self.db.log_advanced_automation_run(adv['id'], "fallo", "", str(e))
-                                st.error(f"Error: {str(e)}")
-                                if st.button(f"Rollback {adv['name']} (v{adv['version']})"):
-                                   self.db.rollback_advanced_automation(adv['id'])
-                                   st.info("Rollback realizado.")
-
-            # Métodos para database.py
-            def save_advanced_automation(self, user_email, name, script):
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("SELECT MAX(version) FROM advanced_automations WHERE user_email=? AND name=?", (user_email, name))
-                last_version = c.fetchone()[0] or 0
-                c.execute("""
-                    INSERT INTO advanced_automations (user_email, name, script, version)
-                    VALUES (?, ?, ?, ?)
-                """, (user_email, name, script, last_version+1))
-                conn.commit()
-                conn.close()
-
-            def get_advanced_automations(self, user_email):
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("""
-                    SELECT id, name, script, version FROM advanced_automations
-                    WHERE user_email=? AND status='activo' ORDER BY created_at DESC
-                """, (user_email,))
-                rows = c.fetchall()
-                conn.close()
-                return [{"id": r[0], "name": r[1], "script": r[2], "version": r[3]} for r in rows]
-
-    def log_advanced_automation_run(self, automation_id, status, output, error):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO advanced_automation_logs (automation_id, status, output, error)
-            VALUES (?, ?, ?, ?)
-        """, (automation_id, status, output, error))
-        conn.commit()
-        conn.close()
-
-    def rollback_advanced_automation(self, automation_id):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("UPDATE advanced_automations SET status='rollback' WHERE id=?", (automation_id,))
-        conn.commit()
-        conn.close()
-                
-        with adv_col1:
-            st.markdown("**🔮 Análisis Predictivo**")
-            model_type = st.selectbox("Modelo", ["Ventas", "Retención", "Inventario"])
-            if st.button("Ejecutar Modelo"):
-                self._run_predictive_model(model_type)
-                st.success("Modelo ejecutado")
-                
-        with adv_col2:
-            st.markdown("**⚙️ Integración Externa**")
-            api_endpoint = st.text_input("URL API")
-            if st.button("Conectar"):
-                self._test_api_connection(api_endpoint)
-                st.success("Conexión exitosa")
-
-    def get_smtp_settings(email):
-        domain = email.split('@')[-1].lower()
-        if domain == "gmail.com":
-            return "smtp.gmail.com", 587
-        elif domain in ["hotmail.com", "outlook.com", "live.com"]:
-            return "smtp.office365.com", 587
-        elif domain == "yahoo.com":
-            return "smtp.mail.yahoo.com", 587
-        elif domain in ["icloud.com", "me.com"]:
-            return "smtp.mail.me.com", 587
-        elif domain == "zoho.com":
-            return "smtp.zoho.com", 587
-        else:
-            # Por defecto, podrías pedir al usuario que lo indique
-            raise ValueError("Proveedor de correo no soportado automáticamente")
-
-    # Uso:
-    sender_email = "usuario@hotmail.com"
-    smtp_server, smtp_port = get_smtp_settings(sender_email)
-    
-    def _generate_invoice(self, data):
-        iva_rate = 0.16 if 'MEX' in data['client_address'] else 0.21
-        return {
-            'client': data['client_name'],
-            'total': round(data['subtotal'] * (1 + iva_rate), 2),
-            'compliance_check': self._check_compliance(data),
-            'invoice_number': f"INV-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}",
-            'date': datetime.datetime.now().strftime("%d/%m/%Y"),
-            'pdf_data': b''
-        }
-
-    def _check_compliance(self, data):
-        return True
-
-    def _show_wellness(self):
-        st.markdown("---")
-        st.subheader("🩺 Ficha Médica del Empleado")
-        user = st.session_state.current_user
-
-        apellido = st.text_input("Apellido del empleado", key=f"apellido_ficha_medica_{user}")
-        nombre = st.text_input("Nombre del empleado", key=f"nombre_ficha_medica_{user}")
-
-        # Uploader y botón guardar documento
-        uploaded_file = st.file_uploader(
-            "Adjunta un documento médico (PDF, imagen, Word)",
-            type=["pdf", "png", "jpg", "jpeg", "docx"],
-            key=f"adjunto_ficha_{user}"
-        )
-        guardar_doc = st.button("Guardar Documento", key=f"guardar_doc_{user}")
-
-        # Carpeta del empleado
-        mostrar_archivos = False
-        empleado_folder = None
-        if apellido and nombre:
-            empleado_folder = f"fichas_medicas/{apellido}_{nombre}"
-
-        if guardar_doc:
-            if uploaded_file and empleado_folder:
-                os.makedirs(empleado_folder, exist_ok=True)
-                save_path = f"{empleado_folder}/{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uploaded_file.name}"
-                with open(save_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                st.success(f"Documento '{uploaded_file.name}' guardado en la carpeta del empleado.")
-                mostrar_archivos = True
-            elif not uploaded_file:
-                st.error("Debes seleccionar un archivo para guardar.")
-            elif not (apellido and nombre):
-                st.error("Debes ingresar Apellido y Nombre para guardar el documento.")
-
-        # Mostrar archivos si hay carpeta disponible
-        if empleado_folder and os.path.exists(empleado_folder):
-            archivos = os.listdir(empleado_folder)
-            if archivos:
-                st.markdown(f"#### Archivos de {apellido} {nombre}:")
-                for archivo in archivos:
-                    col1, col2 = st.columns([8,2])
-                    with col1:
-                        st.write(f"📄 {archivo}")
-                        with open(os.path.join(empleado_folder, archivo), "rb") as f:
-                            st.download_button(
-                                label="Descargar",
-                                data=f.read(),
-                                file_name=archivo,
-                                mime="application/octet-stream",
-                                key=f"descargar_{archivo}_{user}"
-                            )
-                    with col2:
-                        if st.button("Eliminar", key=f"eliminar_{archivo}_{user}"):
-                            try:
-                                os.remove(os.path.join(empleado_folder, archivo))
-                                st.success(f"Archivo {archivo} eliminado.")
-                                st.experimental_rerun()
-                            except Exception as e:
-                                st.error(f"No se pudo eliminar: {e}")
-            else:
-                st.info("No hay archivos médicos para este empleado.")
-
-        # FICHA MÉDICA
-        ficha = self.db.get_medical_record(user)
-
-        with st.form(key=f"ficha_medica_form_{user}"):
-            patologia = st.text_input("Patología principal", value=ficha.get("patologia", "") if ficha else "", key=f"patologia_{user}")
-            enfermedades = st.text_area("Otras enfermedades", value=ficha.get("enfermedades", "") if ficha else "", key=f"enfermedades_{user}")
-            embarazo = st.checkbox("Embarazo", value=bool(ficha.get("embarazo", 0)) if ficha else False, key=f"embarazo_{user}")
-            observaciones = st.text_area("Observaciones", value=ficha.get("observaciones", "") if ficha else "", key=f"observaciones_{user}")
-
-            # Submit button (sin key extra, solo label)
-            guardar_ficha = st.form_submit_button("Guardar ficha médica")
-
-            if guardar_ficha:
-                # Guardar en base de datos, añade los parámetros requeridos por tu método
-                try:
-                    self.db.save_medical_record(
-                        user, patologia, enfermedades, embarazo, observaciones,
-                        apellido=apellido, nombre=nombre, file_path=None # file_path puede ser None si no quieres forzar archivo
-                    )
-                    st.success("Ficha médica actualizada correctamente.")
-                except Exception as e:
-                    st.error(f"Error al guardar ficha médica: {e}")
-        
-        st.markdown("---")
-        st.subheader("📋 Faltas y Permisos de Salud")
-        with st.form("solicitar_permiso"):
-            tipo = st.selectbox("Tipo de permiso", ["Vacaciones", "Enfermedad", "Otro"])
-            fecha_inicio = st.date_input("Desde")
-            fecha_fin = st.date_input("Hasta")
-            motivo = st.text_input("Motivo")
-            observaciones = st.text_area("Observaciones")
-            if st.form_submit_button("Solicitar permiso"):
-                self.db.save_leave_request(user, tipo, fecha_inicio, fecha_fin, motivo, observaciones)
-                st.success("Permiso solicitado.")
-
-
-        
-        # Mostrar historial
-        st.markdown("### Permisos solicitados")
-        leaves = self.db.get_leave_requests(user)
-        if leaves:
-            for lv in leaves:
-                st.markdown(f"- **{lv['tipo_permiso']}**: {lv['fecha_inicio']} a {lv['fecha_fin']} ({lv['estado']})<br> Motivo: {lv['motivo']}<br>Obs: {lv['observaciones']}", unsafe_allow_html=True)
-        else:
-            st.info("Aún no has registrado permisos.")
-        
-        # ... el resto de tu módulo de bienestar ...
-
-        with st.expander("😌 Bienestar del Equipo", expanded=True):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("Predicción de Burnout")
-                hours_worked = st.slider("Horas trabajadas esta semana", 0, 100, 40)
-                if st.button("Calcular Riesgo"):
-                    prediction = self._predict_burnout(np.array([[hours_worked, 0, 0, 0, 0]]))
-                    st.metric("Riesgo de Burnout", f"{prediction}%")
-
-            with col2:
-                st.subheader("Sistema de Reconocimiento")
-                colleague = st.text_input("Nombre del Colega")
-                colleague_email = st.text_input("Email del Colega")
-                recognition = st.text_area("Mensaje de Reconocimiento")
-                signing_authority = st.selectbox("Firmante", ["CEO", "Gerente General"])
-                
-                if st.button("Enviar 🏆"):
-                    certificate_data = self._generate_certificate(
-                        colleague=colleague,
-                        recognition=recognition,
-                        signer=signing_authority
-                    )
-                    cert_id = self.db.save_recognition(
-                        user = st.session_state.current_user,
-                        colleague = colleague,
-                        recognition = recognition
-                    )
-                    if certificate_data and 'cert_id' in certificate_data:
-                        certificate_id = certificate_data['cert_id'],
-                        signer=signing_authority,
-                        pdf_data = certificate_data['pdf_bytes']
-                    
-                    if self._send_recognition_email(colleague_email, certificate_data):
-                        st.success(f"Certificado enviado a {colleague_email}!")
-                        st.download_button(
-                            label = "Descargar Certificado",
-                            data = certificate_data['pdf_bytes'],
-                            file_name = f"Certificado_{cert_id}.pdf",
-                            mime = "application/pdf"
-                        )
-                    else:
-                        st.error("Error enviando el certificado")
-
-            st.markdown("---")
-            self._health_dashboard()
-            self._smart_breaks()
-            self._personal_goals()
-            self._meditation_module()
-            self._team_network()
-            self._workload_monitor()
-            self._gamification_system()
-
-        def save_medical_record(self, user_email, patologia, enfermedades, embarazo, observaciones, apellido=None, nombre=None, file_path=None):
-            conn = sqlite3.connect("enterprise_flow.db")
-            c = conn.cursor()
-            c.execute("SELECT id FROM medical_records WHERE user_email=?", (user_email,))
-            if c.fetchone():
-                c.execute("""
-                    UPDATE medical_records 
-                    SET patologia=?, enfermedades=?, embarazo=?, observaciones=?, apellido=?, nombre=?, file_path=?
-                    WHERE user_email=?
-                """, (patologia, enfermedades, int(embarazo), observaciones, apellido, nombre, file_path, user_email))
-            else:
-                c.execute("""
-                    INSERT INTO medical_records (user_email, patologia, enfermedades, embarazo, observaciones, apellido, nombre, file_path)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (user_email, patologia, enfermedades, int(embarazo), observaciones, apellido, nombre, file_path))
-            conn.commit()
-            conn.close()
-    
-    def _generate_certificate(self, colleague, recognition, signer):
-        try:
-            signer_key = signer.lower().replace(" ", "_")
-            signature_path = st.secrets["signatures"][signer_key]
-            full_path = BASE_DIR / signature_path
-            
-            if not full_path.exists():
-                raise FileNotFoundError(f"❌ Archivo de firma no encontrado: {full_path}")
-
-            # Crear PDF
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_auto_page_break(auto=True, margin=15)
-
-            # Configuración del documento
-            pdf.set_font("Arial", 'B', 16)
-            pdf.cell(0, 10, "Certificado de Reconocimiento", ln=1, align='C')
-            pdf.ln(15)
-
-            # Contenido del certificado
-            pdf.set_font("Arial", '', 12)
-            pdf.multi_cell(0, 10, f"Se reconoce oficialmente a {colleague} por:", align='C')
-            pdf.ln(10)
-            pdf.set_font("Arial", 'I', 12)
-            pdf.multi_cell(0, 8, f'"{recognition}"')
-            pdf.ln(20)
-
-            # Insertar firma
-            pdf.image(str(full_path), x=50, w=30, h=15, type='PNG')
-            pdf.set_font("Arial", 'I', 10)
-            pdf.cell(0, 10, f"Firmado por: {signer}", ln=1, align='R')
-            pdf.ln(15)
-
-            # Pie de página
-            cert_id = str(uuid.uuid4())[:8].upper()
-            pdf.set_font("Arial", '', 8)
-            pdf.cell(0, 10, f"ID de Certificado: {cert_id}", 0, 1, 'C')
-            pdf.cell(0, 10, datetime.datetime.now().strftime("Emitido el %d/%m/%Y a las %H:%M"), 0, 1, 'C')
-
-            return {
-                'pdf_bytes': pdf.output(dest='S').encode('latin1'),
-                'cert_id': cert_id
-            }
-            
-        except KeyError as e:
-            st.error(f"❌ Firma no configurada para '{signer}'. Verifica secrets.toml")
-            return None
-        except Exception as e:
-            st.error(f"🚨 Error al generar certificado: {str(e)}")
-            return None
-    
-    def _send_recognition_email(self, recipient, certificate_data):
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = st.secrets["smtp"]["user"]
-            msg['To'] = recipient
-            msg['Subject'] = "🏆 Reconocimiento Oficial - Tu Certificado"
-            
-            body = f"""
-            ¡Felicitaciones!
-            
-            Has recibido un reconocimiento oficial de la empresa.
-            Adjunto encontrarás tu certificado digital con validez oficial.
-            
-            ID del Certificado: {certificate_data['cert_id']}
-            """
-            msg.attach(MIMEText(body, 'plain'))
-            
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(certificate_data['pdf_bytes'])
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f'attachment; filename= "Certificado_{certificate_data["cert_id"]}.pdf"')
-            msg.attach(part)
-            
-            with smtplib.SMTP(st.secrets["smtp"]["server"], st.secrets["smtp"]["port"]) as server:
-                server.starttls()
-                server.login(st.secrets["smtp"]["user"], st.secrets["smtp"]["password"])
-                server.sendmail(st.secrets["smtp"]["user"], recipient, msg.as_string())
-            return True
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
-            return False
-
-    def _predict_burnout(self, input_data):
-        try:
-            return min(100, int(input_data[0][0] * 1.5))
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
-            return 0
-
-    def _show_feedback_system(self):
-        with st.expander("🔒 Sistema de Feedback Anónimo", expanded=True):
-            feedback_type = st.selectbox("Tipo de Feedback", ["Para el equipo", "Para liderazgo", "Sugerencias generales"])
-            feedback = st.text_area("Escribe tu feedback (máx. 500 caracteres)", max_chars=500)
-            if st.button("Enviar Feedback"):
-                self.db.save_anonymous_feedback(feedback_type, feedback)
-                st.success("¡Gracias por tu contribución! Tu feedback es anónimo.")
-
-    def _health_dashboard(self):
-        with st.container(border=True):
-            st.subheader("📊 Panel de Salud Integral")
-
-            # Cargar los datos del usuario
-            user = st.session_state.current_user
-            health_data = self.db.get_health_data(user)
-            # Si no existen, usa valores por defecto
-            if not health_data:
-                health_data = {'dias': 0, 'sueno': 0.0, 'pasos': 0}
-
-            # Inputs para que el usuario pueda cambiarlos
-            dias = st.number_input("Días sin incidentes", min_value=0, value=health_data['dias'])
-            sueno = st.number_input("Horas Sueño Promedio", min_value=0.0, step=0.1, value=health_data['sueno'])
-            pasos = st.number_input("Pasos Diarios", min_value=0, value=health_data['pasos'])
-
-            if st.button("Guardar mis registros de salud"):
-                self.db.save_health_data(user, dias, sueno, pasos)
-                st.success("¡Datos guardados!")
-
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("📅 Días sin incidentes", dias)
-            with col2:
-                st.metric("💤 Horas Sueño Promedio", sueno)
-            with col3:
-                st.metric("🚶 Pasos Diarios", pasos)
-
-    def _smart_breaks(self):
-        with st.container(border=True):
-            st.subheader("⏰ Programador de Descansos Inteligentes")
-            break_frequency = st.slider("Intervalo entre descansos (minutos)", 30, 120, 50)
-            break_duration = st.slider("Duración del descanso (minutos)", 5, 15, 7)
-            if st.button("Activar Recordatorios"):
-                self._schedule_breaks(break_frequency, break_duration)
-
-    def _schedule_breaks(self, frequency, duration):
-        st.session_state.break_config = {
-            'frequency': frequency,
-            'duration': duration
-        }
-        st.success(f"Descansos programados cada {frequency} minutos por {duration} minutos")
-
-    def _personal_goals(self):
-        st.header("🏆 Sistema de Metas Personales")
-        user = st.session_state.current_user
-
-        with st.form(key="add_goal_form"):
-            new_goal = st.text_input("Establece tu objetivo personal esta semana")
-            submitted = st.form_submit_button("Guardar Objetivo")
-            if submitted and new_goal.strip():
-                self.db.save_personal_goal(user, new_goal.strip())
-                st.success("¡Objetivo guardado!")
-
-        st.markdown("#### Tus objetivos de esta semana:")
-
-        goals = self.db.get_personal_goals(user)
-        if not goals:
-            st.info("Aún no tienes objetivos registrados.")
-        else:
-            for goal_id, goal_text in goals:
-                col1, col2, col3 = st.columns([6,2,2])
-                if "edit_goal" not in st.session_state:
-                    st.session_state["edit_goal"] = {}
-
-                # Mostrar en modo edición o como texto normal
-                if st.session_state["edit_goal"].get(goal_id, False):
-                    with col1:
-                        edited_text = st.text_input(f"Edita objetivo {goal_id}", value=goal_text, key=f"edit_input_{goal_id}")
-                    with col2:
-                        if st.button("Guardar", key=f"save_btn_{goal_id}"):
-                            self.db.edit_personal_goal(goal_id, edited_text)
-                            st.session_state["edit_goal"][goal_id] = False
-                            st.experimental_rerun()
-                    with col3:
-                        if st.button("Cancelar", key=f"cancel_btn_{goal_id}"):
-                            st.session_state["edit_goal"][goal_id] = False
-                            st.experimental_rerun()
-                else:
-                    with col1:
-                        st.write(goal_text)
-                    with col2:
-                        if st.button("Editar", key=f"edit_btn_{goal_id}"):
-                            st.session_state["edit_goal"][goal_id] = True
-                            st.experimental_rerun()
-                    with col3:
-                        if st.button("Eliminar", key=f"delete_btn_{goal_id}"):
-                            self.db.delete_personal_goal(goal_id)
-                            st.experimental_rerun()
-
-    def add_personal_goal(user_email, goal_text):
-        conn = sqlite3.connect("enterprise_flow.db")
-        c = conn.cursor()
-        c.execute("INSERT INTO personal_goals (user_email, goal_text) VALUES (?, ?)", (user_email, goal_text))
-        conn.commit()
-        conn.close()
-    
-    def _meditation_module(self):
-        with st.container(border=True):
-            st.subheader("🧘 Sesiones de Relajación")
-            duration_str = st.radio("Duración:", ["5 min", "10 min", "15 min"], key="meditation_duration")
-            minutes = int(duration_str.split()[0])
-            seconds = minutes * 60
-
-            # Ruta según la duración (cada archivo debe existir en assets/)
-            if minutes == 5:
-                audio_path = "assets/meditacion.mp3"
-            elif minutes == 10:
-                audio_path = "assets/meditacion2.mp3"
-            elif minutes == 15:
-                audio_path = "assets/meditacion3.mp3"
-            else:
-                st.error("Duración no soportada.")
-                return
-
-            # Leer el archivo MP3 solo una vez por cambio de audio
-            if (
-                "audio_bytes" not in st.session_state
-                or st.session_state.get("audio_path") != audio_path
-            ):
-                if os.path.exists(audio_path):
-                    with open(audio_path, "rb") as f:
-                        st.session_state["audio_bytes"] = f.read()
-                    st.session_state["audio_path"] = audio_path
-                else:
-                    st.session_state["audio_bytes"] = None
-                    st.session_state["audio_path"] = None
-
-            if st.session_state["audio_bytes"] is None:
-                st.error("No se encontró el archivo de audio de meditación para esta duración.")
-                return
-
-            if st.button("Iniciar Meditación Guiada", key="meditation_start_btn"):
-                st.session_state["meditation_active"] = True
-                st.session_state["meditation_start_time"] = time.time()
-                st.session_state["meditation_total_seconds"] = seconds
-
-            if st.session_state.get("meditation_active", False):
-                elapsed = int(time.time() - st.session_state["meditation_start_time"])
-                remaining = st.session_state["meditation_total_seconds"] - elapsed
-                mins, secs = divmod(max(remaining, 0), 60)
-                st.markdown(f"### ⏳ Tiempo restante: {mins:02d}:{secs:02d}")
-
-                st.audio(st.session_state["audio_bytes"], format="audio/mp3")
-                st.download_button(
-                    label="Descargar música de meditación (MP3)",
-                    data=st.session_state["audio_bytes"],
-                    file_name=os.path.basename(audio_path),
-                    mime="audio/mp3"
-                )
-
-                if remaining > 0:
-                    st.experimental_rerun()
-                else:
-                    st.session_state["meditation_active"] = False
-                    st.success("¡La sesión ha finalizado! Puedes abrir los ojos y continuar tu día.")
-    
-    def _team_network(self):
-        import json
-        st.subheader("👥 Mapa de Relaciones del Equipo")
-
-        user_key = f"team_graph_{st.session_state.current_user}"
-        if user_key not in st.session_state:
-            # Estructura inicial por defecto
-            st.session_state[user_key] = {
-                "nodes": ["CEO", "Gerente", "Equipo A", "Equipo B", "Miembro 1", "Miembro 2", "Miembro 3"],
-                "edges": [
-                    ("CEO", "Gerente"),
-                    ("Gerente", "Equipo A"),
-                    ("Gerente", "Equipo B"),
-                    ("Equipo A", "Miembro 1"),
-                    ("Equipo A", "Miembro 2"),
-                    ("Equipo B", "Miembro 3"),
-                ]
-            }
-
-        # Estado de edición
-        edit_state_key = f"edit_team_graph_{st.session_state.current_user}"
-        if edit_state_key not in st.session_state:
-            st.session_state[edit_state_key] = False
-
-        # Botón para alternar edición
-        if st.button("Editar" if not st.session_state[edit_state_key] else "Terminar Edición", key="edit_team_graph_btn"):
-             st.session_state[edit_state_key] = not st.session_state[edit_state_key]
-
-        graph = st.session_state[user_key]
-
-        if st.session_state[edit_state_key]:
-            st.markdown("#### Nodos (Personas/Equipos)")
-            with st.form("add_node_form"):
-                new_node = st.text_input("Agregar nuevo nodo (nombre)")
-                add_node = st.form_submit_button("Agregar Nodo")
-                if add_node and new_node.strip():
-                    if new_node not in graph["nodes"]:
-                        graph["nodes"].append(new_node.strip())
-                    else:
-                        st.warning("Ese nodo ya existe.")
-
-            if len(graph["nodes"]) > 0:
-                node_to_remove = st.selectbox("Eliminar nodo", [""] + graph["nodes"], key="remove_node")
-                if node_to_remove and st.button("Eliminar Nodo"):
-                    # Elimina el nodo y todas sus relaciones
-                    graph["nodes"].remove(node_to_remove)
-                    graph["edges"] = [e for e in graph["edges"] if e[0] != node_to_remove and e[1] != node_to_remove]
-
-            st.markdown("#### Flechas (Relaciones)")
-            if len(graph["nodes"]) >= 2:
-                with st.form("add_edge_form"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        from_node = st.selectbox("Desde", graph["nodes"], key="from_node")
-                    with col2:
-                        to_node = st.selectbox("Hacia", graph["nodes"], key="to_node")
-                    add_edge = st.form_submit_button("Agregar Flecha")
-                    if add_edge and from_node != to_node:
-                        if (from_node, to_node) not in graph["edges"]:
-                            graph["edges"].append((from_node, to_node))
-                        else:
-                            st.warning("Esa flecha ya existe.")
-
-            if len(graph["edges"]) > 0:
-                edge_to_remove = st.selectbox(
-                    "Eliminar flecha",
-                    [""] + [f"{a} → {b}" for a, b in graph["edges"]],
-                    key="remove_edge"
-                )
-                if edge_to_remove and st.button("Eliminar Flecha"):
-                     edge_tuple = tuple(edge_to_remove.split(" → "))
-                     if edge_tuple in graph["edges"]:
-                        graph["edges"].remove(edge_tuple)
-
-            # Actualiza el estado tras cambios
-            st.session_state[user_key] = graph
-
-         # Mostrar el grafo con graphviz
-        dot = "digraph {\n"
-        for node in graph["nodes"]:
-            dot += f'    "{node}" [shape=ellipse];\n'
-        for a, b in graph["edges"]:
-            dot += f'    "{a}" -> "{b}";\n'
-        dot += "}"
-        st.graphviz_chart(dot)
-
-    def _workload_monitor(self):
-        with st.container(border=True):
-            st.subheader("⚖️ Monitor de Carga de Trabajo")
-            current_load = st.slider("Tu carga actual (1-10)", 1, 10, 7)
-            ideal_load = st.slider("Carga ideal deseada (1-10)", 1, 10, 5)
-            if current_load > ideal_load:
-                st.error("¡Carga de trabajo excesiva!")
-            elif current_load < ideal_load:
-                st.warning("Capacidad disponible")
-            else:
-                st.success("Carga equilibrada")
-
-    def _gamification_system(self):
-        with st.container(border=True):
-            st.subheader("🎮 Sistema de Recompensas")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("🏅 Puntos Acumulados", "1,250")
-            with col2:
-                st.metric("🌟 Nivel Actual", "5")
-            with col3:
-                st.metric("🏆 Insignias", "3/10")
-
-    def _learning_portal(self):
-        st.subheader("🎓 Plataforma de Aprendizaje")
-
-        user_key = f"learning_courses_{st.session_state.current_user}"
-        if user_key not in st.session_state:
-            st.session_state[user_key] = [
-                {
-                    "id": 1,
-                    "title": "Gestión del Tiempo",
-                    "progress": 0.4,
-                    "url": "https://www.udemy.com/course/gestion-del-tiempo/"
-                },
-               {
-                    "id": 2,
-                    "title": "Liderazgo Efectivo",
-                    "progress": 0.7,
-                    "url": "https://www.linkedin.com/learning/search?entityType=COURSE&keywords=liderazgo&language=es_ES"
-                },
-               {
-                    "id": 3,
-                    "title": "Inteligencia Emocional",
-                    "progress": 0.2,
-                    "url": "https://www.linkedin.com/learning/search?entityType=COURSE&keywords=inteligencia&language=es_ES"
-               }
-            ]
-
-        expander = st.expander("➕ Agregar nuevo curso vinculado", expanded=False)
-        with expander:
-            with st.form("add_course_form", clear_on_submit=True):
-                new_title = st.text_input("Nombre del curso")
-                new_url = st.text_input("Enlace al curso (Udemy, Coursera, Linkedin, etc.)")
-                submitted = st.form_submit_button("Agregar curso")
-                if submitted:
-                    if new_title and new_url:
-                        next_id = max([c["id"] for c in st.session_state[user_key]] + [0]) + 1
-                        st.session_state[user_key].append({
-                            "id": next_id,
-                            "title": new_title,
-                            "progress": 0.0,
-                            "url": new_url
-                        })
-                        st.success("¡Curso agregado!")
-                    else:
-                        st.warning("Completa todos los campos.")
-
-        for course in st.session_state[user_key]:
-            with st.container():
-                st.markdown(f"**{course['title']}**")
-                c1, c2 = st.columns([5,1])
-                with c1:
-                    st.progress(course["progress"])
-                with c2:
-                    st.markdown(
-                        f"<span style='font-size:18px;color:#007bff;font-weight:bold'>{int(course['progress']*100)}%</span>",
-                        unsafe_allow_html=True
-                    )
-                st.markdown(
-                    f"[Ir al curso]({course['url']})",
-                    unsafe_allow_html=True
-                )
-                new_prog = st.slider(
-                    "Actualizar progreso (%)",
-                    0, 100, int(course["progress"]*100),
-                    key=f"prog_{course['id']}")
-                if new_prog != int(course["progress"]*100):
-                    course["progress"] = new_prog / 100.0
-                    st.experimental_rerun()
-                if st.button(f"Eliminar {course['title']}", key=f"del_{course['id']}"):
-                    st.session_state[user_key] = [
-                        c for c in st.session_state[user_key] if c["id"] != course["id"]
-                    ]
-                    st.experimental_rerun()
-    
-    def _show_compliance(self):
-        with st.expander("⚖️ Auditoría Normativa", expanded=True):
-            uploaded_file = st.file_uploader("Subir Documento", type=["txt", "docx", "pdf"])
-            
-            if uploaded_file:
-                text = ""
-                try:
-                    if uploaded_file.type == "text/plain":
-                        text = uploaded_file.getvalue().decode()
-                    elif uploaded_file.type == "application/pdf":
-                        import PyPDF2
-                        reader = PyPDF2.PdfReader(uploaded_file)
-                        text = "\n".join([page.extract_text() for page in reader.pages])
-                    else:
-                        from docx import Document
-                        doc = Document(uploaded_file)
-                        text = "\n".join([para.text for para in doc.paragraphs])
-                except Exception as e:
-                    st.error(f"Error al leer el archivo: {str(e)}")
-                    return
-                
-                audit_result = self._audit_document(text)
-                st.write("**Resultados de Auditoría:**")
-                st.json(audit_result)
-
-    def _audit_document(self, text):
-        doc = self.nlp(text)
-        return {
-            'GDPR': any(token.text.lower() in ('datos personales', 'consentimiento') for token in doc),
-            'SOX': any(token.text.lower() in ('control interno', 'auditoría financiera') for token in doc),
-            'ISO27001': any(token.text.lower() in ('seguridad de la información', 'riesgos') for token in doc)
-        }
-
-    def _show_payment(self):
-        st.header("📈 Planes EnterpriseFlow")
-        cols = st.columns(3)
-        
-        with cols[0]:
-            st.subheader("Básico")
-            st.markdown("""
-                - 10 usuarios
-                - Soporte básico
-                - Reportes estándar
-                **Precio: $99/mes**
-            """)
-            if st.button("Elegir Básico", key="basico"):
-                self._handle_subscription('basico')
-
-        with cols[1]:
-            st.subheader("Premium")
-            st.markdown("""
-                - 50 usuarios
-                - Soporte prioritario
-                - Reportes avanzados
-                **Precio: $299/mes**
-            """)
-            if st.button("Elegir Premium", key="premium"):
-                self._handle_subscription('premium')
-
-        with cols[2]:
-            st.subheader("Enterprise")
-            st.markdown("""
-                - Usuarios ilimitados
-                - Soporte 24/7
-                - Personalización
-                **Precio: $999/mes**
-            """)
-            if st.button("Contactar Ventas", key="enterprise"):
-                st.info("contacto@enterpriseflow.com")
-
-    def _handle_subscription(self, plan: str):
-        try:
-            if not st.session_state.current_user:
-                raise ValueError("Debe iniciar sesión primero")
-            
-            subscription_data = self.payment.create_subscription(
-                customer_email=st.session_state.current_user,
-                price_key=plan
-            )
-            
-            if subscription_data.get('client_secret'):
-                st.session_state.subscription = subscription_data
-                self._show_payment_confirmation()
-            else:
-                st.error("Error al crear la suscripción")
-        
-        except Exception as e:
-            st.error(f"Error en suscripción: {str(e)}")
-
-    def _show_payment_confirmation(self):
-        with st.form("payment-form"):
-            st.write("Complete los datos de pago")
-            card_number = st.text_input("Número de tarjeta")
-            expiry = st.text_input("MM/AA")
-            cvc = st.text_input("CVC")
-            
-            if st.form_submit_button("Confirmar Pago"):
-                try:
-                    st.success("Pago procesado exitosamente!")
-                    st.session_state.subscription = None
-                except Exception as e:
-                    st.error(f"Error en pago: {str(e)}")
-
-# Crear las tablas (ejecuta una sola vez al instalar tu app)
-conn = sqlite3.connect("enterprise_flow.db")
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS user_rewards (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_email TEXT NOT NULL,
-    puntos INTEGER DEFAULT 0,
-    nivel INTEGER DEFAULT 1,
-    insignias INTEGER DEFAULT 0,
-    tareas_completadas INTEGER DEFAULT 0,
-    dias_constancia INTEGER DEFAULT 0,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(user_email)
-)
-""")
-c.execute("""
-CREATE TABLE IF NOT EXISTS personal_goals (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_email TEXT NOT NULL,
-    goal_text TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    completed BOOLEAN DEFAULT 0
-)
-""")
-conn.commit()
-conn.close()
-
-conn = sqlite3.connect("enterprise_flow.db")
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS medical_records (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_email TEXT NOT NULL,
-    patologia TEXT,
-    enfermedades TEXT,
-    embarazo BOOLEAN DEFAULT 0,
-    observaciones TEXT,
-    FOREIGN KEY(user_email) REFERENCES employees(user_email)
-)
-""")
-c.execute("""
-CREATE TABLE IF NOT EXISTS leave_requests (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_email TEXT NOT NULL,
-    tipo_permiso TEXT,
-    fecha_inicio DATE,
-    fecha_fin DATE,
-    estado TEXT DEFAULT 'pendiente',
-    motivo TEXT,
-    observaciones TEXT,
-    FOREIGN KEY(user_email) REFERENCES employees(user_email)
-)
-""")
-conn.commit()
-conn.close()
-
-if __name__ == "__main__":
-    EnterpriseFlowApp()
+import streamlit as st
+import sqlite3
+import hashlib
+import uuid
+import datetime
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from services import get_services
+# NumPy, pandas y PDF/OCR se importan recién al abrir la sección que los usa (FPDF, en pdf_engine.py)
+from lazy_imports import np, pd
+from mailer import enqueue_email
+from campaigns import create_campaign, get_campaigns, pause_campaign, resume_campaign
+from helpers import generate_invoice_pdf, iva_rate_for, send_invoice_email
+from batch_invoices import BatchInvoicer
+from compliance import audit_text
+from compliance_audit import CorpusAudit, report_to_csv, report_to_json
+from pdf_engine import render_certificate, render_receipt
+from pdf_extraction import page_count, parse_page_range
+from ocr import thumbnail
+from text_extraction import detect_kind, extract_text, ocr_document, stream_pdf_pages
+import time
+
+# Configuración inicial
+st.set_page_config(
+    page_title="EnterpriseFlow",
+    page_icon="🏢",
+    layout="wide"
+)
+
+class EnterpriseFlowApp:
+    def __init__(self):
+        # La base de datos se construye una vez por proceso (ver services.py)
+        self.db = get_services().db
+        
+        if 'logged_in' not in st.session_state:
+            st.session_state.logged_in = False
+        if 'current_user' not in st.session_state:
+            st.session_state.current_user = None
+            
+        self._setup_ui()
+
+    @property
+    def payment(self):
+        # Stripe se carga la primera vez que se elige un plan
+        return get_services().payment
+
+    def _setup_ui(self):
+        st.sidebar.image("https://via.placeholder.com/200x50.png?text=EnterpriseFlow", width=200)
+        if not st.session_state.logged_in:
+            self._show_login()
+        else:
+            self._rewards_header()
+            self._show_main_interface()
+
+    def _rewards_header(self):
+        user = st.session_state.current_user
+
+        # Ejemplo: estos datos deberían venir de tu base de datos o tu lógica real de avance
+        # Simulación para el ejemplo (reemplaza los valores aquí por tus consultas reales):
+        tareas_completadas = self.db.get_completed_tasks_count(user) if hasattr(self.db, "get_completed_tasks_count") else 12
+        logros = self.db.get_user_achievements(user) if hasattr(self.db, "get_user_achievements") else ["Inicio de sesión diario", "Primer tarea completada"]
+        dias_constancia = self.db.get_user_streak_days(user) if hasattr(self.db, "get_user_streak_days") else 7
+
+        # Lógica de puntos y recompensas automática:
+        puntos = tareas_completadas * 100 + len(logros) * 250 + dias_constancia * 10
+        nivel = max(1, puntos // 500 + 1)
+        # Insignias: 1 por cada 5 tareas completadas + 1 por cada 1000 puntos + 1 por cada 7 días de constancia
+        insignias = (tareas_completadas // 5) + (puntos // 1000) + (dias_constancia // 7)
+
+        st.markdown(
+            f"""
+            <div style="
+                background-color:#f7f7fa;
+                border-radius:8px;
+                padding:0.2rem 1rem 0.1rem 1rem;
+                margin-bottom:10px;
+                margin-top:0px;
+                box-shadow:0 1px 2px rgba(0,0,0,0.04);
+                border:1px solid #ededed;
+                ">
+                <div style="display:flex;align-items:center;gap:10px;">
+                    <span style="font-size:1.35rem;margin-right:6px;">🎮</span>
+                    <b style="font-size:1.04rem;">Sistema de Recompensas</b>
+                    <span style="flex:1;"></span>
+                    <span style="font-size:0.97rem;display:flex;align-items:center;gap:2px;">
+                        🥇
+                        <span style="margin-left:2px;margin-right:10px;"><b>{puntos:,}</b></span>
+                        🌟
+                        <span style="margin-left:2px;margin-right:10px;"><b>{nivel}</b></span>
+                        🏆
+                        <span style="margin-left:2px;"><b>{insignias}</b></span>
+                    </span>
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    def update_user_rewards(user_email, puntos_delta=0, tareas_completadas=0, dias_constancia=0, insignias_delta=0):
+        conn = sqlite3.connect("enterprise_flow.db")
+        c = conn.cursor()
+        c.execute("SELECT puntos, nivel, insignias, tareas_completadas, dias_constancia FROM user_rewards WHERE user_email=?", (user_email,))
+        row = c.fetchone()
+        if row:
+            puntos, nivel, insignias, tareas, dias = row
+            puntos += puntos_delta
+            tareas += tareas_completadas
+            dias += dias_constancia
+            nivel = max(1, puntos // 500 + 1)
+            insignias += insignias_delta
+            c.execute("""
+                UPDATE user_rewards
+                SET puntos=?, nivel=?, insignias=?, tareas_completadas=?, dias_constancia=?, updated_at=CURRENT_TIMESTAMP
+                WHERE user_email=?
+            """, (puntos, nivel, insignias, tareas, dias, user_email))
+        else:
+            c.execute("""
+                INSERT INTO user_rewards (user_email, puntos, nivel, insignias, tareas_completadas, dias_constancia)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (user_email, puntos_delta, 1, insignias_delta, tareas_completadas, dias_constancia))
+        conn.commit()
+        conn.close()
+    
+    def _show_login(self):
+        with st.sidebar:
+            st.header("Bienvenido a EnterpriseFlow")
+            tab1, tab2 = st.tabs(["Iniciar Sesión", "Registrarse"])
+
+            with tab1:
+                email_login = st.text_input("Correo electrónico").strip().lower()
+                password_login = st.text_input("Contraseña", type="password")
+                if st.button("Ingresar"):
+                    if self.db.verify_user(email_login, password_login):
+                        st.session_state.logged_in = True
+                        st.session_state.current_user = email_login
+                        st.rerun()
+                    else:
+                        st.error("Credenciales incorrectas")
+
+            with tab2:
+                email_register = st.text_input("Correo para registro").strip().lower()  # Corrected line
+                password_register = st.text_input("Contraseña nueva", type="password")
+                if st.button("Crear Cuenta"):
+                    try:
+                        self.db.create_user(email_register, password_register)
+                        st.success("¡Cuenta creada exitosamente!")
+                    except sqlite3.IntegrityError:
+                        st.error("Este correo ya está registrado")
+                    
+    def _show_main_interface(self):
+        menu = st.sidebar.radio(
+            "Menú Principal",
+            ["🏠 Inicio", "📁 Documentos", "🤖 Automatización", "😌 Bienestar", "🎓 Aprendizaje", "🔒 Feedback Anónimo", "⚖️ Cumplimiento", "💳 Suscripción"]
+        )
+        
+        if menu == "🏠 Inicio":
+            self._show_dashboard()
+        elif menu == "📁 Documentos":
+            self._show_documents()
+        elif menu == "🤖 Automatización":
+            self._show_automation()
+        elif menu == "😌 Bienestar":
+            self._show_wellness()
+        elif menu == "🎓 Aprendizaje":
+            self._learning_portal()
+        elif menu == "🔒 Feedback Anónimo":
+            self._show_feedback_system()
+        elif menu == "⚖️ Cumplimiento":
+            self._show_compliance()
+        elif menu == "💳 Suscripción":
+            self._show_payment()
+
+    # app/sections/automation.py
+    def show_automation_preview(config):
+        with st.expander("Vista Previa del Flujo"):
+            st.graphviz_chart(f"""
+            digraph {{
+               {config['trigger']} -> {config['action']}
+               {config['action']} -> {config['notification']}
+            }}
+            """)
+            
+    def _show_dashboard(self):
+        st.title("Panel de Control")
+        st.write(f"Bienvenido: [{st.session_state.current_user}](mailto:{st.session_state.current_user})")
+
+        # --- SECCIÓN TUTORIALES ---
+        st.markdown("---")
+        st.header("📖 Tutoriales: Introducción a como usar EnterpriseFlow")
+         
+        with st.expander("🤖 Automatización de Tareas"):
+            st.markdown("""
+            1. Ve al menú lateral y selecciona **Automatización**.
+            2. Completa los campos para crear una factura, programar tareas o configurar envíos de emails masivos.
+            3. Haz clic en los botones correspondientes para guardar o ejecutar cada acción.
+            4. Observa la vista previa de tus automatizaciones y revisa los resultados en tiempo real.
+            """)
+
+        with st.expander("😌 Bienestar del Equipo"):
+            st.markdown("""
+            1. Accede a la sección **Bienestar** en el menú.
+            2. Usa el panel para calcular el riesgo de burnout y registra reconocimientos a tus colegas.
+            3. Explora los módulos de salud, descansos programados, aprendizaje y metas personales.
+            4. Personaliza y guarda tus propios datos de salud para llevar tu propio registro.
+            """)
+
+        with st.expander("🔒 Feedback Anónimo"):
+            st.markdown("""
+            1. Selecciona **Feedback Anónimo** en el menú lateral.
+            2. Elige el tipo de feedback y escribe tu mensaje de forma confidencial.
+            3. Haz clic en **Enviar Feedback** para que la administración lo reciba sin conocer tu identidad.
+            """)
+
+        with st.expander("⚖️ Cumplimiento y Auditoría"):
+            st.markdown("""
+            1. En el menú, haz clic en **Cumplimiento**.
+            2. Sube documentos para auditoría normativa (GDPR, SOX, ISO27001, etc.).
+            3. Revisa los resultados automáticos y asegúrate de que tus archivos cumplen con los estándares requeridos.
+            """)
+
+        st.info("¿Necesitas más ayuda? Contacta a soporte o revisa la documentación oficial para ver videos y guías paso a paso.")
+
+    def _show_documents(self):
+        st.header("📁 Gestor de Documentos")
+        st.markdown("Sube, escanea, entrega y gestiona tus documentos digitales.")
+
+        # Subida de documentos
+        uploaded_file = st.file_uploader("Sube un documento (PDF, imagen, Word)", type=["pdf", "png", "jpg", "jpeg", "tif", "tiff", "docx"])
+        user = st.session_state.current_user
+
+        if uploaded_file:
+            # El catálogo (document_catalog.py) no vuelve a guardar el mismo contenido en cada rerun
+            documento, nuevo = get_services().documents.add(user, uploaded_file.name, uploaded_file, uploaded_file.type)
+            if nuevo:
+                st.success(f"Documento '{uploaded_file.name}' guardado correctamente.")
+            else:
+                st.info(f"'{uploaded_file.name}' ya estaba en tus documentos.")
+
+            # El texto se extrae una vez por contenido (text_extraction.py); los reruns lo leen de la caché.
+            # La búsqueda se indexa con ese mismo texto, a medida que se muestra: no hay una extracción aparte
+            cache = get_services().extraction_cache
+            kind = detect_kind(uploaded_file.type, uploaded_file.name)
+            if kind == "pdf":
+                with st.expander("📄 Escanear PDF (extraer texto)"):
+                    self._show_pdf_text(uploaded_file.getvalue(), cache, documento)
+                with st.expander("🔎 PDF escaneado (OCR)"):
+                    if st.button("Aplicar OCR a las páginas", key="ocr_pdf"):
+                        self._show_ocr(uploaded_file.getvalue(), "scan", cache)
+            elif kind == "image":
+                with st.expander("🔎 Escanear Imagen (OCR)"):
+                    self._show_ocr(uploaded_file.getvalue(), "image", cache, documento)
+            elif kind == "docx":
+                with st.expander("📄 Leer Word"):
+                    try:
+                        text = extract_text(uploaded_file.getvalue(), "docx", cache)
+                        st.text_area("Texto extraído", value=text, height=200)
+                        self._index_upload(documento, [text])
+                    except ImportError:
+                        st.warning("python-docx necesario para abrir archivos Word.")
+
+        # Listar documentos subidos por el usuario
+        st.markdown("### Tus documentos subidos")
+        busqueda = st.text_input("🔍 Buscar en tus documentos", placeholder='palabras o "una frase exacta"')
+        if busqueda.strip():
+            self._show_search_results(user, busqueda)
+        else:
+            self._show_document_list(user)
+
+        st.markdown("---")
+        st.header("🧾 Generar y Enviar Recibo Digital")
+
+        with st.form("generate_receipt"):
+            nombre = st.text_input("Nombre del receptor")
+            monto = st.number_input("Monto", min_value=0.0)
+            concepto = st.text_input("Concepto del recibo")
+            email_receptor = st.text_input("Email para enviar recibo")
+            submit = st.form_submit_button("Generar Recibo PDF y Enviar por Email")
+
+            if submit and nombre and monto and concepto and email_receptor:
+                # Crear PDF de recibo en memoria (¡NO en disco!)
+                pdf_bytes = render_receipt(nombre, monto, concepto, user)
+                self.db.save_receipt(user, nombre, monto, concepto, email_receptor, pdf_bytes)
+                st.success("Recibo PDF generado correctamente.")
+                st.download_button("Descargar recibo PDF", data=pdf_bytes, file_name="recibo.pdf", mime="application/pdf")
+
+                # El envío lo hace el worker de correo (mailer.py); aquí solo se encola
+                body = f"Estimado/a {nombre},\nAdjunto encontrará su recibo digital por el concepto: {concepto}."
+                enqueue_email(self.db, email_receptor, "Recibo Digital", body, [("recibo.pdf", pdf_bytes)],
+                              user_email=user, kind="recibo")
+                st.success(f"Recibo en cola de envío a {email_receptor}.")
+
+    DOCUMENTS_PER_PAGE = 20
+
+    def _needs_index(self, documento):
+        return documento is not None and not get_services().search.is_indexed(documento["id"])
+
+    def _index_upload(self, documento, pages):
+        """Indexa para la búsqueda (search_index.py) las páginas ya extraídas para mostrarlas, una vez por documento."""
+        if not self._needs_index(documento):
+            return
+        try:
+            get_services().search.index_document(documento["id"], documento["dueño"], pages)
+        except Exception as e:
+            st.warning(f"No se pudo indexar el documento: {str(e)}")
+
+    def _show_search_results(self, user, busqueda):
+        resultados = get_services().search.search(user, busqueda, limit=self.DOCUMENTS_PER_PAGE)
+        if not resultados:
+            st.info("Ningún documento contiene esas palabras.")
+            return
+        for r in resultados:
+            st.markdown(f"📄 **{r['nombre']}** · página {r['pagina']}  \n{r['fragmento']}")
+
+    def _show_document_list(self, user):
+        """Lista paginada desde la tabla documents; los bytes se leen solo del documento que se va a descargar."""
+        catalog = get_services().documents
+        total = catalog.count(user)
+        if not total:
+            st.info("Aún no has subido documentos.")
+            return
+        pages = (total + self.DOCUMENTS_PER_PAGE - 1) // self.DOCUMENTS_PER_PAGE
+        page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, value=1, key="docs_page") if pages > 1 else 1
+        selected = st.session_state.get("doc_download")
+        for doc in catalog.list(user, page, self.DOCUMENTS_PER_PAGE):
+            cols = st.columns([6, 2, 2])
+            cols[0].write(f"📄 {doc['nombre']}")
+            cols[1].caption(f"{doc['tamaño'] / 1024:,.1f} KB · {str(doc['subido'])[:10]}")
+            if selected == doc["id"]:
+                data = catalog.read(user, doc["id"])
+                if data is None:
+                    cols[2].warning("El archivo ya no está disponible.")
+                else:
+                    cols[2].download_button("Descargar", data=data, file_name=doc["nombre"],
+                                            mime=doc["tipo"] or "application/octet-stream", key=f"dl_{doc['id']}")
+            elif cols[2].button("Preparar descarga", key=f"prep_{doc['id']}"):
+                st.session_state.doc_download = doc["id"]
+                st.rerun()
+
+    # Texto que se muestra en pantalla de un PDF; el resto sigue disponible en la descarga
+    PDF_PREVIEW_CHARS = 200_000
+
+    def _show_pdf_text(self, data, cache, documento=None):
+        """
+        Extrae el PDF página por página mostrando el avance (pdf_extraction.py).
+        Si se extrajo el documento entero, esas mismas páginas se indexan para la búsqueda.
+        """
+        try:
+            total = page_count(data)
+        except Exception as e:
+            st.error(f"No se pudo abrir el PDF: {str(e)}")
+            return
+        spec = st.text_input(f"Páginas a extraer (1-{total}, ej. 1-5, 8; vacío = todas)", key="pdf_pages")
+        try:
+            pages = parse_page_range(spec, total)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        progress = st.progress(0.0, text="Extrayendo texto…")
+        preview, shown = [], 0
+        to_index = [] if len(pages) == total and self._needs_index(documento) else None
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as full_text:
+            for done, (number, count, text) in enumerate(stream_pdf_pages(data, cache, pages), 1):
+                full_text.write(f"--- Página {number} ---\n{text}\n")
+                if to_index is not None:
+                    to_index.append(text)
+                if shown < self.PDF_PREVIEW_CHARS:
+                    chunk = f"--- Página {number} ---\n{text}\n"[:self.PDF_PREVIEW_CHARS - shown]
+                    preview.append(chunk)
+                    shown += len(chunk)
+                progress.progress(done / count, text=f"Página {number} ({done}/{count})")
+            progress.empty()
+            if to_index is not None:
+                self._index_upload(documento, to_index)
+            st.text_area("Texto extraído", value="".join(preview), height=200)
+            if shown >= self.PDF_PREVIEW_CHARS:
+                st.caption("El texto en pantalla está recortado; descarga el archivo para verlo completo.")
+            full_text.seek(0)
+            st.download_button("Descargar texto", data=full_text, file_name="texto_extraido.txt",
+                               mime="text/plain")
+
+    def _show_ocr(self, data, kind, cache, documento=None):
+        """OCR en el pool del servidor (ocr.py) con avance y tiempo por página; indexa la imagen para la búsqueda."""
+        try:
+            if kind == "image":
+                # Miniatura en vez del original: una foto de 10 MB no viaja entera al navegador
+                st.image(thumbnail(data), caption="Imagen subida")
+            progress = st.progress(0.0, text="Reconociendo texto…")
+            result = ocr_document(data, kind, cache, get_services().ocr,
+                                  lambda done, total: progress.progress(done / total, text=f"Página {done}/{total}"))
+            progress.empty()
+        except ImportError:
+            st.warning("pytesseract y pillow necesarios para OCR de imagen. Instálalos con pip si quieres esta función.")
+            return
+        except Exception as e:
+            st.error(f"Error en el OCR: {str(e)}")
+            return
+        if kind == "image":
+            self._index_upload(documento, [result["texto"]])
+        st.text_area("Texto extraído (OCR)", value=result["texto"].replace("\f", "\n"), height=200)
+        if result["desde_cache"]:
+            st.caption("Texto reutilizado de un OCR anterior del mismo archivo.")
+        elif result["paginas"]:
+            st.caption(f"{len(result['paginas'])} página(s) en {result['segundos']:.1f} s")
+            if len(result["paginas"]) > 1:
+                st.dataframe(pd.DataFrame(result["paginas"]), hide_index=True)
+
+    def _show_automation(self):
+        with st.expander("🤖 Automatización de Tareas", expanded=True):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.subheader("Generador de Facturas Mejorado")
+                client_name = st.text_input("Nombre del Cliente")
+                subtotal = st.number_input("Subtotal", min_value=0.0)
+                client_address = st.text_input("Dirección del Cliente")
+                client_email = st.text_input("Correo Electrónico del Cliente")
+                send_whatsapp = st.checkbox("Enviar por WhatsApp (simulado)")
+                custom_message = st.text_area("Mensaje personalizado para el cliente", value="Gracias por su compra.")
+                template = st.selectbox("Plantilla de Factura", ["Estándar", "Moderna"])  # Puedes expandir esto
+
+                if st.button("Generar y Enviar Factura"):
+                    iva_rate = iva_rate_for(client_address)
+                    total = round(subtotal * (1 + iva_rate), 2)
+                    invoice_number = f"INV-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+                    pdf_bytes = generate_invoice_pdf(client_name, subtotal, iva_rate, total, invoice_number, template)
+
+                    # Guardar en la base de datos
+                    self.db.save_invoice(
+                        st.session_state.current_user,
+                        client_name, client_email, client_address,
+                        subtotal, iva_rate, total, invoice_number, pdf_bytes
+                    )
+
+                    # Log de acción
+                    self.db.log_invoice_action(invoice_number, st.session_state.current_user, "generada")
+
+                    # Envío por email: se encola y el worker marca la factura como enviada al entregarla
+                    send_invoice_email(
+                        self.db, client_email, invoice_number, total, pdf_bytes, custom_message,
+                        user_email=st.session_state.current_user
+                    )
+                    self.db.log_invoice_action(invoice_number, st.session_state.current_user, "email en cola")
+                    st.success(f"Factura en cola de envío a {client_email}.")
+
+                    # WhatsApp (simulado)
+                    if send_whatsapp:
+                        # Aquí iría la lógica real de WhatsApp API.
+                        st.info(f"Factura simulada enviada a WhatsApp de {client_name}")
+                        self.db.log_invoice_action(invoice_number, st.session_state.current_user, "enviada por whatsapp")
+    
+                with st.container(border=True):
+                    st.markdown("**📑 Facturación por lote**")
+                    clients_csv = st.file_uploader("Clientes (CSV: client_name, client_email, client_address, subtotal, external_ref)", type=["csv"])
+                    batch_message = st.text_input("Mensaje para los clientes", value="Gracias por su compra.")
+                    if clients_csv and st.button("Generar facturas del lote"):
+                        status = st.empty()
+                        invoicer = BatchInvoicer(self.db, st.session_state.current_user, template=template, message=batch_message)
+                        report = invoicer.run(clients_csv, progress=lambda done: status.info(f"{done} filas procesadas..."))
+                        status.empty()
+                        st.success(
+                            f"{report['creadas']} facturas creadas, {report['omitidas']} ya facturadas, "
+                            f"{report['correos']} correos en cola · {report['facturas_por_segundo']} facturas/seg"
+                        )
+                        if report['errores']:
+                            st.warning(f"{len(report['errores'])} filas con errores")
+                            st.dataframe(pd.DataFrame(report['errores']))
+
+            st.markdown("### Facturas Generadas")
+            facturas = self.db.get_invoices_by_user(st.session_state.current_user)
+            st.dataframe(pd.DataFrame(facturas))
+            if facturas:
+                invoice_number = st.selectbox("Descargar factura", [f["Número"] for f in facturas])
+                # El PDF se lee del almacén de blobs solo cuando se pide, no en cada rerun
+                ready = st.session_state.get("invoice_pdf")
+                if ready is None or ready[0] != invoice_number:
+                    ready = None
+                    if st.button("Preparar PDF"):
+                        pdf = self.db.open_invoice_pdf(st.session_state.current_user, invoice_number)
+                        if pdf is None:
+                            st.error("El PDF de esta factura no está disponible")
+                        else:
+                            with pdf:
+                                ready = st.session_state.invoice_pdf = (invoice_number, pdf.read())
+                if ready is not None:
+                    st.download_button("Descargar PDF", data=ready[1], file_name=f"Factura_{invoice_number}.pdf", mime="application/pdf")
+
+            with col2:
+                st.subheader("Programación de Tareas Mejorada")
+                task_type = st.selectbox("Tipo de Tarea", ["Reporte", "Recordatorio", "Backup"])
+                schedule_time = st.time_input("Hora de Ejecución")
+                responsible = st.text_input("Responsable (email)")
+                notification_method = st.selectbox("Notificación", ["Email", "Slack", "WhatsApp"])
+                if st.button("Programar Tarea Mejorada"):
+                   self.db.save_automation_task(
+                       st.session_state.current_user, {
+                           'type': task_type,
+                           'schedule': schedule_time.strftime("%H:%M"),
+                           'responsible': responsible,
+                           'notification_method': notification_method
+                        }
+                   )
+                st.success("Tarea programada exitosamente")
+            st.markdown("### Historial de Tareas")
+            tasks = self.db.get_automation_tasks(st.session_state.current_user)
+            st.dataframe(pd.DataFrame(tasks))
+        
+            with col3:
+                st.subheader("Nuevas Automatizaciones Mejoradas")
+                st.markdown("**Selecciona una plantilla o crea tu automatización personalizada:**")
+                plantilla = st.selectbox("Plantillas", ["Enviar reporte diario", "Backup semanal", "Notificar stock bajo", "Personalizada"])
+                if plantilla != "Personalizada":
+                    task_type, schedule, notification = {
+                        "Enviar reporte diario": ("Reporte", "08:00", "Email"),
+                        "Backup semanal": ("Backup", "Domingo 03:00", "Email"),
+                        "Notificar stock bajo": ("Alerta", "Inmediato", "Email"),
+                    }[plantilla]
+                    st.info(f"Plantilla seleccionada: {plantilla}")
+                else:
+                    task_type = st.text_input("Tipo de tarea (custom)")
+                    schedule = st.text_input("Horario o trigger", help="Ej.: 08:00, Domingo 03:00, lunes a viernes 09:00, Inmediato o una expresión cron")
+                    notification = st.text_input("Método de notificación")
+
+                if st.button("Guardar Automatización"):
+                    try:
+                        self.db.save_automation_task(
+                            st.session_state.current_user, {
+                                'type': task_type,
+                                'schedule': schedule,
+                                'responsible': st.session_state.current_user,
+                                'notification_method': notification
+                            }
+                        )
+                        self.db.log_automation_task_creation(st.session_state.current_user, task_type)
+                        st.success("Automatización guardada")
+                    except ValueError as e:
+                        st.error(f"Horario inválido: {e}")
+
+                st.markdown("### Vista previa del flujo")
+                show_automation_preview({
+                    "trigger": schedule,
+                    "action": task_type,
+                    "notification": notification
+                })
+                
+                with st.container(border=True):
+                    st.markdown("**📧 Email Masivo**")
+                    email_subject = st.text_input("Asunto del Email")
+                    email_template = st.text_area("Plantilla HTML", help="Usa {{ nombre }} o cualquier columna del CSV")
+                    recipients_csv = st.file_uploader("Destinatarios (CSV con columna email)", type=["csv"])
+                    send_at = st.text_input("Envío", value="Inmediato", help="Inmediato o un horario, p. ej. 08:00")
+                    if st.button("Programar Envío"):
+                        if not recipients_csv:
+                            st.error("Sube el CSV de destinatarios")
+                        else:
+                            # El CSV se guarda en disco y la campaña lo lee por bloques al enviar
+                            os.makedirs("campaign_lists", exist_ok=True)
+                            csv_path = os.path.join("campaign_lists", f"{uuid.uuid4().hex}.csv")
+                            with open(csv_path, "wb") as f:
+                                shutil.copyfileobj(recipients_csv, f)
+                            try:
+                                # Tarea y campaña en una sola transacción (ver create_campaign)
+                                create_campaign(self.db, st.session_state.current_user, email_subject, email_template,
+                                                csv_path=csv_path, schedule=send_at)
+                                st.success("Envío programado!")
+                            except ValueError as e:
+                                os.remove(csv_path)  # sin campaña nadie va a leer el archivo
+                                st.error(f"No se pudo programar: {e}")
+                            except Exception:
+                                os.remove(csv_path)
+                                raise
+
+                    for campaign in get_campaigns(self.db, st.session_state.current_user):
+                        st.caption(f"{campaign['Asunto']} · {campaign['Estado']} · {campaign['Enviados']}/{campaign['Total']} ({campaign['Progreso']})")
+                        if campaign['Estado'] in ("pendiente", "en_curso") and st.button("Pausar", key=f"pause_campaign_{campaign['id']}"):
+                            pause_campaign(self.db, campaign['id'])
+                            st.rerun()
+                        if campaign['Estado'] == "pausada" and st.button("Reanudar", key=f"resume_campaign_{campaign['id']}"):
+                            resume_campaign(self.db, campaign['id'])
+                            st.rerun()
+                
+                with st.container(border=True):
+                    st.markdown("**🔄 Sync CRM**")
+                    crm_action = st.selectbox("Acción", ["Actualizar clientes", "Importar leads"])
+                    sync_frequency = st.selectbox("Frecuencia", ["Diario", "Semanal", "Mensual"])
+                    if st.button("Configurar Sync"):
+                        try:
+                            self.db.save_automation_task(st.session_state.current_user, {
+                                'type': 'crm_sync',
+                                'action': crm_action,
+                                'frequency': sync_frequency
+                            })
+                            st.success("Sincronización configurada")
+                        except ValueError as e:
+                            st.error(f"Horario inválido: {e}")
+
+            with st.container():
+                st.subheader("Automatizaciones Avanzadas Mejoradas")
+                st.markdown("**Carga tu propio script Python para automatización avanzada:**")
+                name = st.text_input("Nombre de la automatización")
+                script = st.text_area("Script Python (función run())")
+                if st.button("Guardar Script"):
+                    _, version = self.db.save_advanced_automation(st.session_state.current_user, name, script)
+                    st.success(f"Script guardado (v{version}).")
+
+                # Los scripts corren en el pool del sandbox (sandbox.py), no en este hilo:
+                # guardamos los futures en la sesión y mostramos el resultado en el siguiente rerun.
+                sandbox = get_services().sandbox
+                running = st.session_state.setdefault("advanced_runs", {})
+                advs = self.db.get_advanced_automations(st.session_state.current_user)
+                if advs:
+                    st.markdown("### Tus Automatizaciones Avanzadas")
+                    if st.button("Ejecutar todas"):
+                        for adv in advs:
+                            running[adv['id']] = sandbox.submit(adv, st.session_state.current_user)
+                for adv in advs:
+                    st.markdown(f"**{adv['name']}** (v{adv['version']})")
+                    run_col, rollback_col = st.columns(2)
+                    if run_col.button(f"Ejecutar {adv['name']}", key=f"run_adv_{adv['id']}"):
+                        running[adv['id']] = sandbox.submit(adv, st.session_state.current_user)
+                    if adv['version'] > 1 and rollback_col.button(f"Rollback {adv['name']} (v{adv['version']})", key=f"rollback_adv_{adv['id']}"):
+                        previous = sandbox.rollback(adv['id'])
+                        running.pop(adv['id'], None)
+                        st.info(f"Rollback realizado: activa la v{previous['version']}." if previous else "No hay versión anterior.")
+                        st.rerun()
+
+                    future = running.get(adv['id'])
+                    if future is None:
+                        continue
+                    if not future.done():
+                        st.info("Ejecutando... actualiza para ver el resultado.")
+                        continue
+                    result = sandbox.result(running.pop(adv['id']))
+                    if result['status'] == "exitoso":
+                        st.success(f"Resultado: {result['output']} ({result['duration_ms']} ms)")
+                    else:
+                        st.error(f"Error: {result['error']}")
+
+    def get_smtp_settings(email):
+        domain = email.split('@')[-1].lower()
+        if domain == "gmail.com":
+            return "smtp.gmail.com", 587
+        elif domain in ["hotmail.com", "outlook.com", "live.com"]:
+            return "smtp.office365.com", 587
+        elif domain == "yahoo.com":
+            return "smtp.mail.yahoo.com", 587
+        elif domain in ["icloud.com", "me.com"]:
+            return "smtp.mail.me.com", 587
+        elif domain == "zoho.com":
+            return "smtp.zoho.com", 587
+        else:
+            # Por defecto, podrías pedir al usuario que lo indique
+            raise ValueError("Proveedor de correo no soportado automáticamente")
+
+    # Uso:
+    sender_email = "usuario@hotmail.com"
+    smtp_server, smtp_port = get_smtp_settings(sender_email)
+    
+    def _generate_invoice(self, data):
+        iva_rate = iva_rate_for(data['client_address'])
+        return {
+            'client': data['client_name'],
+            'total': round(data['subtotal'] * (1 + iva_rate), 2),
+            'compliance_check': self._check_compliance(data),
+            'invoice_number': f"INV-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'date': datetime.datetime.now().strftime("%d/%m/%Y"),
+            'pdf_data': b''
+        }
+
+    def _check_compliance(self, data):
+        return True
+
+    def _show_wellness(self):
+        st.markdown("---")
+        st.subheader("🩺 Ficha Médica del Empleado")
+        user = st.session_state.current_user
+
+        apellido = st.text_input("Apellido del empleado", key=f"apellido_ficha_medica_{user}")
+        nombre = st.text_input("Nombre del empleado", key=f"nombre_ficha_medica_{user}")
+
+        # Uploader y botón guardar documento
+        uploaded_file = st.file_uploader(
+            "Adjunta un documento médico (PDF, imagen, Word)",
+            type=["pdf", "png", "jpg", "jpeg", "docx"],
+            key=f"adjunto_ficha_{user}"
+        )
+        guardar_doc = st.button("Guardar Documento", key=f"guardar_doc_{user}")
+
+        # Carpeta del empleado
+        mostrar_archivos = False
+        empleado_folder = None
+        if apellido and nombre:
+            empleado_folder = f"fichas_medicas/{apellido}_{nombre}"
+
+        if guardar_doc:
+            if uploaded_file and empleado_folder:
+                os.makedirs(empleado_folder, exist_ok=True)
+                save_path = f"{empleado_folder}/{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uploaded_file.name}"
+                with open(save_path, "wb") as f:
+                    f.write(uploaded_file.getbuffer())
+                st.success(f"Documento '{uploaded_file.name}' guardado en la carpeta del empleado.")
+                mostrar_archivos = True
+            elif not uploaded_file:
+                st.error("Debes seleccionar un archivo para guardar.")
+            elif not (apellido and nombre):
+                st.error("Debes ingresar Apellido y Nombre para guardar el documento.")
+
+        # Mostrar archivos si hay carpeta disponible
+        if empleado_folder and os.path.exists(empleado_folder):
+            archivos = os.listdir(empleado_folder)
+            if archivos:
+                st.markdown(f"#### Archivos de {apellido} {nombre}:")
+                for archivo in archivos:
+                    col1, col2 = st.columns([8,2])
+                    with col1:
+                        st.write(f"📄 {archivo}")
+                        with open(os.path.join(empleado_folder, archivo), "rb") as f:
+                            st.download_button(
+                                label="Descargar",
+                                data=f.read(),
+                                file_name=archivo,
+                                mime="application/octet-stream",
+                                key=f"descargar_{archivo}_{user}"
+                            )
+                    with col2:
+                        if st.button("Eliminar", key=f"eliminar_{archivo}_{user}"):
+                            try:
+                                os.remove(os.path.join(empleado_folder, archivo))
+                                st.success(f"Archivo {archivo} eliminado.")
+                                st.experimental_rerun()
+                            except Exception as e:
+                                st.error(f"No se pudo eliminar: {e}")
+            else:
+                st.info("No hay archivos médicos para este empleado.")
+
+        # FICHA MÉDICA
+        ficha = self.db.get_medical_record(user)
+
+        with st.form(key=f"ficha_medica_form_{user}"):
+            patologia = st.text_input("Patología principal", value=ficha.get("patologia", "") if ficha else "", key=f"patologia_{user}")
+            enfermedades = st.text_area("Otras enfermedades", value=ficha.get("enfermedades", "") if ficha else "", key=f"enfermedades_{user}")
+            embarazo = st.checkbox("Embarazo", value=bool(ficha.get("embarazo", 0)) if ficha else False, key=f"embarazo_{user}")
+            observaciones = st.text_area("Observaciones", value=ficha.get("observaciones", "") if ficha else "", key=f"observaciones_{user}")
+
+            # Submit button (sin key extra, solo label)
+            guardar_ficha = st.form_submit_button("Guardar ficha médica")
+
+            if guardar_ficha:
+                # Guardar en base de datos, añade los parámetros requeridos por tu método
+                try:
+                    self.db.save_medical_record(
+                        user, patologia, enfermedades, embarazo, observaciones,
+                        apellido=apellido, nombre=nombre, file_path=None # file_path puede ser None si no quieres forzar archivo
+                    )
+                    st.success("Ficha médica actualizada correctamente.")
+                except Exception as e:
+                    st.error(f"Error al guardar ficha médica: {e}")
+        
+        st.markdown("---")
+        st.subheader("📋 Faltas y Permisos de Salud")
+        with st.form("solicitar_permiso"):
+            tipo = st.selectbox("Tipo de permiso", ["Vacaciones", "Enfermedad", "Otro"])
+            fecha_inicio = st.date_input("Desde")
+            fecha_fin = st.date_input("Hasta")
+            motivo = st.text_input("Motivo")
+            observaciones = st.text_area("Observaciones")
+            if st.form_submit_button("Solicitar permiso"):
+                self.db.save_leave_request(user, tipo, fecha_inicio, fecha_fin, motivo, observaciones)
+                st.success("Permiso solicitado.")
+
+
+        
+        # Mostrar historial
+        st.markdown("### Permisos solicitados")
+        leaves = self.db.get_leave_requests(user)
+        if leaves:
+            for lv in leaves:
+                st.markdown(f"- **{lv['tipo_permiso']}**: {lv['fecha_inicio']} a {lv['fecha_fin']} ({lv['estado']})<br> Motivo: {lv['motivo']}<br>Obs: {lv['observaciones']}", unsafe_allow_html=True)
+        else:
+            st.info("Aún no has registrado permisos.")
+        
+        # ... el resto de tu módulo de bienestar ...
+
+        with st.expander("😌 Bienestar del Equipo", expanded=True):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader("Predicción de Burnout")
+                hours_worked = st.slider("Horas trabajadas esta semana", 0, 100, 40)
+                if st.button("Calcular Riesgo"):
+                    prediction = self._predict_burnout(np.array([[hours_worked, 0, 0, 0, 0]]))
+                    st.metric("Riesgo de Burnout", f"{prediction}%")
+
+            with col2:
+                st.subheader("Sistema de Reconocimiento")
+                colleague = st.text_input("Nombre del Colega")
+                colleague_email = st.text_input("Email del Colega")
+                recognition = st.text_area("Mensaje de Reconocimiento")
+                signing_authority = st.selectbox("Firmante", ["CEO", "Gerente General"])
+                
+                if st.button("Enviar 🏆"):
+                    certificate_data = self._generate_certificate(
+                        colleague=colleague,
+                        recognition=recognition,
+                        signer=signing_authority
+                    )
+                    if not certificate_data:
+                        st.stop()
+                    cert_id = certificate_data['cert_id']
+                    self.db.save_recognition(
+                        st.session_state.current_user, colleague, recognition,
+                        cert_id=cert_id, pdf_bytes=certificate_data['pdf_bytes']
+                    )
+                    
+                    if self._send_recognition_email(colleague_email, certificate_data):
+                        st.success(f"Certificado enviado a {colleague_email}!")
+                        st.download_button(
+                            label = "Descargar Certificado",
+                            data = certificate_data['pdf_bytes'],
+                            file_name = f"Certificado_{cert_id}.pdf",
+                            mime = "application/pdf"
+                        )
+                    else:
+                        st.error("Error enviando el certificado")
+
+            st.markdown("---")
+            self._health_dashboard()
+            self._smart_breaks()
+            self._personal_goals()
+            self._meditation_module()
+            self._team_network()
+            self._workload_monitor()
+            self._gamification_system()
+    
+    def _generate_certificate(self, colleague, recognition, signer):
+        signer_key = signer.lower().replace(" ", "_")
+        try:
+            signature_path = st.secrets["signatures"][signer_key]
+        except KeyError:
+            st.error(f"❌ Firma no configurada para '{signer}'. Verifica secrets.toml")
+            return None
+        try:
+            # La firma se lee y decodifica una vez por proceso (pdf_engine.py)
+            return render_certificate(colleague, recognition, signer, signature_path)
+        except FileNotFoundError as e:
+            st.error(f"❌ {e}. Verifica la firma de '{signer}' en secrets.toml")
+            return None
+        except Exception as e:
+            st.error(f"🚨 Error al generar certificado: {str(e)}")
+            return None
+    
+    def _send_recognition_email(self, recipient, certificate_data):
+        try:
+            body = f"""
+            ¡Felicitaciones!
+            
+            Has recibido un reconocimiento oficial de la empresa.
+            Adjunto encontrarás tu certificado digital con validez oficial.
+            
+            ID del Certificado: {certificate_data['cert_id']}
+            """
+            enqueue_email(
+                self.db, recipient, "🏆 Reconocimiento Oficial - Tu Certificado", body,
+                [(f"Certificado_{certificate_data['cert_id']}.pdf", certificate_data['pdf_bytes'])],
+                user_email=st.session_state.current_user, kind="reconocimiento", reference=certificate_data['cert_id']
+            )
+            return True
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+            return False
+
+    def _predict_burnout(self, input_data):
+        try:
+            return min(100, int(input_data[0][0] * 1.5))
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+            return 0
+
+    def _show_feedback_system(self):
+        with st.expander("🔒 Sistema de Feedback Anónimo", expanded=True):
+            feedback_type = st.selectbox("Tipo de Feedback", ["Para el equipo", "Para liderazgo", "Sugerencias generales"])
+            feedback = st.text_area("Escribe tu feedback (máx. 500 caracteres)", max_chars=500)
+            if st.button("Enviar Feedback"):
+                self.db.save_anonymous_feedback(feedback_type, feedback)
+                st.success("¡Gracias por tu contribución! Tu feedback es anónimo.")
+
+    def _health_dashboard(self):
+        with st.container(border=True):
+            st.subheader("📊 Panel de Salud Integral")
+
+            # Cargar los datos del usuario
+            user = st.session_state.current_user
+            health_data = self.db.get_health_data(user)
+            # Si no existen, usa valores por defecto
+            if not health_data:
+                health_data = {'dias': 0, 'sueno': 0.0, 'pasos': 0}
+
+            # Inputs para que el usuario pueda cambiarlos
+            dias = st.number_input("Días sin incidentes", min_value=0, value=health_data['dias'])
+            sueno = st.number_input("Horas Sueño Promedio", min_value=0.0, step=0.1, value=health_data['sueno'])
+            pasos = st.number_input("Pasos Diarios", min_value=0, value=health_data['pasos'])
+
+            if st.button("Guardar mis registros de salud"):
+                self.db.save_health_data(user, dias, sueno, pasos)
+                st.success("¡Datos guardados!")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("📅 Días sin incidentes", dias)
+            with col2:
+                st.metric("💤 Horas Sueño Promedio", sueno)
+            with col3:
+                st.metric("🚶 Pasos Diarios", pasos)
+
+    def _smart_breaks(self):
+        with st.container(border=True):
+            st.subheader("⏰ Programador de Descansos Inteligentes")
+            break_frequency = st.slider("Intervalo entre descansos (minutos)", 30, 120, 50)
+            break_duration = st.slider("Duración del descanso (minutos)", 5, 15, 7)
+            if st.button("Activar Recordatorios"):
+                self._schedule_breaks(break_frequency, break_duration)
+
+    def _schedule_breaks(self, frequency, duration):
+        st.session_state.break_config = {
+            'frequency': frequency,
+            'duration': duration
+        }
+        st.success(f"Descansos programados cada {frequency} minutos por {duration} minutos")
+
+    def _personal_goals(self):
+        st.header("🏆 Sistema de Metas Personales")
+        user = st.session_state.current_user
+
+        with st.form(key="add_goal_form"):
+            new_goal = st.text_input("Establece tu objetivo personal esta semana")
+            submitted = st.form_submit_button("Guardar Objetivo")
+            if submitted and new_goal.strip():
+                self.db.save_personal_goal(user, new_goal.strip())
+                st.success("¡Objetivo guardado!")
+
+        st.markdown("#### Tus objetivos de esta semana:")
+
+        goals = self.db.get_personal_goals(user)
+        if not goals:
+            st.info("Aún no tienes objetivos registrados.")
+        else:
+            for goal_id, goal_text in goals:
+                col1, col2, col3 = st.columns([6,2,2])
+                if "edit_goal" not in st.session_state:
+                    st.session_state["edit_goal"] = {}
+
+                # Mostrar en modo edición o como texto normal
+                if st.session_state["edit_goal"].get(goal_id, False):
+                    with col1:
+                        edited_text = st.text_input(f"Edita objetivo {goal_id}", value=goal_text, key=f"edit_input_{goal_id}")
+                    with col2:
+                        if st.button("Guardar", key=f"save_btn_{goal_id}"):
+                            self.db.edit_personal_goal(goal_id, edited_text)
+                            st.session_state["edit_goal"][goal_id] = False
+                            st.experimental_rerun()
+                    with col3:
+                        if st.button("Cancelar", key=f"cancel_btn_{goal_id}"):
+                            st.session_state["edit_goal"][goal_id] = False
+                            st.experimental_rerun()
+                else:
+                    with col1:
+                        st.write(goal_text)
+                    with col2:
+                        if st.button("Editar", key=f"edit_btn_{goal_id}"):
+                            st.session_state["edit_goal"][goal_id] = True
+                            st.experimental_rerun()
+                    with col3:
+                        if st.button("Eliminar", key=f"delete_btn_{goal_id}"):
+                            self.db.delete_personal_goal(goal_id)
+                            st.experimental_rerun()
+
+    def add_personal_goal(user_email, goal_text):
+        conn = sqlite3.connect("enterprise_flow.db")
+        c = conn.cursor()
+        c.execute("INSERT INTO personal_goals (user_email, goal_text) VALUES (?, ?)", (user_email, goal_text))
+        conn.commit()
+        conn.close()
+    
+    def _meditation_module(self):
+        with st.container(border=True):
+            st.subheader("🧘 Sesiones de Relajación")
+            duration_str = st.radio("Duración:", ["5 min", "10 min", "15 min"], key="meditation_duration")
+            minutes = int(duration_str.split()[0])
+            seconds = minutes * 60
+
+            # Ruta según la duración (cada archivo debe existir en assets/)
+            if minutes == 5:
+                audio_path = "assets/meditacion.mp3"
+            elif minutes == 10:
+                audio_path = "assets/meditacion2.mp3"
+            elif minutes == 15:
+                audio_path = "assets/meditacion3.mp3"
+            else:
+                st.error("Duración no soportada.")
+                return
+
+            # Leer el archivo MP3 solo una vez por cambio de audio
+            if (
+                "audio_bytes" not in st.session_state
+                or st.session_state.get("audio_path") != audio_path
+            ):
+                if os.path.exists(audio_path):
+                    with open(audio_path, "rb") as f:
+                        st.session_state["audio_bytes"] = f.read()
+                    st.session_state["audio_path"] = audio_path
+                else:
+                    st.session_state["audio_bytes"] = None
+                    st.session_state["audio_path"] = None
+
+            if st.session_state["audio_bytes"] is None:
+                st.error("No se encontró el archivo de audio de meditación para esta duración.")
+                return
+
+            if st.button("Iniciar Meditación Guiada", key="meditation_start_btn"):
+                st.session_state["meditation_active"] = True
+                st.session_state["meditation_start_time"] = time.time()
+                st.session_state["meditation_total_seconds"] = seconds
+
+            if st.session_state.get("meditation_active", False):
+                elapsed = int(time.time() - st.session_state["meditation_start_time"])
+                remaining = st.session_state["meditation_total_seconds"] - elapsed
+                mins, secs = divmod(max(remaining, 0), 60)
+                st.markdown(f"### ⏳ Tiempo restante: {mins:02d}:{secs:02d}")
+
+                st.audio(st.session_state["audio_bytes"], format="audio/mp3")
+                st.download_button(
+                    label="Descargar música de meditación (MP3)",
+                    data=st.session_state["audio_bytes"],
+                    file_name=os.path.basename(audio_path),
+                    mime="audio/mp3"
+                )
+
+                if remaining > 0:
+                    st.experimental_rerun()
+                else:
+                    st.session_state["meditation_active"] = False
+                    st.success("¡La sesión ha finalizado! Puedes abrir los ojos y continuar tu día.")
+    
+    def _team_network(self):
+        import json
+        st.subheader("👥 Mapa de Relaciones del Equipo")
+
+        user_key = f"team_graph_{st.session_state.current_user}"
+        if user_key not in st.session_state:
+            # Estructura inicial por defecto
+            st.session_state[user_key] = {
+                "nodes": ["CEO", "Gerente", "Equipo A", "Equipo B", "Miembro 1", "Miembro 2", "Miembro 3"],
+                "edges": [
+                    ("CEO", "Gerente"),
+                    ("Gerente", "Equipo A"),
+                    ("Gerente", "Equipo B"),
+                    ("Equipo A", "Miembro 1"),
+                    ("Equipo A", "Miembro 2"),
+                    ("Equipo B", "Miembro 3"),
+                ]
+            }
+
+        # Estado de edición
+        edit_state_key = f"edit_team_graph_{st.session_state.current_user}"
+        if edit_state_key not in st.session_state:
+            st.session_state[edit_state_key] = False
+
+        # Botón para alternar edición
+        if st.button("Editar" if not st.session_state[edit_state_key] else "Terminar Edición", key="edit_team_graph_btn"):
+             st.session_state[edit_state_key] = not st.session_state[edit_state_key]
+
+        graph = st.session_state[user_key]
+
+        if st.session_state[edit_state_key]:
+            st.markdown("#### Nodos (Personas/Equipos)")
+            with st.form("add_node_form"):
+                new_node = st.text_input("Agregar nuevo nodo (nombre)")
+                add_node = st.form_submit_button("Agregar Nodo")
+                if add_node and new_node.strip():
+                    if new_node not in graph["nodes"]:
+                        graph["nodes"].append(new_node.strip())
+                    else:
+                        st.warning("Ese nodo ya existe.")
+
+            if len(graph["nodes"]) > 0:
+                node_to_remove = st.selectbox("Eliminar nodo", [""] + graph["nodes"], key="remove_node")
+                if node_to_remove and st.button("Eliminar Nodo"):
+                    # Elimina el nodo y todas sus relaciones
+                    graph["nodes"].remove(node_to_remove)
+                    graph["edges"] = [e for e in graph["edges"] if e[0] != node_to_remove and e[1] != node_to_remove]
+
+            st.markdown("#### Flechas (Relaciones)")
+            if len(graph["nodes"]) >= 2:
+                with st.form("add_edge_form"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        from_node = st.selectbox("Desde", graph["nodes"], key="from_node")
+                    with col2:
+                        to_node = st.selectbox("Hacia", graph["nodes"], key="to_node")
+                    add_edge = st.form_submit_button("Agregar Flecha")
+                    if add_edge and from_node != to_node:
+                        if (from_node, to_node) not in graph["edges"]:
+                            graph["edges"].append((from_node, to_node))
+                        else:
+                            st.warning("Esa flecha ya existe.")
+
+            if len(graph["edges"]) > 0:
+                edge_to_remove = st.selectbox(
+                    "Eliminar flecha",
+                    [""] + [f"{a} → {b}" for a, b in graph["edges"]],
+                    key="remove_edge"
+                )
+                if edge_to_remove and st.button("Eliminar Flecha"):
+                     edge_tuple = tuple(edge_to_remove.split(" → "))
+                     if edge_tuple in graph["edges"]:
+                        graph["edges"].remove(edge_tuple)
+
+            # Actualiza el estado tras cambios
+            st.session_state[user_key] = graph
+
+         # Mostrar el grafo con graphviz
+        dot = "digraph {\n"
+        for node in graph["nodes"]:
+            dot += f'    "{node}" [shape=ellipse];\n'
+        for a, b in graph["edges"]:
+            dot += f'    "{a}" -> "{b}";\n'
+        dot += "}"
+        st.graphviz_chart(dot)
+
+    def _workload_monitor(self):
+        with st.container(border=True):
+            st.subheader("⚖️ Monitor de Carga de Trabajo")
+            current_load = st.slider("Tu carga actual (1-10)", 1, 10, 7)
+            ideal_load = st.slider("Carga ideal deseada (1-10)", 1, 10, 5)
+            if current_load > ideal_load:
+                st.error("¡Carga de trabajo excesiva!")
+            elif current_load < ideal_load:
+                st.warning("Capacidad disponible")
+            else:
+                st.success("Carga equilibrada")
+
+    def _gamification_system(self):
+        with st.container(border=True):
+            st.subheader("🎮 Sistema de Recompensas")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🏅 Puntos Acumulados", "1,250")
+            with col2:
+                st.metric("🌟 Nivel Actual", "5")
+            with col3:
+                st.metric("🏆 Insignias", "3/10")
+
+    def _learning_portal(self):
+        st.subheader("🎓 Plataforma de Aprendizaje")
+
+        user_key = f"learning_courses_{st.session_state.current_user}"
+        if user_key not in st.session_state:
+            st.session_state[user_key] = [
+                {
+                    "id": 1,
+                    "title": "Gestión del Tiempo",
+                    "progress": 0.4,
+                    "url": "https://www.udemy.com/course/gestion-del-tiempo/"
+                },
+               {
+                    "id": 2,
+                    "title": "Liderazgo Efectivo",
+                    "progress": 0.7,
+                    "url": "https://www.linkedin.com/learning/search?entityType=COURSE&keywords=liderazgo&language=es_ES"
+                },
+               {
+                    "id": 3,
+                    "title": "Inteligencia Emocional",
+                    "progress": 0.2,
+                    "url": "https://www.linkedin.com/learning/search?entityType=COURSE&keywords=inteligencia&language=es_ES"
+               }
+            ]
+
+        expander = st.expander("➕ Agregar nuevo curso vinculado", expanded=False)
+        with expander:
+            with st.form("add_course_form", clear_on_submit=True):
+                new_title = st.text_input("Nombre del curso")
+                new_url = st.text_input("Enlace al curso (Udemy, Coursera, Linkedin, etc.)")
+                submitted = st.form_submit_button("Agregar curso")
+                if submitted:
+                    if new_title and new_url:
+                        next_id = max([c["id"] for c in st.session_state[user_key]] + [0]) + 1
+                        st.session_state[user_key].append({
+                            "id": next_id,
+                            "title": new_title,
+                            "progress": 0.0,
+                            "url": new_url
+                        })
+                        st.success("¡Curso agregado!")
+                    else:
+                        st.warning("Completa todos los campos.")
+
+        for course in st.session_state[user_key]:
+            with st.container():
+                st.markdown(f"**{course['title']}**")
+                c1, c2 = st.columns([5,1])
+                with c1:
+                    st.progress(course["progress"])
+                with c2:
+                    st.markdown(
+                        f"<span style='font-size:18px;color:#007bff;font-weight:bold'>{int(course['progress']*100)}%</span>",
+                        unsafe_allow_html=True
+                    )
+                st.markdown(
+                    f"[Ir al curso]({course['url']})",
+                    unsafe_allow_html=True
+                )
+                new_prog = st.slider(
+                    "Actualizar progreso (%)",
+                    0, 100, int(course["progress"]*100),
+                    key=f"prog_{course['id']}")
+                if new_prog != int(course["progress"]*100):
+                    course["progress"] = new_prog / 100.0
+                    st.experimental_rerun()
+                if st.button(f"Eliminar {course['title']}", key=f"del_{course['id']}"):
+                    st.session_state[user_key] = [
+                        c for c in st.session_state[user_key] if c["id"] != course["id"]
+                    ]
+                    st.experimental_rerun()
+    
+    def _show_compliance(self):
+        with st.expander("⚖️ Auditoría Normativa", expanded=True):
+            uploaded_file = st.file_uploader("Subir Documento", type=["txt", "docx", "pdf"])
+            
+            if uploaded_file:
+                text = ""
+                try:
+                    kind = detect_kind(uploaded_file.type, uploaded_file.name) or "docx"
+                    text = extract_text(uploaded_file.getvalue(), kind, get_services().extraction_cache)
+                except Exception as e:
+                    st.error(f"Error al leer el archivo: {str(e)}")
+                    return
+                
+                audit_result = self._audit_document(text)
+                st.write("**Resultados de Auditoría:**")
+                cols = st.columns(len(audit_result))
+                for col, (marco, r) in zip(cols, audit_result.items()):
+                    col.metric(marco, "✅ Cumple" if r["cumple"] else "❌ No cumple", f"{r['coincidencias']} coincidencias",
+                               delta_color="off")
+                for marco, r in audit_result.items():
+                    if r["ubicaciones"]:
+                        with st.expander(f"{marco}: dónde aparece"):
+                            st.dataframe(pd.DataFrame(r["ubicaciones"])[["termino", "pagina", "contexto"]],
+                                         hide_index=True)
+                with st.expander("Resultado completo (JSON)"):
+                    st.json(audit_result)
+
+        with st.expander("📚 Auditoría de todos tus documentos"):
+            self._show_corpus_audit(st.session_state.current_user)
+
+    def _show_corpus_audit(self, user):
+        """Audita el catálogo completo (compliance_audit.py); lo ya auditado con las mismas reglas se reutiliza."""
+        total = get_services().documents.count(user)
+        st.caption(f"{total} documentos en tu catálogo. Solo se auditan los nuevos o los que cambiaron.")
+        if st.button("Auditar todos mis documentos", disabled=total == 0):
+            services = get_services()
+            progress = st.progress(0.0, text="Auditando documentos…")
+            try:
+                st.session_state.corpus_audit = CorpusAudit(
+                    services.db, services.documents, cache_path=services.extraction_cache.path,
+                ).run(user, progress=lambda revisados: progress.progress(
+                    min(revisados / total, 1.0), text=f"Auditando documentos… {revisados}/{total}"))
+            except Exception as e:
+                st.error(f"Error en la auditoría: {str(e)}")
+                return
+            finally:
+                progress.empty()
+
+        report = st.session_state.get("corpus_audit")
+        if not report:
+            return
+        st.write(f"**{report['auditados']}** auditados, **{report['reutilizados']}** sin cambios, "
+                 f"**{report['omitidos']}** omitidos (imágenes u otros formatos) en {report['segundos']} s")
+        st.dataframe(pd.DataFrame([
+            {"Marco": marco, "Documentos": r["documentos"], "Cumplen": r["cumplen"], "% cumple": r["porcentaje"],
+             "Coincidencias": r["coincidencias"], "Términos frecuentes": ", ".join(r["terminos_frecuentes"])}
+            for marco, r in report["marcos"].items()
+        ]), hide_index=True)
+        for error in report["errores"]:
+            st.warning(f"{error['nombre']}: {error['error']}")
+
+        cols = st.columns(2)
+        cols[0].download_button("Descargar CSV", data=report_to_csv(report), file_name="auditoria.csv",
+                                mime="text/csv")
+        cols[1].download_button("Descargar JSON", data=report_to_json(report), file_name="auditoria.json",
+                                mime="application/json")
+
+    def _audit_document(self, text):
+        # Una pasada con todas las reglas (compliance.py); ya no hace falta el pipeline de spaCy
+        return audit_text(text)
+
+    def _show_payment(self):
+        st.header("📈 Planes EnterpriseFlow")
+        cols = st.columns(3)
+        
+        with cols[0]:
+            st.subheader("Básico")
+            st.markdown("""
+                - 10 usuarios
+                - Soporte básico
+                - Reportes estándar
+                **Precio: $99/mes**
+            """)
+            if st.button("Elegir Básico", key="basico"):
+                self._handle_subscription('basico')
+
+        with cols[1]:
+            st.subheader("Premium")
+            st.markdown("""
+                - 50 usuarios
+                - Soporte prioritario
+                - Reportes avanzados
+                **Precio: $299/mes**
+            """)
+            if st.button("Elegir Premium", key="premium"):
+                self._handle_subscription('premium')
+
+        with cols[2]:
+            st.subheader("Enterprise")
+            st.markdown("""
+                - Usuarios ilimitados
+                - Soporte 24/7
+                - Personalización
+                **Precio: $999/mes**
+            """)
+            if st.button("Contactar Ventas", key="enterprise"):
+                st.info("contacto@enterpriseflow.com")
+
+    def _handle_subscription(self, plan: str):
+        try:
+            if not st.session_state.current_user:
+                raise ValueError("Debe iniciar sesión primero")
+            
+            subscription_data = self.payment.create_subscription(
+                customer_email=st.session_state.current_user,
+                price_key=plan
+            )
+            
+            if subscription_data.get('client_secret'):
+                st.session_state.subscription = subscription_data
+                self._show_payment_confirmation()
+            else:
+                st.error("Error al crear la suscripción")
+        
+        except Exception as e:
+            st.error(f"Error en suscripción: {str(e)}")
+
+    def _show_payment_confirmation(self):
+        with st.form("payment-form"):
+            st.write("Complete los datos de pago")
+            card_number = st.text_input("Número de tarjeta")
+            expiry = st.text_input("MM/AA")
+            cvc = st.text_input("CVC")
+            
+            if st.form_submit_button("Confirmar Pago"):
+                try:
+                    st.success("Pago procesado exitosamente!")
+                    st.session_state.subscription = None
+                except Exception as e:
+                    st.error(f"Error en pago: {str(e)}")
+
+if __name__ == "__main__":
+    EnterpriseFlowApp()
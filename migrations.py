@@ -0,0 +1,656 @@
+# migrations.py
+"""
+Migraciones versionadas del esquema.
+
+Cada migración tiene un número de versión y se aplica una sola vez, en orden,
+dentro de su propia transacción. Las versiones aplicadas quedan en la tabla
+schema_migrations. Para cambiar el esquema se agrega una migración nueva al
+final de MIGRATIONS; nunca se editan las que ya se publicaron.
+
+Uso manual: python migrations.py [ruta.db]
+"""
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+
+
+def _columns(conn, table):
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, decl):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _ensure_table(conn, name, ddl, renames=None):
+    """
+    Crea la tabla si no existe. Si existe con un esquema viejo (las versiones
+    anteriores de la app crearon tablas incompletas), la reconstruye con el
+    esquema nuevo conservando los datos y las columnas que ya tenía.
+
+    renames: {columna_nueva: columna_vieja} para columnas que cambiaron de nombre.
+    """
+    renames = renames or {}
+    old = _columns(conn, name)
+    if not old:
+        conn.execute(ddl)
+        return
+    conn.execute(f"CREATE TABLE __nueva ({ddl.split('(', 1)[1]}")
+    new = _columns(conn, "__nueva")
+    missing = [c for c in new if c not in old and renames.get(c) not in old]
+    if not missing:
+        conn.execute("DROP TABLE __nueva")
+        return
+
+    for column, decl_type in old.items():
+        if column not in new and column not in renames.values():
+            conn.execute(f"ALTER TABLE __nueva ADD COLUMN {column} {decl_type}")
+    pairs = [(c, c) for c in old if c not in renames.values()]
+    pairs += [(new_c, old_c) for new_c, old_c in renames.items() if old_c in old]
+    targets = ", ".join(t for t, _ in pairs)
+    sources = ", ".join(s for _, s in pairs)
+    conn.execute(f"INSERT INTO __nueva ({targets}) SELECT {sources} FROM {name}")
+    conn.execute(f"DROP TABLE {name}")
+    conn.execute(f"ALTER TABLE __nueva RENAME TO {name}")
+
+
+def _001_esquema_base(conn):
+    """Reúne el esquema que estaba repartido entre database.py, main.py y basededatos.sql."""
+    _ensure_table(conn, "users", """CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        nombre TEXT,
+        apellido TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    _ensure_table(conn, "user_rewards", """CREATE TABLE user_rewards (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        puntos INTEGER DEFAULT 0,
+        nivel INTEGER DEFAULT 1,
+        insignias INTEGER DEFAULT 0,
+        tareas_completadas INTEGER DEFAULT 0,
+        dias_constancia INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_email)
+    )""")
+    _ensure_table(conn, "personal_goals", """CREATE TABLE personal_goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        goal_text TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed BOOLEAN DEFAULT 0
+    )""", renames={"goal_text": "goal"})
+    _ensure_table(conn, "employees", """CREATE TABLE employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL UNIQUE,
+        nombre TEXT,
+        apellido TEXT,
+        fecha_nacimiento DATE,
+        documento TEXT
+    )""")
+    _ensure_table(conn, "medical_records", """CREATE TABLE medical_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        patologia TEXT,
+        enfermedades TEXT,
+        embarazo BOOLEAN DEFAULT 0,
+        observaciones TEXT,
+        apellido TEXT,
+        nombre TEXT,
+        file_path TEXT,
+        FOREIGN KEY(user_email) REFERENCES employees(user_email)
+    )""")
+    _ensure_table(conn, "medical_documents", """CREATE TABLE medical_documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        file_name TEXT,
+        file_path TEXT,
+        uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(employee_id) REFERENCES employees(id)
+    )""")
+    _ensure_table(conn, "sick_leaves", """CREATE TABLE sick_leaves (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        fecha_inicio DATE,
+        fecha_fin DATE,
+        motivo TEXT,
+        observaciones TEXT,
+        FOREIGN KEY(user_email) REFERENCES employees(user_email)
+    )""")
+    _ensure_table(conn, "leave_requests", """CREATE TABLE leave_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        tipo_permiso TEXT, -- "vacaciones", "enfermedad", "otro"
+        fecha_inicio DATE,
+        fecha_fin DATE,
+        estado TEXT DEFAULT 'pendiente', -- "pendiente", "aprobado", "rechazado"
+        motivo TEXT,
+        observaciones TEXT,
+        FOREIGN KEY(user_email) REFERENCES employees(user_email)
+    )""")
+    _ensure_table(conn, "health_data", """CREATE TABLE health_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT UNIQUE,
+        dias_sin_incidentes INTEGER,
+        horas_sueno_promedio REAL,
+        pasos_diarios INTEGER
+    )""")
+    _ensure_table(conn, "recognitions", """CREATE TABLE recognitions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sender TEXT,
+        receiver TEXT,
+        message TEXT,
+        date DATE
+    )""")
+    _ensure_table(conn, "invoices", """CREATE TABLE invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        client_name TEXT,
+        client_email TEXT,
+        client_address TEXT,
+        subtotal REAL,
+        iva REAL,
+        total REAL,
+        invoice_number TEXT,
+        pdf_file BLOB,
+        status TEXT DEFAULT 'pendiente', -- pendiente, enviada, pagada, vencida
+        sent_at TIMESTAMP,
+        paid_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    _ensure_table(conn, "invoice_logs", """CREATE TABLE invoice_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        invoice_id INTEGER,
+        user_email TEXT,
+        action TEXT,
+        log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(invoice_id) REFERENCES invoices(id)
+    )""")
+    _ensure_table(conn, "automation_tasks", """CREATE TABLE automation_tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT,
+        type TEXT,
+        schedule TEXT,
+        responsible TEXT,
+        notification_method TEXT,
+        status TEXT DEFAULT 'pendiente',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""", renames={"type": "task_type"})
+    _ensure_table(conn, "automation_task_logs", """CREATE TABLE automation_task_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        action TEXT,
+        log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(task_id) REFERENCES automation_tasks(id)
+    )""")
+    _ensure_table(conn, "advanced_automations", """CREATE TABLE advanced_automations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT,
+        name TEXT,
+        script TEXT,
+        version INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        rollback_of INTEGER,
+        status TEXT DEFAULT 'activo'
+    )""")
+    _ensure_table(conn, "advanced_automation_logs", """CREATE TABLE advanced_automation_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        automation_id INTEGER,
+        user_email TEXT,
+        status TEXT,
+        output TEXT,
+        error TEXT,
+        executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(automation_id) REFERENCES advanced_automations(id)
+    )""")
+
+
+def _002_indices_por_usuario(conn):
+    """Todas las consultas filtran por user_email y ordenan por fecha."""
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_automation_tasks_user_created ON automation_tasks(user_email, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_user_created ON invoices(user_email, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices(invoice_number)",
+        "CREATE INDEX IF NOT EXISTS idx_invoice_logs_invoice ON invoice_logs(invoice_id)",
+        "CREATE INDEX IF NOT EXISTS idx_leave_requests_user_inicio ON leave_requests(user_email, fecha_inicio DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_personal_goals_user_created ON personal_goals(user_email, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_medical_records_user ON medical_records(user_email)",
+        "CREATE INDEX IF NOT EXISTS idx_advanced_automations_user ON advanced_automations(user_email, name, version)",
+        "CREATE INDEX IF NOT EXISTS idx_advanced_automation_logs_automation ON advanced_automation_logs(automation_id)",
+        "CREATE INDEX IF NOT EXISTS idx_automation_task_logs_task ON automation_task_logs(task_id)",
+    ):
+        conn.execute(statement)
+
+
+def _003_programacion_de_tareas(conn):
+    """Columnas del scheduler (scheduler.py) y registro de cada ejecución."""
+    _add_column(conn, "automation_tasks", "next_run_at", "INTEGER")
+    _add_column(conn, "automation_tasks", "last_run_at", "REAL")
+    _add_column(conn, "automation_tasks", "last_duration_ms", "INTEGER")
+    _add_column(conn, "automation_tasks", "last_error", "TEXT")
+    _add_column(conn, "automation_tasks", "run_count", "INTEGER DEFAULT 0")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_automation_tasks_next_run
+        ON automation_tasks(next_run_at) WHERE next_run_at IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS automation_task_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            scheduled_for INTEGER NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            duration_ms INTEGER,
+            status TEXT,
+            output TEXT,
+            error TEXT,
+            UNIQUE(task_id, scheduled_for),
+            FOREIGN KEY(task_id) REFERENCES automation_tasks(id)
+        )
+    """)
+    # Las tareas guardadas antes de existir el scheduler nunca se ejecutaron
+    now = time.time()
+    rows = conn.execute("SELECT id, schedule FROM automation_tasks WHERE next_run_at IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE automation_tasks SET next_run_at=? WHERE id=?",
+        [(_003_next_run_time(schedule, now, first=True), task_id) for task_id, schedule in rows],
+    )
+
+
+_003_WEEKDAYS = {
+    "lunes": 0, "martes": 1, "miercoles": 2, "miércoles": 2, "jueves": 3,
+    "viernes": 4, "sabado": 5, "sábado": 5, "domingo": 6,
+}
+
+
+def _003_next_run_time(schedule, after, first=False):
+    """
+    El parser de horarios que tenía scheduler.py cuando se publicó la migración 3,
+    congelado aquí para que la migración haga lo mismo en una base nueva que en
+    las que ya la aplicaron. Los horarios que solo entiende recurrence.py los
+    programa la migración 14.
+    """
+    text = (schedule or "").strip().lower()
+    if text == "inmediato":
+        return int(after) if first else None
+    parts = text.split()
+    weekday = None
+    if len(parts) == 2 and parts[0] in _003_WEEKDAYS:
+        weekday = _003_WEEKDAYS[parts[0]]
+        parts = parts[1:]
+    if len(parts) != 1:
+        return None
+    try:
+        at = datetime.datetime.strptime(parts[0], "%H:%M").time()
+    except ValueError:
+        return None
+    base = datetime.datetime.fromtimestamp(after)
+    candidate = datetime.datetime.combine(base.date(), at)
+    while candidate.timestamp() <= after or (weekday is not None and candidate.weekday() != weekday):
+        candidate += datetime.timedelta(days=1)
+    return int(candidate.timestamp())
+
+
+def _004_recurrencias_compiladas(conn):
+    """Horario compilado (cron + zona horaria) junto al texto original."""
+    from recurrence import compile_schedule
+    _add_column(conn, "automation_tasks", "recurrence", "TEXT")
+    _add_column(conn, "automation_tasks", "timezone", "TEXT")
+    rows = conn.execute("SELECT id, schedule FROM automation_tasks WHERE recurrence IS NULL").fetchall()
+    for task_id, schedule in rows:
+        try:
+            compiled = compile_schedule(schedule)
+        except ValueError:
+            conn.execute(
+                "UPDATE automation_tasks SET next_run_at=NULL, status='horario_invalido' WHERE id=?", (task_id,)
+            )
+            continue
+        conn.execute(
+            "UPDATE automation_tasks SET recurrence=?, timezone=? WHERE id=?",
+            (compiled.expression, compiled.timezone, task_id),
+        )
+
+
+def _005_duracion_automatizaciones_avanzadas(conn):
+    """Duración de cada ejecución del sandbox (sandbox.py) y una sola versión activa por script."""
+    _add_column(conn, "advanced_automation_logs", "duration_ms", "INTEGER")
+    # Antes cada guardado dejaba todas las versiones como 'activo'
+    conn.execute("""
+        UPDATE advanced_automations SET status='inactivo'
+        WHERE status='activo' AND version < (
+            SELECT MAX(a.version) FROM advanced_automations a
+            WHERE a.user_email=advanced_automations.user_email AND a.name=advanced_automations.name
+        )
+    """)
+
+
+def _006_bandeja_de_correo(conn):
+    """Bandeja de salida de correos (mailer.py)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT,
+            sender TEXT,
+            recipient TEXT NOT NULL,
+            subject TEXT,
+            message BLOB NOT NULL,
+            kind TEXT,
+            reference TEXT,
+            status TEXT NOT NULL DEFAULT 'pendiente',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL,
+            claimed_at REAL,
+            sent_at REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_status_next ON email_outbox(status, next_attempt_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_reference ON email_outbox(kind, reference)")
+
+
+def _007_campanas_de_email(conn):
+    """Campañas de email masivo (campaigns.py): listas de contactos, progreso y entregas."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            list_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            nombre TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_campaign_contacts_list ON campaign_contacts(user_email, list_name, id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            task_id INTEGER,
+            subject TEXT,
+            template TEXT,
+            csv_path TEXT,
+            contact_list TEXT,
+            status TEXT NOT NULL DEFAULT 'pendiente',
+            total INTEGER DEFAULT 0,
+            sent INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            cursor INTEGER DEFAULT 0,
+            heartbeat_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(task_id) REFERENCES automation_tasks(id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_user_created ON campaigns(user_email, created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_task ON campaigns(task_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_deliveries (
+            campaign_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            recipient TEXT,
+            status TEXT,
+            error TEXT,
+            sent_at REAL,
+            PRIMARY KEY(campaign_id, position),
+            FOREIGN KEY(campaign_id) REFERENCES campaigns(id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _database_path(conn):
+    return next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+
+
+def _008_pdfs_fuera_de_sqlite(conn, batch_size=500):
+    """
+    Los PDFs pasan al almacén de blobs (blob_store.py); en la tabla quedan hash y tamaño.
+    SQLite reutiliza las páginas liberadas; para achicar el archivo, VACUUM aparte.
+    """
+    from blob_store import BlobStore
+    _add_column(conn, "invoices", "pdf_hash", "TEXT")
+    _add_column(conn, "invoices", "pdf_size", "INTEGER")
+    _add_column(conn, "recognitions", "cert_id", "TEXT")
+    _add_column(conn, "recognitions", "pdf_hash", "TEXT")
+    _add_column(conn, "recognitions", "pdf_size", "INTEGER")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS receipts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            nombre TEXT,
+            monto REAL,
+            concepto TEXT,
+            email_receptor TEXT,
+            pdf_hash TEXT,
+            pdf_size INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_receipts_user_created ON receipts(user_email, created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_invoices_pdf_hash ON invoices(pdf_hash)")
+
+    path = _database_path(conn)
+    if not path:  # base en memoria: no hay dónde poner los blobs
+        return
+    store = BlobStore.for_database(path)
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, pdf_file FROM invoices WHERE id>? AND pdf_file IS NOT NULL ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for invoice_id, pdf in rows:
+            data = pdf if isinstance(pdf, bytes) else str(pdf).encode("latin1")
+            updates.append((*store.put(data), invoice_id))
+        conn.executemany("UPDATE invoices SET pdf_hash=?, pdf_size=?, pdf_file=NULL WHERE id=?", updates)
+        last_id = rows[-1][0]
+
+
+def _009_referencia_externa_de_facturas(conn):
+    """Referencia de origen de cada factura: la facturación por lotes no factura dos veces la misma fila."""
+    _add_column(conn, "invoices", "external_ref", "TEXT")
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_user_external_ref
+        ON invoices(user_email, external_ref) WHERE external_ref IS NOT NULL
+    """)
+
+
+_LEGACY_UPLOAD = re.compile(r"^(?P<owner>.+@.+?)_(?P<stamp>\d{14})_(?P<name>.+)$")
+
+
+def _010_catalogo_de_documentos(conn):
+    """
+    Tabla `documents` para el Gestor de Documentos (document_catalog.py).
+
+    Los archivos que ya estaban en uploaded_docs/<usuario>_<fecha>_<nombre> se
+    registran sin moverlos. Las copias idénticas que dejaba la versión anterior
+    (se guardaba el archivo en cada rerun) quedan en `document_copies`,
+    apuntando al documento con ese contenido y con su propio nombre. La
+    migración no borra nada: los archivos repetidos se eliminan después con
+    DocumentCatalog.remove_duplicate_copies().
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner TEXT NOT NULL,
+            original_name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            storage_path TEXT NOT NULL,
+            mime_type TEXT,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(owner, sha256)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_owner_uploaded ON documents(owner, uploaded_at DESC, id DESC)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_copies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL,
+            original_name TEXT NOT NULL,
+            storage_path TEXT,
+            uploaded_at TIMESTAMP,
+            UNIQUE(document_id, storage_path)
+        )
+    """)
+
+    path = _database_path(conn)
+    if not path:
+        return
+    root = os.path.join(os.path.dirname(os.path.abspath(path)), "uploaded_docs")
+    if not os.path.isdir(root):
+        return
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        match = _LEGACY_UPLOAD.match(entry.name)
+        if not entry.is_file() or not match:
+            continue
+        digest = hashlib.sha256()
+        with open(entry.path, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+        uploaded_at = datetime.datetime.strptime(match["stamp"], "%Y%m%d%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+        inserted = conn.execute("""
+            INSERT OR IGNORE INTO documents (owner, original_name, size, sha256, storage_path, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (match["owner"], match["name"], entry.stat().st_size, digest.hexdigest(), entry.name, uploaded_at))
+        if inserted.rowcount == 0:
+            conn.execute("""
+                INSERT OR IGNORE INTO document_copies (document_id, original_name, storage_path, uploaded_at)
+                SELECT id, ?, ?, ? FROM documents WHERE owner = ? AND sha256 = ?
+            """, (match["name"], entry.name, uploaded_at, match["owner"], digest.hexdigest()))
+
+
+def _011_busqueda_en_documentos(conn, shards=16):
+    """
+    Índice FTS5 del texto de los documentos (search_index.py), repartido por
+    usuario en `shards` tablas; sin acentos ni mayúsculas.
+    """
+    _add_column(conn, "documents", "indexed_pages", "INTEGER")
+    for shard in range(shards):
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS document_text_{shard:02d} USING fts5(
+                owner_key, body, tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+
+
+def _012_resultados_de_cumplimiento(conn):
+    """Resultado de la auditoría por contenido y versión de reglas (compliance_audit.py)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS compliance_results (
+            sha256 TEXT NOT NULL,
+            ruleset_version TEXT NOT NULL,
+            result TEXT NOT NULL,
+            audited_at REAL NOT NULL,
+            PRIMARY KEY (sha256, ruleset_version)
+        ) WITHOUT ROWID
+    """)
+
+
+def _013_duenio_de_ejecuciones(conn):
+    """
+    Qué daemon tiene cada ejecución en curso y hasta cuándo (scheduler.py):
+    al arrancar, un daemon solo da por interrumpidas las suyas y las de
+    daemons que dejaron vencer el lease, no las que otros siguen ejecutando.
+    """
+    _add_column(conn, "automation_task_runs", "owner", "TEXT")
+    _add_column(conn, "automation_task_runs", "lease_until", "REAL")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_automation_task_runs_running
+        ON automation_task_runs(lease_until) WHERE status='en_ejecucion'
+    """)
+
+
+def _014_programar_recurrencias_nuevas(conn):
+    """
+    Tareas que nunca se ejecutaron porque el parser de la migración 3 no
+    entendía su horario (Diario, rangos de días, cron...) pero ya tienen
+    recurrencia compilada (migración 4): se programa su primera ejecución.
+    """
+    from recurrence import load
+    now = time.time()
+    rows = conn.execute("""
+        SELECT id, recurrence, timezone FROM automation_tasks
+        WHERE next_run_at IS NULL AND recurrence IS NOT NULL AND COALESCE(run_count, 0) = 0
+          AND status = 'pendiente'
+    """).fetchall()
+    conn.executemany(
+        "UPDATE automation_tasks SET next_run_at=? WHERE id=?",
+        [(load(recurrence, timezone).first_run(now) if timezone else load(recurrence).first_run(now), task_id)
+         for task_id, recurrence, timezone in rows],
+    )
+
+
+MIGRATIONS = [
+    (1, "esquema_base", _001_esquema_base),
+    (2, "indices_por_usuario", _002_indices_por_usuario),
+    (3, "programacion_de_tareas", _003_programacion_de_tareas),
+    (4, "recurrencias_compiladas", _004_recurrencias_compiladas),
+    (5, "duracion_automatizaciones_avanzadas", _005_duracion_automatizaciones_avanzadas),
+    (6, "bandeja_de_correo", _006_bandeja_de_correo),
+    (7, "campanas_de_email", _007_campanas_de_email),
+    (8, "pdfs_fuera_de_sqlite", _008_pdfs_fuera_de_sqlite),
+    (9, "referencia_externa_de_facturas", _009_referencia_externa_de_facturas),
+    (10, "catalogo_de_documentos", _010_catalogo_de_documentos),
+    (11, "busqueda_en_documentos", _011_busqueda_en_documentos),
+    (12, "resultados_de_cumplimiento", _012_resultados_de_cumplimiento),
+    (13, "duenio_de_ejecuciones", _013_duenio_de_ejecuciones),
+    (14, "programar_recurrencias_nuevas", _014_programar_recurrencias_nuevas),
+]
+
+
+def applied_versions(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def apply_migrations(conn, migrations=MIGRATIONS):
+    """
+    Aplica las migraciones pendientes y devuelve las versiones aplicadas.
+
+    BEGIN IMMEDIATE toma el lock de escritura antes de volver a comprobar la
+    versión, así dos procesos que arrancan a la vez no aplican la misma
+    migración dos veces.
+    """
+    done = applied_versions(conn)
+    applied = []
+    for version, name, migrate in sorted(migrations, key=lambda m: m[0]):
+        if version in done:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version=?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "enterprise_flow.db"
+    connection = sqlite3.connect(path)
+    print(f"Migraciones aplicadas: {apply_migrations(connection) or 'ninguna (esquema al día)'}")
+    connection.close()
@@ -0,0 +1,192 @@
+# ocr.py
+"""
+OCR de imágenes y escaneos (PNG/JPG, TIFF de varias páginas y PDFs escaneados).
+
+Antes de pasar cada página a Tesseract se normaliza: orientación EXIF, escala
+de grises, contraste automático y reducción a ~300 DPI (o a MAX_SIDE píxeles
+si la imagen no trae DPI). Una foto de 12 MP de un celular queda en un
+tamaño que Tesseract reconoce igual de bien y bastante más rápido.
+
+Las páginas se reparten en un pool de procesos acotado (OCRPool) que se crea
+una vez por servidor (services.ocr). El archivo se escribe una vez en un
+temporal y cada worker abre solo la página que le toca. El resultado trae el
+tiempo de cada página; el texto se guarda en la caché de extracción desde
+text_extraction.ocr_document().
+"""
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import PIL_Image, PyPDF2, pytesseract
+
+OCR_LANG = "spa"
+TARGET_DPI = 300
+# Lado mayor de una página A4 a 300 DPI
+MAX_SIDE = 3508
+# Separador entre páginas en el texto, igual que en los PDFs con texto
+PAGE_BREAK = "\f"
+
+
+def preprocess(image):
+    """Imagen lista para Tesseract: derecha, en grises, con contraste y sin píxeles de más."""
+    from PIL import ImageOps
+    dpi = image.info.get("dpi")
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        # Las transparencias se aplanan sobre blanco, si no el fondo queda negro
+        rgba = image.convert("RGBA")
+        background = PIL_Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        image = PIL_Image.alpha_composite(background, rgba)
+    image = ImageOps.autocontrast(image.convert("L"))
+
+    scale = 1.0
+    if dpi and dpi[0] and float(dpi[0]) > TARGET_DPI:
+        scale = TARGET_DPI / float(dpi[0])
+    longest = max(image.size)
+    if longest * scale > MAX_SIDE:
+        scale = MAX_SIDE / longest
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # reduce() descarta píxeles enteros rápido; el ajuste fino lo hace LANCZOS
+        factor = int(1 / scale)
+        if factor >= 2:
+            image = image.reduce(factor)
+        image = image.resize(size, PIL_Image.LANCZOS)
+    return image
+
+
+def _scan_image(page):
+    """La imagen más grande de una página de PDF escaneado (normalmente es la única)."""
+    images = list(page.images)
+    if not images:
+        return None
+    best = max(images, key=lambda img: len(img.data))
+    return PIL_Image.open(io.BytesIO(best.data))
+
+
+def count_pages(path, kind="image"):
+    if kind == "pdf":
+        return len(PyPDF2.PdfReader(path).pages)
+    with PIL_Image.open(path) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def load_page(path, kind, index):
+    """Página `index` (0-based) ya preprocesada, o None si la página no tiene imagen."""
+    if kind == "pdf":
+        image = _scan_image(PyPDF2.PdfReader(path).pages[index])
+        return preprocess(image) if image is not None else None
+    with PIL_Image.open(path) as image:
+        if index:
+            image.seek(index)  # TIFF de varias páginas: solo se decodifica este frame
+        image.load()
+        return preprocess(image)
+
+
+def tesseract(image, lang=OCR_LANG):
+    return pytesseract.image_to_string(image, lang=lang)
+
+
+def _ocr_page(job):
+    path, kind, index, lang, engine = job
+    started = time.perf_counter()
+    image = load_page(path, kind, index)
+    text = engine(image, lang) if image is not None else ""
+    return index, text, time.perf_counter() - started
+
+
+class OCRPool:
+    """
+    Pool de procesos para OCR compartido por todas las sesiones.
+
+    `workers=0` hace el OCR en el mismo proceso. `engine(imagen, idioma)`
+    permite cambiar Tesseract por otro motor; debe poder importarse desde los
+    workers.
+    """
+
+    def __init__(self, workers=None, lang=OCR_LANG, engine=tesseract, pages_in_flight=2):
+        self.workers = min(os.cpu_count() or 1, 4) if workers is None else workers
+        self.lang = lang
+        self.engine = engine
+        self.pages_in_flight = pages_in_flight
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None and self.workers:
+            with self._lock:
+                if self._executor is None:
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def _results(self, jobs):
+        executor = self.executor
+        if executor is None:
+            yield from map(_ocr_page, jobs)
+            return
+        # Ventana acotada: un escaneo de 500 páginas no encola 500 tareas de golpe
+        window = deque()
+        jobs = iter(jobs)
+        for job in jobs:
+            window.append(executor.submit(_ocr_page, job))
+            if len(window) >= self.workers * self.pages_in_flight:
+                break
+        try:
+            while window:
+                result = window.popleft().result()
+                job = next(jobs, None)
+                if job is not None:
+                    window.append(executor.submit(_ocr_page, job))
+                yield result
+        finally:
+            for future in window:
+                future.cancel()
+
+    def recognize(self, data, kind="image", progress=None):
+        """
+        OCR de todas las páginas de `data` (bytes de una imagen, TIFF o PDF
+        escaneado). Devuelve {'texto', 'paginas': [{'pagina', 'segundos',
+        'caracteres'}], 'segundos'}. `progress(hechas, total)` se llama por página.
+        """
+        started = time.perf_counter()
+        fd, path = tempfile.mkstemp(suffix=".pdf" if kind == "pdf" else ".img")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            total = count_pages(path, kind)
+            jobs = ((path, kind, index, self.lang, self.engine) for index in range(total))
+            texts, pages = [], []
+            for done, (index, text, seconds) in enumerate(self._results(jobs), 1):
+                texts.append(text)
+                pages.append({"pagina": index + 1, "segundos": round(seconds, 3), "caracteres": len(text)})
+                if progress:
+                    progress(done, total)
+        finally:
+            os.remove(path)
+        return {"texto": PAGE_BREAK.join(texts), "paginas": pages,
+                "segundos": round(time.perf_counter() - started, 3)}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+def thumbnail(data, max_side=800):
+    """JPEG pequeño de la primera página para mostrar en pantalla (también sirve para TIFF)."""
+    with PIL_Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (max_side, max_side))  # JPEG: decodifica ya reducido
+        preview = image.convert("RGB")
+        preview.thumbnail((max_side, max_side))
+    out = io.BytesIO()
+    preview.save(out, "JPEG", quality=85)
+    return out.getvalue()
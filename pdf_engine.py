@@ -0,0 +1,210 @@
+# pdf_engine.py
+"""
+Generación de PDFs (facturas, recibos y certificados) con fpdf2.
+
+Cada tipo de documento es un PDFTemplate: la lista de operaciones (fuente,
+celdas, texto, imagen) se arma una sola vez al importar el módulo y render()
+solo rellena los valores. Las firmas se abren y decodifican una vez por
+proceso y se pasan a fpdf2 como imagen de Pillow, así un certificado no
+vuelve a abrir ni a decodificar el PNG.
+
+render() devuelve bytes, o escribe en un archivo abierto si se pasa `out`.
+"""
+import datetime
+import io
+import os
+import string
+import threading
+import uuid
+
+from lazy_imports import PIL_Image, fpdf
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_formatter = string.Formatter()
+
+
+def _fields(text):
+    return {name.split(".")[0].split("[")[0] for _, name, _, _ in _formatter.parse(text) if name}
+
+
+class PDFTemplate:
+    """
+    Operaciones soportadas:
+      ("font", familia, estilo, tamaño)
+      ("cell", texto, alineación)          una línea; el texto admite {campos}
+      ("multi_cell", texto, alto, alineación)
+      ("ln", alto)
+      ("image", campo, x, ancho, alto)     ruta de la imagen en values[campo]
+    """
+
+    def __init__(self, name, operations, margin=None):
+        self.name = name
+        self.margin = margin
+        self.operations = tuple(operations)
+        self.fields = set()
+        for op in self.operations:
+            if op[0] in ("cell", "multi_cell"):
+                self.fields |= _fields(op[1])
+            elif op[0] == "image":
+                self.fields.add(op[1])
+            elif op[0] not in ("font", "ln"):
+                raise ValueError(f"Operación desconocida en la plantilla {name}: {op[0]}")
+
+    def _document(self):
+        from fpdf.enums import XPos, YPos
+        pdf = fpdf.FPDF()
+        if self.margin is not None:
+            pdf.set_auto_page_break(auto=True, margin=self.margin)
+        pdf.add_page()
+        return pdf, {"new_x": XPos.LMARGIN, "new_y": YPos.NEXT}
+
+    def render(self, values, out=None):
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Faltan campos para {self.name}: {', '.join(sorted(missing))}")
+        pdf, next_line = self._document()
+        for op in self.operations:
+            kind = op[0]
+            if kind == "font":
+                pdf.set_font(op[1], op[2], op[3])
+            elif kind == "cell":
+                pdf.cell(0, 10, op[1].format_map(values), align=op[2], **next_line)
+            elif kind == "multi_cell":
+                pdf.multi_cell(0, op[2], op[1].format_map(values), align=op[3], **next_line)
+            elif kind == "ln":
+                pdf.ln(op[1])
+            elif kind == "image":
+                image = _signature_image(_resolve(values[op[1]]))
+                pdf.image(image, x=op[2], w=op[3], h=op[4])
+        data = pdf.output()  # fpdf2 devuelve bytearray
+        if out is None:
+            return bytes(data)
+        out.write(data)
+        return None
+
+
+# --- Caché de imágenes por proceso -------------------------------------------
+
+_images = {}
+_images_lock = threading.Lock()
+
+
+def _resolve(path):
+    path = os.path.join(BASE_DIR, path) if not os.path.isabs(path) else path
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Archivo de firma no encontrado: {path}")
+    return path
+
+
+def _signature_image(path):
+    """
+    La firma abierta y decodificada con Pillow, una vez por proceso y versión
+    del archivo. fpdf2 acepta la imagen de Pillow en pdf.image(), así que no
+    vuelve a leer el PNG de disco en cada certificado.
+    """
+    key = (path, os.path.getmtime(path))
+    image = _images.get(key)
+    if image is None:
+        image = PIL_Image.open(path)
+        image.load()
+        with _images_lock:
+            image = _images.setdefault(key, image)
+    return image
+
+
+def clear_caches():
+    with _images_lock:
+        _images.clear()
+
+
+# --- Plantillas ---------------------------------------------------------------
+
+INVOICE_TEMPLATES = {
+    "Estándar": PDFTemplate("factura", [
+        ("font", "Helvetica", "", 14),
+        ("cell", "Factura {invoice_number}", "C"),
+        ("font", "Helvetica", "", 12),
+        ("cell", "Cliente: {client_name}", "L"),
+        ("cell", "Subtotal: ${subtotal:.2f}", "L"),
+        ("cell", "IVA: {iva_percent}%", "L"),
+        ("cell", "Total: ${total:.2f}", "L"),
+        ("cell", "Fecha: {fecha}", "L"),
+    ]),
+    "Moderna": PDFTemplate("factura_moderna", [
+        ("font", "Helvetica", "B", 18),
+        ("cell", "FACTURA {invoice_number}", "L"),
+        ("ln", 4),
+        ("font", "Helvetica", "", 11),
+        ("cell", "Cliente: {client_name}", "L"),
+        ("cell", "Fecha: {fecha}", "L"),
+        ("ln", 6),
+        ("cell", "Subtotal: ${subtotal:.2f}", "R"),
+        ("cell", "IVA ({iva_percent}%): ${iva_amount:.2f}", "R"),
+        ("font", "Helvetica", "B", 13),
+        ("cell", "Total: ${total:.2f}", "R"),
+    ]),
+}
+
+RECEIPT_TEMPLATE = PDFTemplate("recibo", [
+    ("font", "Helvetica", "", 14),
+    ("cell", "Recibo Digital", "C"),
+    ("font", "Helvetica", "", 12),
+    ("ln", 8),
+    ("cell", "Recibí de: {nombre}", "L"),
+    ("cell", "Monto: ${monto:.2f}", "L"),
+    ("cell", "Concepto: {concepto}", "L"),
+    ("cell", "Emitido por: {emisor}", "L"),
+    ("cell", "Fecha: {fecha}", "L"),
+])
+
+CERTIFICATE_TEMPLATE = PDFTemplate("certificado", [
+    ("font", "Helvetica", "B", 16),
+    ("cell", "Certificado de Reconocimiento", "C"),
+    ("ln", 15),
+    ("font", "Helvetica", "", 12),
+    ("multi_cell", "Se reconoce oficialmente a {colleague} por:", 10, "C"),
+    ("ln", 10),
+    ("font", "Helvetica", "I", 12),
+    ("multi_cell", '"{recognition}"', 8, "L"),
+    ("ln", 20),
+    ("image", "signature_path", 50, 30, 15),
+    ("font", "Helvetica", "I", 10),
+    ("cell", "Firmado por: {signer}", "R"),
+    ("ln", 15),
+    ("font", "Helvetica", "", 8),
+    ("cell", "ID de Certificado: {cert_id}", "C"),
+    ("cell", "Emitido el {fecha} a las {hora}", "C"),
+], margin=15)
+
+
+def _now():
+    return datetime.datetime.now()
+
+
+def render_invoice(client_name, subtotal, iva_rate, total, invoice_number, template="Estándar", out=None):
+    now = _now()
+    return INVOICE_TEMPLATES.get(template, INVOICE_TEMPLATES["Estándar"]).render({
+        "client_name": client_name, "subtotal": subtotal, "iva_percent": int(round(iva_rate * 100)),
+        "iva_amount": total - subtotal, "total": total, "invoice_number": invoice_number,
+        "fecha": now.strftime('%d/%m/%Y %H:%M'),
+    }, out)
+
+
+def render_receipt(nombre, monto, concepto, emisor, out=None):
+    return RECEIPT_TEMPLATE.render({
+        "nombre": nombre, "monto": monto, "concepto": concepto, "emisor": emisor,
+        "fecha": _now().strftime('%d/%m/%Y %H:%M'),
+    }, out)
+
+
+def render_certificate(colleague, recognition, signer, signature_path, cert_id=None):
+    """Devuelve {'pdf_bytes', 'cert_id'}, como esperaba el módulo de reconocimientos."""
+    cert_id = cert_id or str(uuid.uuid4())[:8].upper()
+    now = _now()
+    buffer = io.BytesIO()
+    CERTIFICATE_TEMPLATE.render({
+        "colleague": colleague, "recognition": recognition, "signer": signer, "signature_path": signature_path,
+        "cert_id": cert_id, "fecha": now.strftime("%d/%m/%Y"), "hora": now.strftime("%H:%M"),
+    }, buffer)
+    return {"pdf_bytes": buffer.getvalue(), "cert_id": cert_id}
@@ -0,0 +1,140 @@
+# pdf_extraction.py
+"""
+Extracción de texto de PDFs página por página.
+
+iter_pages() es un generador: cada página se entrega apenas se decodifica,
+así la interfaz puede ir mostrando el avance y nunca hace falta tener todo el
+texto del documento en memoria. Admite rangos de páginas ("1-5, 8") y, en
+documentos grandes (escaneos de cientos de páginas), reparte las páginas en
+un pool de procesos manteniendo el orden y un número acotado de páginas en
+vuelo.
+"""
+import io
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import PyPDF2
+
+# Por debajo de esto levantar procesos cuesta más que extraer en serie
+PARALLEL_MIN_PAGES = 40
+# Páginas pedidas al pool por cada worker antes de esperar resultados
+PAGES_IN_FLIGHT_PER_WORKER = 4
+
+logger = logging.getLogger(__name__)
+
+
+def _open(source):
+    """PdfReader sobre una ruta o sobre los bytes del archivo; las páginas se leen a demanda."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return PyPDF2.PdfReader(io.BytesIO(source))
+    return PyPDF2.PdfReader(source)
+
+
+def _page_text(reader, index):
+    try:
+        return reader.pages[index].extract_text() or ""
+    except Exception as e:  # una página dañada no debe tirar el documento entero
+        logger.warning("Error extrayendo la página %d: %s", index + 1, e)
+        return ""
+
+
+def page_count(source):
+    return len(_open(source).pages)
+
+
+def parse_page_range(spec, total):
+    """
+    "1-3, 7, 10-" -> índices 0-based [0, 1, 2, 6, 9, ..., total-1].
+    Vacío o None significa todas las páginas. Lanza ValueError si el rango no es válido.
+    """
+    if not spec or not str(spec).strip():
+        return list(range(total))
+    indices, seen = [], set()
+    for part in str(spec).replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                first, last = part.split("-", 1)
+                first = int(first) if first.strip() else 1
+                last = int(last) if last.strip() else total
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise ValueError(f"Rango de páginas no válido: '{part}'") from None
+        if first < 1 or last > total or first > last:
+            raise ValueError(f"Rango fuera del documento (1-{total}): '{part}'")
+        for page in range(first - 1, last):
+            if page not in seen:
+                seen.add(page)
+                indices.append(page)
+    return indices
+
+
+# --- Workers -------------------------------------------------------------------
+
+_worker_reader = None
+
+
+def _init_worker(source):
+    global _worker_reader
+    _worker_reader = _open(source)
+
+
+def _extract_in_worker(index):
+    return _page_text(_worker_reader, index)
+
+
+def _executor(workers, source):
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                               initializer=_init_worker, initargs=(source,))
+
+
+def iter_pages(source, pages=None, workers=None):
+    """
+    Genera (número de página 1-based, texto) en orden.
+
+    `source` es una ruta o los bytes del PDF (con una ruta los workers abren el
+    archivo y no reciben una copia del contenido). `pages` es una lista de
+    índices 0-based o un rango como texto. `workers=None` decide según el
+    tamaño; 0 extrae en este proceso.
+    """
+    reader = _open(source)
+    if pages is None or isinstance(pages, str):
+        pages = parse_page_range(pages, len(reader.pages))
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8) if len(pages) >= PARALLEL_MIN_PAGES else 0
+    if workers <= 1:
+        for index in pages:
+            yield index + 1, _page_text(reader, index)
+        return
+
+    del reader  # cada worker abre el suyo
+    executor = _executor(workers, source)
+    window = deque()
+    remaining = iter(pages)
+    try:
+        for index in remaining:
+            window.append((index, executor.submit(_extract_in_worker, index)))
+            if len(window) >= workers * PAGES_IN_FLIGHT_PER_WORKER:
+                break
+        while window:
+            index, future = window.popleft()
+            text = future.result()
+            following = next(remaining, None)
+            if following is not None:
+                window.append((following, executor.submit(_extract_in_worker, following)))
+            yield index + 1, text
+    finally:
+        # Si quien consume deja de iterar, no se extraen las páginas que faltan
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pdf_text(source, pages=None, workers=None, separator="\f"):
+    """Texto completo (las páginas separadas por salto de página) para quien no necesita ir por partes."""
+    return separator.join(text for _, text in iter_pages(source, pages, workers))
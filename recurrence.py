@@ -0,0 +1,203 @@
+# recurrence.py
+"""
+Compilador de horarios de automatización.
+
+Los horarios llegan como texto libre desde la UI ("08:00", "Domingo 03:00",
+"Inmediato", o la frecuencia del Sync CRM: Diario/Semanal/Mensual). Se
+compilan una sola vez a una expresión tipo cron de cinco campos con su zona
+horaria, que se guarda junto a la tarea (automation_tasks.recurrence y
+.timezone). Con eso el scheduler solo avanza next_run_at después de cada
+ejecución, sin volver a interpretar el texto.
+"""
+import datetime
+import re
+import unicodedata
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from config import TIMEZONE
+
+ONCE = "@once"
+
+# Día de la semana en numeración cron (0 = domingo)
+WEEKDAYS = {
+    "domingo": 0, "lunes": 1, "martes": 2, "miercoles": 3,
+    "jueves": 4, "viernes": 5, "sabado": 6,
+}
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "diario": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "semanal": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "mensual": "0 0 1 * *",
+}
+
+# (mínimo, máximo) de cada campo cron
+FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+_TIME = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).split())
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Paso inválido: {step_text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(p) for p in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if not (low <= start <= end <= high):
+            raise ValueError(f"Valor fuera de rango ({low}-{high}): {part}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class Recurrence:
+    """Horario compilado: conjuntos de minutos, horas, días, meses y días de semana."""
+
+    __slots__ = ("expression", "tz", "once", "minutes", "hours", "days", "months",
+                 "weekdays", "_any_day", "_any_weekday")
+
+    def __init__(self, expression, tz=TIMEZONE):
+        self.expression = expression
+        try:
+            self.tz = ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError) as e:
+            raise ValueError(f"Zona horaria desconocida: {tz}") from e
+        self.once = expression == ONCE
+        if self.once:
+            return
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Se esperaban 5 campos cron: {expression}")
+        try:
+            parsed = [_parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, FIELDS)]
+        except ValueError as e:
+            raise ValueError(f"Expresión cron inválida '{expression}': {e}") from e
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @property
+    def timezone(self):
+        return self.tz.key
+
+    def __repr__(self):
+        return f"Recurrence({self.expression!r}, {self.timezone!r})"
+
+    def _day_matches(self, day):
+        cron_weekday = (day.weekday() + 1) % 7
+        if day.month not in self.months:
+            return False
+        if self._any_day:
+            return self._any_weekday or cron_weekday in self.weekdays
+        if self._any_weekday:
+            return day.day in self.days
+        # Igual que cron: con día del mes y de la semana restringidos, basta uno
+        return day.day in self.days or cron_weekday in self.weekdays
+
+    def next_after(self, ts):
+        """Primera ejecución estrictamente posterior a `ts` (epoch), o None."""
+        if self.once:
+            return None
+        local = datetime.datetime.fromtimestamp(ts, self.tz)
+        times = sorted((h, m) for h in self.hours for m in self.minutes)
+        day = local.date()
+        for _ in range(366 * 4 + 1):
+            if self._day_matches(day):
+                for hour, minute in times:
+                    candidate = datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=self.tz)
+                    epoch = int(candidate.timestamp())
+                    if epoch > ts:
+                        return epoch
+            day += datetime.timedelta(days=1)
+        return None
+
+    def first_run(self, now):
+        """Primera ejecución de una tarea recién guardada."""
+        return int(now) if self.once else self.next_after(now)
+
+
+@lru_cache(maxsize=4096)
+def load(expression, tz=TIMEZONE):
+    """Recurrencia ya compilada a partir de lo guardado en la tabla (con caché)."""
+    return Recurrence(expression, tz)
+
+
+def compile_schedule(text, tz=TIMEZONE):
+    """
+    Compila el texto de la UI a una Recurrence. Lanza ValueError si no se entiende.
+
+    Acepta: "Inmediato", "HH:MM", "<día>[, <día> y <día>] HH:MM",
+    "<día> a <día> HH:MM", "Diario|Semanal|Mensual [HH:MM]", alias cron
+    (@daily, ...) y expresiones cron de cinco campos.
+    """
+    if not text or not text.strip():
+        raise ValueError("El horario está vacío")
+    normalized = _normalize(text)
+    if normalized == "inmediato":
+        return load(ONCE, tz)
+    if len(normalized.split()) == 5 and not _TIME.match(normalized.split()[-1]):
+        return load(normalized, tz)
+
+    words = normalized.replace(",", " ").split()
+    hour, minute = None, None
+    if words and _TIME.match(words[-1]):
+        h, m = _TIME.match(words.pop()).groups()
+        hour, minute = int(h), int(m)
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Hora inválida: {h}:{m}")
+
+    if len(words) == 1 and words[0] in ALIASES:
+        fields = ALIASES[words[0]].split()
+        if hour is not None:
+            fields[0], fields[1] = str(minute), str(hour)
+        return load(" ".join(fields), tz)
+
+    if hour is None:
+        raise ValueError(f"Horario no reconocido: '{text}'. Ejemplos: 08:00, Domingo 03:00, Inmediato")
+
+    days = []
+    index = 0
+    while index < len(words):
+        word = words[index]
+        if word == "y":
+            index += 1
+            continue
+        if word not in WEEKDAYS:
+            raise ValueError(f"Día desconocido '{word}' en el horario '{text}'")
+        if index + 1 < len(words) and words[index + 1] == "a":
+            if index + 2 >= len(words) or words[index + 2] not in WEEKDAYS:
+                raise ValueError(f"Rango de días incompleto en '{text}'")
+            start, end = WEEKDAYS[word], WEEKDAYS[words[index + 2]]
+            days.append(f"{start}-{end}" if start <= end else f"{start}-6,0-{end}")
+            index += 3
+        else:
+            days.append(str(WEEKDAYS[word]))
+            index += 1
+    weekday_field = ",".join(days) if days else "*"
+    return load(f"{minute} {hour} * * {weekday_field}", tz)
+
+
+def next_run_time(schedule, after, first=False, tz=TIMEZONE):
+    """Atajo para texto sin compilar: próxima ejecución o None si no se entiende."""
+    try:
+        recurrence = compile_schedule(schedule, tz)
+    except ValueError:
+        return None
+    return recurrence.first_run(after) if first else recurrence.next_after(after)
@@ -0,0 +1,322 @@
+# sandbox.py
+"""
+Ejecución aislada de las "Automatizaciones Avanzadas".
+
+Los scripts de usuario (deben definir run()) corren en un pool de procesos,
+fuera del hilo de Streamlit, con límites por ejecución de CPU, memoria y
+tiempo real. El bytecode se compila una vez por (id de automatización,
+versión) y se guarda en caché, así un rollback a una versión anterior no
+vuelve a compilar. Resultado, error y duración quedan en
+advanced_automation_logs.
+
+Si un worker no responde ni a sus propios límites (bloqueado en código C),
+hay que reiniciar el pool: ProcessPoolExecutor no deja matar un solo
+proceso sin romper los demás. De eso se encarga un hilo vigilante por pool:
+lee los avisos de inicio de los workers (así el pipe nunca se llena) y
+reinicia el pool cuando una ejecución pasa wall_seconds + grace_seconds,
+aunque nadie esté esperando su resultado. Las otras ejecuciones afectadas
+no se dan por falladas en silencio: las que todavía no habían empezado se vuelven a
+encolar en el pool nuevo y las que estaban corriendo quedan registradas como
+'interrumpida', con el motivo.
+"""
+import itertools
+import marshal
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # Windows: sin límites de CPU/memoria, solo tiempo real
+    resource = None
+
+MAX_OUTPUT_CHARS = 10000
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+# --- Lado del worker -------------------------------------------------------
+
+_worker_code = OrderedDict()
+_started = None  # pipe donde cada worker avisa qué ejecución empezó
+
+
+def _raise_limit(signum, frame):
+    raise LimitExceeded("tiempo de CPU agotado" if signum == getattr(signal, "SIGXCPU", None)
+                        else "tiempo de ejecución agotado")
+
+
+def _init_worker(memory_mb, started=None):
+    global _started
+    _started = started
+    if resource is None or not memory_mb:
+        return
+    try:
+        with open("/proc/self/status") as f:
+            vm_kb = next(int(line.split()[1]) for line in f if line.startswith("VmSize:"))
+    except (OSError, StopIteration):
+        vm_kb = 0
+    limit = vm_kb * 1024 + memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    except (ValueError, OSError):
+        pass
+
+
+def _run_in_worker(token, key, code, cpu_seconds, wall_seconds):
+    if _started is not None:
+        _started.send(token)
+    code_obj = _worker_code.get(key)
+    if code_obj is None:
+        code_obj = _worker_code[key] = marshal.loads(code)
+        if len(_worker_code) > 128:
+            _worker_code.popitem(last=False)
+
+    previous_cpu = None
+    if resource is not None and cpu_seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime) + 1
+        previous_cpu = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, previous_cpu[1]))
+        signal.signal(signal.SIGXCPU, _raise_limit)
+    if hasattr(signal, "setitimer") and wall_seconds:
+        signal.signal(signal.SIGALRM, _raise_limit)
+        signal.setitimer(signal.ITIMER_REAL, wall_seconds)
+
+    started = time.perf_counter()
+    output, error = "", ""
+    try:
+        env = {"__name__": "automatizacion"}
+        exec(code_obj, env)
+        if callable(env.get("run")):
+            output = str(env["run"]())[:MAX_OUTPUT_CHARS]
+            status = "exitoso"
+        else:
+            status, error = "fallo", "El script debe definir una función run()"
+    except LimitExceeded as e:
+        status, error = "limite_excedido", str(e)
+    except MemoryError:
+        status, error = "limite_excedido", "memoria agotada"
+    except BaseException as e:
+        status, error = "fallo", f"{type(e).__name__}: {e}"
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if previous_cpu is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, previous_cpu)
+    return {
+        "status": status,
+        "output": output,
+        "error": error,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+# --- Lado de la app -------------------------------------------------------
+
+class AutomationSandbox:
+    def __init__(self, db, max_workers=None, cpu_seconds=5, memory_mb=256, wall_seconds=10, cache_size=512,
+                 grace_seconds=5):
+        self.db = db
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        # Margen sobre wall_seconds antes de dar al worker por colgado
+        self.grace_seconds = grace_seconds
+        self.cache_size = cache_size
+        self.compilations = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._started_pipe = None  # (lectura, escritura) de los avisos de inicio del pool actual
+        self._pipe_lock = threading.Lock()
+        self._tokens = itertools.count()
+        self._running = set()      # ejecuciones enviadas al pool actual
+        self._started_at = {}      # de esas y de las afectadas por un reinicio, cuándo empezaron
+        self._timed_out = set()    # las que no respondieron y provocaron el reinicio
+        self._collateral = set()   # las demás que estaban en el pool reiniciado
+
+    def _submit(self, token, key, code):
+        with self._lock:
+            if self._executor is None:
+                # forkserver: no copiamos los hilos del servidor de Streamlit
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                context = multiprocessing.get_context(method)
+                # Avisos de pocos bytes: cada escritura en el pipe es atómica, no hace falta un lock
+                # que un worker terminado a la fuerza pueda dejar tomado
+                self._started_pipe = context.Pipe(duplex=False)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.memory_mb, self._started_pipe[1]),
+                )
+                threading.Thread(target=self._watch, args=(self._executor, self._started_pipe[0]),
+                                 name="sandbox-vigilante", daemon=True).start()
+            self._running.add(token)
+            return self._executor.submit(_run_in_worker, token, key, code, self.cpu_seconds, self.wall_seconds)
+
+    def _drain(self, reader, timeout=0):
+        """Anota cuándo empezó cada ejecución que avisó por el pipe."""
+        with self._pipe_lock:
+            try:
+                ready = reader.poll(timeout)
+                while ready:
+                    token = reader.recv()
+                    with self._lock:
+                        if token in self._running or token in self._collateral:
+                            self._started_at.setdefault(token, time.monotonic())
+                    ready = reader.poll()
+            except (EOFError, OSError):  # el pool ya se reinició y el pipe está cerrado
+                pass
+
+    def _watch(self, executor, reader):
+        """Vigilante del pool: vacía el pipe y reinicia el pool si una ejecución no responde."""
+        tick = min(0.5, self.wall_seconds / 4)
+        while True:
+            with self._lock:
+                if self._executor is not executor:
+                    return
+            self._drain(reader, tick)
+            deadline = time.monotonic() - self.wall_seconds - self.grace_seconds
+            with self._lock:
+                overdue = {t for t in self._running if self._started_at.get(t, deadline) < deadline}
+            if overdue:
+                # El temporizador del worker no alcanzó (bloqueado fuera de Python)
+                self._reset_pool(overdue, executor)
+
+    def _reset_pool(self, culprits, executor):
+        """Mata los workers porque `culprits` no responden; el pool nuevo se crea al próximo uso."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            reader, writer = self._started_pipe
+            self._started_pipe = None
+            self._timed_out |= culprits
+            self._collateral |= self._running - culprits
+            self._running = set()
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        # Lo que alcanzaron a avisar antes de morir decide si se vuelven a encolar
+        self._drain(reader)
+        with self._pipe_lock:
+            reader.close()
+            writer.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _timeout_result(self):
+        return {"status": "limite_excedido", "output": "", "error": "tiempo de ejecución agotado",
+                "duration_ms": int((self.wall_seconds + self.grace_seconds) * 1000)}
+
+    def compile(self, automation):
+        """Bytecode serializado de (id, versión); compila solo si no está en caché."""
+        key = (automation["id"], automation["version"])
+        with self._lock:
+            code = self._cache.get(key)
+            if code is not None:
+                self._cache.move_to_end(key)
+                return key, code
+        code = marshal.dumps(compile(automation["script"], f"<automatizacion {key[0]} v{key[1]}>", "exec"))
+        with self._lock:
+            self.compilations += 1
+            self._cache[key] = code
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return key, code
+
+    def _log(self, automation, user_email, result):
+        self.db.log_advanced_automation_run(
+            automation["id"], result["status"], result["output"], result["error"],
+            duration_ms=result["duration_ms"], user_email=user_email,
+        )
+
+    def submit(self, automation, user_email=None):
+        """Lanza la automatización sin bloquear; el Future devuelve el dict de resultado."""
+        try:
+            key, code = self.compile(automation)
+        except SyntaxError as e:
+            result = {"status": "fallo", "output": "", "error": f"SyntaxError: {e}", "duration_ms": 0}
+            self._log(automation, user_email, result)
+            future = Future()
+            future.set_result(result)
+            return future
+
+        # El Future que devolvemos se resuelve después de escribir el log
+        future = Future()
+        self._dispatch(automation, user_email, key, code, future)
+        return future
+
+    def _dispatch(self, automation, user_email, key, code, future):
+        token = next(self._tokens)
+        future.token = token  # la ejecución actual; cambia si se vuelve a encolar
+
+        def log(f):
+            with self._lock:
+                self._running.discard(token)
+                timed_out = token in self._timed_out
+                collateral = token in self._collateral
+                began = self._started_at.pop(token, None) is not None
+                self._timed_out.discard(token)
+                self._collateral.discard(token)
+            try:
+                result = f.result()
+            except (BrokenProcessPool, CancelledError):
+                if timed_out:
+                    result = self._timeout_result()
+                elif collateral and not began:
+                    # Estaba en cola cuando se reinició el pool por otra: no llegó a empezar
+                    self._dispatch(automation, user_email, key, code, future)
+                    return
+                elif collateral:
+                    result = {"status": "interrumpida", "output": "", "duration_ms": 0,
+                              "error": "se reinició el sandbox porque otra automatización no respondía"}
+                else:
+                    result = {"status": "limite_excedido", "output": "", "error": "el proceso fue terminado",
+                              "duration_ms": 0}
+            except Exception as e:
+                result = {"status": "fallo", "output": "", "error": str(e), "duration_ms": 0}
+            try:
+                self._log(automation, user_email, result)
+            finally:
+                future.set_result(result)
+
+        self._submit(token, key, code).add_done_callback(log)
+
+    def result(self, future):
+        """Espera el resultado; el vigilante del pool corta las ejecuciones que no responden."""
+        return future.result()
+
+    def run(self, automation, user_email=None):
+        return self.result(self.submit(automation, user_email))
+
+    def run_many(self, automations, user_email=None):
+        """Ejecuta varias automatizaciones en paralelo y devuelve sus resultados en orden."""
+        futures = [self.submit(a, user_email) for a in automations]
+        return [self.result(f) for f in futures]
+
+    def rollback(self, automation_id):
+        """Vuelve a la versión anterior; su bytecode sigue en caché si ya se había usado."""
+        previous = self.db.rollback_advanced_automation(automation_id)
+        if previous is not None:
+            self.compile(previous)
+        return previous
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pipe, self._started_pipe = self._started_pipe, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if pipe is not None:
+            with self._pipe_lock:
+                for conn in pipe:
+                    conn.close()
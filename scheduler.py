@@ -0,0 +1,262 @@
+# scheduler.py
+"""
+Daemon que ejecuta las tareas guardadas en automation_tasks.
+
+Cada tarea tiene su horario compilado (recurrence.py) y una columna
+next_run_at (epoch, indexada). El daemon solo
+carga las tareas que vencen dentro de la ventana `lookahead`, las mantiene en
+un min-heap ordenado por hora de ejecución y las entrega a un pool acotado de
+hilos. Así el costo por ciclo depende de las tareas próximas, no del tamaño
+de la tabla.
+
+Para no disparar dos veces (reinicios, varios daemons) cada ejecución se
+reclama con un UPDATE condicional sobre next_run_at: solo el proceso que
+avanza next_run_at ejecuta la tarea, y automation_task_runs tiene
+UNIQUE(task_id, scheduled_for).
+
+Cada ejecución en curso guarda su dueño (host:pid) y un lease que el daemon
+renueva mientras corre. Solo se dan por interrumpidas las del propio dueño
+(un reinicio) o las de un daemon que dejó vencer el lease (se cayó); las que
+otro daemon sigue ejecutando no se tocan.
+
+Uso: python scheduler.py [ruta.db]
+"""
+import heapq
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from recurrence import load as load_recurrence
+
+def _notify(task, db):
+    """Registra el aviso de la tarea para su responsable."""
+    message = f"Notificación ({task['notification_method'] or 'Email'}) a {task['responsible'] or task['user_email']}: {task['type']}"
+    with db.pool.transaction() as conn:
+        conn.execute("INSERT INTO automation_task_logs (task_id, action) VALUES (?, ?)", (task['id'], message))
+    return message
+
+
+def _backup(task, db):
+    """Copia en caliente de la base de datos con la API de backup de SQLite."""
+    os.makedirs("backups", exist_ok=True)
+    name, _ = os.path.splitext(os.path.basename(db.db_path))
+    target = os.path.join("backups", f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.db")
+    source = sqlite3.connect(db.db_path)
+    dest = sqlite3.connect(target)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+    return target
+
+
+def _email_masivo(task, db):
+    from campaigns import run_campaign_task
+    return run_campaign_task(task, db)
+
+
+DEFAULT_HANDLERS = {
+    "Backup": _backup,
+    "email_masivo": _email_masivo,
+}
+
+
+class TaskScheduler:
+    def __init__(self, db, handlers=None, max_workers=4, lookahead=60, poll_interval=5,
+                 batch_size=1000, lease=60, owner=None, clock=time.time):
+        self.db = db
+        self.lease = lease
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers = dict(DEFAULT_HANDLERS, **(handlers or {}))
+        self.lookahead = lookahead
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self._heap = []          # (run_at, task_id)
+        self._queued = set()
+        self._next_load = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarea")
+        self._slots = threading.BoundedSemaphore(max_workers * 2)
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def recover(self, now=None, own=True):
+        """
+        Marca como interrumpidas las ejecuciones que quedaron a medias: las
+        de leases vencidos y, al arrancar (own=True), también las propias de
+        antes del reinicio. Devuelve cuántas marcó.
+        """
+        now = self.clock() if now is None else now
+        with self.db.pool.transaction() as conn:
+            marked = conn.execute("""
+                UPDATE automation_task_runs SET status='interrumpida'
+                WHERE status='en_ejecucion' AND (owner=? OR owner IS NULL OR lease_until IS NULL OR lease_until < ?)
+            """, (self.owner if own else None, now)).rowcount
+            if marked:
+                conn.execute("""
+                    UPDATE automation_tasks SET status='interrumpida'
+                    WHERE status='en_ejecucion' AND id NOT IN (
+                        SELECT task_id FROM automation_task_runs WHERE status='en_ejecucion'
+                    )
+                """)
+        return marked
+
+    def renew_leases(self, now=None):
+        """Extiende el lease de las ejecuciones en curso de este daemon."""
+        now = self.clock() if now is None else now
+        with self.db.pool.transaction() as conn:
+            conn.execute("""
+                UPDATE automation_task_runs SET lease_until=?
+                WHERE status='en_ejecucion' AND owner=?
+            """, (now + self.lease, self.owner))
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease / 3):
+            self.renew_leases()
+
+    def _load_window(self, now):
+        """Trae al heap las tareas que vencen antes de now + lookahead (incluye atrasadas)."""
+        horizon = now + self.lookahead
+        last = (-1, 0)
+        while True:
+            rows = self.db.conn.execute("""
+                SELECT id, next_run_at FROM automation_tasks
+                WHERE next_run_at IS NOT NULL AND next_run_at <= ? AND (next_run_at, id) > (?, ?)
+                ORDER BY next_run_at, id LIMIT ?
+            """, (horizon, last[0], last[1], self.batch_size)).fetchall()
+            for task_id, run_at in rows:
+                if task_id not in self._queued:
+                    self._queued.add(task_id)
+                    heapq.heappush(self._heap, (run_at, task_id))
+            if len(rows) < self.batch_size:
+                break
+            last = (rows[-1][1], rows[-1][0])
+        self._next_load = now + self.poll_interval
+        # Ejecuciones de daemons caídos: se liberan apenas vence su lease, sin esperar un reinicio
+        self.recover(now, own=False)
+
+    def _claim(self, task_id, scheduled_for, now):
+        conn = self.db.conn
+        row = conn.execute("""
+            SELECT id, user_email, type, schedule, responsible, notification_method, recurrence, timezone
+            FROM automation_tasks WHERE id=? AND next_run_at=?
+        """, (task_id, scheduled_for)).fetchone()
+        if row is None:
+            return None
+        task = dict(zip(("id", "user_email", "type", "schedule", "responsible", "notification_method",
+                         "recurrence", "timezone"), row))
+        # Avance incremental: la recurrencia ya está compilada, no se vuelve a leer el texto
+        following = None
+        if task["recurrence"]:
+            following = load_recurrence(task["recurrence"], task["timezone"]).next_after(max(now, scheduled_for))
+        with self.db.pool.transaction() as conn:
+            try:
+                task["run_id"] = conn.execute("""
+                    INSERT INTO automation_task_runs (task_id, scheduled_for, started_at, status, owner, lease_until)
+                    VALUES (?, ?, ?, 'en_ejecucion', ?, ?)
+                """, (task_id, scheduled_for, now, self.owner, now + self.lease)).lastrowid
+            except sqlite3.IntegrityError:
+                # Esta ocurrencia ya se ejecutó (o la tiene otro daemon), por ejemplo si la tarea se
+                # volvió a guardar con el mismo next_run_at: se avanza sin repetirla
+                conn.execute("UPDATE automation_tasks SET next_run_at=? WHERE id=? AND next_run_at=?",
+                             (following, task_id, scheduled_for))
+                return None
+            claimed = conn.execute("""
+                UPDATE automation_tasks SET next_run_at=?, status='en_ejecucion'
+                WHERE id=? AND next_run_at=?
+            """, (following, task_id, scheduled_for)).rowcount
+            if not claimed:
+                conn.execute("DELETE FROM automation_task_runs WHERE id=?", (task["run_id"],))
+                return None
+        return task
+
+    def _execute(self, task):
+        handler = self.handlers.get(task["type"], _notify)
+        started = time.perf_counter()
+        output, error = None, None
+        try:
+            output = handler(task, self.db)
+            status = "completada"
+        except Exception as e:
+            status, error = "fallida", str(e)
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        finished = self.clock()
+        with self.db.pool.transaction() as conn:
+            conn.execute("""
+                UPDATE automation_task_runs SET finished_at=?, duration_ms=?, status=?, output=?, error=?
+                WHERE id=?
+            """, (finished, duration_ms, status, None if output is None else str(output), error, task["run_id"]))
+            conn.execute("""
+                UPDATE automation_tasks
+                SET status=?, last_run_at=?, last_duration_ms=?, last_error=?, run_count=run_count+1
+                WHERE id=?
+            """, (status, finished, duration_ms, error, task["id"]))
+        return status
+
+    def _dispatch(self, task):
+        self._slots.acquire()  # si el pool está lleno, el ciclo espera aquí
+        future = self._executor.submit(self._execute, task)
+        with self._running_lock:
+            self._running.add(future)
+
+        def done(f):
+            with self._running_lock:
+                self._running.discard(f)
+            self._slots.release()
+        future.add_done_callback(done)
+
+    def tick(self, now=None):
+        """Un ciclo: recarga la ventana si toca y despacha lo vencido. Devuelve cuántas despachó."""
+        now = self.clock() if now is None else now
+        if now >= self._next_load:
+            self._load_window(now)
+        dispatched = 0
+        while self._heap and self._heap[0][0] <= now:
+            run_at, task_id = heapq.heappop(self._heap)
+            self._queued.discard(task_id)
+            task = self._claim(task_id, run_at, now)
+            if task is not None:
+                self._dispatch(task)
+                dispatched += 1
+        return dispatched
+
+    def drain(self, timeout=None):
+        """Espera a que terminen las tareas en curso."""
+        with self._running_lock:
+            running = list(self._running)
+        wait(running, timeout=timeout)
+
+    def run_forever(self):
+        self.recover()
+        threading.Thread(target=self._heartbeat, name="lease", daemon=True).start()
+        while not self._stop.is_set():
+            self.tick()
+            now = self.clock()
+            wake_at = self._next_load
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+            self._stop.wait(max(0.0, wake_at - now))
+        self.drain()
+        self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    from database import DatabaseManager
+
+    db = DatabaseManager(sys.argv[1] if len(sys.argv) > 1 else "enterprise_flow.db")
+    db.migrate()
+    scheduler = TaskScheduler(db)
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    print("Scheduler de EnterpriseFlow en ejecución")
+    scheduler.run_forever()
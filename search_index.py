@@ -0,0 +1,129 @@
+# search_index.py
+"""
+Búsqueda de texto completo en los documentos subidos (SQLite FTS5).
+
+El texto extraído de cada documento se indexa por página en tablas
+virtuales FTS5 al subirlo. El rowid de cada fila es
+documento * PAGE_SLOTS + página, así reindexar o borrar un documento es un
+rango de rowid y no hace falta guardar columnas extra.
+
+El índice está repartido en SHARDS tablas (document_text_00, ...) según el
+dueño: BM25 calcula la frecuencia de cada término recorriendo todas sus
+apariciones en la tabla, y con un millón de páginas una palabra común hacía
+que ese cálculo costara más que la búsqueda. Dentro de cada tabla, cada fila
+lleva un token con el hash del dueño (`owner_key`); la consulta lo exige y
+FTS5 cruza las listas del índice sin recorrer las coincidencias de otros
+usuarios. Los resultados se ordenan por BM25 y traen un fragmento con los
+términos resaltados.
+"""
+import hashlib
+import re
+
+# Páginas por documento que caben en el rango de rowid de cada uno
+PAGE_SLOTS = 100_000
+# Tablas FTS5 entre las que se reparten los usuarios (ver migración 11)
+SHARDS = 16
+# Marcadores del fragmento; se reemplazan por ** después de escapar el texto
+_OPEN, _CLOSE = "\x02", "\x03"
+_TERM = re.compile(r"\w+", re.UNICODE)
+_MARKDOWN = re.compile(r"([\\`*_{}\[\]<>()#+\-.!|~])")
+
+
+def owner_key(owner):
+    return "u" + hashlib.sha1(owner.strip().lower().encode()).hexdigest()[:20]
+
+
+def shard_table(owner):
+    """Tabla FTS5 donde están las páginas del usuario."""
+    return f"document_text_{int(owner_key(owner)[1:9], 16) % SHARDS:02d}"
+
+
+def build_query(text):
+    """
+    Consulta FTS5 a partir de lo que escribe el usuario: todas las palabras
+    (AND), "frases entre comillas" y la última palabra como prefijo mientras
+    se escribe. Las comillas y operadores de FTS5 no llegan crudos.
+    """
+    parts = []
+    for i, chunk in enumerate(str(text or "").split('"')):
+        if i % 2:  # dentro de comillas
+            words = _TERM.findall(chunk)
+            if words:
+                parts.append('"' + " ".join(words) + '"')
+        else:
+            parts.extend(f'"{w}"' for w in _TERM.findall(chunk))
+    if not parts:
+        return None
+    if str(text).rstrip()[-1:].isalnum() and " " not in parts[-1]:
+        parts[-1] += "*"
+    return " AND ".join(parts)
+
+
+def delete_pages(conn, document_id, owner):
+    """Borra del índice las páginas del documento (dentro de la transacción de quien llama)."""
+    base = document_id * PAGE_SLOTS
+    conn.execute(f"DELETE FROM {shard_table(owner)} WHERE rowid BETWEEN ? AND ?", (base, base + PAGE_SLOTS - 1))
+
+
+def _markdown_snippet(snippet):
+    return _MARKDOWN.sub(r"\\\1", snippet).replace(_OPEN, "**").replace(_CLOSE, "**").replace("\n", " ")
+
+
+class SearchIndex:
+    def __init__(self, db):
+        self.db = db
+
+    def index_document(self, document_id, owner, pages):
+        """(Re)indexa el documento con sus páginas (iterable de textos, la primera es la 1)."""
+        key, table = owner_key(owner), shard_table(owner)
+        base = document_id * PAGE_SLOTS
+        rows = ((base + number, key, text) for number, text in enumerate(pages, 1)
+                if number < PAGE_SLOTS and text and text.strip())
+        with self.db.pool.transaction() as conn:
+            delete_pages(conn, document_id, owner)
+            conn.executemany(f"INSERT INTO {table} (rowid, owner_key, body) VALUES (?, ?, ?)", rows)
+            count = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE rowid BETWEEN ? AND ?", (base, base + PAGE_SLOTS - 1)
+            ).fetchone()[0]
+            conn.execute("UPDATE documents SET indexed_pages=? WHERE id=?", (count, document_id))
+        return count
+
+    def remove_document(self, document_id, owner):
+        with self.db.pool.transaction() as conn:
+            delete_pages(conn, document_id, owner)
+            conn.execute("UPDATE documents SET indexed_pages=NULL WHERE id=?", (document_id,))
+
+    def is_indexed(self, document_id):
+        row = self.db.conn.execute("SELECT indexed_pages FROM documents WHERE id=?", (document_id,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def search(self, owner, text, limit=20, offset=0):
+        """
+        Páginas de los documentos del usuario que contienen todas las palabras,
+        las más relevantes primero: [{'documento_id', 'nombre', 'pagina',
+        'fragmento' (markdown con los términos en negrita), 'puntaje'}].
+        """
+        query = build_query(text)
+        if query is None:
+            return []
+        match = f'owner_key:{owner_key(owner)} AND body:({query})'
+        table = shard_table(owner)
+        conn = self.db.conn
+        # Sin JOIN: con la subconsulta materializada la misma búsqueda tardaba el triple
+        hits = conn.execute(f"""
+            SELECT rowid, bm25({table}, 0.0, 1.0) AS score, snippet({table}, 1, ?, ?, '…', 16)
+            FROM {table} WHERE {table} MATCH ?
+            ORDER BY score LIMIT ? OFFSET ?
+        """, (_OPEN, _CLOSE, match, limit, offset)).fetchall()
+        if not hits:
+            return []
+        ids = {rowid // PAGE_SLOTS for rowid, _, _ in hits}
+        names = dict(conn.execute(
+            f"SELECT id, original_name FROM documents WHERE owner=? AND id IN ({','.join('?' * len(ids))})",
+            (owner, *ids)
+        ).fetchall())
+        return [
+            {"documento_id": rowid // PAGE_SLOTS, "nombre": names[rowid // PAGE_SLOTS], "pagina": rowid % PAGE_SLOTS,
+             "fragmento": _markdown_snippet(fragment), "puntaje": round(-score, 3)}
+            for rowid, score, fragment in hits if rowid // PAGE_SLOTS in names
+        ]
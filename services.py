@@ -0,0 +1,92 @@
+# services.py
+"""
+Servicios compartidos por todas las sesiones del servidor.
+
+Streamlit vuelve a ejecutar main.py en cada interacción, pero los módulos
+importados permanecen en memoria: lo que se guarda aquí se construye una sola
+vez por proceso y lo reutilizan todas las sesiones y todos los reruns.
+"""
+import threading
+
+from database import DatabaseManager
+
+DEFAULT_DB_PATH = "enterprise_flow.db"
+
+
+class ServiceContainer:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._services = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, factory):
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = self._services[name] = factory()
+        return service
+
+    @property
+    def db(self):
+        def build():
+            db = DatabaseManager(self.db_path)
+            db.migrate()
+            return db
+        return self._get("db", build)
+
+    @property
+    def payment(self):
+        def build():
+            from payment_handler import PaymentHandler
+            return PaymentHandler()
+        return self._get("payment", build)
+
+    @property
+    def sandbox(self):
+        def build():
+            from sandbox import AutomationSandbox
+            return AutomationSandbox(self.db)
+        return self._get("sandbox", build)
+
+    @property
+    def extraction_cache(self):
+        def build():
+            from extraction_cache import ExtractionCache
+            return ExtractionCache.for_database(self.db_path)
+        return self._get("extraction_cache", build)
+
+    @property
+    def documents(self):
+        def build():
+            from document_catalog import DocumentCatalog
+            return DocumentCatalog.for_database(self.db)
+        return self._get("documents", build)
+
+    @property
+    def search(self):
+        def build():
+            from search_index import SearchIndex
+            return SearchIndex(self.db)
+        return self._get("search", build)
+
+    @property
+    def ocr(self):
+        def build():
+            from ocr import OCRPool
+            return OCRPool()
+        return self._get("ocr", build)
+
+
+_container = None
+_container_lock = threading.Lock()
+
+def get_services(db_path=DEFAULT_DB_PATH):
+    """Devuelve el contenedor del proceso, creándolo en la primera llamada."""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = ServiceContainer(db_path)
+    return _container
@@ -0,0 +1,82 @@
+# tests/test_batch_invoices.py
+import io
+
+from batch_invoices import BatchInvoicer
+
+USER = "ana@empresa.com"
+
+CSV = "Client_Name,client_email,client_address,subtotal,external_ref\n" + "".join(
+    f"Cliente {i},cliente{i}@correo.com,{'MEX' if i % 2 else 'ESP'},{100 + i},PED-{i}\n" for i in range(30)
+)
+
+
+def fake_pdf(client_name, subtotal, iva_rate, total, invoice_number, template):
+    return f"%PDF {invoice_number} {client_name} {total:.2f}".encode()
+
+
+def invoicer(db, **kwargs):
+    kwargs.setdefault("workers", 0)
+    return BatchInvoicer(db, USER, render=fake_pdf, chunk_size=8, **kwargs)
+
+
+def count(db, sql):
+    return db.conn.execute(sql).fetchone()[0]
+
+
+def test_batch_creates_invoices_logs_and_emails(db):
+    report = invoicer(db).run(io.BytesIO(CSV.encode()))
+    assert (report["procesadas"], report["creadas"], report["omitidas"], report["correos"]) == (30, 30, 0, 30)
+    assert report["errores"] == [] and report["facturas_por_segundo"] > 0
+
+    assert count(db, "SELECT COUNT(*) FROM invoices") == 30
+    assert count(db, "SELECT COUNT(*) FROM invoice_logs") == 30
+    assert count(db, "SELECT COUNT(*) FROM email_outbox WHERE kind='factura'") == 30
+    number, total = db.conn.execute(
+        "SELECT invoice_number, total FROM invoices WHERE external_ref='PED-1'"
+    ).fetchone()
+    assert total == 117.16  # 101 + 16 % de IVA (MEX)
+    with db.open_invoice_pdf(USER, number) as f:
+        assert f.read() == f"%PDF {number} Cliente 1 117.16".encode()
+
+
+def test_sender_is_read_once_per_batch(db, monkeypatch):
+    import mailer
+    reads = []
+    monkeypatch.setattr(mailer, "load_secrets", lambda section: reads.append(section) or {"user": "facturas@empresa.com"})
+    report = invoicer(db).run(io.BytesIO(CSV.encode()))
+    assert report["correos"] == 30 and reads == ["smtp"]
+    assert count(db, "SELECT COUNT(DISTINCT sender) FROM email_outbox") == 1
+    assert db.conn.execute("SELECT sender FROM email_outbox LIMIT 1").fetchone()[0] == "facturas@empresa.com"
+
+
+def test_rerun_skips_rows_already_invoiced(db, tmp_path):
+    path = tmp_path / "clientes.csv"
+    path.write_text(CSV, encoding="utf-8")
+    invoicer(db).run(str(path))
+    extra = CSV + "Cliente nuevo,nuevo@correo.com,MEX,50,PED-nuevo\n"
+    path.write_text(extra, encoding="utf-8")
+
+    report = invoicer(db).run(str(path))
+    assert (report["creadas"], report["omitidas"]) == (1, 30)
+    assert count(db, "SELECT COUNT(*) FROM invoices") == 31
+
+
+def test_rows_without_reference_are_deduplicated_by_content(db):
+    csv_text = "client_name,client_email,client_address,subtotal\nACME,a@acme.com,MEX,10\n"
+    assert invoicer(db, period="2026-10").run(io.StringIO(csv_text))["creadas"] == 1
+    assert invoicer(db, period="2026-10").run(io.StringIO(csv_text))["omitidas"] == 1
+    assert invoicer(db, period="2026-11").run(io.StringIO(csv_text))["creadas"] == 1
+
+
+def test_invalid_rows_are_reported(db):
+    csv_text = "client_name,client_email,client_address,subtotal\nACME,a@acme.com,MEX,diez\n,b@b.com,MEX,10\nOK,c@c.com,ESP,5\n"
+    report = invoicer(db, send_email=False).run(io.StringIO(csv_text))
+    assert report["creadas"] == 1 and report["correos"] == 0
+    assert [e["fila"] for e in report["errores"]] == [2, 3]
+
+
+def test_pdfs_render_in_a_process_pool(db):
+    report = invoicer(db, workers=2).run(io.BytesIO(CSV.encode()))
+    assert report["creadas"] == 30
+    hashes = {r[0] for r in db.conn.execute("SELECT pdf_hash FROM invoices")}
+    assert len(hashes) == 30 and all(db.blobs.exists(h) for h in hashes)
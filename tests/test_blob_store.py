@@ -0,0 +1,68 @@
+# tests/test_blob_store.py
+import hashlib
+import io
+import os
+import sqlite3
+
+from blob_store import BlobStore
+from migrations import MIGRATIONS, apply_migrations
+
+PDF = b"%PDF-1.4\n" + b"1 0 obj << /Type /Page >> endobj\n" * 200
+RANDOM = os.urandom(4096)  # no se comprime
+
+
+def test_put_is_content_addressed_and_deduplicated(tmp_path):
+    store = BlobStore(str(tmp_path))
+    digest, size = store.put(PDF)
+    assert (digest, size) == (hashlib.sha256(PDF).hexdigest(), len(PDF))
+    assert store.put(PDF) == (digest, size)
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 1
+    assert store.read(digest) == PDF
+
+
+def test_compresses_only_when_it_pays(tmp_path):
+    store = BlobStore(str(tmp_path))
+    compressible, _ = store.put(PDF)
+    incompressible, _ = store.put(RANDOM)
+    assert os.path.exists(store._path(compressible) + ".gz")
+    assert os.path.exists(store._path(incompressible))
+    assert store.stored_size() < len(PDF) + len(RANDOM)
+
+    with store.open(incompressible) as f:  # mapeado en memoria
+        f.seek(100)
+        assert f.read(10) == RANDOM[100:110]
+    assert b"".join(store.iter_chunks(compressible, chunk_size=1000)) == PDF
+    target = io.BytesIO()
+    store.copy_to(incompressible, target)
+    assert target.getvalue() == RANDOM
+
+
+def test_invoices_keep_only_hash_and_size(db):
+    db.save_invoice("ana@empresa.com", "ACME", "c@acme.com", "MEX", 100, 0.16, 116, "INV-1", PDF)
+    pdf_file, pdf_hash, pdf_size = db.conn.execute("SELECT pdf_file, pdf_hash, pdf_size FROM invoices").fetchone()
+    assert (pdf_file, pdf_hash, pdf_size) == (None, hashlib.sha256(PDF).hexdigest(), len(PDF))
+    with db.open_invoice_pdf("ana@empresa.com", "INV-1") as f:
+        assert f.read() == PDF
+    assert db.open_invoice_pdf("otro@empresa.com", "INV-1") is None
+    path, _ = db.blobs._existing(pdf_hash)
+    os.remove(path)  # el blob se perdió: la factura sigue listada pero sin PDF
+    assert db.open_invoice_pdf("ana@empresa.com", "INV-1") is None
+
+
+def test_migration_moves_existing_pdfs_out_of_the_database(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, [m for m in MIGRATIONS if m[0] < 8])
+    conn.executemany(
+        "INSERT INTO invoices (user_email, invoice_number, pdf_file) VALUES ('ana@empresa.com', ?, ?)",
+        [(f"INV-{i}", PDF + str(i).encode()) for i in range(5)] + [("INV-sin-pdf", None)],
+    )
+    conn.commit()
+
+    assert 8 in apply_migrations(conn)
+    rows = conn.execute("SELECT invoice_number, pdf_file, pdf_hash, pdf_size FROM invoices ORDER BY id").fetchall()
+    store = BlobStore.for_database(str(path))
+    for i, (number, pdf_file, pdf_hash, pdf_size) in enumerate(rows[:5]):
+        assert pdf_file is None and pdf_size == len(PDF) + 1
+        assert store.read(pdf_hash) == PDF + str(i).encode()
+    assert rows[5][1:] == (None, None, None)
@@ -0,0 +1,147 @@
+# tests/test_campaigns.py
+import email
+import threading
+
+import pytest
+
+from campaigns import (CampaignRunner, CompiledTemplate, DomainRateLimiter, TokenBucket, create_campaign,
+                       get_campaign, import_contacts, pause_campaign, resume_campaign)
+
+USER = "ana@empresa.com"
+
+
+class Outbox:
+    def __init__(self, fail=()):
+        self.sent = []
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+
+    def __call__(self, sender, recipients, message):
+        if recipients[0] in self.fail:
+            raise OSError("conexión rechazada")
+        with self.lock:
+            self.sent.append((recipients[0], email.message_from_bytes(message)))
+
+
+class NoLimit:
+    def acquire(self, address):
+        pass
+
+
+@pytest.fixture
+def recipients_csv(tmp_path):
+    path = tmp_path / "destinatarios.csv"
+    lines = ["Email,Nombre"] + [f"persona{i}@dominio{i % 3}.com,Persona {i}" for i in range(1, 51)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def runner(db, outbox, chunk_size=10):
+    return CampaignRunner(db, outbox, "app@empresa.com", max_workers=4, chunk_size=chunk_size, rate_limiter=NoLimit())
+
+
+def test_template_is_compiled_once_and_escapes_values():
+    template = CompiledTemplate("<p>Hola {{ nombre }}, tu correo es {{email}}</p>")
+    assert template.fields == {"nombre", "email"}
+    assert template.render({"nombre": "<Ana>", "email": "a@b.com"}) == "<p>Hola &lt;Ana&gt;, tu correo es a@b.com</p>"
+    assert template.render({}) == "<p>Hola , tu correo es </p>"
+
+
+def test_csv_campaign_is_sent_and_rendered(db, recipients_csv):
+    outbox = Outbox()
+    campaign_id = create_campaign(db, USER, "Novedades", "<b>Hola {{ nombre }}</b>", csv_path=recipients_csv)
+    assert get_campaign(db, campaign_id)["total"] == 50
+
+    assert runner(db, outbox).run(campaign_id) == "completada"
+    assert len(outbox.sent) == 50
+    address, message = sorted(outbox.sent)[0]
+    assert message["Subject"] == "Novedades"
+    html = message.get_payload()[0]
+    assert html.get_content_type() == "text/html"
+    assert "Hola Persona" in html.get_payload(decode=True).decode()
+    progress = get_campaign(db, campaign_id)
+    assert (progress["sent"], progress["failed"], progress["cursor"]) == (50, 0, 50)
+
+
+def test_pause_and_resume_continue_from_checkpoint(db, recipients_csv):
+    outbox = Outbox()
+    task_id = db.save_automation_task(USER, {"type": "email_masivo", "schedule": "Inmediato"})
+    campaign_id = create_campaign(db, USER, "Novedades", "Hola", csv_path=recipients_csv, task_id=task_id)
+    assert runner(db, outbox).run(campaign_id, max_chunks=2) == "pendiente"
+    assert get_campaign(db, campaign_id)["cursor"] == 20
+
+    assert pause_campaign(db, campaign_id)
+    assert runner(db, outbox).run(campaign_id) == "pausada"
+    assert len(outbox.sent) == 20
+
+    assert resume_campaign(db, campaign_id, now=1_800_000_000)
+    assert db.conn.execute("SELECT next_run_at FROM automation_tasks WHERE id=?", (task_id,)).fetchone()[0] == 1_800_000_000
+    assert runner(db, outbox).run(campaign_id) == "completada"
+    assert len({address for address, _ in outbox.sent}) == 50 == len(outbox.sent)
+
+
+def test_contact_list_source_and_failures_are_tracked(db):
+    contacts = [{"email": f"c{i}@empresa.com", "nombre": f"C{i}"} for i in range(25)]
+    contacts.append({"email": "sin-arroba", "nombre": "X"})
+    import_contacts(db, USER, "clientes", iter(contacts), chunk_size=7)
+    outbox = Outbox(fail={"c3@empresa.com"})
+    campaign_id = create_campaign(db, USER, "Oferta", "Hola {{ nombre }}", contact_list="clientes")
+
+    assert runner(db, outbox, chunk_size=8).run(campaign_id) == "completada"
+    progress = get_campaign(db, campaign_id)
+    assert (progress["total"], progress["sent"], progress["failed"]) == (26, 24, 2)
+    errors = dict(db.conn.execute(
+        "SELECT recipient, error FROM campaign_deliveries WHERE campaign_id=? AND status='fallido'", (campaign_id,)
+    ).fetchall())
+    assert errors == {"c3@empresa.com": "conexión rechazada", "sin-arroba": "dirección inválida"}
+
+
+def test_only_one_runner_per_campaign(db, recipients_csv):
+    campaign_id = create_campaign(db, USER, "Novedades", "Hola", csv_path=recipients_csv)
+    first = runner(db, Outbox())
+    assert first._claim(campaign_id)
+    assert runner(db, Outbox()).run(campaign_id) == "en_curso"
+
+
+def test_scheduled_campaign_and_its_task_are_saved_together(db, recipients_csv):
+    campaign_id = create_campaign(db, USER, "Novedades", "Hola", csv_path=recipients_csv, schedule="Inmediato")
+    task_id, task_type, next_run_at = db.conn.execute("""
+        SELECT t.id, t.type, t.next_run_at FROM automation_tasks t JOIN campaigns c ON c.task_id = t.id WHERE c.id=?
+    """, (campaign_id,)).fetchone()
+    assert task_type == "email_masivo" and next_run_at is not None
+
+    tasks = db.conn.execute("SELECT COUNT(*) FROM automation_tasks").fetchone()[0]
+    with pytest.raises(ValueError):
+        create_campaign(db, USER, "x", "y", csv_path=recipients_csv, schedule="cuando pueda")
+    with pytest.raises(ValueError):
+        create_campaign(db, USER, "x", "y", schedule="Inmediato")
+    assert db.conn.execute("SELECT COUNT(*) FROM automation_tasks").fetchone()[0] == tasks
+
+
+def test_campaign_needs_exactly_one_source(db, recipients_csv):
+    with pytest.raises(ValueError):
+        create_campaign(db, USER, "x", "y")
+    with pytest.raises(ValueError):
+        create_campaign(db, USER, "x", "y", csv_path=recipients_csv, contact_list="clientes")
+
+
+def test_token_bucket_limits_rate_per_domain():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        bucket.acquire()
+    # 2 de ráfaga y luego uno cada 0,5 s
+    assert now[0] == pytest.approx(2.0)
+
+    limiter = DomainRateLimiter(default_rate=5, rates={"gmail.com": 2})
+    limiter.acquire("a@gmail.com")
+    limiter.acquire("b@GMAIL.com")
+    limiter.acquire("c@empresa.com")
+    assert set(limiter._buckets) == {"gmail.com", "empresa.com"}
+    assert limiter._buckets["gmail.com"].rate == 2
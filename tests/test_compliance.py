@@ -0,0 +1,46 @@
+# tests/test_compliance.py
+import json
+import random
+import time
+
+from compliance import DEFAULT_RULESETS, RuleEngine, load_rulesets
+
+
+def test_multiword_phrases_match_across_accents_case_and_line_breaks():
+    text = "El tratamiento de DATOS\nPERSONALES requiere consentimiento.\fLa gestion de riesgos y el Control  Interno."
+    result = RuleEngine().audit(text)
+    assert result["GDPR"]["cumple"] and result["SOX"]["cumple"] and result["ISO27001"]["cumple"]
+    assert result["GDPR"]["terminos"] == {"datos personales": 1, "consentimiento": 1}
+    hit = result["ISO27001"]["ubicaciones"][0]
+    assert hit["termino"] == "gestión de riesgos" and hit["pagina"] == 2
+    assert text[hit["inicio"]:hit["fin"]] == "gestion de riesgos"
+
+
+def test_no_partial_words_and_longest_term_wins():
+    result = RuleEngine().audit("Procesos riesgosos y controles internos. Gestión de riesgos.")
+    assert result["SOX"]["coincidencias"] == 0
+    assert result["ISO27001"]["terminos"] == {"gestión de riesgos": 1}
+
+
+def test_minimum_and_custom_rulesets(tmp_path):
+    rules = {"Privacidad": {"minimo": 2, "terminos": ["cookies", "datos de navegación"]}}
+    path = tmp_path / "reglas.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    engine = RuleEngine(load_rulesets(str(path)))
+    assert not engine.audit("Usamos cookies. Más cookies.")["Privacidad"]["cumple"]
+    assert engine.audit("Usamos cookies y datos de navegacion.")["Privacidad"]["cumple"]
+    assert engine.version != RuleEngine(DEFAULT_RULESETS).version
+    assert load_rulesets(str(tmp_path / "no_existe.json")) is DEFAULT_RULESETS
+
+
+def test_500_pages_in_well_under_a_second():
+    rnd = random.Random(0)
+    words = "el la de que y en los del se las por un para con una su al lo como más pero sus informe área".split()
+    pages = [" ".join(rnd.choice(words) for _ in range(450)) + " control interno y riesgos" for _ in range(500)]
+    text = "\f".join(pages)
+    engine = RuleEngine()
+    start = time.perf_counter()
+    result = engine.audit(text)
+    assert time.perf_counter() - start < 0.5
+    assert result["SOX"]["coincidencias"] == 500
+    assert len(result["SOX"]["ubicaciones"]) == 20  # las posiciones se recortan, el conteo no
@@ -0,0 +1,60 @@
+# tests/test_compliance_audit.py
+import csv
+import io
+import json
+
+import pytest
+
+from compliance import DEFAULT_RULESETS
+from compliance_audit import CorpusAudit, report_to_csv, report_to_json
+from document_catalog import DocumentCatalog
+
+
+@pytest.fixture
+def catalog(db, tmp_path):
+    catalog = DocumentCatalog(db, str(tmp_path / "docs"))
+    catalog.add("ana@empresa.com", "politica.txt", "Tratamiento de datos personales.".encode(), "text/plain")
+    catalog.add("ana@empresa.com", "sox.txt", "Informe de control interno y riesgos.".encode(), "text/plain")
+    catalog.add("ana@empresa.com", "foto.png", b"\x89PNG", "image/png")
+    catalog.add("luis@empresa.com", "ajeno.txt", "consentimiento".encode(), "text/plain")
+    return catalog
+
+
+def test_audits_only_the_owner_and_aggregates(db, catalog):
+    report = CorpusAudit(db, catalog, workers=0).run("ana@empresa.com")
+    assert (report["auditados"], report["reutilizados"], report["omitidos"]) == (2, 0, 1)
+    assert {d["nombre"] for d in report["documentos"]} == {"politica.txt", "sox.txt"}
+    gdpr = report["marcos"]["GDPR"]
+    assert (gdpr["documentos"], gdpr["cumplen"], gdpr["porcentaje"]) == (2, 1, 50.0)
+    assert report["marcos"]["ISO27001"]["terminos_frecuentes"] == {"riesgos": 1}
+
+
+def test_results_are_reused_until_content_or_rules_change(db, catalog):
+    CorpusAudit(db, catalog, workers=0).run("ana@empresa.com")
+    again = CorpusAudit(db, catalog, workers=0).run("ana@empresa.com")
+    assert (again["auditados"], again["reutilizados"]) == (0, 2)
+
+    catalog.add("ana@empresa.com", "nuevo.txt", "auditor externo".encode(), "text/plain")
+    assert CorpusAudit(db, catalog, workers=0).run("ana@empresa.com")["auditados"] == 1
+
+    rules = dict(DEFAULT_RULESETS, Privacidad={"minimo": 1, "terminos": ["cookies"]})
+    changed = CorpusAudit(db, catalog, rulesets=rules, workers=0).run("ana@empresa.com")
+    assert (changed["auditados"], changed["reutilizados"]) == (3, 0)
+    assert changed["marcos"]["Privacidad"]["documentos"] == 3
+
+
+def test_process_pool_gives_the_same_report(db, catalog, tmp_path):
+    serial = CorpusAudit(db, catalog, workers=0).run("ana@empresa.com")
+    db.conn.execute("DELETE FROM compliance_results")
+    db.conn.commit()
+    parallel = CorpusAudit(db, catalog, workers=2, batch_size=1,
+                           cache_path=str(tmp_path / "cache.db")).run("ana@empresa.com")
+    assert parallel["marcos"] == serial["marcos"]
+
+
+def test_exports(db, catalog):
+    report = CorpusAudit(db, catalog, workers=0).run("ana@empresa.com")
+    rows = list(csv.DictReader(io.StringIO(report_to_csv(report))))
+    assert len(rows) == 2 * len(DEFAULT_RULESETS)
+    assert {r["cumple"] for r in rows if r["documento"] == "politica.txt" and r["marco"] == "GDPR"} == {"sí"}
+    assert json.loads(report_to_json(report))["marcos"]["SOX"]["cumplen"] == 1
@@ -0,0 +1,58 @@
+# tests/test_database.py
+import threading
+
+from database import DatabaseManager
+
+
+def test_same_thread_reuses_connection(db):
+    assert db.pool.connection() is db.pool.connection()
+    assert DatabaseManager(db.db_path).conn is db.conn
+
+
+def test_threads_get_their_own_connection(db):
+    seen = []
+    worker = threading.Thread(target=lambda: seen.append(db.pool.connection()))
+    worker.start()
+    worker.join()
+    assert seen[0] is not db.pool.connection()
+
+
+def test_finished_thread_returns_connection_to_pool(db):
+    seen = []
+    for _ in range(3):
+        worker = threading.Thread(target=lambda: seen.append(id(db.pool.connection())))
+        worker.start()
+        worker.join()
+    assert len(set(seen)) == 1
+
+
+def test_pragmas_applied(db):
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_user_roundtrip(db):
+    assert db.create_user("Ana@Empresa.com ", "secreta")
+    assert not db.create_user("ana@empresa.com", "otra")
+    assert db.verify_user("ana@empresa.com", "secreta")
+    assert not db.verify_user("ana@empresa.com", "mala")
+
+
+def test_failed_transaction_rolls_back(db):
+    try:
+        with db.pool.transaction() as conn:
+            conn.execute("INSERT INTO users (email, password) VALUES ('x@y.com', 'p')")
+            raise RuntimeError("falla")
+    except RuntimeError:
+        pass
+    assert db.get_user("x@y.com") is None
+
+
+def test_invoices_and_tasks(db):
+    db.save_invoice("ana@empresa.com", "ACME", "c@acme.com", "Madrid", 100, 0.21, 121, "INV-1", b"%PDF")
+    db.log_invoice_action("INV-1", "ana@empresa.com", "generada")
+    db.update_invoice_status("INV-1", "enviada")
+    assert db.get_invoices_by_user("ana@empresa.com")[0]["Estado"] == "enviada"
+
+    db.save_automation_task("ana@empresa.com", {"type": "Backup", "schedule": "08:00"})
+    assert db.get_automation_tasks("ana@empresa.com")[0]["Tipo"] == "Backup"
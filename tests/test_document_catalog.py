@@ -0,0 +1,120 @@
+# tests/test_document_catalog.py
+import io
+import os
+import sqlite3
+
+from database import DatabaseManager
+from document_catalog import DocumentCatalog, safe_name
+from migrations import apply_migrations
+
+
+def test_add_stores_per_user_and_deduplicates(db, tmp_path):
+    catalog = DocumentCatalog(db, str(tmp_path / "docs"))
+    doc, new = catalog.add("ana@empresa.com", "contrato.pdf", io.BytesIO(b"%PDF contrato"), "application/pdf")
+    assert new and doc["nombre"] == "contrato.pdf" and doc["tamaño"] == 13
+    assert doc["ruta"].startswith(catalog.user_dir("ana@empresa.com"))
+    again, new = catalog.add("ana@empresa.com", "contrato (1).pdf", b"%PDF contrato")
+    assert not new and again["id"] == doc["id"]
+    other, new = catalog.add("luis@empresa.com", "contrato.pdf", b"%PDF contrato")
+    assert new and other["id"] != doc["id"]
+    files = [f for _, _, names in os.walk(tmp_path / "docs") for f in names]
+    assert len(files) == 2
+
+
+def test_list_is_paginated_and_scoped_to_owner(db, tmp_path):
+    catalog = DocumentCatalog(db, str(tmp_path / "docs"))
+    for i in range(5):
+        catalog.add("ana@empresa.com", f"doc{i}.txt", f"contenido {i}".encode())
+    catalog.add("luis@empresa.com", "ajeno.txt", b"de luis")
+    assert catalog.count("ana@empresa.com") == 5
+    first, last = catalog.list("ana@empresa.com", 1, 2), catalog.list("ana@empresa.com", 3, 2)
+    assert [d["nombre"] for d in first] == ["doc4.txt", "doc3.txt"]
+    assert [d["nombre"] for d in last] == ["doc0.txt"]
+
+
+def test_read_checks_owner_and_delete_removes_file(db, tmp_path):
+    catalog = DocumentCatalog(db, str(tmp_path / "docs"))
+    doc, _ = catalog.add("ana@empresa.com", "../../etc/passwd", b"secreto")
+    assert os.path.dirname(catalog.path(doc)).startswith(str(tmp_path / "docs"))
+    assert catalog.read("luis@empresa.com", doc["id"]) is None
+    assert catalog.read("ana@empresa.com", doc["id"]) == b"secreto"
+    assert catalog.delete("ana@empresa.com", doc["id"])
+    assert not os.path.exists(catalog.path(doc)) and catalog.count("ana@empresa.com") == 0
+
+
+def test_losing_an_upload_race_is_not_new_and_leaves_no_orphan(db, tmp_path, monkeypatch):
+    catalog = DocumentCatalog(db, str(tmp_path / "docs"))
+    real_find = catalog.find
+    calls = []
+
+    def racing_find(owner, sha256):
+        if not calls:  # otra sesión sube el mismo contenido justo después de nuestra consulta
+            calls.append(DocumentCatalog(db, catalog.root).add(owner, "contrato (copia).pdf", b"%PDF contrato"))
+            return None
+        return real_find(owner, sha256)
+
+    monkeypatch.setattr(catalog, "find", racing_find)
+    doc, new = catalog.add("ana@empresa.com", "contrato.pdf", b"%PDF contrato")
+    assert not new and doc == calls[0][0]
+    files = [f for _, _, names in os.walk(tmp_path / "docs") for f in names]
+    assert files == [os.path.basename(doc["ruta"])]
+
+
+def test_safe_name():
+    assert safe_name("../a/b/informe final.pdf") == "informe final.pdf"
+    assert safe_name("") == "documento"
+
+
+def test_migration_registers_legacy_uploads(tmp_path):
+    legacy = tmp_path / "uploaded_docs"
+    legacy.mkdir()
+    (legacy / "ana_g@empresa.com_20240101120000_informe.pdf").write_bytes(b"informe")
+    (legacy / "ana_g@empresa.com_20240101120005_informe.pdf").write_bytes(b"informe")  # copia de un rerun
+    (legacy / "ana_g@empresa.com_20240103080000_informe final.pdf").write_bytes(b"informe")
+    (legacy / "luis@empresa.com_20240102090000_foto.png").write_bytes(b"png")
+    (legacy / "suelto.txt").write_bytes(b"sin usuario")
+    before = sorted(os.listdir(legacy))
+    conn = sqlite3.connect(str(tmp_path / "app.db"))
+    apply_migrations(conn)
+    rows = conn.execute(
+        "SELECT owner, original_name, storage_path, uploaded_at FROM documents ORDER BY owner"
+    ).fetchall()
+    assert rows == [
+        ("ana_g@empresa.com", "informe.pdf", "ana_g@empresa.com_20240101120000_informe.pdf", "2024-01-01 12:00:00"),
+        ("luis@empresa.com", "foto.png", "luis@empresa.com_20240102090000_foto.png", "2024-01-02 09:00:00"),
+    ]
+    copies = conn.execute("""
+        SELECT d.original_name, c.original_name, c.storage_path FROM document_copies c
+        JOIN documents d ON d.id = c.document_id ORDER BY c.storage_path
+    """).fetchall()
+    assert copies == [
+        ("informe.pdf", "informe.pdf", "ana_g@empresa.com_20240101120005_informe.pdf"),
+        ("informe.pdf", "informe final.pdf", "ana_g@empresa.com_20240103080000_informe final.pdf"),
+    ]
+    assert sorted(os.listdir(legacy)) == before  # la migración no borra archivos
+    conn.close()
+
+
+def test_duplicate_copies_are_removed_by_maintenance(tmp_path):
+    legacy = tmp_path / "uploaded_docs"
+    legacy.mkdir()
+    (legacy / "ana@empresa.com_20240101120000_informe.pdf").write_bytes(b"informe")
+    (legacy / "ana@empresa.com_20240101120005_informe.pdf").write_bytes(b"informe")
+    (legacy / "ana@empresa.com_20240103080000_final.pdf").write_bytes(b"informe")
+    manager = DatabaseManager(str(tmp_path / "app.db"))
+    manager.migrate()
+    # Alguien cambió una copia después de la migración: esa no se toca
+    (legacy / "ana@empresa.com_20240103080000_final.pdf").write_bytes(b"otro contenido")
+    catalog = DocumentCatalog.for_database(manager)
+    assert catalog.remove_duplicate_copies() == 1
+    assert sorted(os.listdir(legacy)) == ["ana@empresa.com_20240101120000_informe.pdf",
+                                          "ana@empresa.com_20240103080000_final.pdf"]
+    assert catalog.remove_duplicate_copies() == 0
+    names = manager.conn.execute("SELECT original_name FROM document_copies ORDER BY id").fetchall()
+    assert names == [("informe.pdf",), ("final.pdf",)]  # los nombres quedan registrados
+
+    doc = catalog.list("ana@empresa.com")[0]
+    assert catalog.delete("ana@empresa.com", doc["id"])
+    assert os.listdir(legacy) == []
+    assert manager.conn.execute("SELECT COUNT(*) FROM document_copies").fetchone()[0] == 0
+    manager.pool.close_all()
@@ -0,0 +1,78 @@
+# tests/test_extraction_cache.py
+import os
+
+import pytest
+
+import text_extraction
+from extraction_cache import ExtractionCache
+from text_extraction import detect_kind, extract_text
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    yield cache
+    cache.pool.close_all()
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    calls = []
+
+    def extract(data):
+        calls.append(data)
+        return f"texto de {data.decode()} " * 50
+
+    monkeypatch.setitem(text_extraction.EXTRACTORS, "pdf", (None, extract))
+    return calls
+
+
+def test_same_content_is_extracted_once(cache, fake_pdf):
+    first = extract_text(b"contrato", "pdf", cache)
+    assert extract_text(b"contrato", "pdf", cache) == first
+    assert fake_pdf == [b"contrato"]
+    extract_text(b"otro", "pdf", cache)
+    assert len(fake_pdf) == 2
+
+
+def test_cache_survives_restarts_and_is_shared(tmp_path, fake_pdf):
+    path = str(tmp_path / "cache.db")
+    extract_text(b"contrato", "pdf", ExtractionCache(path))
+    fresh = ExtractionCache(path)  # otro proceso / otro usuario
+    assert "contrato" in extract_text(b"contrato", "pdf", fresh)
+    assert fake_pdf == [b"contrato"]
+
+
+def test_new_extractor_version_misses(cache, fake_pdf, monkeypatch):
+    extract_text(b"contrato", "pdf", cache)
+    monkeypatch.setattr(text_extraction, "EXTRACTOR_REVISION", text_extraction.EXTRACTOR_REVISION + 1)
+    extract_text(b"contrato", "pdf", cache)
+    assert len(fake_pdf) == 2
+
+
+def test_lru_eviction_by_size(tmp_path):
+    now = [0.0]
+    cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=5000, memory_bytes=0, clock=lambda: now[0])
+    texts = [os.urandom(1800).hex() for _ in range(3)]  # ~1,9 KB comprimido cada uno
+
+    def put(i):
+        now[0] += 100
+        cache.put(f"k{i}", texts[i])
+
+    put(0)
+    put(1)
+    now[0] += 100
+    assert cache.get("k0") == texts[0]  # k0 pasa a ser la más reciente
+    put(2)
+    assert cache.stats()["bytes"] <= 5000
+    assert cache.get("k1") is None
+    assert cache.get("k0") == texts[0] and cache.get("k2") == texts[2]
+
+
+def test_detect_kind():
+    assert detect_kind("application/pdf") == "pdf"
+    assert detect_kind("image/png") == "image"
+    assert detect_kind(None, "Contrato.DOCX") == "docx"
+    assert detect_kind("application/zip", "x.zip") is None
+    with pytest.raises(ValueError):
+        extract_text(b"", "zip")
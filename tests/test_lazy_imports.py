@@ -0,0 +1,38 @@
+# tests/test_lazy_imports.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lazy_imports import LazyModule
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_deferred_until_first_attribute(tmp_path, monkeypatch):
+    (tmp_path / "modulo_pesado.py").write_text("VALOR = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    lazy = LazyModule("modulo_pesado")
+    assert "modulo_pesado" not in sys.modules
+    assert lazy.VALOR == 42
+    assert lazy.is_loaded
+    assert "modulo_pesado" in sys.modules
+
+
+def test_missing_module_reports_install_hint():
+    lazy = LazyModule("modulo_que_no_existe", "pip install algo")
+    with pytest.raises(ImportError, match="pip install algo"):
+        lazy.cualquier_cosa
+
+
+def test_startup_modules_do_not_pull_heavy_dependencies():
+    code = (
+        "import sys, services, lazy_imports\n"
+        "heavy = ['numpy', 'pandas', 'spacy', 'tensorflow', 'fpdf', 'PyPDF2', 'stripe']\n"
+        "print([m for m in heavy if m in sys.modules])\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=ROOT, check=True).stdout
+    assert out.strip() == "[]"
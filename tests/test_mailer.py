@@ -0,0 +1,162 @@
+# tests/test_mailer.py
+import email
+import socketserver
+import threading
+
+import pytest
+
+from mailer import OutboxWorker, SMTPConnectionPool, enqueue_email, get_outbox_status
+
+NOW = 1_800_000_000
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo (EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT)."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.rejected = set()      # destinatarios con 550
+        self.busy = 0              # próximos DATA que responden 451
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 fake ESMTP")
+        rcpts = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-fake")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                server.logins += 1
+                self.reply("235 ok")
+            elif verb in ("MAIL", "RSET"):
+                rcpts = []
+                self.reply("250 ok")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip("<> ")
+                if address in server.rejected:
+                    self.reply("550 no such user")
+                else:
+                    rcpts.append(address)
+                    self.reply("250 ok")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                data = b""
+                while not data.endswith(b"\r\n.\r\n"):
+                    data += self.rfile.readline()
+                if server.busy:
+                    server.busy -= 1
+                    self.reply("451 try again later")
+                else:
+                    server.messages.append((rcpts, email.message_from_bytes(data[:-5])))
+                    self.reply("250 queued")
+            elif verb == "NOOP":
+                self.reply("250 ok")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    server = FakeSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def worker(db, smtp_server):
+    pool = SMTPConnectionPool("127.0.0.1", smtp_server.server_address[1], "app@empresa.com", "secreto",
+                              starttls=False, size=2)
+    worker = OutboxWorker(db, pool, batch_size=10, backoff=30)
+    yield worker
+    pool.close_all()
+
+
+def enqueue(db, recipient, **kwargs):
+    return enqueue_email(db, recipient, "Asunto", "Cuerpo", [("doc.pdf", b"%PDF-1.4")],
+                         sender="app@empresa.com", now=NOW, **kwargs)
+
+
+def test_enqueue_only_writes_the_outbox(db, smtp_server):
+    email_id = enqueue(db, "cliente@correo.com")
+    assert get_outbox_status(db, email_id)["status"] == "pendiente"
+    assert smtp_server.connections == 0
+
+
+def test_batch_is_sent_over_reused_connections(db, smtp_server, worker):
+    ids = [enqueue(db, f"cliente{i}@correo.com") for i in range(25)]
+    assert worker.deliver_once(NOW) == {"enviado": 10}
+    assert worker.deliver_once(NOW) == {"enviado": 10}
+    assert worker.deliver_once(NOW) == {"enviado": 5}
+    assert worker.deliver_once(NOW) == {}
+
+    assert all(get_outbox_status(db, i)["status"] == "enviado" for i in ids)
+    assert len(smtp_server.messages) == 25
+    assert smtp_server.connections <= 2 and smtp_server.logins == smtp_server.connections
+    rcpts, message = smtp_server.messages[0]
+    assert message["Subject"] == "Asunto"
+    assert [p.get_filename() for p in message.walk() if p.get_filename()] == ["doc.pdf"]
+
+
+def test_temporary_failures_retry_with_backoff(db, smtp_server, worker):
+    email_id = enqueue(db, "cliente@correo.com")
+    smtp_server.busy = 2
+
+    assert worker.deliver_once(NOW) == {"pendiente": 1}
+    status = get_outbox_status(db, email_id)
+    assert (status["status"], status["attempts"]) == ("pendiente", 1)
+    assert "451" in status["last_error"]
+    # Todavía no vence el reintento
+    assert worker.deliver_once(NOW + 29) == {}
+    assert worker.deliver_once(NOW + 30) == {"pendiente": 1}
+    # La segunda espera es el doble
+    assert worker.deliver_once(NOW + 30 + 59) == {}
+    assert worker.deliver_once(NOW + 30 + 60) == {"enviado": 1}
+    assert get_outbox_status(db, email_id)["attempts"] == 3
+
+
+def test_permanent_failures_are_not_retried(db, smtp_server, worker):
+    smtp_server.rejected.add("nadie@correo.com")
+    bad = enqueue(db, "nadie@correo.com")
+    good = enqueue(db, "cliente@correo.com")
+    assert worker.deliver_once(NOW) == {"fallido": 1, "enviado": 1}
+    assert get_outbox_status(db, bad)["status"] == "fallido"
+    assert get_outbox_status(db, good)["status"] == "enviado"
+    assert worker.deliver_once(NOW + 3600) == {}
+
+
+def test_stale_claims_are_recovered(db, worker):
+    email_id = enqueue(db, "cliente@correo.com")
+    assert [e["id"] for e in worker.claim(NOW)] == [email_id]
+    # El worker que lo reclamó se cayó: nadie más lo toma hasta que vence el lease
+    assert worker.claim(NOW + 1) == []
+    assert [e["id"] for e in worker.claim(NOW + worker.lease + 1)] == [email_id]
+
+
+def test_invoice_is_marked_sent_on_delivery(db, smtp_server, worker):
+    db.save_invoice("ana@empresa.com", "ACME", "cliente@correo.com", "MEX", 100, 0.16, 116, "INV-1", b"%PDF")
+    enqueue(db, "cliente@correo.com", user_email="ana@empresa.com", kind="factura", reference="INV-1")
+    worker.deliver_once(NOW)
+    assert db.get_invoices_by_user("ana@empresa.com")[0]["Estado"] == "enviada"
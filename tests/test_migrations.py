@@ -0,0 +1,70 @@
+# tests/test_migrations.py
+import sqlite3
+
+import pytest
+
+from database import HOT_QUERIES
+from migrations import MIGRATIONS, apply_migrations
+
+
+def test_migrations_apply_once(tmp_path):
+    conn = sqlite3.connect(tmp_path / "app.db")
+    assert apply_migrations(conn) == [v for v, _, _ in MIGRATIONS]
+    assert apply_migrations(conn) == []
+    rows = conn.execute("SELECT version FROM schema_migrations ORDER BY version").fetchall()
+    assert [r[0] for r in rows] == [v for v, _, _ in MIGRATIONS]
+
+
+def test_failed_migration_is_not_recorded(tmp_path):
+    conn = sqlite3.connect(tmp_path / "app.db")
+
+    def broken(c):
+        c.execute("CREATE TABLE a_medias (id INTEGER)")
+        raise RuntimeError("falla")
+
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn, [(1, "rota", broken)])
+    assert conn.execute("SELECT COUNT(*) FROM schema_migrations").fetchone()[0] == 0
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name='a_medias'").fetchone()
+
+
+def test_legacy_tables_are_upgraded_keeping_data(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT UNIQUE, password TEXT,
+                            plan TEXT DEFAULT 'free', trial_end DATE);
+        CREATE TABLE automation_tasks (id INTEGER PRIMARY KEY, user_email TEXT, task_type TEXT, schedule TEXT);
+        INSERT INTO users (email, password, plan) VALUES ('ana@empresa.com', 'x', 'premium');
+        INSERT INTO automation_tasks (user_email, task_type, schedule) VALUES ('ana@empresa.com', 'Backup', '08:00');
+    """)
+    conn.commit()
+    apply_migrations(conn)
+
+    assert conn.execute("SELECT email, plan, nombre FROM users").fetchone() == ("ana@empresa.com", "premium", None)
+    assert conn.execute("SELECT type, schedule, status FROM automation_tasks").fetchone() == ("Backup", "08:00", "pendiente")
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_queries_use_an_index(db, name):
+    plan = db.conn.execute(f"EXPLAIN QUERY PLAN {HOT_QUERIES[name]}", ("ana@empresa.com",)).fetchall()
+    details = [row[3] for row in plan]
+    assert not any(d.startswith("SCAN") for d in details), details
+    assert not any("TEMP B-TREE" in d for d in details), details
+
+
+def test_legacy_schedules_get_a_first_run(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript("""
+        CREATE TABLE automation_tasks (id INTEGER PRIMARY KEY, user_email TEXT, task_type TEXT, schedule TEXT);
+        INSERT INTO automation_tasks (user_email, task_type, schedule) VALUES ('ana@empresa.com', 'Backup', '08:00');
+        INSERT INTO automation_tasks (user_email, task_type, schedule) VALUES ('ana@empresa.com', 'Sync', 'Diario 09:00');
+        INSERT INTO automation_tasks (user_email, task_type, schedule) VALUES ('ana@empresa.com', 'Sync', 'cuando pueda');
+    """)
+    conn.commit()
+    apply_migrations(conn, [m for m in MIGRATIONS if m[0] <= 4])
+    # La migración 3 solo entendía los horarios de entonces
+    assert [r[0] is not None for r in conn.execute("SELECT next_run_at FROM automation_tasks ORDER BY id")] == \
+        [True, False, False]
+    apply_migrations(conn)
+    rows = conn.execute("SELECT next_run_at IS NOT NULL, status FROM automation_tasks ORDER BY id").fetchall()
+    assert rows == [(1, "pendiente"), (1, "pendiente"), (0, "horario_invalido")]
@@ -0,0 +1,88 @@
+# tests/test_ocr.py
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from extraction_cache import ExtractionCache
+from ocr import MAX_SIDE, OCRPool, count_pages, load_page, preprocess, thumbnail
+from text_extraction import ocr_document
+
+
+def fake_engine(image, lang):
+    """Motor de prueba: devuelve el tamaño y el modo de la imagen que recibiría Tesseract."""
+    return f"{image.width}x{image.height} {image.mode} {lang}"
+
+
+def image_bytes(size, fmt="PNG", color=(200, 30, 30), **save):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, fmt, **save)
+    return out.getvalue()
+
+
+def tiff_pages(sizes):
+    frames = [Image.new("RGB", size, "white") for size in sizes]
+    out = io.BytesIO()
+    frames[0].save(out, "TIFF", save_all=True, append_images=frames[1:])
+    return out.getvalue()
+
+
+def test_high_dpi_scan_is_reduced_to_300_dpi():
+    image = Image.open(io.BytesIO(image_bytes((2400, 1200), dpi=(600, 600))))
+    result = preprocess(image)
+    assert result.mode == "L"
+    assert result.size == (1200, 600)
+
+
+def test_large_photo_without_dpi_is_capped():
+    result = preprocess(Image.new("RGBA", (8000, 4000), (0, 0, 0, 0)))
+    assert max(result.size) == MAX_SIDE
+    assert result.getpixel((0, 0)) == 255  # la transparencia queda blanca, no negra
+
+
+def test_small_images_are_not_upscaled():
+    assert preprocess(Image.new("RGB", (640, 480))).size == (640, 480)
+
+
+def test_multipage_tiff_pages(tmp_path):
+    path = tmp_path / "scan.tif"
+    path.write_bytes(tiff_pages([(100, 50), (200, 80), (300, 90)]))
+    assert count_pages(str(path)) == 3
+    assert load_page(str(path), "image", 2).size == (300, 90)
+
+
+def test_recognize_reports_each_page():
+    progress = []
+    result = OCRPool(workers=0, engine=fake_engine).recognize(
+        tiff_pages([(100, 50), (200, 80)]), progress=lambda done, total: progress.append((done, total))
+    )
+    assert result["texto"] == "100x50 L spa\f200x80 L spa"
+    assert [p["pagina"] for p in result["paginas"]] == [1, 2]
+    assert all(p["segundos"] >= 0 for p in result["paginas"])
+    assert progress == [(1, 2), (2, 2)]
+
+
+def test_process_pool_keeps_page_order():
+    pool = OCRPool(workers=2, engine=fake_engine, pages_in_flight=1)
+    try:
+        result = pool.recognize(tiff_pages([(10 * i, 10) for i in range(1, 7)]))
+    finally:
+        pool.shutdown()
+    assert [line.split(" ")[0] for line in result["texto"].split("\f")] == [f"{10 * i}x10" for i in range(1, 7)]
+
+
+def test_ocr_document_reuses_cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    pool = OCRPool(workers=0, engine=fake_engine)
+    data = image_bytes((120, 60))
+    first = ocr_document(data, "image", cache, pool)
+    again = ocr_document(data, "image", cache, pool)
+    assert not first["desde_cache"] and again["desde_cache"]
+    assert again["texto"] == first["texto"] == "120x60 L spa"
+    cache.pool.close_all()
+
+
+def test_thumbnail_is_small_jpeg():
+    preview = Image.open(io.BytesIO(thumbnail(image_bytes((3000, 2000), "JPEG"))))
+    assert preview.format == "JPEG" and max(preview.size) == 800
@@ -0,0 +1,65 @@
+# tests/test_pdf_engine.py
+import io
+
+import pytest
+
+import pdf_engine
+from pdf_engine import (CERTIFICATE_TEMPLATE, INVOICE_TEMPLATES, PDFTemplate, render_certificate, render_invoice,
+                        render_receipt)
+
+
+@pytest.fixture
+def fpdf2():
+    return pytest.importorskip("fpdf")
+
+
+@pytest.fixture
+def signature(fpdf2, tmp_path):
+    from PIL import Image
+    path = tmp_path / "firma.png"
+    Image.new("RGBA", (120, 60), (0, 0, 80, 255)).save(path)
+    return str(path)
+
+
+def test_templates_know_their_fields():
+    assert INVOICE_TEMPLATES["Estándar"].fields == {"invoice_number", "client_name", "subtotal", "iva_percent", "total", "fecha"}
+    assert "signature_path" in CERTIFICATE_TEMPLATE.fields
+    with pytest.raises(ValueError):
+        PDFTemplate("rota", [("tabla", "x")])
+
+
+def test_missing_values_fail_before_rendering():
+    with pytest.raises(KeyError, match="client_name"):
+        INVOICE_TEMPLATES["Estándar"].render({"invoice_number": "INV-1"})
+
+
+def test_documents_render_to_bytes(fpdf2):
+    for template in INVOICE_TEMPLATES:
+        pdf = render_invoice("ACME", 100.0, 0.16, 116.0, "INV-1", template)
+        assert isinstance(pdf, bytes) and pdf.startswith(b"%PDF")
+    assert render_receipt("Ana", 50.0, "Consultoría", "ana@empresa.com").startswith(b"%PDF")
+
+
+def test_streaming_output(fpdf2):
+    out = io.BytesIO()
+    assert render_invoice("ACME", 100.0, 0.21, 121.0, "INV-2", out=out) is None
+    assert out.getvalue().startswith(b"%PDF")
+
+
+def test_signature_is_decoded_once_per_process(signature, monkeypatch):
+    pdf_engine.clear_caches()
+    first = render_certificate("Luis", "Gran trabajo", "CEO", signature, cert_id="ABC")
+    assert first["cert_id"] == "ABC" and first["pdf_bytes"].startswith(b"%PDF")
+    assert len(pdf_engine._images) == 1
+
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+    second = render_certificate("Luis", "Gran trabajo", "CEO", signature)
+    assert second["pdf_bytes"].startswith(b"%PDF")
+    assert signature not in map(str, opened)
+
+
+def test_missing_signature_is_reported(fpdf2):
+    with pytest.raises(FileNotFoundError):
+        render_certificate("Luis", "Gran trabajo", "CEO", "firmas/no_existe.png")
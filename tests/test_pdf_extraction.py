@@ -0,0 +1,79 @@
+# tests/test_pdf_extraction.py
+import pytest
+
+pytest.importorskip("PyPDF2")
+fpdf = pytest.importorskip("fpdf")
+
+from extraction_cache import ExtractionCache
+from pdf_extraction import extract_pdf_text, iter_pages, parse_page_range
+from text_extraction import extract_text, stream_pdf_pages
+
+
+def make_pdf(pages):
+    pdf = fpdf.FPDF()
+    pdf.set_font("Helvetica", size=12)
+    for i in range(1, pages + 1):
+        pdf.add_page()
+        pdf.cell(0, 10, f"Contenido de la pagina {i}")
+    return bytes(pdf.output())
+
+
+@pytest.fixture(scope="module")
+def document():
+    return make_pdf(6)
+
+
+def test_parse_page_range():
+    assert parse_page_range("", 5) == [0, 1, 2, 3, 4]
+    assert parse_page_range("1-2, 4", 5) == [0, 1, 3]
+    assert parse_page_range("4-", 5) == [3, 4]
+    assert parse_page_range("2, 1-3", 5) == [1, 0, 2]
+    for bad in ("0", "3-9", "a-b", "4-2"):
+        with pytest.raises(ValueError):
+            parse_page_range(bad, 5)
+
+
+def test_pages_are_yielded_in_order(document):
+    pages = list(iter_pages(document, "2-3, 6", workers=0))
+    assert [n for n, _ in pages] == [2, 3, 6]
+    assert all(f"pagina {n}" in text for n, text in pages)
+
+
+def test_damaged_page_is_logged_and_left_empty(document, monkeypatch, caplog):
+    from PyPDF2 import PageObject
+    real = PageObject.extract_text
+
+    def extract(page, *args, **kwargs):
+        if "pagina 2" in real(page, *args, **kwargs):
+            raise ValueError("flujo dañado")
+        return real(page, *args, **kwargs)
+
+    monkeypatch.setattr(PageObject, "extract_text", extract)
+    pages = list(iter_pages(document, "1-3", workers=0))
+    assert pages[1] == (2, "") and "pagina 3" in pages[2][1]
+    assert "Error extrayendo la página 2: flujo dañado" in caplog.text
+
+
+def test_parallel_extraction_matches_serial(document, tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(document)
+    assert list(iter_pages(str(path), workers=2)) == list(iter_pages(document, workers=0))
+
+
+def test_stopping_early_does_not_extract_the_rest(document):
+    pages = iter_pages(document, workers=2)
+    assert next(pages)[0] == 1
+    pages.close()
+
+
+def test_whole_document_is_cached_and_served_by_page(document, tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    partial = list(stream_pdf_pages(document, cache, "1-2"))
+    assert [(n, total) for n, total, _ in partial] == [(1, 2), (2, 2)]
+    assert cache.stats()["entradas"] == 0  # un rango parcial no se guarda
+
+    extracted = list(stream_pdf_pages(document, cache))
+    assert cache.stats()["entradas"] == 1
+    assert list(stream_pdf_pages(document, cache, "5-6")) == [(5, 2, extracted[4][2]), (6, 2, extracted[5][2])]
+    assert extract_text(document, "pdf", cache) == extract_pdf_text(document)
+    cache.pool.close_all()
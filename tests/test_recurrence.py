@@ -0,0 +1,71 @@
+# tests/test_recurrence.py
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from recurrence import compile_schedule, next_run_time
+
+MADRID = ZoneInfo("Europe/Madrid")
+
+
+def at(*args, tz=MADRID):
+    return int(datetime.datetime(*args, tzinfo=tz).timestamp())
+
+
+@pytest.mark.parametrize("text, expression", [
+    ("08:00", "0 8 * * *"),
+    ("Domingo 03:00", "0 3 * * 0"),
+    ("Inmediato", "@once"),
+    ("Diario", "0 0 * * *"),
+    ("Semanal", "0 0 * * 0"),
+    ("Mensual 10:30", "30 10 1 * *"),
+    ("lunes a viernes 09:15", "15 9 * * 1-5"),
+    ("Sábado y domingo 10:00", "0 10 * * 6,0"),
+    ("*/15 * * * *", "*/15 * * * *"),
+])
+def test_compile(text, expression):
+    assert compile_schedule(text, "Europe/Madrid").expression == expression
+
+
+@pytest.mark.parametrize("text", ["", "mañana", "25:00", "lunes a 08:00", "61 * * * *", "Feriado 08:00"])
+def test_invalid_schedules_raise(text):
+    with pytest.raises(ValueError):
+        compile_schedule(text, "Europe/Madrid")
+
+
+def test_unknown_timezone_raises():
+    with pytest.raises(ValueError):
+        compile_schedule("08:00", "Marte/Olympus")
+
+
+def test_next_after_daily_and_weekly():
+    sunday = at(2026, 10, 11, 7, 59)
+    assert compile_schedule("08:00", "Europe/Madrid").next_after(sunday) == at(2026, 10, 11, 8, 0)
+    assert compile_schedule("07:00", "Europe/Madrid").next_after(sunday) == at(2026, 10, 12, 7, 0)
+    assert compile_schedule("Domingo 03:00", "Europe/Madrid").next_after(sunday) == at(2026, 10, 18, 3, 0)
+
+
+def test_next_after_keeps_local_time_across_dst():
+    # El 25/10/2026 Madrid pasa de UTC+2 a UTC+1: las 08:00 siguen siendo las 08:00 locales
+    recurrence = compile_schedule("08:00", "Europe/Madrid")
+    before = recurrence.next_after(at(2026, 10, 24, 7, 0))
+    after = recurrence.next_after(before)
+    assert after - before == 25 * 3600
+    assert datetime.datetime.fromtimestamp(after, MADRID).hour == 8
+
+
+def test_monthly_on_day_31_skips_short_months():
+    recurrence = compile_schedule("0 12 31 * *", "Europe/Madrid")
+    assert recurrence.next_after(at(2026, 4, 1, 0, 0)) == at(2026, 5, 31, 12, 0)
+
+
+def test_once_runs_immediately_and_never_again():
+    recurrence = compile_schedule("Inmediato", "UTC")
+    assert recurrence.first_run(1000) == 1000
+    assert recurrence.next_after(1000) is None
+    assert next_run_time("cuando pueda", 1000) is None
+
+
+def test_compiled_schedules_are_cached():
+    assert compile_schedule("08:00", "UTC") is compile_schedule("08:00", "UTC")
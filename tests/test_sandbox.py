@@ -0,0 +1,126 @@
+# tests/test_sandbox.py
+import time
+
+import pytest
+
+from sandbox import AutomationSandbox
+
+USER = "ana@empresa.com"
+
+
+@pytest.fixture
+def sandbox(db):
+    sandbox = AutomationSandbox(db, max_workers=2, cpu_seconds=2, memory_mb=128, wall_seconds=2)
+    yield sandbox
+    sandbox.shutdown()
+
+
+def save(db, name, script):
+    automation_id, version = db.save_advanced_automation(USER, name, script)
+    return {"id": automation_id, "name": name, "script": script, "version": version}
+
+
+def logs(db, automation_id):
+    return db.conn.execute(
+        "SELECT status, output, error, duration_ms, user_email FROM advanced_automation_logs WHERE automation_id=?",
+        (automation_id,),
+    ).fetchall()
+
+
+def test_run_logs_result_and_duration(db, sandbox):
+    adv = save(db, "suma", "def run():\n    return sum(range(10))\n")
+    result = sandbox.run(adv, USER)
+    assert (result["status"], result["output"]) == ("exitoso", "45")
+    [(status, output, error, duration_ms, user)] = logs(db, adv["id"])
+    assert (status, output, error, user) == ("exitoso", "45", "", USER)
+    assert duration_ms is not None
+
+
+def test_errors_are_logged(db, sandbox):
+    broken = save(db, "roto", "def run(:\n")
+    failing = save(db, "falla", "def run():\n    raise RuntimeError('sin datos')\n")
+    missing = save(db, "sin_run", "x = 1\n")
+    lookup = save(db, "clave", "def run():\n    return {}['cliente']\n")
+    results = sandbox.run_many([broken, failing, missing, lookup], USER)
+    assert [r["status"] for r in results] == ["fallo"] * 4
+    assert results[0]["error"].startswith("SyntaxError")
+    assert results[1]["error"] == "RuntimeError: sin datos"
+    assert "run()" in results[2]["error"]
+    assert results[3]["error"] == "KeyError: 'cliente'"
+
+
+def test_limits_stop_runaway_scripts(db, sandbox):
+    loop = save(db, "bucle", "def run():\n    while True:\n        pass\n")
+    sleeper = save(db, "dormido", "import time\ndef run():\n    time.sleep(30)\n")
+    hungry = save(db, "memoria", "def run():\n    return len(bytearray(1024 ** 3))\n")
+    results = sandbox.run_many([loop, sleeper, hungry], USER)
+    assert [r["status"] for r in results] == ["limite_excedido"] * 3
+    # El pool sigue sirviendo después de los límites
+    assert sandbox.run(save(db, "ok", "def run():\n    return 'ok'\n"))["output"] == "ok"
+
+
+def test_bytecode_is_cached_per_version_and_rollback_does_not_recompile(db, sandbox):
+    v1 = save(db, "reporte", "def run():\n    return 1\n")
+    sandbox.run(v1)
+    sandbox.run(v1)
+    assert sandbox.compilations == 1
+
+    v2 = save(db, "reporte", "def run():\n    return 2\n")
+    assert [a["version"] for a in db.get_advanced_automations(USER)] == [2]
+    assert sandbox.run(v2)["output"] == "2"
+    assert sandbox.compilations == 2
+
+    previous = sandbox.rollback(v2["id"])
+    assert (previous["id"], previous["version"]) == (v1["id"], 1)
+    assert [a["id"] for a in db.get_advanced_automations(USER)] == [v1["id"]]
+    assert sandbox.run(previous)["output"] == "1"
+    assert sandbox.compilations == 2
+
+
+def test_rollback_without_previous_version(db, sandbox):
+    only = save(db, "unico", "def run():\n    return 0\n")
+    assert sandbox.rollback(only["id"]) is None
+    assert [a["id"] for a in db.get_advanced_automations(USER)] == [only["id"]]
+
+
+# Bloquea las señales de sus propios límites: solo la detiene reiniciar el pool
+STUCK = ("import signal, time\n"
+         "def run():\n"
+         "    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM, signal.SIGXCPU})\n"
+         "    time.sleep(30)\n")
+
+
+def wait_until_started(sandbox, future, timeout=30):
+    deadline = time.monotonic() + timeout
+    while future.token not in sandbox._started_at:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_stuck_worker_does_not_silently_fail_the_others(db):
+    sandbox = AutomationSandbox(db, max_workers=2, wall_seconds=2, grace_seconds=0.5)
+    try:
+        stuck = sandbox.submit(save(db, "colgada", STUCK), USER)
+        wait_until_started(sandbox, stuck)
+        time.sleep(1)
+        running = sandbox.submit(save(db, "también_corría", STUCK), USER)
+        queued = sandbox.submit(save(db, "en_cola", "def run():\n    return 'ok'\n"), USER)
+        # Nadie llama a result(): el vigilante corta la colgada por su cuenta
+        assert stuck.result(timeout=10)["status"] == "limite_excedido"
+        # La que corría en el pool reiniciado queda registrada con el motivo
+        interrupted = running.result(timeout=10)
+        assert interrupted["status"] == "interrumpida" and "otra automatización" in interrupted["error"]
+        # La que no había empezado se vuelve a encolar y termina bien
+        assert queued.result(timeout=30)["output"] == "ok"
+        statuses = [row[0] for row in db.conn.execute("SELECT status FROM advanced_automation_logs ORDER BY id")]
+        assert sorted(statuses) == ["exitoso", "interrumpida", "limite_excedido"]
+    finally:
+        sandbox.shutdown()
+
+
+def test_many_runs_do_not_fill_the_start_notices(db, sandbox):
+    # Más ejecuciones que los avisos de inicio que entran en el buffer de un pipe (64 KiB)
+    adv = save(db, "rapida", "def run():\n    return 1\n")
+    futures = [sandbox.submit(adv) for _ in range(6000)]
+    assert {f.result(timeout=60)["status"] for f in futures} == {"exitoso"}
+    assert sandbox._started_at == {}
@@ -0,0 +1,140 @@
+# tests/test_scheduler.py
+import datetime
+import threading
+from zoneinfo import ZoneInfo
+
+from config import TIMEZONE
+from scheduler import TaskScheduler
+
+NOW = datetime.datetime(2026, 10, 11, 7, 59, tzinfo=ZoneInfo(TIMEZONE)).timestamp()  # domingo 07:59
+
+
+def add_task(db, schedule, task_type="Reporte", next_run_at=None):
+    task_id = db.save_automation_task("ana@empresa.com", {"type": task_type, "schedule": schedule})
+    if next_run_at is not None:
+        with db.pool.transaction() as conn:
+            conn.execute("UPDATE automation_tasks SET next_run_at=? WHERE id=?", (next_run_at, task_id))
+    return task_id
+
+
+def runs(db, task_id):
+    return db.conn.execute(
+        "SELECT scheduled_for, status, duration_ms FROM automation_task_runs WHERE task_id=?", (task_id,)
+    ).fetchall()
+
+
+def test_due_task_runs_once_and_is_rescheduled(db):
+    calls = []
+    task_id = add_task(db, "08:00", next_run_at=NOW)
+    scheduler = TaskScheduler(db, handlers={"Reporte": lambda task, db: calls.append(task["id"])})
+
+    assert scheduler.tick(NOW) == 1
+    scheduler.drain()
+    assert calls == [task_id]
+    assert scheduler.tick(NOW + 1) == 0
+
+    status, next_run_at, run_count, duration = db.conn.execute(
+        "SELECT status, next_run_at, run_count, last_duration_ms FROM automation_tasks WHERE id=?", (task_id,)
+    ).fetchone()
+    assert (status, next_run_at, run_count) == ("completada", NOW + 60, 1)
+    assert duration is not None
+    assert runs(db, task_id)[0][:2] == (NOW, "completada")
+
+
+def test_restart_does_not_fire_twice(db):
+    task_id = add_task(db, "08:00", next_run_at=NOW)
+    first = TaskScheduler(db, handlers={"Reporte": lambda task, db: None})
+    second = TaskScheduler(db, handlers={"Reporte": lambda task, db: None})
+    second._load_window(NOW)  # cargó la tarea antes de que la reclame el primero
+
+    assert first.tick(NOW) == 1
+    assert second.tick(NOW) == 0
+    first.drain()
+    assert len(runs(db, task_id)) == 1
+
+
+def test_immediate_task_runs_only_once(db):
+    task_id = add_task(db, "Inmediato")
+    scheduler = TaskScheduler(db, handlers={"Reporte": lambda task, db: None})
+    assert scheduler.tick() == 1
+    scheduler.drain()
+    assert db.conn.execute("SELECT next_run_at FROM automation_tasks WHERE id=?", (task_id,)).fetchone()[0] is None
+    assert scheduler.tick(NOW + 10 ** 8) == 0
+
+
+def test_only_tasks_inside_window_are_loaded(db):
+    for i in range(50):
+        add_task(db, "08:00", next_run_at=NOW + 3600 + i)
+    add_task(db, "08:00", next_run_at=NOW + 30)
+    scheduler = TaskScheduler(db, lookahead=60, batch_size=10)
+    scheduler._load_window(NOW)
+    assert len(scheduler._heap) == 1
+
+
+def test_failing_handler_is_recorded(db):
+    def broken(task, db):
+        raise RuntimeError("sin conexión")
+
+    task_id = add_task(db, "08:00", next_run_at=NOW)
+    scheduler = TaskScheduler(db, handlers={"Reporte": broken})
+    scheduler.tick(NOW)
+    scheduler.drain()
+    assert db.conn.execute("SELECT status, last_error FROM automation_tasks WHERE id=?", (task_id,)).fetchone() == (
+        "fallida", "sin conexión"
+    )
+
+
+def test_default_handler_logs_notification(db):
+    task_id = add_task(db, "08:00", task_type="Recordatorio", next_run_at=NOW)
+    scheduler = TaskScheduler(db)
+    scheduler.tick(NOW)
+    scheduler.drain()
+    action = db.conn.execute("SELECT action FROM automation_task_logs WHERE task_id=?", (task_id,)).fetchone()[0]
+    assert "Recordatorio" in action
+
+
+def test_resaved_occurrence_does_not_overwrite_another_run(db):
+    task_id = add_task(db, "08:00", next_run_at=NOW)
+    other_id = add_task(db, "08:00", next_run_at=NOW + 3600)
+    scheduler = TaskScheduler(db, handlers={"Reporte": lambda task, db: "primera"})
+    scheduler.tick(NOW)
+    scheduler.drain()
+    # Se vuelve a guardar con la misma hora que ya se ejecutó
+    with db.pool.transaction() as conn:
+        conn.execute("UPDATE automation_tasks SET next_run_at=? WHERE id=?", (NOW, task_id))
+    scheduler._load_window(NOW + 1)
+    assert scheduler.tick(NOW + 1) == 0
+    scheduler.tick(NOW + 3600)
+    scheduler.drain()
+    # La ocurrencia repetida no se volvió a ejecutar ni escribió sobre la ejecución de otra tarea
+    assert [r[:2] for r in runs(db, task_id)] == [(NOW, "completada"), (NOW + 60, "completada")]
+    assert [r[:2] for r in runs(db, other_id)] == [(NOW + 3600, "completada")]
+
+
+def test_recover_leaves_runs_of_live_daemons_alone(db):
+    started = []
+    release = threading.Event()
+
+    def slow(task, db):
+        started.append(task["id"])
+        release.wait(5)
+
+    busy_id = add_task(db, "08:00", next_run_at=NOW)
+    stale_id = add_task(db, "08:00", next_run_at=NOW)
+    live = TaskScheduler(db, handlers={"Reporte": slow}, owner="host-a:1", lease=60, clock=lambda: NOW)
+    live.tick(NOW)
+    with db.pool.transaction() as conn:  # un daemon caído que dejó vencer su lease
+        conn.execute("UPDATE automation_task_runs SET owner='host-b:2', lease_until=? WHERE task_id=?",
+                     (NOW - 1, stale_id))
+
+    starting = TaskScheduler(db, owner="host-c:3", clock=lambda: NOW + 30)
+    assert starting.recover() == 1
+    # Mientras sigue en ejecución, el daemon vivo extiende su lease
+    live.renew_leases(NOW + 50)
+    assert db.conn.execute("SELECT lease_until FROM automation_task_runs WHERE task_id=?",
+                           (busy_id,)).fetchone()[0] == NOW + 50 + 60
+    release.set()
+    live.drain()
+    status = dict(db.conn.execute("SELECT task_id, status FROM automation_task_runs").fetchall())
+    assert status[busy_id] == "completada"
+    assert db.conn.execute("SELECT status FROM automation_tasks WHERE id=?", (busy_id,)).fetchone()[0] == "completada"
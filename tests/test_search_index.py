@@ -0,0 +1,58 @@
+# tests/test_search_index.py
+import pytest
+
+from document_catalog import DocumentCatalog
+from search_index import SearchIndex, build_query
+
+
+@pytest.fixture
+def catalog(db, tmp_path):
+    return DocumentCatalog(db, str(tmp_path / "docs"))
+
+
+def add(catalog, owner, name, pages):
+    doc, _ = catalog.add(owner, name, "\f".join(pages).encode())
+    SearchIndex(catalog.db).index_document(doc["id"], owner, pages)
+    return doc
+
+
+def test_build_query():
+    assert build_query("contrato anual") == '"contrato" AND "anual"*'
+    assert build_query('"datos personales" OR x') == '"datos personales" AND "OR" AND "x"*'
+    assert build_query('NEAR( ") ') == '"NEAR"'  # sin operadores crudos
+    assert build_query("  ") is None
+
+
+def test_search_is_scoped_ranked_and_highlighted(db, catalog):
+    add(catalog, "ana@empresa.com", "politica.pdf", [
+        "Introducción general del documento.",
+        "Tratamiento de datos personales y consentimiento del titular de los datos personales.",
+    ])
+    add(catalog, "ana@empresa.com", "acta.pdf", ["Se mencionan datos personales una vez en el acta."])
+    add(catalog, "luis@empresa.com", "ajeno.pdf", ["Datos personales de otro usuario."])
+    search = SearchIndex(db)
+
+    results = search.search("ana@empresa.com", "datos personales")
+    assert [(r["nombre"], r["pagina"]) for r in results] == [("politica.pdf", 2), ("acta.pdf", 1)]
+    assert "**datos**" in results[0]["fragmento"]
+    assert search.search("luis@empresa.com", "consentimiento") == []
+
+
+def test_accents_prefixes_and_phrases(db, catalog):
+    add(catalog, "ana@empresa.com", "iso.pdf", ["Política de Seguridad de la Información y gestión de riesgos."])
+    search = SearchIndex(db)
+    assert search.search("ana@empresa.com", "informacion politica")
+    assert search.search("ana@empresa.com", "riesg")
+    assert search.search("ana@empresa.com", '"seguridad de la informacion"')
+    assert not search.search("ana@empresa.com", '"informacion de la seguridad"')
+
+
+def test_reindex_and_delete(db, catalog):
+    doc = add(catalog, "ana@empresa.com", "borrador.pdf", ["versión con presupuesto"])
+    search = SearchIndex(db)
+    assert search.is_indexed(doc["id"])
+    search.index_document(doc["id"], "ana@empresa.com", ["versión final sin cifras"])
+    assert not search.search("ana@empresa.com", "presupuesto")
+    assert search.search("ana@empresa.com", "cifras")
+    catalog.delete("ana@empresa.com", doc["id"])
+    assert not search.search("ana@empresa.com", "cifras")
@@ -0,0 +1,36 @@
+# tests/test_services.py
+import threading
+
+import services
+from services import ServiceContainer
+
+
+def test_db_built_once_with_schema(tmp_path):
+    container = ServiceContainer(str(tmp_path / "app.db"))
+    db = container.db
+    assert container.db is db
+    tables = {r[0] for r in db.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"user_rewards", "personal_goals", "medical_records", "leave_requests"} <= tables
+
+
+def test_concurrent_sessions_share_one_instance(tmp_path):
+    container = ServiceContainer(str(tmp_path / "app.db"))
+    built = []
+    results = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(container._get("x", factory))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 1
+    assert len({id(r) for r in results}) == 1
+
+
+def test_get_services_is_process_wide(monkeypatch):
+    monkeypatch.setattr(services, "_container", None)
+    assert services.get_services() is services.get_services()
@@ -0,0 +1,145 @@
+# text_extraction.py
+"""
+Extracción de texto de los documentos subidos (PDF, Word, imágenes, texto).
+
+Usada por el gestor de documentos y por la auditoría normativa. El
+resultado se guarda en la caché por contenido (extraction_cache.py), así
+volver a mostrar o auditar el mismo archivo no vuelve a parsearlo.
+"""
+import hashlib
+import io
+from importlib import metadata
+
+from lazy_imports import docx
+from ocr import OCRPool
+from pdf_extraction import extract_pdf_text, iter_pages, page_count, parse_page_range
+
+# Se suma a la versión de la librería: subirlo invalida lo extraído antes
+EXTRACTOR_REVISION = 3
+# Separador entre páginas de un PDF en el texto guardado
+PAGE_BREAK = "\f"
+# Documentos con más texto que esto se muestran por páginas pero no se guardan en la caché
+MAX_CACHED_CHARS = 20_000_000
+
+
+def _library_version(package):
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "0"
+
+
+def _pdf(data):
+    return extract_pdf_text(data, separator=PAGE_BREAK)
+
+
+def _docx(data):
+    return "\n".join(para.text for para in docx.Document(io.BytesIO(data)).paragraphs)
+
+
+def _image(data):
+    return OCRPool(workers=0).recognize(data, "image")["texto"]
+
+
+def _scan(data):
+    return OCRPool(workers=0).recognize(data, "pdf")["texto"]
+
+
+def _text(data):
+    return data.decode("utf-8", errors="replace")
+
+
+# tipo: (paquete cuya versión forma parte de la clave, función)
+EXTRACTORS = {
+    "pdf": ("PyPDF2", _pdf),
+    "docx": ("python-docx", _docx),
+    "image": ("pytesseract", _image),
+    "scan": ("pytesseract", _scan),  # PDF escaneado: OCR de las imágenes de cada página
+    "txt": (None, _text),
+}
+
+MIME_KINDS = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "txt",
+}
+
+
+def detect_kind(mime_type=None, filename=""):
+    if mime_type in MIME_KINDS:
+        return MIME_KINDS[mime_type]
+    if mime_type and mime_type.startswith("image/"):
+        return "image"
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return {"pdf": "pdf", "docx": "docx", "txt": "txt", "png": "image", "jpg": "image", "jpeg": "image",
+            "tif": "image", "tiff": "image"}.get(extension)
+
+
+def extractor_version(kind):
+    package, _ = EXTRACTORS[kind]
+    library = _library_version(package) if package else "-"
+    return f"{library}.{EXTRACTOR_REVISION}"
+
+
+def extract_text(data, kind, cache=None):
+    """Texto del documento; con `cache` solo se extrae la primera vez que se ve este contenido."""
+    if kind not in EXTRACTORS:
+        raise ValueError(f"Tipo de documento no soportado: {kind}")
+    extract = EXTRACTORS[kind][1]
+    if cache is None or kind == "txt":
+        return extract(data)
+    key = cache.key(hashlib.sha256(data).hexdigest(), kind, extractor_version(kind))
+    return cache.get_or_extract(key, lambda: extract(data))
+
+
+def stream_pdf_pages(data, cache=None, pages=None, workers=None):
+    """
+    Genera (página, total de páginas pedidas, texto) a medida que se decodifica.
+
+    Si el documento ya está en la caché las páginas salen de ahí. Si se extrae
+    el documento completo, el texto se guarda al terminar (salvo que supere
+    MAX_CACHED_CHARS); con un rango parcial no se guarda nada.
+    """
+    total_pages = page_count(data)
+    indices = pages if isinstance(pages, list) else parse_page_range(pages, total_pages)
+    key = None
+    if cache is not None:
+        key = cache.key(hashlib.sha256(data).hexdigest(), "pdf", extractor_version("pdf"))
+        cached = cache.get(key)
+        if cached is not None:
+            texts = cached.split(PAGE_BREAK)
+            for index in indices:
+                yield index + 1, len(indices), texts[index] if index < len(texts) else ""
+            return
+
+    whole = key is not None and indices == list(range(total_pages))
+    collected, size = [], 0
+    for number, text in iter_pages(data, indices, workers):
+        if whole:
+            size += len(text)
+            if size > MAX_CACHED_CHARS:
+                whole, collected = False, []
+            else:
+                collected.append(text)
+        yield number, len(indices), text
+    if whole:
+        cache.put(key, PAGE_BREAK.join(collected))
+
+
+def ocr_document(data, kind, cache=None, pool=None, progress=None):
+    """
+    OCR en el pool compartido (services.ocr) con el mismo resultado que
+    OCRPool.recognize() más 'desde_cache'. `kind` es "image" o "scan".
+    """
+    key = None
+    if cache is not None:
+        key = cache.key(hashlib.sha256(data).hexdigest(), kind, extractor_version(kind))
+        text = cache.get(key)
+        if text is not None:
+            return {"texto": text, "paginas": [], "segundos": 0.0, "desde_cache": True}
+    pool = pool or OCRPool(workers=0)
+    result = pool.recognize(data, "pdf" if kind == "scan" else "image", progress)
+    if key is not None:
+        cache.put(key, result["texto"])
+    result["desde_cache"] = False
+    return result